@@ -8,24 +8,28 @@ NICHOS = {
         "nome": "Casa & Cozinha",
         "persona": "Cléo Cozinha Prática",
         "categoria_shopee": ["Home & Living", "Kitchen & Dining"],
+        "categoria_ids": [],  # IDs numéricos de categoria da API Shopee, buscados além das palavras-chave
         "palavras_chave": ["casa", "cozinha", "decoração", "organização"]
     },
     "tech": {
         "nome": "Tech & Wearables",
         "persona": "Léo Tech Acessível",
         "categoria_shopee": ["Electronics", "Mobiles & Gadgets"],
+        "categoria_ids": [],
         "palavras_chave": ["fone", "smartwatch", "carregador", "cabo", "tech"]
     },
     "pet": {
         "nome": "Mundo Pet",
         "persona": "Pri e os Peludinhos",
         "categoria_shopee": ["Pet Care"],
+        "categoria_ids": [],
         "palavras_chave": ["pet", "cachorro", "gato", "ração", "brinquedo"]
     },
     "cosmeticos": {
         "nome": "Cosméticos",
         "persona": "Tati Beleza Real",
         "categoria_shopee": ["Beauty & Personal Care"],
+        "categoria_ids": [],
         "palavras_chave": ["makeup", "skincare", "cabelo", "cosmético"]
     }
 }
@@ -111,9 +115,93 @@ PESO_DESCONTO = 0.05
 
 # Limites de API
 SHOPEE_API_RATE_LIMIT = 100  # chamadas por minuto
-PRODUTOS_POR_COLETA = 50
+SHOPEE_API_BURST = 10  # chamadas permitidas em rajada antes de entrar na fila
+SHOPEE_API_ENDPOINT_RATE_LIMITS = {}  # limites extras por endpoint, ex: {"/link/generate": 60}
+PRODUTOS_POR_COLETA = 50  # ofertas por página da API
+SHOPEE_PAGE_CONCURRENCY = 4  # páginas buscadas em paralelo na coleta paginada
+COLETA_CONCORRENCIA_GLOBAL = 12  # páginas em voo somando todos os nichos/palavras-chave
+COLETA_COTA_POR_NICHO = 500  # produtos válidos coletados por nicho na coleta diária
+UPSERT_BATCH_SIZE = 500  # produtos por INSERT ... ON CONFLICT
+ROLLUP_LOTE = 2000  # linhas de analytics reservadas e somadas por vez na atualização dos rollups
 TOP_N_PRODUTOS = 10
 
+# Ingestão de cliques/conversões (buffer em memória)
+CLIQUES_FLUSH_INTERVALO_S = 0.25  # grava os incrementos acumulados a cada intervalo
+CLIQUES_FLUSH_MAX_EVENTOS = 500  # ou antes, ao acumular esse número de eventos
+
+# Cache de redirecionamento (short code -> link_completo)
+REDIRECT_CACHE_MAX_ITENS = 50000  # aquecido no startup com os links mais clicados
+REDIRECT_CACHE_TTL_S = 3600  # segundos até reler o destino do banco
+REDIRECT_CACHE_TTL_NEGATIVO_S = 30  # short codes inexistentes também ficam em cache
+
+# Short codes dos links (base62)
+SHORT_CODE_TAMANHO = 8  # caracteres; 62^8 > 2^47 IDs distintos
+SHORT_CODE_BLOCO = 1000  # IDs reservados por ida ao banco (por worker)
+LINK_CODIGO_TENTATIVAS = 3  # INSERTs de um link antes de desistir por colisão de short code
+LINKS_CONCORRENCIA = 8  # chamadas /link/generate em voo na geração em lote (o rate limit vale por cima)
+LINKS_LOTE_MAX_PEDIDOS = 2000  # combinações produto × canal × formato × campanha por lote
+AFFILIATE_CACHE_MAX_ITENS = 20000  # links por (produto, SubIds) em memória; o resto fica na tabela links
+
+# Pool de conexões HTTP com a API Shopee
+SHOPEE_HTTP_TIMEOUT = 30.0  # segundos
+SHOPEE_HTTP_MAX_CONNECTIONS = 20
+SHOPEE_HTTP_MAX_KEEPALIVE = 10
+SHOPEE_HTTP_KEEPALIVE_EXPIRY = 30.0  # segundos
+
+# Resiliência das chamadas externas (Shopee, LLMs, Buffer, Telegram)
+RESILIENCIA_TENTATIVAS = 3  # tentativas por chamada (1 = sem retry)
+RESILIENCIA_BACKOFF_BASE_S = 0.5  # espera antes do 2º envio; dobra a cada tentativa (com jitter)
+RESILIENCIA_BACKOFF_MAX_S = 10.0
+RESILIENCIA_RETRY_AFTER_MAX_S = 60.0  # Retry-After maior que isso desiste em vez de esperar
+CIRCUITO_LIMITE_FALHAS = 5  # falhas transitórias seguidas que abrem o circuito do host
+CIRCUITO_RESET_S = 30.0  # segundos com o circuito aberto antes de uma chamada de teste (meio-aberto)
+
+# Cache de respostas dos LLMs
+LLM_CACHE_MAX_ITENS_MEMORIA = 2000  # entradas no LRU em memória (por processo)
+LLM_CACHE_TTL_S = 7 * 24 * 3600  # segundos até uma resposta expirar
+LLM_CACHE_MAX_BYTES = 200 * 1024 * 1024  # tamanho máximo das respostas no SQLite
+LLM_CACHE_VARIACOES = 3  # respostas guardadas por prompt quando a temperatura é alta
+LLM_CACHE_TEMPERATURA_DETERMINISTICA = 0.3  # até aqui, uma resposta por prompt basta
+LLM_CACHE_PURGA_A_CADA = 200  # gravações entre limpezas de expirados/excesso no SQLite
+
+# Chamadas em voo por provedor de LLM (variações de conteúdo geradas em paralelo)
+LLM_CONCORRENCIA_POR_PROVEDOR = {"gpt": 4, "deepseek": 4, "gemini": 2}
+
+# Jobs de geração de copies em lote (src/llm/batch.py)
+LLM_BATCH_TAMANHO_LOTE = 50  # itens por envio ao provedor (e por transação de resultados)
+LLM_BATCH_INTERVALO_POLL_S = 30.0  # espera entre consultas a um lote enviado a uma batch API
+LLM_BATCH_MAX_TENTATIVAS = 3  # tentativas por item antes de marcá-lo como falhou
+
+# Custo e orçamento dos LLMs (src/llm/budget.py)
+# USD por 1000 tokens: (entrada/prompt, saída/resposta)
+LLM_PRECOS_POR_MIL_TOKENS = {
+    "gpt-4-turbo-preview": (0.01, 0.03),
+    "gpt-3.5-turbo": (0.0005, 0.0015),
+    "deepseek-chat": (0.00014, 0.00028),
+    "gemini-pro": (0.0005, 0.0015),
+}
+LLM_MODELO_ECONOMICO = {"gpt-4-turbo-preview": "gpt-3.5-turbo"}  # troca quando o orçamento aperta
+LLM_ORCAMENTO_POR_TAREFA_USD = {"copywriting": 6.0, "hashtags": 0.5}  # por dia; tarefas fora daqui só têm o diário
+LLM_ORCAMENTO_LIMIAR_ECONOMIA = 0.8  # fração do orçamento a partir da qual usa o modelo econômico
+LLM_CHARS_POR_TOKEN = 4.0  # estimativa de tokens quando o provedor não informa (sem tiktoken)
+
+# Roteamento dos LLMs por tarefa (src/llm/router.py)
+# provedores: ordem de fallback ("template" = texto local, sem LLM)
+# timeout_s: limite de cada tentativa; hedge: tarefa sensível à latência
+LLM_POLITICAS_ROTEAMENTO = {
+    "copywriting": {"provedores": ["gpt", "deepseek", "template"], "timeout_s": 30.0, "hedge": True},
+    "hashtags": {"provedores": ["gpt", "template"], "timeout_s": 15.0, "hedge": False},
+    "variations": {"provedores": ["gpt"], "timeout_s": 60.0, "hedge": False},
+    "ranking": {"provedores": ["deepseek"], "timeout_s": 90.0, "hedge": False},
+    "analysis": {"provedores": ["deepseek"], "timeout_s": 60.0, "hedge": False},
+    "video_script": {"provedores": ["gemini"], "timeout_s": 60.0, "hedge": False},
+    "image_analysis": {"provedores": ["gemini"], "timeout_s": 60.0, "hedge": False},
+    "narration": {"provedores": ["gemini"], "timeout_s": 60.0, "hedge": False},
+}
+LLM_LATENCIA_JANELA = 200  # últimas chamadas por provedor usadas nos percentis de latência
+LLM_HEDGE_PERCENTIL = 0.95  # sem resposta após esse percentil de latência, dispara o pedido reserva
+LLM_HEDGE_MIN_AMOSTRAS = 20  # amostras de latência do provedor antes de usar hedge
+
 # Compliance
 DISCLAIMER_AFILIADO = "🔗 Link de afiliado"
 DISCLAIMER_PRECO_SUJEITO = "⚠️ Preço sujeito a alteração"
@@ -14,16 +14,29 @@ class Credentials:
     
     # Database
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./shopee_affiliate.db")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_TIMEOUT_MS: int = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "30000"))
+    DB_SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("DB_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    DB_ECHO: bool = os.getenv("DB_ECHO", "false").lower() == "true"
     
     # Shopee Affiliate API
     SHOPEE_AFFILIATE_API_KEY: Optional[str] = os.getenv("SHOPEE_AFFILIATE_API_KEY")
     SHOPEE_AFFILIATE_SECRET: Optional[str] = os.getenv("SHOPEE_AFFILIATE_SECRET")
     SHOPEE_PARTNER_ID: Optional[str] = os.getenv("SHOPEE_PARTNER_ID")
+    SHOPEE_HTTP2: bool = os.getenv("SHOPEE_HTTP2", "false").lower() == "true"
+    SHOPEE_RATE_LIMIT_BACKEND: str = os.getenv("SHOPEE_RATE_LIMIT_BACKEND", "memory")
     
     # LLM APIs
     DEEPSEEK_API_KEY: Optional[str] = os.getenv("DEEPSEEK_API_KEY")
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     GOOGLE_API_KEY: Optional[str] = os.getenv("GOOGLE_API_KEY")
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "true").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "./llm_cache.db")
+    LLM_DAILY_BUDGET_USD: float = float(os.getenv("LLM_DAILY_BUDGET_USD", "10"))
     
     # Telegram
     TELEGRAM_BOT_TOKEN: Optional[str] = os.getenv("TELEGRAM_BOT_TOKEN")
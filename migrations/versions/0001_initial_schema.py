@@ -0,0 +1,124 @@
+"""Schema inicial (tabelas criadas por init_db até então)
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "produtos",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("shopee_id", sa.String(), nullable=False),
+        sa.Column("nome", sa.String(), nullable=False),
+        sa.Column("descricao", sa.Text(), nullable=True),
+        sa.Column("preco_original", sa.Float(), nullable=False),
+        sa.Column("preco_promocional", sa.Float(), nullable=True),
+        sa.Column("desconto_percentual", sa.Float(), nullable=True),
+        sa.Column("comissao_percentual", sa.Float(), nullable=False),
+        sa.Column("comissao_valor", sa.Float(), nullable=False),
+        sa.Column("rating", sa.Float(), nullable=True),
+        sa.Column("total_vendas", sa.Integer(), nullable=True),
+        sa.Column("total_avaliacoes", sa.Integer(), nullable=True),
+        sa.Column("nicho", sa.String(), nullable=False),
+        sa.Column("categoria_shopee", sa.String(), nullable=True),
+        sa.Column("url_produto", sa.String(), nullable=False),
+        sa.Column("imagem_url", sa.String(), nullable=True),
+        sa.Column("imagens_adicionais", sa.JSON(), nullable=True),
+        sa.Column("score_ranking", sa.Float(), nullable=True),
+        sa.Column("motivo_ranking", sa.Text(), nullable=True),
+        sa.Column("ativo", sa.Boolean(), nullable=True),
+        sa.Column("ja_publicado", sa.Boolean(), nullable=True),
+        sa.Column("coletado_em", sa.DateTime(), nullable=True),
+        sa.Column("atualizado_em", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_produtos_id", "produtos", ["id"])
+    op.create_index("ix_produtos_shopee_id", "produtos", ["shopee_id"], unique=True)
+    op.create_index("ix_produtos_nicho", "produtos", ["nicho"])
+    op.create_index("ix_produtos_score_ranking", "produtos", ["score_ranking"])
+    
+    op.create_table(
+        "conteudos_gerados",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("produto_id", sa.Integer(), nullable=False),
+        sa.Column("canal", sa.String(), nullable=False),
+        sa.Column("formato", sa.String(), nullable=False),
+        sa.Column("persona", sa.String(), nullable=False),
+        sa.Column("template", sa.String(), nullable=False),
+        sa.Column("titulo", sa.String(), nullable=True),
+        sa.Column("copy_texto", sa.Text(), nullable=False),
+        sa.Column("hashtags", sa.String(), nullable=True),
+        sa.Column("cta", sa.String(), nullable=True),
+        sa.Column("roteiro_video", sa.Text(), nullable=True),
+        sa.Column("video_url", sa.String(), nullable=True),
+        sa.Column("duracao_segundos", sa.Integer(), nullable=True),
+        sa.Column("variacao_numero", sa.Integer(), nullable=True),
+        sa.Column("aprovado", sa.Boolean(), nullable=True),
+        sa.Column("publicado", sa.Boolean(), nullable=True),
+        sa.Column("gerado_em", sa.DateTime(), nullable=True),
+        sa.Column("publicado_em", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["produto_id"], ["produtos.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_conteudos_gerados_id", "conteudos_gerados", ["id"])
+    
+    op.create_table(
+        "links",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("produto_id", sa.Integer(), nullable=False),
+        sa.Column("link_curto", sa.String(), nullable=False),
+        sa.Column("link_completo", sa.String(), nullable=False),
+        sa.Column("sub_id1", sa.String(), nullable=False),
+        sa.Column("sub_id2", sa.String(), nullable=False),
+        sa.Column("sub_id3", sa.String(), nullable=False),
+        sa.Column("sub_id4", sa.String(), nullable=False),
+        sa.Column("sub_id5", sa.String(), nullable=False),
+        sa.Column("total_cliques", sa.Integer(), nullable=True),
+        sa.Column("total_conversoes", sa.Integer(), nullable=True),
+        sa.Column("receita_gerada", sa.Float(), nullable=True),
+        sa.Column("criado_em", sa.DateTime(), nullable=True),
+        sa.Column("ultimo_clique_em", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["produto_id"], ["produtos.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_links_id", "links", ["id"])
+    op.create_index("ix_links_link_curto", "links", ["link_curto"], unique=True)
+    
+    op.create_table(
+        "analytics",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("produto_id", sa.Integer(), nullable=True),
+        sa.Column("data", sa.DateTime(), nullable=False),
+        sa.Column("canal", sa.String(), nullable=True),
+        sa.Column("nicho", sa.String(), nullable=True),
+        sa.Column("campanha", sa.String(), nullable=True),
+        sa.Column("impressoes", sa.Integer(), nullable=True),
+        sa.Column("cliques", sa.Integer(), nullable=True),
+        sa.Column("conversoes", sa.Integer(), nullable=True),
+        sa.Column("receita", sa.Float(), nullable=True),
+        sa.Column("comissao", sa.Float(), nullable=True),
+        sa.Column("ctr", sa.Float(), nullable=True),
+        sa.Column("taxa_conversao", sa.Float(), nullable=True),
+        sa.Column("coletado_em", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["produto_id"], ["produtos.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_analytics_id", "analytics", ["id"])
+    op.create_index("ix_analytics_data", "analytics", ["data"])
+
+
+def downgrade():
+    op.drop_table("analytics")
+    op.drop_table("links")
+    op.drop_table("conteudos_gerados")
+    op.drop_table("produtos")
@@ -0,0 +1,36 @@
+"""Token bucket compartilhado e fingerprint do score de produtos
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "rate_limit_buckets",
+        sa.Column("nome", sa.String(), nullable=False),
+        sa.Column("tokens", sa.Float(), nullable=False),
+        sa.Column("atualizado_em", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("nome"),
+    )
+    
+    with op.batch_alter_table("produtos") as batch_op:
+        batch_op.add_column(sa.Column("score_fingerprint", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("score_versao_pesos", sa.String(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("produtos") as batch_op:
+        batch_op.drop_column("score_versao_pesos")
+        batch_op.drop_column("score_fingerprint")
+    
+    op.drop_table("rate_limit_buckets")
@@ -0,0 +1,48 @@
+"""Índices compostos e parciais para as consultas mais frequentes
+
+- produtos (nicho, ativo, score_ranking): top_ranqueados / listar_por_nicho;
+  substitui o índice simples em nicho (prefixo do composto)
+- conteudos_gerados (canal, produto_id) só de aprovados não publicados:
+  buscar_para_publicar
+- analytics (canal, data) e (nicho, data): buscar_por_periodo
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        "ix_produtos_nicho_ativo_score",
+        "produtos",
+        ["nicho", "ativo", "score_ranking"],
+    )
+    op.drop_index("ix_produtos_nicho", table_name="produtos")
+    
+    op.create_index(
+        "ix_conteudos_pendentes_publicacao",
+        "conteudos_gerados",
+        ["canal", "produto_id"],
+        sqlite_where=sa.text("aprovado = 1 AND publicado = 0"),
+        postgresql_where=sa.text("aprovado AND NOT publicado"),
+    )
+    
+    op.create_index("ix_analytics_canal_data", "analytics", ["canal", "data"])
+    op.create_index("ix_analytics_nicho_data", "analytics", ["nicho", "data"])
+
+
+def downgrade():
+    op.drop_index("ix_analytics_nicho_data", table_name="analytics")
+    op.drop_index("ix_analytics_canal_data", table_name="analytics")
+    op.drop_index("ix_conteudos_pendentes_publicacao", table_name="conteudos_gerados")
+    op.create_index("ix_produtos_nicho", "produtos", ["nicho"])
+    op.drop_index("ix_produtos_nicho_ativo_score", table_name="produtos")
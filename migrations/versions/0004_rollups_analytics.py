@@ -0,0 +1,70 @@
+"""Rollups diários de analytics e watermarks da atualização incremental
+
+- analytics_diario: dia × canal × nicho × campanha
+- analytics_produto_diario: dia × produto
+- rollup_watermarks: último analytics.id agregado em cada rollup
+
+As tabelas nascem vazias; a primeira atualização (watermark 0) agrega todo
+o histórico existente.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def _colunas_metricas():
+    return [
+        sa.Column("impressoes", sa.Integer(), nullable=False),
+        sa.Column("cliques", sa.Integer(), nullable=False),
+        sa.Column("conversoes", sa.Integer(), nullable=False),
+        sa.Column("receita", sa.Float(), nullable=False),
+        sa.Column("comissao", sa.Float(), nullable=False),
+    ]
+
+
+def upgrade():
+    op.create_table(
+        "analytics_diario",
+        sa.Column("dia", sa.Date(), nullable=False),
+        sa.Column("canal", sa.String(), nullable=False),
+        sa.Column("nicho", sa.String(), nullable=False),
+        sa.Column("campanha", sa.String(), nullable=False),
+        *_colunas_metricas(),
+        sa.PrimaryKeyConstraint("dia", "canal", "nicho", "campanha"),
+    )
+    op.create_index("ix_analytics_diario_canal_dia", "analytics_diario", ["canal", "dia"])
+    op.create_index("ix_analytics_diario_nicho_dia", "analytics_diario", ["nicho", "dia"])
+    
+    op.create_table(
+        "analytics_produto_diario",
+        sa.Column("dia", sa.Date(), nullable=False),
+        sa.Column("produto_id", sa.Integer(), nullable=False),
+        *_colunas_metricas(),
+        sa.ForeignKeyConstraint(["produto_id"], ["produtos.id"]),
+        sa.PrimaryKeyConstraint("dia", "produto_id"),
+    )
+    
+    op.create_table(
+        "rollup_watermarks",
+        sa.Column("nome", sa.String(), nullable=False),
+        sa.Column("ultimo_id", sa.Integer(), nullable=False),
+        sa.Column("atualizado_em", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("nome"),
+    )
+
+
+def downgrade():
+    op.drop_table("rollup_watermarks")
+    op.drop_table("analytics_produto_diario")
+    op.drop_index("ix_analytics_diario_nicho_dia", table_name="analytics_diario")
+    op.drop_index("ix_analytics_diario_canal_dia", table_name="analytics_diario")
+    op.drop_table("analytics_diario")
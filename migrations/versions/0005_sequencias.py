@@ -0,0 +1,30 @@
+"""Tabela de sequências para alocação de short codes em blocos
+
+Cada worker reserva um bloco de IDs com um único UPDATE ... RETURNING e
+gera os short codes do bloco em memória, sem consultar o banco por link.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "sequencias",
+        sa.Column("nome", sa.String(), nullable=False),
+        sa.Column("proximo", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("nome"),
+    )
+
+
+def downgrade():
+    op.drop_table("sequencias")
@@ -0,0 +1,40 @@
+"""Índice único de links por produto + SubIds
+
+Antes do índice, links repetidos (mesmo produto e mesmos cinco SubIds) são
+consolidados no mais antigo: as métricas dos repetidos são somadas nele e
+os demais são removidos. Os short codes removidos deixam de redirecionar.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+"""
+from alembic import op
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+CHAVE = ["produto_id", "sub_id1", "sub_id2", "sub_id3", "sub_id4", "sub_id5"]
+
+_MESMA_CHAVE = " AND ".join(f"d.{coluna} = links.{coluna}" for coluna in CHAVE)
+_GRUPO = ", ".join(CHAVE)
+
+
+def upgrade():
+    op.execute(f"""
+        UPDATE links SET
+            total_cliques = (SELECT SUM(COALESCE(d.total_cliques, 0)) FROM links d WHERE {_MESMA_CHAVE}),
+            total_conversoes = (SELECT SUM(COALESCE(d.total_conversoes, 0)) FROM links d WHERE {_MESMA_CHAVE}),
+            receita_gerada = (SELECT SUM(COALESCE(d.receita_gerada, 0)) FROM links d WHERE {_MESMA_CHAVE}),
+            ultimo_clique_em = (SELECT MAX(d.ultimo_clique_em) FROM links d WHERE {_MESMA_CHAVE})
+        WHERE id IN (SELECT MIN(id) FROM links GROUP BY {_GRUPO} HAVING COUNT(*) > 1)
+    """)
+    op.execute(f"DELETE FROM links WHERE id NOT IN (SELECT MIN(id) FROM links GROUP BY {_GRUPO})")
+    
+    op.create_index("uq_links_produto_subids", "links", CHAVE, unique=True)
+
+
+def downgrade():
+    op.drop_index("uq_links_produto_subids", table_name="links")
@@ -0,0 +1,69 @@
+"""Jobs de geração de copies em lote (llm_jobs e llm_job_itens)
+
+Cada item guarda o prompt, o estado (pendente, enviado, concluido, falhou)
+e o ID do lote no provedor, para que um job interrompido continue de onde
+parou.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "llm_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("nome", sa.String(), nullable=True),
+        sa.Column("provider", sa.String(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("concluidos", sa.Integer(), nullable=False),
+        sa.Column("falhas", sa.Integer(), nullable=False),
+        sa.Column("criado_em", sa.DateTime(), nullable=True),
+        sa.Column("atualizado_em", sa.DateTime(), nullable=True),
+        sa.Column("concluido_em", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_llm_jobs_id", "llm_jobs", ["id"])
+    
+    op.create_table(
+        "llm_job_itens",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("produto_id", sa.Integer(), nullable=False),
+        sa.Column("canal", sa.String(), nullable=False),
+        sa.Column("formato", sa.String(), nullable=True),
+        sa.Column("persona", sa.String(), nullable=True),
+        sa.Column("template", sa.String(), nullable=True),
+        sa.Column("variacao_numero", sa.Integer(), nullable=True),
+        sa.Column("prompt", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("lote_externo", sa.String(), nullable=True),
+        sa.Column("tentativas", sa.Integer(), nullable=False),
+        sa.Column("erro", sa.Text(), nullable=True),
+        sa.Column("conteudo_id", sa.Integer(), nullable=True),
+        sa.Column("atualizado_em", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["job_id"], ["llm_jobs.id"]),
+        sa.ForeignKeyConstraint(["produto_id"], ["produtos.id"]),
+        sa.ForeignKeyConstraint(["conteudo_id"], ["conteudos_gerados.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_llm_job_itens_id", "llm_job_itens", ["id"])
+    op.create_index("ix_llm_job_itens_job_status", "llm_job_itens", ["job_id", "status"])
+
+
+def downgrade():
+    op.drop_index("ix_llm_job_itens_job_status", table_name="llm_job_itens")
+    op.drop_index("ix_llm_job_itens_id", table_name="llm_job_itens")
+    op.drop_table("llm_job_itens")
+    op.drop_index("ix_llm_jobs_id", table_name="llm_jobs")
+    op.drop_table("llm_jobs")
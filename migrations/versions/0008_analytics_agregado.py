@@ -0,0 +1,48 @@
+"""Marca de agregação nas linhas de analytics (analytics.agregado)
+
+Os rollups passam a agregar as linhas com agregado = false em vez das
+linhas acima do watermark, que perdia linhas commitadas depois de outras
+com id maior. As linhas até o menor watermark já foram agregadas e nascem
+marcadas.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0008"
+down_revision = "0007"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("analytics") as batch:
+        batch.add_column(
+            sa.Column("agregado", sa.Boolean(), server_default=sa.false(), nullable=False)
+        )
+    
+    op.execute(
+        sa.text(
+            "UPDATE analytics SET agregado = :sim "
+            "WHERE id <= (SELECT COALESCE(MIN(ultimo_id), 0) FROM rollup_watermarks)"
+        ).bindparams(sim=True)
+    )
+    
+    op.create_index(
+        "ix_analytics_pendentes",
+        "analytics",
+        ["id"],
+        sqlite_where=sa.text("agregado = 0"),
+        postgresql_where=sa.text("NOT agregado"),
+    )
+
+
+def downgrade():
+    op.drop_index("ix_analytics_pendentes", table_name="analytics")
+    
+    with op.batch_alter_table("analytics") as batch:
+        batch.drop_column("agregado")
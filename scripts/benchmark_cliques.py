@@ -0,0 +1,157 @@
+"""
+Benchmark da ingestão de cliques: leitura+escrita vs UPDATE atômico vs buffer
+
+Webhooks concorrentes (tasks no mesmo event loop, como um worker do
+uvicorn) registram cliques em poucos links de um banco SQLite temporário:
+
+- leitura+escrita: carrega o Link, soma em Python e faz commit (como
+  atualizar_metricas fazia); cliques concorrentes se sobrescrevem
+- UPDATE atômico por evento: total_cliques = total_cliques + 1, um commit
+  por clique
+- ClickBuffer: soma em memória e grava em lote a cada intervalo
+
+Para cada modo mostra a vazão e quantos cliques se perderam.
+
+Uso:
+    python scripts/benchmark_cliques.py --eventos 5000 --concorrencia 50 --links 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Adiciona o diretório raiz ao Python path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from sqlalchemy import create_engine, func, insert, select, update
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.database import models  # noqa: F401
+from src.database.async_repository import AsyncLinkRepository
+from src.database.connection import Base, async_database_url, configurar_sqlite, engine_options
+from src.database.models import Link, Produto
+from src.links.click_tracker import ClickBuffer
+
+
+def popular(engine, total_links: int):
+    with engine.begin() as conn:
+        conn.execute(insert(Produto.__table__), [{
+            "id": 1, "shopee_id": "bench_1", "nome": "Produto", "preco_original": 100.0,
+            "comissao_percentual": 10.0, "comissao_valor": 10.0, "nicho": "tech",
+            "url_produto": "https://shopee.com.br",
+        }])
+        conn.execute(insert(Link.__table__), [
+            {
+                "produto_id": 1, "link_curto": f"s{i}", "link_completo": f"https://s.shopee.com.br/{i}",
+                "sub_id1": "grupo", "sub_id2": "tech", "sub_id3": "texto",
+                "sub_id4": "oferta_dia", "sub_id5": "20260101",
+            }
+            for i in range(total_links)
+        ])
+
+
+def zerar(engine):
+    with engine.begin() as conn:
+        conn.execute(update(Link.__table__).values(total_cliques=0))
+
+
+def total_gravado(engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(select(func.sum(Link.total_cliques))).scalar() or 0
+
+
+async def leitura_escrita(async_factory, link_id: int):
+    async with async_factory() as db:
+        link = await db.get(Link, link_id)
+        await asyncio.sleep(0)  # outro webhook roda entre a leitura e a escrita
+        link.total_cliques = (link.total_cliques or 0) + 1
+        await db.commit()
+
+
+async def atomico(async_factory, link_id: int):
+    async with async_factory() as db:
+        await AsyncLinkRepository.atualizar_metricas(db, link_id, cliques=1)
+
+
+async def carga(registrar, eventos: int, concorrencia: int, total_links: int) -> float:
+    fila = asyncio.Queue()
+    for i in range(eventos):
+        fila.put_nowait(1 + i % total_links)
+    
+    async def webhook():
+        while not fila.empty():
+            await registrar(fila.get_nowait())
+    
+    inicio = time.perf_counter()
+    await asyncio.gather(*(webhook() for _ in range(concorrencia)))
+    return time.perf_counter() - inicio
+
+
+async def main(eventos: int, concorrencia: int, total_links: int):
+    print("=" * 60)
+    print("BENCHMARK - Ingestão de cliques (SQLite)")
+    print("=" * 60)
+    print(f"\n{eventos} cliques, {concorrencia} webhooks concorrentes, {total_links} links")
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench_cliques.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        popular(engine, total_links)
+        
+        # Mesmas opções da API: pool dimensionado, WAL e busy_timeout
+        async_engine = create_async_engine(async_database_url(url), **engine_options(url, assincrono=True))
+        configurar_sqlite(async_engine.sync_engine)
+        async_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+        
+        resultados = {}
+        
+        zerar(engine)
+        duracao = await carga(lambda l: leitura_escrita(async_factory, l), eventos, concorrencia, total_links)
+        resultados["leitura+escrita"] = (duracao, total_gravado(engine))
+        
+        zerar(engine)
+        duracao = await carga(lambda l: atomico(async_factory, l), eventos, concorrencia, total_links)
+        resultados["UPDATE atômico por evento"] = (duracao, total_gravado(engine))
+        
+        zerar(engine)
+        buffer = ClickBuffer(session_factory=async_factory)
+        await buffer.start()
+        
+        async def bufferizado(link_id):
+            buffer.registrar(link_id, cliques=1)
+            await asyncio.sleep(0)
+        
+        duracao = await carga(bufferizado, eventos, concorrencia, total_links)
+        inicio = time.perf_counter()
+        await buffer.stop()
+        duracao += time.perf_counter() - inicio
+        resultados["ClickBuffer"] = (duracao, total_gravado(engine))
+        stats = buffer.get_stats()
+        
+        print()
+        for nome, (duracao, gravado) in resultados.items():
+            print(f"  {nome:28s} {eventos / duracao:10.0f} cliques/s   "
+                  f"perdidos: {eventos - gravado}")
+        
+        print(f"\n  ClickBuffer: {stats['flushes']} flushes, "
+              f"flush médio {stats['flush_medio_ms']:.1f} ms (o tempo inclui o flush final do stop)")
+        
+        await async_engine.dispose()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--eventos", type=int, default=5000)
+    parser.add_argument("--concorrencia", type=int, default=50)
+    parser.add_argument("--links", type=int, default=20)
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.eventos, args.concorrencia, args.links))
@@ -0,0 +1,219 @@
+"""
+Benchmark dos índices compostos/parciais (migração 0003)
+
+Cria um banco SQLite temporário na revisão 0002 (só índices simples),
+popula com 1M linhas de analytics, produtos e conteúdos, e mede as
+consultas quentes dos repositories. Depois aplica a migração 0003 e
+repete. Para cada consulta mostra o plano (EXPLAIN QUERY PLAN) e o tempo
+mediano antes e depois.
+
+Uso:
+    python scripts/benchmark_indices.py --analytics 1000000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adiciona o diretório raiz ao Python path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Analytics, ConteudoGerado, Produto
+from src.database.repository import AnalyticsRepository, ConteudoRepository, ProdutoRepository
+
+NICHOS = ["casa", "tech", "pet", "cosmeticos"]
+CANAIS = ["tiktok", "reels", "stories", "grupo"]
+HOJE = datetime(2026, 1, 31)
+
+
+def alembic_config(url: str) -> Config:
+    config = Config(str(root_dir / "alembic.ini"))
+    config.set_main_option("script_location", str(root_dir / "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def inserir_em_blocos(conn, tabela, linhas, bloco: int = 20000):
+    for inicio in range(0, len(linhas), bloco):
+        conn.execute(insert(tabela), linhas[inicio:inicio + bloco])
+
+
+def popular(engine, total_analytics: int, total_produtos: int, total_conteudos: int):
+    rng = random.Random(42)
+    
+    produtos = [
+        {
+            "id": i + 1,
+            "shopee_id": f"bench_{i}",
+            "nome": f"Produto {i}",
+            "preco_original": 100.0,
+            "comissao_percentual": 10.0,
+            "comissao_valor": 10.0,
+            "nicho": NICHOS[i % 4],
+            "url_produto": "https://shopee.com.br",
+            "score_ranking": rng.uniform(0, 100),
+            "ativo": rng.random() > 0.1,
+        }
+        for i in range(total_produtos)
+    ]
+    
+    conteudos = [
+        {
+            "produto_id": rng.randint(1, total_produtos),
+            "canal": CANAIS[i % 4],
+            "formato": "texto",
+            "persona": "bench",
+            "template": "bench",
+            "copy_texto": "bench",
+            # ~1% aprovado e pendente; o resto já publicado ou não aprovado
+            "aprovado": i % 100 == 0 or i % 3 != 0,
+            "publicado": i % 100 != 0 and i % 3 != 0,
+        }
+        for i in range(total_conteudos)
+    ]
+    
+    analytics = [
+        {
+            "produto_id": rng.randint(1, total_produtos),
+            "data": HOJE - timedelta(minutes=rng.randint(0, 365 * 24 * 60)),
+            "canal": CANAIS[rng.randrange(4)],
+            "nicho": NICHOS[rng.randrange(4)],
+            "campanha": "bench",
+            "impressoes": 100,
+            "cliques": rng.randint(0, 10),
+            "conversoes": rng.randint(0, 2),
+            "receita": 10.0,
+            "comissao": 1.0,
+        }
+        for _ in range(total_analytics)
+    ]
+    
+    with engine.begin() as conn:
+        inserir_em_blocos(conn, Produto.__table__, produtos)
+        inserir_em_blocos(conn, ConteudoGerado.__table__, conteudos)
+        inserir_em_blocos(conn, Analytics.__table__, analytics)
+        conn.execute(text("ANALYZE"))
+
+
+CONSULTAS = {
+    "top_ranqueados(tech)": lambda db: ProdutoRepository.top_ranqueados(db, "tech", 10),
+    "buscar_para_publicar(grupo, pet)": lambda db: ConteudoRepository.buscar_para_publicar(db, "grupo", "pet", 5),
+    "buscar_por_periodo(7d, canal)": lambda db: AnalyticsRepository.buscar_por_periodo(
+        db, HOJE - timedelta(days=7), HOJE, canal="tiktok"
+    ),
+    "buscar_por_periodo(1d, nicho)": lambda db: AnalyticsRepository.buscar_por_periodo(
+        db, HOJE - timedelta(days=1), HOJE, nicho="casa"
+    ),
+}
+
+
+def capturar_sql(engine, session_factory, consulta):
+    """Executa a consulta uma vez e captura o SQL gerado pelo repository"""
+    capturado = {}
+    
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        capturado.setdefault("sql", (statement, parameters))
+    
+    event.listen(engine, "before_cursor_execute", listener)
+    db = session_factory()
+    try:
+        consulta(db)
+    finally:
+        db.close()
+        event.remove(engine, "before_cursor_execute", listener)
+    
+    return capturado["sql"]
+
+
+def medir(engine, session_factory, repeticoes: int) -> dict:
+    resultados = {}
+    
+    for nome, consulta in CONSULTAS.items():
+        statement, parameters = capturar_sql(engine, session_factory, consulta)
+        with engine.connect() as conn:
+            plano = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        
+        tempos = []
+        for _ in range(repeticoes):
+            db = session_factory()
+            inicio = time.perf_counter()
+            consulta(db)
+            tempos.append(time.perf_counter() - inicio)
+            db.close()
+        
+        resultados[nome] = {
+            "plano": [linha[-1] for linha in plano],
+            "ms": statistics.median(tempos) * 1000,
+        }
+    
+    return resultados
+
+
+def imprimir(titulo: str, resultados: dict):
+    print(f"\n--- {titulo} ---")
+    for nome, r in resultados.items():
+        print(f"\n  {nome}: {r['ms']:.2f} ms")
+        for linha in r["plano"]:
+            print(f"      {linha}")
+
+
+def main(total_analytics: int, repeticoes: int):
+    print("=" * 60)
+    print("BENCHMARK - Índices das consultas quentes (SQLite)")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench_indices.db'}"
+        config = alembic_config(url)
+        engine = create_engine(url)
+        session_factory = sessionmaker(bind=engine)
+        
+        command.upgrade(config, "0002")
+        
+        inicio = time.perf_counter()
+        popular(engine, total_analytics, total_produtos=50000, total_conteudos=300000)
+        print(f"\nPopulado em {time.perf_counter() - inicio:.1f} s "
+              f"({total_analytics} analytics, 50000 produtos, 300000 conteúdos)")
+        
+        antes = medir(engine, session_factory, repeticoes)
+        imprimir("Antes (revisão 0002, índices simples)", antes)
+        
+        command.upgrade(config, "0003")
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        
+        depois = medir(engine, session_factory, repeticoes)
+        imprimir("Depois (revisão 0003, índices compostos/parciais)", depois)
+        
+        print("\n--- Resumo ---")
+        for nome in CONSULTAS:
+            print(f"  {nome:34s} {antes[nome]['ms']:9.2f} ms -> {depois[nome]['ms']:9.2f} ms "
+                  f"({antes[nome]['ms'] / depois[nome]['ms']:.1f}x)")
+        
+        print("\n  Obs.: buscar_por_periodo devolve milhares de objetos ORM; depois do")
+        print("  índice, o tempo restante é quase todo materialização das linhas.")
+        
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--analytics", type=int, default=1_000_000)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+    
+    main(args.analytics, args.repeticoes)
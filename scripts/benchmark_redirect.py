@@ -0,0 +1,176 @@
+"""
+Benchmark do redirecionamento de short links (GET /r/{link_curto})
+
+Monta duas versões da rota sobre um banco SQLite temporário com N links
+e mede a latência por redirecionamento (um worker, in-process):
+
+- antes: consulta o Link no banco e grava o clique (UPDATE + commit) a
+  cada requisição
+- depois: a rota da API (src/api/routes/redirect.py) com o cache em
+  memória aquecido e o clique no ClickBuffer
+
+Os short codes seguem uma distribuição Zipf (poucos links concentram a
+maior parte dos cliques). Meta: p99 abaixo de 2 ms no "depois".
+
+Uso:
+    python scripts/benchmark_redirect.py --links 10000 --requisicoes 5000
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# Adiciona o diretório raiz ao Python path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import RedirectResponse
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from src.api.routes import redirect
+from src.database import models  # noqa: F401
+from src.database.async_repository import AsyncLinkRepository
+from src.database.connection import Base, async_database_url, configurar_sqlite, engine_options
+from src.database.models import Link, Produto
+from src.links import click_tracker, redirect_cache
+
+
+def popular(engine, total_links: int):
+    with engine.begin() as conn:
+        conn.execute(insert(Produto.__table__), [{
+            "id": 1, "shopee_id": "bench_1", "nome": "Produto", "preco_original": 100.0,
+            "comissao_percentual": 10.0, "comissao_valor": 10.0, "nicho": "tech",
+            "url_produto": "https://shopee.com.br",
+        }])
+        conn.execute(insert(Link.__table__), [
+            {
+                "produto_id": 1, "link_curto": f"c{i:07d}", "link_completo": f"https://s.shopee.com.br/{i}",
+                "sub_id1": "grupo", "sub_id2": "tech", "sub_id3": "texto",
+                "sub_id4": "oferta_dia", "sub_id5": "20260101",
+            }
+            for i in range(total_links)
+        ])
+
+
+def criar_app_antes(async_factory) -> FastAPI:
+    app = FastAPI()
+    
+    @app.get("/r/{link_curto}")
+    async def redirecionar(link_curto: str):
+        async with async_factory() as db:
+            link = await AsyncLinkRepository.buscar_por_link_curto(db, link_curto)
+            if not link:
+                raise HTTPException(status_code=404)
+            await AsyncLinkRepository.atualizar_metricas(db, link.id, cliques=1)
+        return RedirectResponse(link.link_completo, status_code=302)
+    
+    return app
+
+
+def criar_app_depois() -> FastAPI:
+    app = FastAPI()
+    app.include_router(redirect.router)
+    return app
+
+
+async def carga(app: FastAPI, codigos: list, clientes: int) -> dict:
+    fila = asyncio.Queue()
+    for codigo in codigos:
+        fila.put_nowait(codigo)
+    
+    latencias = []
+    transport = httpx.ASGITransport(app=app)
+    
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def cliente():
+            while not fila.empty():
+                codigo = fila.get_nowait()
+                inicio = time.perf_counter()
+                resposta = await client.get(f"/r/{codigo}")
+                latencias.append(time.perf_counter() - inicio)
+                assert resposta.status_code == 302
+        
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(clientes)))
+        duracao = time.perf_counter() - inicio
+    
+    quantis = statistics.quantiles(latencias, n=100)
+    return {
+        "req_s": len(codigos) / duracao,
+        "p50": quantis[49] * 1000,
+        "p99": quantis[98] * 1000,
+    }
+
+
+def imprimir(titulo: str, r: dict):
+    print(f"  {titulo:48s} {r['req_s']:8.0f} req/s   p50 {r['p50']:6.2f} ms   p99 {r['p99']:6.2f} ms")
+
+
+async def main(total_links: int, requisicoes: int, clientes: int):
+    print("=" * 60)
+    print("BENCHMARK - Redirecionamento de short links (SQLite)")
+    print("=" * 60)
+    print(f"\n{total_links} links, {requisicoes} redirecionamentos (Zipf)")
+    
+    rng = random.Random(42)
+    pesos = [1 / (i + 1) for i in range(total_links)]
+    codigos = [f"c{i:07d}" for i in rng.choices(range(total_links), weights=pesos, k=requisicoes)]
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench_redirect.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        popular(engine, total_links)
+        
+        async_engine = create_async_engine(async_database_url(url), **engine_options(url, assincrono=True))
+        configurar_sqlite(async_engine.sync_engine)
+        async_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+        
+        # A rota real usa as instâncias globais dos módulos
+        cache = redirect_cache.ShortLinkCache(session_factory=async_factory)
+        buffer = click_tracker.ClickBuffer(session_factory=async_factory)
+        redirect_cache.short_link_cache = cache
+        click_tracker.click_buffer = buffer
+        
+        inicio = time.perf_counter()
+        carregados = await cache.aquecer()
+        print(f"Cache aquecido com {carregados} links em {(time.perf_counter() - inicio) * 1000:.0f} ms\n")
+        
+        await buffer.start()
+        
+        for clientes_carga in (1, clientes):
+            antes = await carga(criar_app_antes(async_factory), codigos, clientes_carga)
+            depois = await carga(criar_app_depois(), codigos, clientes_carga)
+            imprimir(f"antes  (banco por clique, {clientes_carga} cliente(s))", antes)
+            imprimir(f"depois (cache + ClickBuffer, {clientes_carga} cliente(s))", depois)
+        
+        await buffer.stop()
+        
+        stats = cache.get_stats()
+        print(f"\n  Cache: hit ratio {stats['hit_ratio']:.2%}, {stats['consultas_banco']} consultas ao banco")
+        print(f"  Buffer: {buffer.get_stats()['eventos_gravados']} cliques gravados em "
+              f"{buffer.get_stats()['flushes']} flushes")
+        print("\n  Obs.: as latências incluem o cliente httpx e o roteamento ASGI in-process.")
+        
+        await async_engine.dispose()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--links", type=int, default=10_000)
+    parser.add_argument("--requisicoes", type=int, default=5000)
+    parser.add_argument("--clientes", type=int, default=20)
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.links, args.requisicoes, args.clientes))
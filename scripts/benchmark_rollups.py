@@ -0,0 +1,150 @@
+"""
+Benchmark dos rollups diários de analytics (migração 0004)
+
+Cria um banco SQLite temporário e insere o histórico de analytics em
+lotes. Depois de cada lote atualiza os rollups de forma incremental (só
+as linhas novas) e mede as consultas de dashboard de 30/90/365 dias na
+tabela bruta (AnalyticsRepository.aggregate) e nos rollups
+(AnalyticsRollupRepository.aggregate), conferindo que os totais batem.
+
+Uso:
+    python scripts/benchmark_rollups.py --lotes 4 --por-lote 250000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adiciona o diretório raiz ao Python path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+from src.database.models import Analytics
+from src.database.repository import AnalyticsRepository, AnalyticsRollupRepository
+
+NICHOS = ["casa", "tech", "pet", "cosmeticos"]
+CANAIS = ["tiktok", "reels", "stories", "grupo"]
+HOJE = datetime(2026, 1, 31)
+JANELAS = (30, 90, 365)
+
+
+def alembic_config(url: str) -> Config:
+    config = Config(str(root_dir / "alembic.ini"))
+    config.set_main_option("script_location", str(root_dir / "migrations"))
+    config.set_main_option("sqlalchemy.url", url)
+    config.attributes["configure_logger"] = False
+    return config
+
+
+def inserir_lote(engine, rng: random.Random, total: int, bloco: int = 20000):
+    """Analytics espalhados pelos últimos 2 anos"""
+    linhas = [
+        {
+            "data": HOJE - timedelta(minutes=rng.randint(0, 2 * 365 * 24 * 60)),
+            "canal": CANAIS[rng.randrange(4)],
+            "nicho": NICHOS[rng.randrange(4)],
+            "campanha": "bench",
+            "impressoes": 100,
+            "cliques": rng.randint(0, 10),
+            "conversoes": rng.randint(0, 2),
+            "receita": 10.0,
+            "comissao": 1.0,
+        }
+        for _ in range(total)
+    ]
+    
+    with engine.begin() as conn:
+        for inicio in range(0, total, bloco):
+            conn.execute(insert(Analytics.__table__), linhas[inicio:inicio + bloco])
+
+
+def cronometrar(session_factory, consulta, repeticoes: int):
+    tempos = []
+    for _ in range(repeticoes):
+        db = session_factory()
+        inicio = time.perf_counter()
+        resultado = consulta(db)
+        tempos.append(time.perf_counter() - inicio)
+        db.close()
+    return statistics.median(tempos) * 1000, resultado
+
+
+def medir(session_factory, dias: int, repeticoes: int) -> tuple:
+    """Dashboard por canal dos últimos N dias: (ms bruto, ms rollup)"""
+    dia_fim = HOJE.date()
+    dia_inicio = dia_fim - timedelta(days=dias - 1)
+    
+    ms_bruto, bruto = cronometrar(session_factory, lambda db: AnalyticsRepository.aggregate(
+        db,
+        dimensions=("canal",),
+        data_inicio=datetime.combine(dia_inicio, datetime.min.time()),
+        data_fim=datetime.combine(dia_fim, datetime.max.time())
+    ), repeticoes)
+    
+    ms_rollup, rollup = cronometrar(session_factory, lambda db: AnalyticsRollupRepository.aggregate(
+        db, dimensions=("canal",), dia_inicio=dia_inicio, dia_fim=dia_fim
+    ), repeticoes)
+    
+    assert [l["cliques"] for l in bruto] == [l["cliques"] for l in rollup], "Totais divergentes"
+    return ms_bruto, ms_rollup
+
+
+def main(lotes: int, por_lote: int, repeticoes: int):
+    print("=" * 60)
+    print("BENCHMARK - Rollups diários de analytics (SQLite)")
+    print("=" * 60)
+    
+    rng = random.Random(42)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'bench_rollups.db'}"
+        command.upgrade(alembic_config(url), "head")
+        engine = create_engine(url)
+        session_factory = sessionmaker(bind=engine)
+        
+        print(f"\n{'histórico':>10s} {'refresh':>10s}  " + "  ".join(
+            f"{f'{dias}d bruto':>12s} {f'{dias}d rollup':>12s}" for dias in JANELAS
+        ))
+        
+        for lote in range(1, lotes + 1):
+            inserir_lote(engine, rng, por_lote)
+            
+            db = session_factory()
+            inicio = time.perf_counter()
+            AnalyticsRollupRepository.atualizar(db)
+            refresh = time.perf_counter() - inicio
+            db.close()
+            
+            colunas = []
+            for dias in JANELAS:
+                ms_bruto, ms_rollup = medir(session_factory, dias, repeticoes)
+                colunas.append(f"{ms_bruto:9.1f} ms {ms_rollup:9.2f} ms")
+            
+            print(f"{lote * por_lote:>10d} {refresh:8.2f} s  " + "  ".join(colunas))
+        
+        print("\n  Obs.: o refresh só agrega o lote novo (analytics.agregado); as consultas nos")
+        print("  rollups leem no máximo dias × canais × nichos linhas.")
+        
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lotes", type=int, default=4)
+    parser.add_argument("--por-lote", type=int, default=250_000)
+    parser.add_argument("--repeticoes", type=int, default=5)
+    args = parser.parse_args()
+    
+    main(args.lotes, args.por_lote, args.repeticoes)
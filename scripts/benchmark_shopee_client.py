@@ -0,0 +1,133 @@
+"""
+Benchmark do cliente Shopee: cliente por chamada vs pool de conexões
+
+Sobe um servidor HTTP stub local que imita a API Shopee e mede a latência
+média por requisição nos dois modos:
+
+- por_chamada: um httpx.AsyncClient novo a cada requisição (modo antigo)
+- pool: ShopeeAffiliateAPI com cliente compartilhado e keep-alive
+
+Uso:
+    python scripts/benchmark_shopee_client.py --requests 300
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Adiciona o diretório raiz ao Python path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+# Credenciais fictícias para o stub (precisam existir antes do import)
+os.environ.setdefault("SHOPEE_PARTNER_ID", "bench")
+os.environ.setdefault("SHOPEE_AFFILIATE_API_KEY", "bench")
+os.environ.setdefault("SHOPEE_AFFILIATE_SECRET", "bench")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+
+from src.collectors.shopee_api import ShopeeAffiliateAPI
+
+
+RESPOSTA_STUB = json.dumps({
+    "data": {"affiliate_link": "https://s.shopee.com.br/bench"}
+}).encode()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Responde qualquer requisição com um link de afiliado fixo"""
+    
+    protocol_version = "HTTP/1.1"  # Mantém a conexão aberta (keep-alive)
+    disable_nagle_algorithm = True
+    
+    def _responder(self):
+        length = int(self.headers.get("Content-Length", 0))
+        if length:
+            self.rfile.read(length)
+        
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(RESPOSTA_STUB)))
+        self.end_headers()
+        self.wfile.write(RESPOSTA_STUB)
+    
+    do_GET = _responder
+    do_POST = _responder
+    
+    def log_message(self, format, *args):
+        pass
+
+
+def iniciar_stub() -> ThreadingHTTPServer:
+    """Inicia o servidor stub em uma thread e retorna a instância"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def bench_por_chamada(base_url: str, total: int) -> float:
+    """Modo antigo: abre e fecha um AsyncClient a cada requisição"""
+    inicio = time.perf_counter()
+    
+    for i in range(total):
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.post(
+                f"{base_url}/link/generate",
+                json={"item_id": str(i), "shop_id": "1"}
+            )
+            response.raise_for_status()
+    
+    return (time.perf_counter() - inicio) / total
+
+
+async def bench_pool(base_url: str, total: int) -> float:
+    """Modo novo: ShopeeAffiliateAPI com pool compartilhado"""
+    async with ShopeeAffiliateAPI(base_url=base_url) as api:
+        # Aquece o pool (primeira conexão)
+        await api.generate_affiliate_link("0", "1", ["a", "b", "c", "d", "e"])
+        
+        inicio = time.perf_counter()
+        
+        for i in range(total):
+            link = await api.generate_affiliate_link(str(i), "1", ["a", "b", "c", "d", "e"])
+            assert link, "stub não respondeu"
+        
+        return (time.perf_counter() - inicio) / total
+
+
+async def main(total: int):
+    server = iniciar_stub()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    
+    print("=" * 60)
+    print("BENCHMARK - Cliente HTTP da API Shopee (stub local)")
+    print("=" * 60)
+    print(f"Requisições por modo: {total}\n")
+    
+    try:
+        por_chamada = await bench_por_chamada(base_url, total)
+        pool = await bench_pool(base_url, total)
+    finally:
+        server.shutdown()
+    
+    print(f"  Cliente por chamada: {por_chamada * 1000:8.3f} ms/req")
+    print(f"  Pool compartilhado:  {pool * 1000:8.3f} ms/req")
+    print(f"\n  Redução de latência: {(1 - pool / por_chamada) * 100:.1f}% "
+          f"({por_chamada / pool:.1f}x mais rápido)")
+    print("\n  Obs.: o stub é HTTP puro em localhost. O custo do modo antigo vem")
+    print("  da criação do cliente (contexto SSL + CA bundle) e do handshake TCP;")
+    print("  contra a API real soma-se ainda o handshake TLS a cada chamada.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=300)
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.requests))
@@ -11,14 +11,14 @@ root_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(root_dir))
 
 from config.settings import settings
-from src.database.connection import SessionLocal
+from src.database.connection import SessionLocal, AsyncSessionLocal
 from src.database import repository
-from src.collectors.shopee_api import ShopeeAffiliateAPI
+from src.collectors.shopee_api import get_shopee_api, close_shopee_api
 from src.collectors.offer_parser import OfferParser
-from src.ranking.scorer import ProductScorer
+from src.ranking.incremental import reranquear_nicho
 from src.ranking.selector import ProductSelector
 from src.content.generator import ContentGenerator
-from src.links.shortener import LinkShortener
+from src.links.batch import LinkBatchGenerator
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -28,13 +28,11 @@ async def step1_coletar_produtos(db, nicho: str = "tech"):
     """Passo 1: Coleta produtos da Shopee"""
     print(f"\n📥 PASSO 1: Coletando produtos do nicho '{nicho}'...")
     
-    api = ShopeeAffiliateAPI()
+    api = get_shopee_api()
     parser = OfferParser()
     
-    raw_offers = await api.get_product_offers(limit=20)
-    
-    produtos_salvos = []
-    for raw_offer in raw_offers:
+    produtos_validos = []
+    async for raw_offer in api.iter_product_offers(max_items=20):
         produto_data = parser.parse_offer(raw_offer, nicho)
         
         if not produto_data:
@@ -44,40 +42,28 @@ async def step1_coletar_produtos(db, nicho: str = "tech"):
         if not is_valid:
             continue
         
-        # Verifica duplicata
-        existing = repository.ProdutoRepository.buscar_por_shopee_id(
-            db, produto_data["shopee_id"]
-        )
-        
-        if not existing:
-            produto = repository.ProdutoRepository.criar(db, produto_data)
-            produtos_salvos.append(produto)
+        produtos_validos.append(produto_data)
+    
+    # Insere novos e atualiza os existentes em um único upsert
+    contagens = repository.ProdutoRepository.upsert_many(db, produtos_validos)
+    produtos_salvos = repository.ProdutoRepository.buscar_por_shopee_ids(
+        db, [p["shopee_id"] for p in produtos_validos]
+    )
     
-    print(f"  ✅ {len(produtos_salvos)} produtos coletados e salvos")
+    print(
+        f"  ✅ {contagens['inseridos']} produtos novos, "
+        f"{contagens['atualizados']} atualizados, {contagens['inalterados']} inalterados"
+    )
     return produtos_salvos
 
 
-def step2_rankear_produtos(db, produtos):
-    """Passo 2: Ranqueia produtos"""
-    print(f"\n⭐ PASSO 2: Ranqueando {len(produtos)} produtos...")
+def step2_rankear_produtos(db, nicho: str = "tech"):
+    """Passo 2: Ranqueia produtos (só os que mudaram desde o último ranking)"""
+    print(f"\n⭐ PASSO 2: Ranqueando produtos do nicho '{nicho}'...")
     
-    scorer = ProductScorer()
+    relatorio = reranquear_nicho(db, nicho)
     
-    for produto in produtos:
-        produto_dict = {
-            "shopee_id": produto.shopee_id,
-            "comissao_percentual": produto.comissao_percentual,
-            "preco_original": produto.preco_original,
-            "preco_promocional": produto.preco_promocional,
-            "desconto_percentual": produto.desconto_percentual,
-            "rating": produto.rating,
-            "total_vendas": produto.total_vendas
-        }
-        
-        score, motivo = scorer.calcular_score(produto_dict)
-        repository.ProdutoRepository.atualizar_score(db, produto.id, score, motivo)
-    
-    print(f"  ✅ Produtos ranqueados")
+    print(f"  ✅ {relatorio['reranqueados']} produtos ranqueados, {relatorio['inalterados']} sem mudanças")
 
 
 def step3_selecionar_top(db, nicho: str, top_n: int = 5):
@@ -135,40 +121,24 @@ def step4_gerar_conteudo(db, produtos, canal: str = "grupo"):
     print(f"  ✅ {total_gerado} conteúdos gerados")
 
 
-async def step5_gerar_links(db, produtos):
-    """Passo 5: Gera links de afiliado"""
+async def step5_gerar_links(produtos):
+    """Passo 5: Gera links de afiliado (reaproveitando os já gerados hoje)"""
     print(f"\n🔗 PASSO 5: Gerando links de afiliado...")
     
-    shortener = LinkShortener()
-    total_links = 0
-    
-    for produto in produtos[:3]:  # Apenas 3 para teste
-        try:
-            parts = produto.shopee_id.split("_")
-            if len(parts) < 2:
-                continue
-            
-            shop_id = parts[0]
-            item_id = "_".join(parts[1:])
-            
-            link_data = await shortener.generate_short_link(
-                item_id=item_id,
-                shop_id=shop_id,
-                canal="grupo",
-                nicho=produto.nicho,
-                formato="texto",
-                campanha="first_run"
-            )
-            
-            if link_data:
-                link_data["produto_id"] = produto.id
-                repository.LinkRepository.criar(db, link_data)
-                total_links += 1
-                
-        except Exception as e:
-            logger.warning(f"Erro ao gerar link para {produto.shopee_id}: {e}")
-    
-    print(f"  ✅ {total_links} links gerados")
+    pedidos = LinkBatchGenerator.expandir(
+        [p.id for p in produtos[:3]],  # Apenas 3 para teste
+        canais=["grupo"],
+        formatos=["texto"],
+        campanhas=["first_run"]
+    )
+    
+    async with AsyncSessionLocal() as async_db:
+        resultado = await LinkBatchGenerator().gerar(async_db, pedidos)
+    
+    for falha in resultado["falhas"]:
+        logger.warning(f"Erro ao gerar link para produto {falha['produto_id']}: {falha['motivo']}")
+    
+    print(f"  ✅ {resultado['gerados']} links gerados, {resultado['reutilizados']} reaproveitados")
 
 
 async def main():
@@ -189,7 +159,7 @@ async def main():
             return
         
         # 2. Ranking
-        step2_rankear_produtos(db, produtos)
+        step2_rankear_produtos(db, nicho="tech")
         
         # 3. Seleção
         top_produtos = step3_selecionar_top(db, nicho="tech", top_n=5)
@@ -198,7 +168,7 @@ async def main():
         step4_gerar_conteudo(db, top_produtos, canal="grupo")
         
         # 5. Links
-        await step5_gerar_links(db, top_produtos)
+        await step5_gerar_links(top_produtos)
         
         print("\n" + "=" * 70)
         print("✨ CICLO COMPLETO FINALIZADO!")
@@ -218,6 +188,7 @@ async def main():
         
     finally:
         db.close()
+        await close_shopee_api()
         print(f"\n⏰ Fim: {datetime.now().strftime('%d/%m/%Y %H:%M:%S')}")
 
 
@@ -0,0 +1,193 @@
+"""
+Teste de carga: rotas com Session síncrona vs AsyncSession
+
+Monta duas versões da mesma API sobre um banco SQLite temporário com
+analytics de exemplo:
+
+- antes: rota async def chamando o repository síncrono (SessionLocal),
+  como as rotas faziam; cada consulta bloqueia o event loop
+- depois: rota async def com get_async_db e o repository assíncrono
+
+Ambas têm também uma rota que só aguarda I/O externo (simulando uma
+chamada à Shopee ou a um LLM). Clientes concorrentes disparam uma mistura
+das duas rotas contra a app (in-process, um event loop como um worker do
+uvicorn) e o script mede a vazão total e a latência da rota de I/O.
+
+Uso:
+    python scripts/load_test_api.py --analytics 100000 --clientes 20 --requisicoes 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Adiciona o diretório raiz ao Python path
+root_dir = Path(__file__).parent.parent
+sys.path.insert(0, str(root_dir))
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+from fastapi import Depends, FastAPI
+from sqlalchemy import create_engine, insert
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from src.database import models  # noqa: F401
+from src.database.async_repository import AsyncAnalyticsRepository
+from src.database.connection import Base, async_database_url
+from src.database.models import Analytics
+from src.database.repository import AnalyticsRepository
+
+HOJE = datetime(2026, 1, 31)
+CANAIS = ["tiktok", "reels", "stories", "grupo"]
+LATENCIA_EXTERNA_S = 0.05
+
+
+def popular(engine, total: int, bloco: int = 20000):
+    rng = random.Random(42)
+    linhas = [
+        {
+            "data": HOJE - timedelta(minutes=rng.randint(0, 90 * 24 * 60)),
+            "canal": CANAIS[rng.randrange(4)],
+            "nicho": "tech",
+            "impressoes": 100,
+            "cliques": rng.randint(0, 10),
+        }
+        for _ in range(total)
+    ]
+    with engine.begin() as conn:
+        for inicio in range(0, total, bloco):
+            conn.execute(insert(Analytics.__table__), linhas[inicio:inicio + bloco])
+
+
+def criar_app_sincrona(session_factory) -> FastAPI:
+    app = FastAPI()
+    
+    def get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+    
+    @app.get("/db")
+    async def consulta(db: Session = Depends(get_db)):
+        return AnalyticsRepository.aggregate(
+            db, dimensions=("canal",), data_inicio=HOJE - timedelta(days=30)
+        )
+    
+    @app.get("/externo")
+    async def externo():
+        await asyncio.sleep(LATENCIA_EXTERNA_S)
+        return {"ok": True}
+    
+    return app
+
+
+def criar_app_assincrona(async_factory) -> FastAPI:
+    app = FastAPI()
+    
+    async def get_async_db():
+        async with async_factory() as db:
+            yield db
+    
+    @app.get("/db")
+    async def consulta(db: AsyncSession = Depends(get_async_db)):
+        return await AsyncAnalyticsRepository.aggregate(
+            db, dimensions=("canal",), data_inicio=HOJE - timedelta(days=30)
+        )
+    
+    @app.get("/externo")
+    async def externo():
+        await asyncio.sleep(LATENCIA_EXTERNA_S)
+        return {"ok": True}
+    
+    return app
+
+
+async def carga(app: FastAPI, clientes: int, requisicoes: int) -> dict:
+    """Dispara requisicoes (metade /db, metade /externo) com N clientes concorrentes"""
+    fila = asyncio.Queue()
+    for i in range(requisicoes):
+        fila.put_nowait("/db" if i % 2 == 0 else "/externo")
+    
+    latencias = {"/db": [], "/externo": []}
+    transport = httpx.ASGITransport(app=app)
+    
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def cliente():
+            while not fila.empty():
+                caminho = fila.get_nowait()
+                inicio = time.perf_counter()
+                resposta = await client.get(caminho)
+                resposta.raise_for_status()
+                latencias[caminho].append(time.perf_counter() - inicio)
+        
+        inicio = time.perf_counter()
+        await asyncio.gather(*(cliente() for _ in range(clientes)))
+        duracao = time.perf_counter() - inicio
+    
+    def p(valores, q):
+        return statistics.quantiles(valores, n=100)[q - 1] * 1000
+    
+    return {
+        "req_s": requisicoes / duracao,
+        "db_p50": p(latencias["/db"], 50),
+        "externo_p50": p(latencias["/externo"], 50),
+        "externo_p95": p(latencias["/externo"], 95),
+    }
+
+
+def imprimir(titulo: str, r: dict):
+    print(f"\n  {titulo}")
+    print(f"    vazão:                {r['req_s']:8.1f} req/s")
+    print(f"    /db p50:              {r['db_p50']:8.1f} ms")
+    print(f"    /externo p50 / p95:   {r['externo_p50']:8.1f} / {r['externo_p95']:.1f} ms "
+          f"(ideal: {LATENCIA_EXTERNA_S * 1000:.0f} ms)")
+
+
+async def main(total_analytics: int, clientes: int, requisicoes: int):
+    print("=" * 60)
+    print("TESTE DE CARGA - Session síncrona vs AsyncSession (SQLite)")
+    print("=" * 60)
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{Path(tmp) / 'load_test.db'}"
+        engine = create_engine(url)
+        Base.metadata.create_all(engine)
+        popular(engine, total_analytics)
+        print(f"\n{total_analytics} analytics, {clientes} clientes, {requisicoes} requisições")
+        
+        async_engine = create_async_engine(async_database_url(url))
+        
+        antes = await carga(criar_app_sincrona(sessionmaker(bind=engine)), clientes, requisicoes)
+        depois = await carga(
+            criar_app_assincrona(async_sessionmaker(async_engine, expire_on_commit=False)),
+            clientes,
+            requisicoes
+        )
+        
+        imprimir("Antes (Session síncrona dentro de async def)", antes)
+        imprimir("Depois (AsyncSession + repository assíncrono)", depois)
+        print(f"\n  Vazão: {depois['req_s'] / antes['req_s']:.1f}x; "
+              f"p95 de /externo: {antes['externo_p95']:.0f} ms -> {depois['externo_p95']:.0f} ms")
+        
+        await async_engine.dispose()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--analytics", type=int, default=100_000)
+    parser.add_argument("--clientes", type=int, default=20)
+    parser.add_argument("--requisicoes", type=int, default=200)
+    args = parser.parse_args()
+    
+    asyncio.run(main(args.analytics, args.clientes, args.requisicoes))
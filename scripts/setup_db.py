@@ -8,22 +8,75 @@ from pathlib import Path
 root_dir = Path(__file__).parent.parent
 sys.path.insert(0, str(root_dir))
 
-from src.database.connection import init_db, engine
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import inspect
+
+from src.database.connection import engine
 from src.database.models import Base
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def revisao_sem_alembic(engine):
+    """
+    Descobre a revisão de um banco criado por init_db (sem alembic_version)
+    
+    Returns:
+        None se o banco está vazio ou já é versionado, senão a revisão equivalente
+    """
+    inspector = inspect(engine)
+    tabelas = inspector.get_table_names()
+    
+    if "alembic_version" in tabelas or "produtos" not in tabelas:
+        return None
+    
+    colunas = {c["name"] for c in inspector.get_columns("produtos")}
+    if "score_fingerprint" not in colunas:
+        return "0001"
+    
+    indices = {i["name"] for i in inspector.get_indexes("produtos")}
+    if "ix_produtos_nicho_ativo_score" not in indices:
+        return "0002"
+    
+    if "analytics_diario" not in tabelas:
+        return "0003"
+    
+    if "sequencias" not in tabelas:
+        return "0004"
+    
+    indices = {i["name"] for i in inspector.get_indexes("links")}
+    if "uq_links_produto_subids" not in indices:
+        return "0005"
+    
+    if "llm_jobs" not in tabelas:
+        return "0006"
+    
+    colunas = {c["name"] for c in inspector.get_columns("analytics")}
+    if "agregado" not in colunas:
+        return "0007"
+    
+    return "head"
+
+
 def setup_database():
     """
-    Inicializa o banco de dados criando todas as tabelas
+    Inicializa o banco de dados aplicando as migrações (alembic upgrade head)
     """
     try:
         logger.info("Iniciando setup do banco de dados...")
         
-        # Cria todas as tabelas
-        init_db()
+        config = Config(str(root_dir / "alembic.ini"))
+        config.set_main_option("script_location", str(root_dir / "migrations"))
+        
+        # Bancos criados antes das migrações são marcados na revisão equivalente
+        revisao = revisao_sem_alembic(engine)
+        if revisao:
+            logger.info(f"Banco existente sem versionamento, marcando revisão {revisao}")
+            command.stamp(config, revisao)
+        
+        command.upgrade(config, "head")
         
         logger.info("✅ Banco de dados inicializado com sucesso!")
         logger.info(f"📊 Tabelas criadas: {', '.join(Base.metadata.tables.keys())}")
@@ -1,9 +1,12 @@
 """
 Cálculo de métricas de performance
 """
-from typing import Dict, List
-from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+from datetime import date, datetime, timedelta
 
+from sqlalchemy.orm import Session
+
+from src.database.repository import AnalyticsRollupRepository
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -170,6 +173,45 @@ class MetricsCalculator:
             }
         
         return comparison
+    
+    def compare_periods_rollup(
+        self,
+        db: Session,
+        dias: int = 30,
+        fim: Optional[date] = None,
+        canal: Optional[str] = None,
+        nicho: Optional[str] = None
+    ) -> Dict:
+        """
+        Compara os últimos N dias com os N dias anteriores (lidos dos rollups)
+        
+        Args:
+            db: Sessão do banco
+            dias: Tamanho de cada período em dias
+            fim: Último dia do período atual (padrão: hoje)
+            canal: Filtra por canal
+            nicho: Filtra por nicho
+            
+        Returns:
+            Dict com os períodos e a comparação de compare_periods
+        """
+        fim = fim or datetime.utcnow().date()
+        inicio = fim - timedelta(days=dias - 1)
+        fim_anterior = inicio - timedelta(days=1)
+        inicio_anterior = fim_anterior - timedelta(days=dias - 1)
+        
+        atual = AnalyticsRollupRepository.aggregate(
+            db, dia_inicio=inicio, dia_fim=fim, canal=canal, nicho=nicho
+        )[0]
+        anterior = AnalyticsRollupRepository.aggregate(
+            db, dia_inicio=inicio_anterior, dia_fim=fim_anterior, canal=canal, nicho=nicho
+        )[0]
+        
+        return {
+            "periodo_atual": {"inicio": inicio.isoformat(), "fim": fim.isoformat()},
+            "periodo_anterior": {"inicio": inicio_anterior.isoformat(), "fim": fim_anterior.isoformat()},
+            "comparacao": self.compare_periods(atual, anterior)
+        }
 
 
 # Instância global
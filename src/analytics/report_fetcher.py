@@ -4,7 +4,7 @@ Fetcher de relatórios da API Shopee
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional
 
-from src.collectors.shopee_api import ShopeeAffiliateAPI
+from src.collectors.shopee_api import ShopeeAffiliateAPI, get_shopee_api
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -15,8 +15,19 @@ class ReportFetcher:
     Busca relatórios de performance da API Shopee
     """
     
-    def __init__(self):
-        self.api = ShopeeAffiliateAPI()
+    def __init__(self, api: Optional[ShopeeAffiliateAPI] = None):
+        """
+        Args:
+            api: Cliente Shopee (padrão: instância compartilhada)
+        """
+        self._api = api
+    
+    @property
+    def api(self) -> ShopeeAffiliateAPI:
+        """Cliente Shopee, resolvido sob demanda para não exigir credenciais no import"""
+        if self._api is None:
+            self._api = get_shopee_api()
+        return self._api
     
     async def fetch_daily_report(self, date: datetime = None) -> Optional[Dict]:
         """
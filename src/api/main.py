@@ -5,7 +5,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from config.settings import settings
-from src.api.routes import products, content, links, analytics
+from src.api.routes import products, content, links, analytics, redirect
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -31,6 +31,7 @@ app.include_router(products.router, prefix="/api/products", tags=["Produtos"])
 app.include_router(content.router, prefix="/api/content", tags=["Conteúdo"])
 app.include_router(links.router, prefix="/api/links", tags=["Links"])
 app.include_router(analytics.router, prefix="/api/analytics", tags=["Analytics"])
+app.include_router(redirect.router, tags=["Redirecionamento"])
 
 
 @app.on_event("startup")
@@ -43,12 +44,32 @@ async def startup_event():
     init_db()
     
     logger.info("Banco de dados inicializado")
+    
+    # Gravação periódica dos cliques/conversões recebidos
+    from src.links.click_tracker import click_buffer
+    await click_buffer.start()
+    
+    # Short links mais clicados em memória antes do primeiro redirecionamento
+    from src.links.redirect_cache import short_link_cache
+    await short_link_cache.aquecer()
 
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Evento de encerramento"""
     logger.info("Aplicação encerrando...")
+    
+    # Grava os cliques ainda no buffer antes de fechar o banco
+    from src.links.click_tracker import click_buffer
+    await click_buffer.stop()
+    
+    # Fecha o pool de conexões compartilhado da API Shopee
+    from src.collectors.shopee_api import close_shopee_api
+    await close_shopee_api()
+    
+    # Fecha as conexões do engine assíncrono
+    from src.database.connection import async_engine
+    await async_engine.dispose()
 
 
 @app.get("/")
@@ -61,6 +82,35 @@ async def root():
     }
 
 
+@app.get("/metrics")
+async def metrics():
+    """Métricas operacionais (filas de rate limit, pools, caches, retries, circuitos, custo e roteamento de LLM)"""
+    from src.database.connection import async_engine, engine, pool_stats
+    from src.links.affiliate_cache import affiliate_link_cache
+    from src.links.click_tracker import click_buffer
+    from src.links.redirect_cache import short_link_cache
+    from src.llm.budget import llm_budget
+    from src.llm.cache import llm_cache
+    from src.llm.router import llm_router
+    from src.utils.rate_limiter import shopee_rate_limiter
+    from src.utils.resilience import resilience
+    
+    return {
+        "shopee_rate_limit": shopee_rate_limiter.get_stats(),
+        "database_pool": {
+            "sync": pool_stats(engine),
+            "async": pool_stats(async_engine.sync_engine)
+        },
+        "click_buffer": click_buffer.get_stats(),
+        "redirect_cache": short_link_cache.get_stats(),
+        "affiliate_link_cache": affiliate_link_cache.get_stats(),
+        "llm_cache": {**llm_cache.get_stats(), "por_tarefa": llm_router.get_stats()},
+        "llm_custos": llm_budget.get_stats(),
+        "llm_roteamento": llm_router.get_roteamento_stats(),
+        "resiliencia": resilience.get_stats()
+    }
+
+
 @app.get("/health")
 async def health_check():
     """Health check"""
@@ -2,11 +2,11 @@
 Rotas de Analytics - Relatórios e métricas
 """
 from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 
-from src.database.connection import get_db
-from src.database import repository
+from src.database.connection import get_async_db
+from src.database import async_repository
 from src.analytics.metrics import metrics_calculator
 from src.utils.logger import get_logger
 
@@ -17,7 +17,7 @@ router = APIRouter()
 @router.get("/summary")
 async def get_summary(
     days: int = 7,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Retorna resumo de analytics dos últimos N dias
@@ -29,7 +29,7 @@ async def get_summary(
     Returns:
         Resumo de métricas
     """
-    resumo = repository.AnalyticsRepository.resumo_ultimos_dias(db, days)
+    resumo = await async_repository.AsyncAnalyticsRepository.resumo_ultimos_dias(db, days)
     
     return {
         "periodo": f"Últimos {days} dias",
@@ -37,11 +37,36 @@ async def get_summary(
     }
 
 
+def _periodo(start_date: str = None, end_date: str = None):
+    """Converte as datas da query (padrão: últimos 7 dias)"""
+    start = datetime.fromisoformat(start_date) if start_date else datetime.now() - timedelta(days=7)
+    end = datetime.fromisoformat(end_date) if end_date else datetime.now()
+    return start, end
+
+
+async def _agregar_por(db: AsyncSession, dimensao: str, start: datetime, end: datetime) -> dict:
+    """Totais dos dias do período agrupados por uma dimensão (lidos dos rollups)"""
+    linhas = await async_repository.AsyncAnalyticsRollupRepository.aggregate(
+        db,
+        dimensions=(dimensao,),
+        metrics=("cliques", "conversoes", "receita", "comissao", "ctr", "taxa_conversao"),
+        dia_inicio=start.date(),
+        dia_fim=end.date()
+    )
+    
+    agrupado = {}
+    for linha in linhas:
+        chave = linha.pop(dimensao) or "unknown"
+        agrupado[chave] = linha
+    
+    return agrupado
+
+
 @router.get("/by-canal")
 async def analytics_by_canal(
     start_date: str = None,
     end_date: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Analytics por canal
@@ -54,44 +79,14 @@ async def analytics_by_canal(
     Returns:
         Métricas por canal
     """
-    if not start_date:
-        start = datetime.now() - timedelta(days=7)
-    else:
-        start = datetime.fromisoformat(start_date)
-    
-    if not end_date:
-        end = datetime.now()
-    else:
-        end = datetime.fromisoformat(end_date)
-    
-    analytics = repository.AnalyticsRepository.buscar_por_periodo(
-        db, start, end
-    )
-    
-    # Agrupa por canal
-    by_canal = {}
-    for a in analytics:
-        canal = a.canal or "unknown"
-        
-        if canal not in by_canal:
-            by_canal[canal] = {
-                "cliques": 0,
-                "conversoes": 0,
-                "receita": 0.0,
-                "comissao": 0.0
-            }
-        
-        by_canal[canal]["cliques"] += a.cliques
-        by_canal[canal]["conversoes"] += a.conversoes
-        by_canal[canal]["receita"] += a.receita
-        by_canal[canal]["comissao"] += a.comissao
+    start, end = _periodo(start_date, end_date)
     
     return {
         "periodo": {
             "inicio": start.strftime("%Y-%m-%d"),
             "fim": end.strftime("%Y-%m-%d")
         },
-        "por_canal": by_canal
+        "por_canal": await _agregar_por(db, "canal", start, end)
     }
 
 
@@ -99,7 +94,7 @@ async def analytics_by_canal(
 async def analytics_by_nicho(
     start_date: str = None,
     end_date: str = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Analytics por nicho
@@ -112,47 +107,60 @@ async def analytics_by_nicho(
     Returns:
         Métricas por nicho
     """
-    if not start_date:
-        start = datetime.now() - timedelta(days=7)
-    else:
-        start = datetime.fromisoformat(start_date)
-    
-    if not end_date:
-        end = datetime.now()
-    else:
-        end = datetime.fromisoformat(end_date)
-    
-    analytics = repository.AnalyticsRepository.buscar_por_periodo(
-        db, start, end
-    )
-    
-    # Agrupa por nicho
-    by_nicho = {}
-    for a in analytics:
-        nicho = a.nicho or "unknown"
-        
-        if nicho not in by_nicho:
-            by_nicho[nicho] = {
-                "cliques": 0,
-                "conversoes": 0,
-                "receita": 0.0,
-                "comissao": 0.0
-            }
-        
-        by_nicho[nicho]["cliques"] += a.cliques
-        by_nicho[nicho]["conversoes"] += a.conversoes
-        by_nicho[nicho]["receita"] += a.receita
-        by_nicho[nicho]["comissao"] += a.comissao
+    start, end = _periodo(start_date, end_date)
     
     return {
         "periodo": {
             "inicio": start.strftime("%Y-%m-%d"),
             "fim": end.strftime("%Y-%m-%d")
         },
-        "por_nicho": by_nicho
+        "por_nicho": await _agregar_por(db, "nicho", start, end)
     }
 
 
+@router.get("/compare")
+async def compare_periods(
+    days: int = 30,
+    canal: str = None,
+    nicho: str = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Compara os últimos N dias com os N dias anteriores
+    
+    Args:
+        days: Tamanho de cada período em dias
+        canal: Filtra por canal (opcional)
+        nicho: Filtra por nicho (opcional)
+        db: Sessão do banco
+        
+    Returns:
+        Métricas dos dois períodos e variação percentual
+    """
+    return await db.run_sync(
+        metrics_calculator.compare_periods_rollup, days, canal=canal, nicho=nicho
+    )
+
+
+@router.post("/rollups/refresh")
+async def refresh_rollups(db: AsyncSession = Depends(get_async_db)):
+    """
+    Agrega nos rollups diários as linhas de analytics ainda não processadas
+    
+    Chamado pelo job agendado (N8N) antes dos relatórios: nenhuma escrita
+    em analytics atualiza os rollups por conta própria.
+    
+    Args:
+        db: Sessão do banco
+        
+    Returns:
+        Linhas agregadas por rollup
+    """
+    processados = await async_repository.AsyncAnalyticsRollupRepository.atualizar(db)
+    
+    return {"processados": processados}
+
+
 @router.get("/metrics")
 async def calculate_metrics(
     impressions: int = 0,
@@ -1,12 +1,14 @@
 """
 Rotas de Conteúdo - Geração de conteúdo
 """
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
-from typing import Optional
+from typing import List, Optional
 
-from src.database.connection import get_db
-from src.database import repository
+from src.database.connection import get_async_db
+from src.database import async_repository, repository
+from src.database.unit_of_work import UnitOfWork
 from src.content.generator import ContentGenerator
 from src.llm.router import llm_router, LLMTask
 from src.utils.logger import get_logger
@@ -21,7 +23,7 @@ async def generate_content(
     canal: str,
     template: Optional[str] = None,
     num_variacoes: int = 5,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Gera conteúdo para um produto
@@ -36,10 +38,8 @@ async def generate_content(
     Returns:
         Conteúdos gerados
     """
-    from src.database.models import Produto
-    
     # Busca produto
-    produto = db.query(Produto).filter(Produto.id == produto_id).first()
+    produto = await async_repository.AsyncProdutoRepository.buscar_por_id(db, produto_id)
     
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
@@ -76,21 +76,24 @@ async def generate_content(
             )
             conteudos = [conteudo]
         
-        # Para conteúdos que precisam LLM (TikTok, Reels)
+        # Para conteúdos que precisam LLM (TikTok, Reels): todas as copies
+        # em paralelo, limitadas pelo semáforo do provedor no router (com o
+        # produto, a cadeia de fallback termina na copy do template local)
         if canal in ['tiktok', 'reels']:
-            for conteudo in conteudos:
-                if 'prompt_llm' in conteudo:
-                    # Gera copy usando GPT
-                    result = await llm_router.execute(
-                        LLMTask.COPYWRITING,
-                        prompt=conteudo['prompt_llm']
-                    )
-                    conteudo['copy_gerada'] = result.get('copy') if result else None
+            com_prompt = [conteudo for conteudo in conteudos if 'prompt_llm' in conteudo]
+            resultados = await llm_router.execute_many(
+                LLMTask.COPYWRITING,
+                [
+                    {"prompt": conteudo['prompt_llm'], "produto": produto_dict, "canal": canal}
+                    for conteudo in com_prompt
+                ]
+            )
+            for conteudo, result in zip(com_prompt, resultados):
+                conteudo['copy_gerada'] = result.get('copy') if result else None
         
-        # Salva conteúdos no banco
-        conteudos_salvos = []
-        for conteudo in conteudos:
-            conteudo_data = {
+        # Salva conteúdos no banco (um INSERT e um commit)
+        conteudos_salvos = await async_repository.AsyncConteudoRepository.criar_muitos(db, [
+            {
                 "produto_id": produto_id,
                 "canal": conteudo.get('canal'),
                 "formato": conteudo.get('formato'),
@@ -100,9 +103,8 @@ async def generate_content(
                 "variacao_numero": conteudo.get('variacao_numero', 1),
                 "aprovado": False
             }
-            
-            conteudo_obj = repository.ConteudoRepository.criar(db, conteudo_data)
-            conteudos_salvos.append(conteudo_obj)
+            for conteudo in conteudos
+        ])
         
         logger.info(
             f"Gerados {len(conteudos_salvos)} conteúdos",
@@ -129,10 +131,48 @@ async def generate_content(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _marcar_publicados(db: Session, conteudo_ids: List[int]) -> dict:
+    """Marca conteúdos e seus produtos como publicados numa única transação"""
+    conteudos = repository.ConteudoRepository.buscar_por_ids(db, conteudo_ids)
+    
+    with UnitOfWork(db) as uow:
+        for conteudo in conteudos:
+            uow.marcar_conteudo_publicado(conteudo.id)
+            uow.marcar_produto_publicado(conteudo.produto_id)
+    
+    return {
+        "conteudos": len(conteudos),
+        "produtos": len({c.produto_id for c in conteudos}),
+        "nao_encontrados": sorted(set(conteudo_ids) - {c.id for c in conteudos})
+    }
+
+
+@router.post("/mark-published")
+async def mark_published(
+    conteudo_ids: List[int] = Body(..., embed=True),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Marca vários conteúdos (e seus produtos) como publicados
+    
+    Args:
+        conteudo_ids: IDs dos conteúdos publicados
+        db: Sessão do banco
+        
+    Returns:
+        Quantidade de conteúdos e produtos marcados
+    """
+    resultado = await db.run_sync(_marcar_publicados, conteudo_ids)
+    
+    logger.info("Conteúdos marcados como publicados", total=resultado["conteudos"])
+    
+    return resultado
+
+
 @router.get("/{conteudo_id}")
 async def get_content(
     conteudo_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Busca conteúdo gerado
@@ -144,11 +184,7 @@ async def get_content(
     Returns:
         Detalhes do conteúdo
     """
-    from src.database.models import ConteudoGerado
-    
-    conteudo = db.query(ConteudoGerado).filter(
-        ConteudoGerado.id == conteudo_id
-    ).first()
+    conteudo = await async_repository.AsyncConteudoRepository.buscar_por_id(db, conteudo_id)
     
     if not conteudo:
         raise HTTPException(status_code=404, detail="Conteúdo não encontrado")
@@ -171,7 +207,7 @@ async def get_content(
 @router.post("/{conteudo_id}/approve")
 async def approve_content(
     conteudo_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Aprova conteúdo para publicação
@@ -183,18 +219,11 @@ async def approve_content(
     Returns:
         Confirmação
     """
-    from src.database.models import ConteudoGerado
-    
-    conteudo = db.query(ConteudoGerado).filter(
-        ConteudoGerado.id == conteudo_id
-    ).first()
+    conteudo = await async_repository.AsyncConteudoRepository.aprovar(db, conteudo_id)
     
     if not conteudo:
         raise HTTPException(status_code=404, detail="Conteúdo não encontrado")
     
-    conteudo.aprovado = True
-    db.commit()
-    
     logger.info("Conteúdo aprovado", conteudo_id=conteudo_id)
     
     return {"message": "Conteúdo aprovado", "id": conteudo_id}
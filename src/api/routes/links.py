@@ -1,29 +1,49 @@
 """
 Rotas de Links - Geração de links de afiliado
 """
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import List
 
-from src.database.connection import get_db
-from src.database import repository
-from src.links.shortener import LinkShortener
+from fastapi import APIRouter, Body, Depends, HTTPException
+from pydantic import BaseModel, Field
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.constants import LINKS_LOTE_MAX_PEDIDOS
+from src.database.connection import get_async_db
+from src.database import async_repository
+from src.links import affiliate_cache, click_tracker, redirect_cache
+from src.links.batch import LinkBatchGenerator
+from src.links.shortener import LinkShortener, separar_shopee_id
+from src.links.subid_builder import SubIdBuilder
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 router = APIRouter()
 
 
+class EventoLink(BaseModel):
+    """Clique e/ou conversão de um link"""
+    
+    link_id: int
+    cliques: int = Field(default=0, ge=0)
+    conversoes: int = Field(default=0, ge=0)
+    receita: float = Field(default=0.0, ge=0)
+
+
 @router.post("/generate/{produto_id}")
 async def generate_link(
     produto_id: int,
     canal: str,
     formato: str,
     campanha: str = "oferta_dia",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Gera link de afiliado para produto
     
+    Um link já gerado hoje para o mesmo produto e SubIds é devolvido pelo
+    cache de links de afiliado, sem chamar a Shopee.
+    
     Args:
         produto_id: ID do produto
         canal: Canal (tiktok, reels, stories, grupo)
@@ -34,45 +54,53 @@ async def generate_link(
     Returns:
         Link gerado
     """
-    from src.database.models import Produto
-    
     # Busca produto
-    produto = db.query(Produto).filter(Produto.id == produto_id).first()
+    produto = await async_repository.AsyncProdutoRepository.buscar_por_id(db, produto_id)
     
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
     
     try:
-        # Extrai IDs da Shopee (formato: shop_id_item_id)
-        parts = produto.shopee_id.split("_")
-        if len(parts) < 2:
-            raise ValueError("shopee_id inválido")
+        data = datetime.now()
+        sub_ids = SubIdBuilder.build(canal, produto.nicho, formato, campanha, data)
+        chave = (produto_id, *sub_ids)
+        cache = affiliate_cache.affiliate_link_cache
         
-        shop_id = parts[0]
-        item_id = "_".join(parts[1:])
+        link = await cache.buscar(db, chave)
+        reutilizado = link is not None
         
-        # Gera link
-        shortener = LinkShortener()
-        link_data = await shortener.generate_short_link(
-            item_id=item_id,
-            shop_id=shop_id,
-            canal=canal,
-            nicho=produto.nicho,
-            formato=formato,
-            campanha=campanha
-        )
-        
-        if not link_data:
-            raise HTTPException(
-                status_code=500,
-                detail="Erro ao gerar link de afiliado"
+        if not reutilizado:
+            # Extrai IDs da Shopee (formato: shop_id_item_id)
+            shop_id, item_id = separar_shopee_id(produto.shopee_id)
+            
+            # Gera link
+            shortener = LinkShortener()
+            link_data = await shortener.generate_short_link(
+                item_id=item_id,
+                shop_id=shop_id,
+                canal=canal,
+                nicho=produto.nicho,
+                formato=formato,
+                campanha=campanha,
+                data=data
             )
-        
-        # Salva no banco
-        link_data["produto_id"] = produto_id
-        link = repository.LinkRepository.criar(db, link_data)
-        
-        logger.info("Link gerado", produto_id=produto_id, link_id=link.id)
+            
+            if not link_data:
+                raise HTTPException(
+                    status_code=500,
+                    detail="Erro ao gerar link de afiliado"
+                )
+            
+            # Salva no banco
+            link_data["produto_id"] = produto_id
+            salvo, criado = await async_repository.AsyncLinkRepository.criar_ou_obter(
+                db, link_data, gerar_codigo=shortener.codigos.gerar
+            )
+            link = cache.put(chave, salvo)
+            reutilizado = not criado
+            redirect_cache.short_link_cache.put(link.link_curto, link.id, link.link_completo)
+            
+            logger.info("Link gerado", produto_id=produto_id, link_id=link.id)
         
         return {
             "link_id": link.id,
@@ -80,13 +108,8 @@ async def generate_link(
             "link_completo": link.link_completo,
             "produto_id": produto_id,
             "canal": canal,
-            "tracking": {
-                "sub_id1": link.sub_id1,
-                "sub_id2": link.sub_id2,
-                "sub_id3": link.sub_id3,
-                "sub_id4": link.sub_id4,
-                "sub_id5": link.sub_id5
-            }
+            "reutilizado": reutilizado,
+            "tracking": dict(zip(("sub_id1", "sub_id2", "sub_id3", "sub_id4", "sub_id5"), sub_ids))
         }
         
     except Exception as e:
@@ -94,10 +117,74 @@ async def generate_link(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/events", status_code=202)
+async def register_events(
+    eventos: List[EventoLink] = Body(..., embed=True)
+):
+    """
+    Registra cliques/conversões em lote
+    
+    Os eventos vão para o buffer em memória e são gravados em segundos
+    com incrementos atômicos; a resposta não espera o banco.
+    
+    Args:
+        eventos: Lista de eventos (link_id, cliques, conversoes, receita)
+        
+    Returns:
+        Quantidade de eventos aceitos
+    """
+    aceitos = click_tracker.click_buffer.registrar_muitos(e.model_dump() for e in eventos)
+    
+    return {"aceitos": aceitos}
+
+
+class LoteLinks(BaseModel):
+    """Matriz produto × canal × formato × campanha"""
+    
+    produto_ids: List[int] = Field(..., min_length=1)
+    canais: List[str] = Field(..., min_length=1)
+    formatos: List[str] = Field(..., min_length=1)
+    campanhas: List[str] = Field(default=["oferta_dia"], min_length=1)
+
+
+@router.post("/generate-batch")
+async def generate_links_batch(
+    lote: LoteLinks,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Gera links para todas as combinações de produto, canal, formato e campanha
+    
+    Links já gerados hoje para a mesma tupla de SubIds são reaproveitados;
+    os demais são gerados em paralelo na Shopee e gravados num INSERT em lote.
+    
+    Args:
+        lote: Listas de produto_ids, canais, formatos e campanhas
+        db: Sessão do banco
+        
+    Returns:
+        Links por combinação, contagens (gerados/reutilizados) e falhas
+    """
+    pedidos = LinkBatchGenerator.expandir(lote.produto_ids, lote.canais, lote.formatos, lote.campanhas)
+    
+    if len(pedidos) > LINKS_LOTE_MAX_PEDIDOS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Lote com {len(pedidos)} combinações (máximo {LINKS_LOTE_MAX_PEDIDOS})"
+        )
+    
+    try:
+        return await LinkBatchGenerator().gerar(db, pedidos)
+    
+    except Exception as e:
+        logger.error(f"Erro na geração de links em lote: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/{link_id}")
 async def get_link(
     link_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Busca link por ID
@@ -109,9 +196,7 @@ async def get_link(
     Returns:
         Detalhes do link
     """
-    from src.database.models import Link
-    
-    link = db.query(Link).filter(Link.id == link_id).first()
+    link = await async_repository.AsyncLinkRepository.buscar_por_id(db, link_id)
     
     if not link:
         raise HTTPException(status_code=404, detail="Link não encontrado")
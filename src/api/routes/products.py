@@ -2,13 +2,15 @@
 Rotas de Produtos - CRUD e coleta
 """
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
 
-from src.database.connection import get_db
-from src.database import repository
-from src.collectors.shopee_api import ShopeeAffiliateAPI
+from config.constants import UPSERT_BATCH_SIZE
+from src.database.connection import get_async_db
+from src.database import async_repository
+from src.collectors.shopee_api import get_shopee_api
 from src.collectors.offer_parser import OfferParser
+from src.collectors.pipeline import CollectionPipeline
 from src.ranking.selector import ProductSelector
 from src.utils.logger import get_logger
 
@@ -20,29 +22,49 @@ router = APIRouter()
 async def collect_products(
     nicho: str,
     limit: int = 50,
-    db: Session = Depends(get_db)
+    keyword: Optional[str] = None,
+    category_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Coleta produtos da API Shopee para um nicho
     
+    As ofertas são paginadas e processadas conforme chegam, e os produtos
+    válidos são gravados em lotes de UPSERT_BATCH_SIZE, então limites altos
+    (milhares) não acumulam a coleta inteira em memória.
+    
     Args:
         nicho: Nome do nicho (casa, tech, pet, cosmeticos)
-        limit: Número máximo de produtos
+        limit: Número máximo de ofertas coletadas
+        keyword: Palavra-chave para busca (opcional)
+        category_id: ID da categoria (opcional)
         db: Sessão do banco
         
     Returns:
-        Lista de produtos coletados
+        Contagens e os shopee_ids dos produtos novos (só os inseridos)
     """
     try:
-        api = ShopeeAffiliateAPI()
+        api = get_shopee_api()
         parser = OfferParser()
         
-        # Busca ofertas
-        raw_offers = await api.get_product_offers(limit=limit)
+        contagens = {"inseridos": 0, "atualizados": 0, "inalterados": 0}
+        inseridos = []
+        lote = []
         
-        produtos_salvos = []
+        async def salvar_lote():
+            # Insere novos e atualiza preço/comissão/vendas dos existentes em lote
+            parciais, novos = await async_repository.AsyncProdutoRepository.upsert_many_com_inseridos(db, lote)
+            for chave, valor in parciais.items():
+                contagens[chave] += valor
+            inseridos.extend(novos)
+            lote.clear()
         
-        for raw_offer in raw_offers:
+        # Busca ofertas página a página, gravando a cada UPSERT_BATCH_SIZE válidas
+        async for raw_offer in api.iter_product_offers(
+            category_id=category_id,
+            keyword=keyword,
+            max_items=limit
+        ):
             # Parse da oferta
             produto_data = parser.parse_offer(raw_offer, nicho)
             
@@ -55,26 +77,21 @@ async def collect_products(
                 logger.debug(f"Produto rejeitado: {motivo}")
                 continue
             
-            # Verifica se já existe
-            existing = repository.ProdutoRepository.buscar_por_shopee_id(
-                db,
-                produto_data["shopee_id"]
-            )
-            
-            if existing:
-                logger.debug(f"Produto já existe: {produto_data['shopee_id']}")
-                continue
-            
-            # Salva no banco
-            produto = repository.ProdutoRepository.criar(db, produto_data)
-            produtos_salvos.append(produto)
+            lote.append(produto_data)
+            if len(lote) >= UPSERT_BATCH_SIZE:
+                await salvar_lote()
         
-        logger.info(f"Coletados {len(produtos_salvos)} produtos", nicho=nicho)
+        if lote:
+            await salvar_lote()
+        
+        logger.info(f"Coletados {contagens['inseridos']} produtos", nicho=nicho, **contagens)
         
         return {
-            "total_coletados": len(produtos_salvos),
+            "total_coletados": contagens["inseridos"],
+            "atualizados": contagens["atualizados"],
+            "inalterados": contagens["inalterados"],
             "nicho": nicho,
-            "produtos": [p.shopee_id for p in produtos_salvos]
+            "produtos": inseridos
         }
         
     except Exception as e:
@@ -82,11 +99,37 @@ async def collect_products(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/collect-all")
+async def collect_all_products(
+    nichos: Optional[str] = None,
+    cota: Optional[int] = None
+):
+    """
+    Coleta todos os nichos ativos em paralelo
+    
+    Args:
+        nichos: Nichos separados por vírgula (padrão: ACTIVE_NICHES)
+        cota: Máximo de produtos válidos por nicho (padrão: COLETA_COTA_POR_NICHO)
+        
+    Returns:
+        Relatório por nicho com tempos e vazão
+    """
+    try:
+        pipeline = CollectionPipeline(cota_por_nicho=cota) if cota else CollectionPipeline()
+        lista = nichos.split(",") if nichos else None
+        
+        return await pipeline.run(lista)
+    
+    except Exception as e:
+        logger.error(f"Erro na coleta multi-nicho: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.get("/top/{nicho}")
 async def get_top_products(
     nicho: str,
     limit: int = 10,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Retorna top N produtos ranqueados de um nicho
@@ -99,7 +142,7 @@ async def get_top_products(
     Returns:
         Top produtos ranqueados
     """
-    produtos = repository.ProdutoRepository.top_ranqueados(db, nicho, limit)
+    produtos = await async_repository.AsyncProdutoRepository.top_ranqueados(db, nicho, limit)
     
     return {
         "nicho": nicho,
@@ -121,56 +164,37 @@ async def get_top_products(
 @router.post("/rank")
 async def rank_products(
     nicho: str,
-    db: Session = Depends(get_db)
+    forcar: bool = False,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Ranqueia produtos de um nicho
     
+    Só produtos cujas entradas do score (ou os pesos) mudaram desde o
+    último ranking são pontuados de novo.
+    
     Args:
         nicho: Nome do nicho
+        forcar: Re-pontua todos os produtos do nicho
         db: Sessão do banco
         
     Returns:
         Produtos ranqueados
     """
-    from src.ranking.scorer import ProductScorer
+    from src.ranking.incremental import reranquear_nicho
     
-    # Busca produtos do nicho
-    produtos = repository.ProdutoRepository.listar_por_nicho(db, nicho, limit=100)
+    relatorio = await db.run_sync(reranquear_nicho, nicho, forcar=forcar)
     
-    if not produtos:
+    if not relatorio["total"]:
         return {"message": "Nenhum produto encontrado", "total": 0}
     
-    # Ranqueia
-    scorer = ProductScorer()
-    
-    for produto in produtos:
-        produto_dict = {
-            "id": produto.id,
-            "shopee_id": produto.shopee_id,
-            "comissao_percentual": produto.comissao_percentual,
-            "preco_original": produto.preco_original,
-            "preco_promocional": produto.preco_promocional,
-            "desconto_percentual": produto.desconto_percentual,
-            "rating": produto.rating,
-            "total_vendas": produto.total_vendas
-        }
-        
-        score, motivo = scorer.calcular_score(produto_dict)
-        
-        # Atualiza score no banco
-        repository.ProdutoRepository.atualizar_score(
-            db,
-            produto.id,
-            score,
-            motivo
-        )
-    
-    logger.info(f"Ranqueados {len(produtos)} produtos", nicho=nicho)
+    logger.info(f"Ranqueados {relatorio['reranqueados']} produtos", nicho=nicho)
     
     return {
         "message": "Produtos ranqueados com sucesso",
-        "total": len(produtos),
+        "total": relatorio["total"],
+        "reranqueados": relatorio["reranqueados"],
+        "inalterados": relatorio["inalterados"],
         "nicho": nicho
     }
 
@@ -178,7 +202,7 @@ async def rank_products(
 @router.get("/{produto_id}")
 async def get_product(
     produto_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Busca detalhes de um produto
@@ -190,9 +214,7 @@ async def get_product(
     Returns:
         Detalhes do produto
     """
-    from src.database.models import Produto
-    
-    produto = db.query(Produto).filter(Produto.id == produto_id).first()
+    produto = await async_repository.AsyncProdutoRepository.buscar_por_id(db, produto_id)
     
     if not produto:
         raise HTTPException(status_code=404, detail="Produto não encontrado")
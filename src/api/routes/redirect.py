@@ -0,0 +1,34 @@
+"""
+Rota de redirecionamento dos short links
+"""
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import RedirectResponse
+
+from src.links import click_tracker, redirect_cache
+
+router = APIRouter()
+
+
+@router.get("/r/{link_curto}")
+async def redirect(link_curto: str):
+    """
+    Redireciona um short link para o link de afiliado e conta o clique
+    
+    O destino vem do cache em memória (banco só em miss) e o clique vai
+    para o buffer de cliques; a resposta nunca espera uma escrita.
+    
+    Args:
+        link_curto: Short code do link
+        
+    Returns:
+        302 para o link_completo
+    """
+    destino = await redirect_cache.short_link_cache.resolver(link_curto)
+    
+    if destino is None:
+        raise HTTPException(status_code=404, detail="Link não encontrado")
+    
+    link_id, link_completo = destino
+    click_tracker.click_buffer.registrar(link_id, cliques=1)
+    
+    return RedirectResponse(link_completo, status_code=302)
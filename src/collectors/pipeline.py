@@ -0,0 +1,221 @@
+"""
+Pipeline de coleta multi-nicho
+
+Coleta todos os nichos ativos (e todas as palavras-chave e categorias de cada nicho) ao
+mesmo tempo, em vez de um /collect por nicho em série. O tempo total fica
+próximo ao do nicho mais lento.
+"""
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from config.constants import (
+    NICHOS,
+    COLETA_CONCORRENCIA_GLOBAL,
+    COLETA_COTA_POR_NICHO,
+    SHOPEE_PAGE_CONCURRENCY,
+)
+from config.credentials import credentials
+from src.collectors.offer_parser import OfferParser
+from src.collectors.shopee_api import ShopeeAffiliateAPI, get_shopee_api
+from src.database import repository
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class CollectionPipeline:
+    """
+    Orquestrador da coleta de todos os nichos ativos
+    
+    - Um semáforo global limita as páginas em voo somando todos os nichos
+    - Cada nicho para ao atingir sua cota de produtos válidos
+    - Ofertas são parseadas e validadas conforme chegam
+    - Cada nicho é persistido em lote assim que termina
+    """
+    
+    def __init__(
+        self,
+        api: Optional[ShopeeAffiliateAPI] = None,
+        concorrencia_global: int = COLETA_CONCORRENCIA_GLOBAL,
+        cota_por_nicho: int = COLETA_COTA_POR_NICHO,
+        paginas_por_palavra: int = SHOPEE_PAGE_CONCURRENCY,
+        session_factory=None
+    ):
+        """
+        Args:
+            api: Cliente Shopee (padrão: instância compartilhada)
+            concorrencia_global: Máximo de páginas em voo no total
+            cota_por_nicho: Máximo de produtos válidos por nicho
+            paginas_por_palavra: Páginas em paralelo por palavra-chave
+            session_factory: Factory de sessões (padrão: SessionLocal)
+        """
+        self._api = api
+        self.parser = OfferParser()
+        self.concorrencia_global = concorrencia_global
+        self.cota_por_nicho = cota_por_nicho
+        self.paginas_por_palavra = paginas_por_palavra
+        self._session_factory = session_factory
+    
+    @property
+    def api(self) -> ShopeeAffiliateAPI:
+        if self._api is None:
+            self._api = get_shopee_api()
+        return self._api
+    
+    def _get_session(self):
+        if self._session_factory is None:
+            from src.database.connection import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+    
+    async def run(self, nichos: Optional[List[str]] = None) -> Dict:
+        """
+        Coleta todos os nichos em paralelo
+        
+        Args:
+            nichos: Nichos a coletar (padrão: credentials.ACTIVE_NICHES)
+            
+        Returns:
+            Dict com relatório por nicho e duração total
+        """
+        nichos = [n.strip() for n in (nichos or credentials.ACTIVE_NICHES) if n.strip()]
+        semaforo = asyncio.Semaphore(self.concorrencia_global)
+        inicio = time.perf_counter()
+        
+        relatorios = await asyncio.gather(
+            *(self._coletar_nicho(nicho, semaforo) for nicho in nichos)
+        )
+        
+        duracao = time.perf_counter() - inicio
+        resultado = {
+            "nichos": {r["nicho"]: r for r in relatorios},
+            "total_salvos": sum(r["salvos"] for r in relatorios),
+            "total_atualizados": sum(r["atualizados"] for r in relatorios),
+            "duracao_s": round(duracao, 3),
+            "soma_duracoes_s": round(sum(r["duracao_s"] for r in relatorios), 3),
+        }
+        
+        logger.info(
+            "Coleta multi-nicho finalizada",
+            nichos=len(nichos),
+            total_salvos=resultado["total_salvos"],
+            duracao_s=resultado["duracao_s"]
+        )
+        
+        return resultado
+    
+    async def _coletar_nicho(self, nicho: str, semaforo: asyncio.Semaphore) -> Dict:
+        """
+        Coleta todas as palavras-chave e categorias de um nicho e persiste o resultado
+        
+        Args:
+            nicho: Nome do nicho
+            semaforo: Semáforo global de páginas em voo
+            
+        Returns:
+            Relatório do nicho (coletados, validos, salvos, atualizados, duração, vazão)
+        """
+        inicio = time.perf_counter()
+        config = NICHOS.get(nicho)
+        relatorio = {
+            "nicho": nicho,
+            "coletados": 0,
+            "validos": 0,
+            "salvos": 0,
+            "atualizados": 0,
+            "erros": 0,
+        }
+        
+        if not config:
+            logger.warning(f"Nicho desconhecido: {nicho}")
+            relatorio.update(duracao_s=0.0, ofertas_por_s=0.0)
+            return relatorio
+        
+        validos: List[Dict] = []
+        vistos = set()
+        
+        async def coletar(busca: Dict):
+            async for raw_offer in self.api.iter_product_offers(
+                **busca,
+                max_items=self.cota_por_nicho,
+                concurrency=self.paginas_por_palavra,
+                semaphore=semaforo
+            ):
+                relatorio["coletados"] += 1
+                
+                produto_data = self.parser.parse_offer(raw_offer, nicho)
+                if not produto_data or produto_data["shopee_id"] in vistos:
+                    continue
+                vistos.add(produto_data["shopee_id"])
+                
+                is_valid, motivo = self.parser.validar_produto(produto_data)
+                if not is_valid:
+                    logger.debug(f"Produto rejeitado: {motivo}")
+                    continue
+                
+                validos.append(produto_data)
+                if len(validos) >= self.cota_por_nicho:
+                    return
+        
+        # Uma busca por palavra-chave e uma por categoria; a API filtra pelo
+        # ID numérico (categoria_ids), categoria_shopee só tem os nomes
+        buscas = [{"keyword": keyword} for keyword in config["palavras_chave"]]
+        buscas += [{"category_id": categoria} for categoria in config.get("categoria_ids", [])]
+        pendentes = {asyncio.create_task(coletar(busca)) for busca in buscas}
+        
+        try:
+            while pendentes and len(validos) < self.cota_por_nicho:
+                concluidas, pendentes = await asyncio.wait(
+                    pendentes,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in concluidas:
+                    if task.exception() is not None:
+                        relatorio["erros"] += 1
+                        logger.error(f"Erro na coleta do nicho {nicho}: {task.exception()}")
+        finally:
+            # Cota atingida: as demais buscas param de buscar páginas
+            for task in pendentes:
+                task.cancel()
+            if pendentes:
+                await asyncio.gather(*pendentes, return_exceptions=True)
+        
+        validos = validos[:self.cota_por_nicho]
+        relatorio["validos"] = len(validos)
+        
+        try:
+            contagens = await asyncio.to_thread(self._persistir, validos)
+            relatorio["salvos"] = contagens["inseridos"]
+            relatorio["atualizados"] = contagens["atualizados"]
+        except Exception as e:
+            relatorio["erros"] += 1
+            logger.error(f"Erro ao salvar produtos do nicho {nicho}: {e}")
+        
+        duracao = time.perf_counter() - inicio
+        relatorio["duracao_s"] = round(duracao, 3)
+        relatorio["ofertas_por_s"] = round(relatorio["coletados"] / duracao, 1) if duracao else 0.0
+        
+        logger.info("Nicho coletado", **relatorio)
+        
+        return relatorio
+    
+    def _persistir(self, produtos_data: List[Dict]) -> Dict[str, int]:
+        """
+        Salva os produtos de um nicho em uma única transação (upsert em lote)
+        
+        Args:
+            produtos_data: Produtos válidos do nicho
+            
+        Returns:
+            Contagens de inseridos, atualizados e inalterados
+        """
+        db = self._get_session()
+        try:
+            return repository.ProdutoRepository.upsert_many(db, produtos_data)
+        finally:
+            db.close()
+
+
+# Instância global
+collection_pipeline = CollectionPipeline()
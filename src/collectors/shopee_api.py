@@ -1,35 +1,139 @@
 """
 Cliente da API Shopee Affiliate para coleta de produtos
 """
+import asyncio
 import hashlib
 import hmac
+import json
 import time
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import httpx
 
 from config.credentials import credentials
-from config.constants import SHOPEE_API_RATE_LIMIT, PRODUTOS_POR_COLETA
+from config.constants import (
+    SHOPEE_API_RATE_LIMIT,
+    PRODUTOS_POR_COLETA,
+    SHOPEE_PAGE_CONCURRENCY,
+    SHOPEE_HTTP_TIMEOUT,
+    SHOPEE_HTTP_MAX_CONNECTIONS,
+    SHOPEE_HTTP_MAX_KEEPALIVE,
+    SHOPEE_HTTP_KEEPALIVE_EXPIRY,
+)
 from src.utils.logger import get_logger
+from src.utils.rate_limiter import RateLimiter, shopee_rate_limiter
+from src.utils.resilience import Resilience, resilience as resilience_global
 
 logger = get_logger(__name__)
 
 
+def _http2_disponivel() -> bool:
+    """Verifica se o pacote h2 (necessário para HTTP/2 no httpx) está instalado"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
 class ShopeeAffiliateAPI:
     """
     Cliente para interagir com a Shopee Affiliate API
     
+    Mantém um único httpx.AsyncClient com pool de conexões (keep-alive e
+    HTTP/2 opcional), reaproveitado por todas as chamadas. Use como
+    context manager assíncrono ou chame aclose() ao final:
+    
+        async with ShopeeAffiliateAPI() as api:
+            ofertas = await api.get_product_offers(keyword="fone")
+            
     Documentação: https://open.shopee.com/documents/v2/affiliate
     """
     
     BASE_URL = "https://partner.shopeemobile.com/api/v3/affiliate"
     
-    def __init__(self):
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        http2: Optional[bool] = None,
+        max_connections: int = SHOPEE_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = SHOPEE_HTTP_MAX_KEEPALIVE,
+        keepalive_expiry: float = SHOPEE_HTTP_KEEPALIVE_EXPIRY,
+        timeout: float = SHOPEE_HTTP_TIMEOUT,
+        client: Optional[httpx.AsyncClient] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        resilience: Optional[Resilience] = None
+    ):
+        """
+        Args:
+            base_url: URL base da API (padrão: BASE_URL)
+            http2: Habilita HTTP/2 (padrão: credentials.SHOPEE_HTTP2)
+            max_connections: Máximo de conexões simultâneas no pool
+            max_keepalive_connections: Máximo de conexões ociosas mantidas abertas
+            keepalive_expiry: Tempo (s) que uma conexão ociosa fica no pool
+            timeout: Timeout (s) de cada requisição
+            client: httpx.AsyncClient externo (não é fechado por aclose())
+            rate_limiter: Limitador de chamadas (padrão: shopee_rate_limiter)
+            resilience: Retry e circuit breaker (padrão: instância global)
+        """
         self.partner_id = credentials.SHOPEE_PARTNER_ID
         self.api_key = credentials.SHOPEE_AFFILIATE_API_KEY
         self.secret = credentials.SHOPEE_AFFILIATE_SECRET
         
         if not all([self.partner_id, self.api_key, self.secret]):
             raise ValueError("Credenciais da Shopee não configuradas")
+        
+        self.base_url = base_url or self.BASE_URL
+        self.http2 = credentials.SHOPEE_HTTP2 if http2 is None else http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+        
+        self._client = client
+        self._owns_client = client is None
+        self.rate_limiter = rate_limiter or shopee_rate_limiter
+        self.resilience = resilience or resilience_global
+        self.host = httpx.URL(self.base_url).host
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        Cliente HTTP compartilhado, criado sob demanda
+        
+        Returns:
+            httpx.AsyncClient com pool de conexões
+        """
+        if self._client is None or self._client.is_closed:
+            http2 = self.http2
+            if http2 and not _http2_disponivel():
+                logger.warning("Pacote h2 não instalado, usando HTTP/1.1")
+                http2 = False
+            
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=http2
+            )
+            self._owns_client = True
+        
+        return self._client
+    
+    async def aclose(self):
+        """Fecha o pool de conexões (se pertencer a esta instância)"""
+        if not self._owns_client:
+            return
+        
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
+    
+    async def __aenter__(self) -> "ShopeeAffiliateAPI":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
     
     def _generate_signature(self, path: str, timestamp: int, body: str = "") -> str:
         """
@@ -51,75 +155,153 @@ class ShopeeAffiliateAPI:
         ).hexdigest()
         return signature
     
-    async def get_product_offers(
+    async def _signed_request(
         self,
-        category_id: Optional[int] = None,
-        keyword: Optional[str] = None,
-        limit: int = PRODUTOS_POR_COLETA
-    ) -> List[Dict]:
+        method: str,
+        path: str,
+        params: Optional[Dict] = None,
+        body: Optional[Dict] = None
+    ) -> Dict:
         """
-        Busca ofertas de produtos da Shopee
+        Executa uma requisição assinada usando o pool de conexões
+        
+        Antes de enviar, aguarda um token do rate limiter (SHOPEE_API_RATE_LIMIT),
+        então rajadas entram em fila em vez de serem barradas pela Shopee.
+        Falhas transitórias (rede, 429, 5xx) são repetidas com backoff pela
+        camada de resiliência; cada tentativa pega um token novo e é
+        assinada de novo.
         
         Args:
-            category_id: ID da categoria (opcional)
-            keyword: Palavra-chave para busca (opcional)
-            limit: Número máximo de produtos
+            method: Método HTTP (GET, POST)
+            path: Caminho da API
+            params: Query string (o timestamp e o partner_id são adicionados)
+            body: Corpo JSON (o timestamp e o partner_id são adicionados)
             
         Returns:
-            Lista de produtos/ofertas
+            JSON de resposta da API
+            
+        Raises:
+            httpx.HTTPError: Em falhas de rede ou status HTTP de erro
+            CircuitoAbertoError: Se a Shopee está com o circuito aberto
         """
-        path = "/product/get_offer_list"
+        return await self.resilience.executar(
+            self.host, lambda: self._enviar(method, path, params, body)
+        )
+    
+    async def _enviar(
+        self,
+        method: str,
+        path: str,
+        params: Optional[Dict],
+        body: Optional[Dict]
+    ) -> Dict:
+        """Uma tentativa de _signed_request (rate limit, assinatura e envio)"""
+        await self.rate_limiter.acquire(path)
+        
+        # Timestamp gerado após a fila, para a assinatura não expirar na espera
         timestamp = int(time.time())
         
-        # Parâmetros da requisição
-        params = {
-            "partner_id": self.partner_id,
-            "timestamp": timestamp,
-            "limit": limit,
+        if body is not None:
+            body = {"partner_id": self.partner_id, "timestamp": timestamp, **body}
+            body_str = json.dumps(body)
+            signature = self._generate_signature(path, timestamp, body_str)
+        else:
+            params = {"partner_id": self.partner_id, "timestamp": timestamp, **(params or {})}
+            body_str = None
+            signature = self._generate_signature(path, timestamp)
+        
+        headers = {
+            "Content-Type": "application/json",
+            "Authorization": f"{self.api_key}:{signature}"
         }
         
+        response = await self.client.request(
+            method,
+            f"{self.base_url}{path}",
+            params=params if body is None else None,
+            content=body_str,
+            headers=headers
+        )
+        response.raise_for_status()
+        
+        return response.json()
+    
+    async def _fetch_offer_page(
+        self,
+        category_id: Optional[int],
+        keyword: Optional[str],
+        limit: int,
+        page: int
+    ) -> Tuple[List[Dict], bool]:
+        """
+        Busca uma página de ofertas
+        
+        Args:
+            category_id: ID da categoria (opcional)
+            keyword: Palavra-chave para busca (opcional)
+            limit: Tamanho da página
+            page: Número da página (começa em 1)
+            
+        Returns:
+            Tupla (ofertas, ha_mais_paginas)
+            
+        Raises:
+            httpx.HTTPError: Em falhas de rede ou status HTTP de erro
+            ValueError: Se a API retornar erro no corpo da resposta
+        """
+        params = {"limit": limit, "page": page}
+        
         if category_id:
             params["category_id"] = category_id
         if keyword:
             params["keyword"] = keyword
         
-        # Gera assinatura
-        signature = self._generate_signature(path, timestamp)
+        data = await self._signed_request("GET", "/product/get_offer_list", params=params)
         
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"{self.api_key}:{signature}"
-        }
+        if data.get("error"):
+            raise ValueError(f"Erro na API Shopee: {data.get('error')} - {data.get('message')}")
+        
+        payload = data.get("data", {})
+        offers = payload.get("offers", [])
         
+        # Sem has_more na resposta, uma página incompleta indica o fim
+        has_more = payload.get("has_more")
+        if has_more is None:
+            has_more = len(offers) >= limit
+        
+        return offers, bool(has_more) and len(offers) > 0
+    
+    async def get_product_offers(
+        self,
+        category_id: Optional[int] = None,
+        keyword: Optional[str] = None,
+        limit: int = PRODUTOS_POR_COLETA,
+        page: int = 1
+    ) -> List[Dict]:
+        """
+        Busca ofertas de produtos da Shopee
+        
+        Args:
+            category_id: ID da categoria (opcional)
+            keyword: Palavra-chave para busca (opcional)
+            limit: Número máximo de produtos
+            page: Página de resultados (começa em 1)
+            
+        Returns:
+            Lista de produtos/ofertas
+        """
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.BASE_URL}{path}",
-                    params=params,
-                    headers=headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if data.get("error"):
-                    logger.error(
-                        "Erro na API Shopee",
-                        error=data.get("message"),
-                        code=data.get("error")
-                    )
-                    return []
-                
-                products = data.get("data", {}).get("offers", [])
-                logger.info(
-                    "Produtos coletados da Shopee",
-                    total=len(products),
-                    category_id=category_id,
-                    keyword=keyword
-                )
-                
-                return products
-                
+            products, _ = await self._fetch_offer_page(category_id, keyword, limit, page)
+            logger.info(
+                "Produtos coletados da Shopee",
+                total=len(products),
+                category_id=category_id,
+                keyword=keyword,
+                page=page
+            )
+            
+            return products
+        
         except httpx.HTTPError as e:
             logger.error(f"Erro HTTP ao buscar produtos: {e}")
             return []
@@ -127,6 +309,124 @@ class ShopeeAffiliateAPI:
             logger.error(f"Erro inesperado ao buscar produtos: {e}")
             return []
     
+    async def iter_product_offers(
+        self,
+        category_id: Optional[int] = None,
+        keyword: Optional[str] = None,
+        max_items: Optional[int] = None,
+        concurrency: int = SHOPEE_PAGE_CONCURRENCY,
+        page_size: int = PRODUTOS_POR_COLETA,
+        semaphore: Optional[asyncio.Semaphore] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Percorre todas as páginas de ofertas, entregando-as conforme chegam
+        
+        Mantém no máximo `concurrency` páginas em voo (todas passam pelo rate
+        limiter) e descarta duplicatas por shop_id/item_id (ofertas sem um dos
+        IDs são sempre entregues). Só a página atual e o conjunto de chaves já
+        vistas ficam em memória, então o consumo não cresce com o número de
+        páginas.
+        
+            async for oferta in api.iter_product_offers(keyword="fone", max_items=2000):
+                ...
+                
+        Args:
+            category_id: ID da categoria (opcional)
+            keyword: Palavra-chave para busca (opcional)
+            max_items: Máximo de ofertas únicas entregues (None = todas)
+            concurrency: Páginas buscadas em paralelo
+            page_size: Ofertas por página
+            semaphore: Semáforo compartilhado entre coletas simultâneas, para
+                limitar o total de páginas em voo (opcional)
+            
+        Yields:
+            Ofertas únicas, na ordem em que as páginas chegam
+            
+        Raises:
+            httpx.HTTPError, ValueError: Se uma página falha mesmo após os
+                retries (as ofertas das páginas anteriores já foram entregues)
+        """
+        concurrency = max(1, concurrency)
+        vistos = set()
+        pendentes: Dict[asyncio.Task, int] = {}
+        proxima_pagina = 1
+        fim = False
+        entregues = 0
+        paginas = 0
+        duplicadas = 0
+        
+        async def buscar(page: int) -> Tuple[List[Dict], bool]:
+            if semaphore is None:
+                return await self._fetch_offer_page(category_id, keyword, page_size, page)
+            async with semaphore:
+                return await self._fetch_offer_page(category_id, keyword, page_size, page)
+        
+        def agendar():
+            nonlocal proxima_pagina
+            while not fim and len(pendentes) < concurrency:
+                # Não busca páginas além do necessário para atingir max_items
+                if max_items is not None and entregues + len(pendentes) * page_size >= max_items:
+                    break
+                task = asyncio.create_task(buscar(proxima_pagina))
+                pendentes[task] = proxima_pagina
+                proxima_pagina += 1
+        
+        try:
+            agendar()
+            
+            while pendentes:
+                concluidas, _ = await asyncio.wait(
+                    pendentes.keys(),
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+                
+                for task in concluidas:
+                    page = pendentes.pop(task)
+                    
+                    try:
+                        offers, has_more = task.result()
+                    except Exception as e:
+                        # Os retries já ficaram com a camada de resiliência: sem
+                        # a página não dá para saber se há mais, então o erro sobe
+                        logger.error(f"Erro ao buscar página {page} de ofertas: {e}")
+                        raise
+                    
+                    paginas += 1
+                    if not has_more:
+                        fim = True
+                    
+                    for offer in offers:
+                        chave = (offer.get("shop_id"), offer.get("item_id"))
+                        # Sem os dois IDs não há como reconhecer duplicatas
+                        if None not in chave:
+                            if chave in vistos:
+                                duplicadas += 1
+                                continue
+                            vistos.add(chave)
+                        
+                        yield offer
+                        entregues += 1
+                        
+                        if max_items is not None and entregues >= max_items:
+                            return
+                
+                agendar()
+        
+        finally:
+            for task in pendentes:
+                task.cancel()
+            if pendentes:
+                await asyncio.gather(*pendentes, return_exceptions=True)
+            
+            logger.info(
+                "Coleta paginada finalizada",
+                total=entregues,
+                paginas=paginas,
+                duplicadas=duplicadas,
+                category_id=category_id,
+                keyword=keyword
+            )
+    
     async def get_product_detail(self, item_id: str, shop_id: str) -> Optional[Dict]:
         """
         Busca detalhes de um produto específico
@@ -138,40 +438,20 @@ class ShopeeAffiliateAPI:
         Returns:
             Detalhes do produto
         """
-        path = "/product/get_detail"
-        timestamp = int(time.time())
-        
         params = {
-            "partner_id": self.partner_id,
-            "timestamp": timestamp,
             "item_id": item_id,
             "shop_id": shop_id
         }
         
-        signature = self._generate_signature(path, timestamp)
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"{self.api_key}:{signature}"
-        }
-        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.BASE_URL}{path}",
-                    params=params,
-                    headers=headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if data.get("error"):
-                    logger.error("Erro ao buscar detalhe", item_id=item_id)
-                    return None
-                
-                return data.get("data", {})
-                
+            data = await self._signed_request("GET", "/product/get_detail", params=params)
+            
+            if data.get("error"):
+                logger.error("Erro ao buscar detalhe", item_id=item_id)
+                return None
+            
+            return data.get("data", {})
+        
         except Exception as e:
             logger.error(f"Erro ao buscar detalhe do produto: {e}")
             return None
@@ -193,12 +473,7 @@ class ShopeeAffiliateAPI:
         Returns:
             Link de afiliado ou None
         """
-        path = "/link/generate"
-        timestamp = int(time.time())
-        
         body = {
-            "partner_id": self.partner_id,
-            "timestamp": timestamp,
             "item_id": item_id,
             "shop_id": shop_id,
             "sub_id1": sub_ids[0] if len(sub_ids) > 0 else "",
@@ -208,35 +483,52 @@ class ShopeeAffiliateAPI:
             "sub_id5": sub_ids[4] if len(sub_ids) > 4 else "",
         }
         
-        import json
-        body_str = json.dumps(body)
-        signature = self._generate_signature(path, timestamp, body_str)
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"{self.api_key}:{signature}"
-        }
-        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.BASE_URL}{path}",
-                    json=body,
-                    headers=headers
-                )
-                response.raise_for_status()
-                
-                data = response.json()
-                
-                if data.get("error"):
-                    logger.error("Erro ao gerar link", item_id=item_id)
-                    return None
-                
-                link = data.get("data", {}).get("affiliate_link")
-                logger.info("Link de afiliado gerado", item_id=item_id)
-                
-                return link
-                
+            data = await self._signed_request("POST", "/link/generate", body=body)
+            
+            if data.get("error"):
+                logger.error("Erro ao gerar link", item_id=item_id)
+                return None
+            
+            link = data.get("data", {}).get("affiliate_link")
+            logger.info("Link de afiliado gerado", item_id=item_id)
+            
+            return link
+        
         except Exception as e:
             logger.error(f"Erro ao gerar link de afiliado: {e}")
             return None
+
+
+# Instância compartilhada (criada sob demanda, pois exige credenciais)
+_shared_api: Optional[ShopeeAffiliateAPI] = None
+
+
+def get_shopee_api() -> ShopeeAffiliateAPI:
+    """
+    Retorna a instância compartilhada do cliente Shopee
+    
+    Todas as partes da aplicação (coleta, links, relatórios) usam o mesmo
+    pool de conexões através desta função.
+    
+    Returns:
+        ShopeeAffiliateAPI compartilhado
+        
+    Raises:
+        ValueError: Se as credenciais da Shopee não estiverem configuradas
+    """
+    global _shared_api
+    
+    if _shared_api is None:
+        _shared_api = ShopeeAffiliateAPI()
+    
+    return _shared_api
+
+
+async def close_shopee_api():
+    """Fecha o pool de conexões da instância compartilhada"""
+    global _shared_api
+    
+    if _shared_api is not None:
+        await _shared_api.aclose()
+        _shared_api = None
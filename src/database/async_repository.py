@@ -0,0 +1,92 @@
+"""
+Repository assíncrono - mesmas operações do repository, para AsyncSession
+
+Cada método executa a versão síncrona com AsyncSession.run_sync: o SQL
+roda pelo driver assíncrono (aiosqlite/asyncpg) e o event loop fica livre
+durante o I/O. Assim a lógica das consultas continua num lugar só.
+"""
+import functools
+from typing import Callable
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.database.repository import (
+    ProdutoRepository,
+    ConteudoRepository,
+    LinkRepository,
+    AnalyticsRepository,
+    AnalyticsRollupRepository,
+)
+
+
+def _async(metodo: Callable):
+    """Expõe um método estático do repository síncrono como corrotina"""
+    @functools.wraps(metodo)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(metodo, *args, **kwargs)
+    
+    return staticmethod(wrapper)
+
+
+class AsyncProdutoRepository:
+    """Versão assíncrona de ProdutoRepository"""
+    
+    criar = _async(ProdutoRepository.criar)
+    upsert_many = _async(ProdutoRepository.upsert_many)
+    upsert_many_com_inseridos = _async(ProdutoRepository.upsert_many_com_inseridos)
+    buscar_por_id = _async(ProdutoRepository.buscar_por_id)
+    buscar_por_ids = _async(ProdutoRepository.buscar_por_ids)
+    buscar_por_shopee_ids = _async(ProdutoRepository.buscar_por_shopee_ids)
+    buscar_por_shopee_id = _async(ProdutoRepository.buscar_por_shopee_id)
+    listar_por_nicho = _async(ProdutoRepository.listar_por_nicho)
+    top_ranqueados = _async(ProdutoRepository.top_ranqueados)
+    atualizar_score = _async(ProdutoRepository.atualizar_score)
+    listar_entradas_score = _async(ProdutoRepository.listar_entradas_score)
+    atualizar_scores_em_lote = _async(ProdutoRepository.atualizar_scores_em_lote)
+    marcar_como_publicado = _async(ProdutoRepository.marcar_como_publicado)
+    marcar_como_publicado_many = _async(ProdutoRepository.marcar_como_publicado_many)
+
+
+class AsyncConteudoRepository:
+    """Versão assíncrona de ConteudoRepository"""
+    
+    criar = _async(ConteudoRepository.criar)
+    criar_muitos = _async(ConteudoRepository.criar_muitos)
+    buscar_por_id = _async(ConteudoRepository.buscar_por_id)
+    buscar_por_ids = _async(ConteudoRepository.buscar_por_ids)
+    aprovar = _async(ConteudoRepository.aprovar)
+    listar_por_produto = _async(ConteudoRepository.listar_por_produto)
+    buscar_para_publicar = _async(ConteudoRepository.buscar_para_publicar)
+    marcar_como_publicado = _async(ConteudoRepository.marcar_como_publicado)
+    marcar_como_publicado_many = _async(ConteudoRepository.marcar_como_publicado_many)
+
+
+class AsyncLinkRepository:
+    """Versão assíncrona de LinkRepository"""
+    
+    criar = _async(LinkRepository.criar)
+    criar_ou_obter = _async(LinkRepository.criar_ou_obter)
+    criar_muitos = _async(LinkRepository.criar_muitos)
+    buscar_por_id = _async(LinkRepository.buscar_por_id)
+    buscar_por_link_curto = _async(LinkRepository.buscar_por_link_curto)
+    buscar_por_subids = _async(LinkRepository.buscar_por_subids)
+    buscar_destino = _async(LinkRepository.buscar_destino)
+    listar_destinos = _async(LinkRepository.listar_destinos)
+    atualizar_metricas = _async(LinkRepository.atualizar_metricas)
+    atualizar_metricas_many = _async(LinkRepository.atualizar_metricas_many)
+
+
+class AsyncAnalyticsRepository:
+    """Versão assíncrona de AnalyticsRepository"""
+    
+    criar = _async(AnalyticsRepository.criar)
+    buscar_por_periodo = _async(AnalyticsRepository.buscar_por_periodo)
+    aggregate = _async(AnalyticsRepository.aggregate)
+    resumo_ultimos_dias = _async(AnalyticsRepository.resumo_ultimos_dias)
+
+
+class AsyncAnalyticsRollupRepository:
+    """Versão assíncrona de AnalyticsRollupRepository"""
+    
+    atualizar = _async(AnalyticsRollupRepository.atualizar)
+    aggregate = _async(AnalyticsRollupRepository.aggregate)
@@ -1,23 +1,220 @@
 """
 Conexão com o banco de dados usando SQLAlchemy
 """
-from sqlalchemy import create_engine
+import threading
+import time
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, Session
-from typing import Generator
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from typing import AsyncGenerator, Dict, Generator
 
 from config.credentials import credentials
 
+
+class PoolStats:
+    """
+    Contadores de espera por conexão de um pool (thread-safe)
+    
+    Alimentado pelo pool monitorado a cada checkout; a espera inclui abrir
+    uma conexão nova quando o pool ainda não está cheio.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkouts_com_espera = 0
+        self.timeouts = 0
+        self.espera_total_s = 0.0
+        self.espera_max_s = 0.0
+    
+    def registrar(self, espera: float, timeout: bool = False):
+        with self._lock:
+            if timeout:
+                self.timeouts += 1
+                return
+            self.checkouts += 1
+            self.espera_total_s += espera
+            self.espera_max_s = max(self.espera_max_s, espera)
+            if espera > 0.001:
+                self.checkouts_com_espera += 1
+    
+    def as_dict(self) -> Dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkouts_com_espera": self.checkouts_com_espera,
+                "timeouts": self.timeouts,
+                "espera_media_ms": round(self.espera_total_s / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "espera_max_ms": round(self.espera_max_s * 1000, 3),
+            }
+
+
+def _pool_monitorado(base: type) -> type:
+    """
+    Subclasse do pool que mede a espera por conexão em cada checkout
+    
+    Uma classe por engine: Pool.recreate() (engine.dispose) instancia
+    self.__class__, então os contadores sobrevivem à recriação do pool.
+    """
+    stats = PoolStats()
+    
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexao = base._do_get(self)
+        except PoolTimeoutError:
+            stats.registrar(time.perf_counter() - inicio, timeout=True)
+            raise
+        stats.registrar(time.perf_counter() - inicio)
+        return conexao
+    
+    return type(f"Monitored{base.__name__}", (base,), {"_do_get": _do_get, "stats": stats})
+
+
+def _sqlite_em_memoria(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+
+def engine_options(url: str, assincrono: bool = False) -> Dict:
+    """
+    Argumentos de create_engine/create_async_engine a partir das credenciais
+    
+    Args:
+        url: URL do banco
+        assincrono: Opções para o engine assíncrono (aiosqlite/asyncpg)
+        
+    Returns:
+        Dict de argumentos (pool, timeouts e connect_args por banco)
+    """
+    parsed = make_url(url)
+    opcoes = {
+        "echo": credentials.DB_ECHO,
+        "pool_pre_ping": credentials.DB_POOL_PRE_PING,
+    }
+    
+    # SQLite em memória usa um pool próprio (uma conexão), sem dimensionamento
+    if not _sqlite_em_memoria(parsed):
+        opcoes.update({
+            "poolclass": _pool_monitorado(AsyncAdaptedQueuePool if assincrono else QueuePool),
+            "pool_size": credentials.DB_POOL_SIZE,
+            "max_overflow": credentials.DB_MAX_OVERFLOW,
+            "pool_timeout": credentials.DB_POOL_TIMEOUT,
+            "pool_recycle": credentials.DB_POOL_RECYCLE,
+        })
+    
+    if parsed.get_backend_name() == "sqlite":
+        if not assincrono:
+            opcoes["connect_args"] = {"check_same_thread": False}
+    elif parsed.get_backend_name() == "postgresql" and credentials.DB_STATEMENT_TIMEOUT_MS:
+        timeout = str(credentials.DB_STATEMENT_TIMEOUT_MS)
+        if assincrono:
+            opcoes["connect_args"] = {"server_settings": {"statement_timeout": timeout}}
+        else:
+            opcoes["connect_args"] = {"options": f"-c statement_timeout={timeout}"}
+    
+    return opcoes
+
+
+def configurar_sqlite(engine: Engine):
+    """
+    Ajusta cada conexão SQLite nova: WAL, synchronous=NORMAL e busy_timeout
+    
+    WAL deixa leituras concorrentes com uma escrita; NORMAL é seguro em WAL
+    (só perde a última transação numa queda de energia); busy_timeout faz
+    escritas concorrentes esperarem o lock em vez de falhar na hora.
+    """
+    if engine.dialect.name != "sqlite":
+        return
+    
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={credentials.DB_SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+
+def pool_stats(engine: Engine) -> Dict:
+    """
+    Estado atual do pool de um engine
+    
+    Args:
+        engine: Engine síncrono (para o assíncrono, use async_engine.sync_engine)
+        
+    Returns:
+        Dict com tamanho, conexões em uso, overflow e esperas por conexão
+    """
+    pool = engine.pool
+    stats = {"pool": type(pool).__name__}
+    
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "tamanho": pool.size(),
+            "em_uso": pool.checkedout(),
+            "disponiveis": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+    
+    if hasattr(type(pool), "stats"):
+        stats.update(type(pool).stats.as_dict())
+    
+    return stats
+
+
 # Engine do SQLAlchemy
-engine = create_engine(
-    credentials.DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in credentials.DATABASE_URL else {},
-    echo=credentials.ENVIRONMENT == "development"
-)
+engine = create_engine(credentials.DATABASE_URL, **engine_options(credentials.DATABASE_URL))
+configurar_sqlite(engine)
 
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Drivers assíncronos por banco (mesma DATABASE_URL do engine síncrono)
+DRIVERS_ASYNC = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_url(url: str) -> str:
+    """
+    Converte uma URL síncrona para o driver assíncrono equivalente
+    
+    Ex: postgresql+psycopg2://... -> postgresql+asyncpg://...
+    
+    Args:
+        url: URL do banco (DATABASE_URL)
+        
+    Returns:
+        URL com aiosqlite (SQLite) ou asyncpg (PostgreSQL)
+    """
+    parsed = make_url(url)
+    driver = DRIVERS_ASYNC.get(parsed.get_backend_name())
+    if not driver:
+        raise ValueError(f"Banco sem driver assíncrono configurado: {parsed.get_backend_name()}")
+    return parsed.set(drivername=driver).render_as_string(hide_password=False)
+
+
+# Engine assíncrono usado pelas rotas da API (não bloqueia o event loop)
+async_engine = create_async_engine(
+    async_database_url(credentials.DATABASE_URL),
+    **engine_options(credentials.DATABASE_URL, assincrono=True)
+)
+configurar_sqlite(async_engine.sync_engine)
+
+# Session factory assíncrona (expire_on_commit=False: objetos continuam
+# legíveis após o commit sem novo I/O implícito, que não é permitido em async)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine,
+    autoflush=False,
+    expire_on_commit=False
+)
+
 # Base para models
 Base = declarative_base()
 
@@ -41,10 +238,26 @@ def get_db() -> Generator[Session, None, None]:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency injection para FastAPI - retorna sessão assíncrona do banco
+    
+    Yields:
+        AsyncSession do SQLAlchemy
+        
+    Exemplo:
+        @app.get("/produtos")
+        async def get_produtos(db: AsyncSession = Depends(get_async_db)):
+            return await AsyncProdutoRepository.top_ranqueados(db, "tech")
+    """
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
 def init_db():
     """
     Inicializa o banco de dados criando todas as tabelas
     """
-    from src.database.models import Produto, ConteudoGerado, Link, Analytics
+    from src.database.models import Produto, ConteudoGerado, Link, Analytics, RateLimitBucket
     
     Base.metadata.create_all(bind=engine)
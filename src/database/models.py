@@ -3,7 +3,7 @@ Modelos do banco de dados - SQLAlchemy Models
 """
 from datetime import datetime
 from typing import Optional
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Float, Date, DateTime, Text, Boolean, ForeignKey, JSON, Index, text, false
 from sqlalchemy.orm import relationship
 
 from src.database.connection import Base
@@ -35,7 +35,7 @@ class Produto(Base):
     total_avaliacoes = Column(Integer, default=0)
     
     # Categorização
-    nicho = Column(String, index=True, nullable=False)  # casa, tech, pet, cosmeticos
+    nicho = Column(String, nullable=False)  # casa, tech, pet, cosmeticos
     categoria_shopee = Column(String, nullable=True)
     
     # URLs e Imagens
@@ -46,6 +46,8 @@ class Produto(Base):
     # Ranking
     score_ranking = Column(Float, default=0.0, index=True)
     motivo_ranking = Column(Text, nullable=True)  # Explicação do DeepSeek
+    score_fingerprint = Column(String, nullable=True)  # Hash das entradas do score
+    score_versao_pesos = Column(String, nullable=True)  # Versão dos pesos usados no score
     
     # Status
     ativo = Column(Boolean, default=True)
@@ -60,6 +62,11 @@ class Produto(Base):
     links = relationship("Link", back_populates="produto")
     analytics = relationship("Analytics", back_populates="produto")
     
+    __table_args__ = (
+        # top_ranqueados / listar_por_nicho: WHERE nicho, ativo ORDER BY score_ranking
+        Index("ix_produtos_nicho_ativo_score", "nicho", "ativo", "score_ranking"),
+    )
+    
     def __repr__(self):
         return f"<Produto {self.shopee_id}: {self.nome}>"
 
@@ -104,6 +111,17 @@ class ConteudoGerado(Base):
     # Relacionamentos
     produto = relationship("Produto", back_populates="conteudos")
     
+    __table_args__ = (
+        # buscar_para_publicar: só conteúdos aprovados e ainda não publicados
+        Index(
+            "ix_conteudos_pendentes_publicacao",
+            "canal",
+            "produto_id",
+            sqlite_where=text("aprovado = 1 AND publicado = 0"),
+            postgresql_where=text("aprovado AND NOT publicado"),
+        ),
+    )
+    
     def __repr__(self):
         return f"<Conteudo {self.canal}/{self.template} - Produto {self.produto_id}>"
 
@@ -142,6 +160,15 @@ class Link(Base):
     # Relacionamentos
     produto = relationship("Produto", back_populates="links")
     
+    __table_args__ = (
+        # Um link por produto + SubIds: cache de links de afiliado e geração idempotente
+        Index(
+            "uq_links_produto_subids",
+            "produto_id", "sub_id1", "sub_id2", "sub_id3", "sub_id4", "sub_id5",
+            unique=True,
+        ),
+    )
+    
     def __repr__(self):
         return f"<Link {self.link_curto} - Produto {self.produto_id}>"
 
@@ -176,11 +203,188 @@ class Analytics(Base):
     ctr = Column(Float, default=0.0)  # Click-through rate
     taxa_conversao = Column(Float, default=0.0)
     
+    # Já somada nos rollups diários (AnalyticsRollupRepository.atualizar)
+    agregado = Column(Boolean, default=False, server_default=false(), nullable=False)
+    
     # Timestamps
     coletado_em = Column(DateTime, default=datetime.utcnow)
     
     # Relacionamentos
     produto = relationship("Produto", back_populates="analytics")
     
+    __table_args__ = (
+        # buscar_por_periodo filtrando por canal ou nicho
+        Index("ix_analytics_canal_data", "canal", "data"),
+        Index("ix_analytics_nicho_data", "nicho", "data"),
+        # Linhas ainda não agregadas nos rollups
+        Index(
+            "ix_analytics_pendentes",
+            "id",
+            sqlite_where=text("agregado = 0"),
+            postgresql_where=text("NOT agregado"),
+        ),
+    )
+    
     def __repr__(self):
         return f"<Analytics {self.data} - Canal: {self.canal}>"
+
+
+class AnalyticsDiario(Base):
+    """
+    Rollup diário de analytics por canal × nicho × campanha
+    
+    Dimensões nulas em analytics são gravadas como "" (fazem parte da chave).
+    """
+    __tablename__ = "analytics_diario"
+    
+    dia = Column(Date, primary_key=True)
+    canal = Column(String, primary_key=True, default="")
+    nicho = Column(String, primary_key=True, default="")
+    campanha = Column(String, primary_key=True, default="")
+    
+    impressoes = Column(Integer, nullable=False, default=0)
+    cliques = Column(Integer, nullable=False, default=0)
+    conversoes = Column(Integer, nullable=False, default=0)
+    receita = Column(Float, nullable=False, default=0.0)
+    comissao = Column(Float, nullable=False, default=0.0)
+    
+    __table_args__ = (
+        # Dashboards filtrados por canal ou nicho num intervalo de dias
+        Index("ix_analytics_diario_canal_dia", "canal", "dia"),
+        Index("ix_analytics_diario_nicho_dia", "nicho", "dia"),
+    )
+    
+    def __repr__(self):
+        return f"<AnalyticsDiario {self.dia} - {self.canal}/{self.nicho}/{self.campanha}>"
+
+
+class AnalyticsProdutoDiario(Base):
+    """
+    Rollup diário de analytics por produto
+    """
+    __tablename__ = "analytics_produto_diario"
+    
+    dia = Column(Date, primary_key=True)
+    produto_id = Column(Integer, ForeignKey("produtos.id"), primary_key=True)
+    
+    impressoes = Column(Integer, nullable=False, default=0)
+    cliques = Column(Integer, nullable=False, default=0)
+    conversoes = Column(Integer, nullable=False, default=0)
+    receita = Column(Float, nullable=False, default=0.0)
+    comissao = Column(Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f"<AnalyticsProdutoDiario {self.dia} - Produto: {self.produto_id}>"
+
+
+class RollupWatermark(Base):
+    """
+    Trava de atualização de cada tabela de rollup
+    
+    As linhas agregadas são marcadas em analytics.agregado; ultimo_id guarda
+    o maior id já agregado, só para acompanhamento.
+    """
+    __tablename__ = "rollup_watermarks"
+    
+    nome = Column(String, primary_key=True)
+    ultimo_id = Column(Integer, nullable=False, default=0)
+    atualizado_em = Column(DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f"<RollupWatermark {self.nome}: {self.ultimo_id}>"
+
+
+class RateLimitBucket(Base):
+    """
+    Token bucket compartilhado entre workers (rate limit da API Shopee)
+    """
+    __tablename__ = "rate_limit_buckets"
+    
+    nome = Column(String, primary_key=True)
+    tokens = Column(Float, nullable=False)
+    atualizado_em = Column(Float, nullable=False)  # Unix timestamp
+    
+    def __repr__(self):
+        return f"<RateLimitBucket {self.nome}: {self.tokens:.2f}>"
+
+
+class Sequencia(Base):
+    """
+    Contador para alocação de IDs em blocos (ex: short codes dos links)
+    """
+    __tablename__ = "sequencias"
+    
+    nome = Column(String, primary_key=True)
+    proximo = Column(BigInteger, nullable=False, default=1)
+    
+    def __repr__(self):
+        return f"<Sequencia {self.nome}: {self.proximo}>"
+
+
+class LLMJob(Base):
+    """
+    Job de geração de copies em lote (ver src/llm/batch.py)
+    """
+    __tablename__ = "llm_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    nome = Column(String, nullable=True)
+    provider = Column(String, nullable=False)
+    
+    # pendente -> em_andamento -> concluido
+    status = Column(String, nullable=False, default="pendente")
+    
+    # Progresso
+    total = Column(Integer, nullable=False, default=0)
+    concluidos = Column(Integer, nullable=False, default=0)
+    falhas = Column(Integer, nullable=False, default=0)
+    
+    # Timestamps
+    criado_em = Column(DateTime, default=datetime.utcnow)
+    atualizado_em = Column(DateTime, default=datetime.utcnow)
+    concluido_em = Column(DateTime, nullable=True)
+    
+    # Relacionamentos
+    itens = relationship("LLMJobItem", back_populates="job")
+    
+    def __repr__(self):
+        return f"<LLMJob {self.id} {self.status}: {self.concluidos}/{self.total}>"
+
+
+class LLMJobItem(Base):
+    """
+    Um prompt de um job em lote e o conteúdo gerado a partir dele
+    """
+    __tablename__ = "llm_job_itens"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("llm_jobs.id"), nullable=False)
+    produto_id = Column(Integer, ForeignKey("produtos.id"), nullable=False)
+    
+    # Campos do conteúdo (ContentGenerator)
+    canal = Column(String, nullable=False)
+    formato = Column(String, nullable=True)
+    persona = Column(String, nullable=True)
+    template = Column(String, nullable=True)
+    variacao_numero = Column(Integer, default=1)
+    prompt = Column(Text, nullable=False)
+    
+    # pendente -> enviado (batch API) -> concluido | falhou
+    status = Column(String, nullable=False, default="pendente")
+    lote_externo = Column(String, nullable=True)  # ID do lote no provedor
+    tentativas = Column(Integer, nullable=False, default=0)
+    erro = Column(Text, nullable=True)
+    conteudo_id = Column(Integer, ForeignKey("conteudos_gerados.id"), nullable=True)
+    
+    atualizado_em = Column(DateTime, default=datetime.utcnow)
+    
+    # Relacionamentos
+    job = relationship("LLMJob", back_populates="itens")
+    
+    __table_args__ = (
+        # Próximos itens a enviar/coletar de um job
+        Index("ix_llm_job_itens_job_status", "job_id", "status"),
+    )
+    
+    def __repr__(self):
+        return f"<LLMJobItem {self.id} job={self.job_id} {self.status}>"
@@ -1,16 +1,177 @@
 """
 Repository - CRUD operations para o banco de dados
 """
-from datetime import datetime, timedelta
-from typing import List, Optional
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, and_
+from sqlalchemy import desc, and_, or_, insert, update, func, select, literal_column, bindparam, case, tuple_
+from sqlalchemy.exc import IntegrityError
 
-from src.database.models import Produto, ConteudoGerado, Link, Analytics
+from config.constants import LINK_CODIGO_TENTATIVAS, ROLLUP_LOTE, UPSERT_BATCH_SIZE
+from src.database.models import (
+    Produto, ConteudoGerado, Link, Analytics,
+    AnalyticsDiario, AnalyticsProdutoDiario, RollupWatermark, Sequencia,
+    LLMJob, LLMJobItem
+)
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Campos de um produto existente atualizados a cada nova coleta
+CAMPOS_UPSERT = (
+    "preco_original",
+    "preco_promocional",
+    "desconto_percentual",
+    "comissao_percentual",
+    "comissao_valor",
+    "total_vendas",
+)
+
+# Dimensões aceitas por AnalyticsRepository.aggregate ("dia" agrupa por data)
+DIMENSOES_ANALYTICS = {
+    "dia": func.date(Analytics.data),
+    "canal": Analytics.canal,
+    "nicho": Analytics.nicho,
+    "campanha": Analytics.campanha,
+    "produto_id": Analytics.produto_id,
+}
+
+# Métricas somadas no banco
+METRICAS_SOMA = ("impressoes", "cliques", "conversoes", "receita", "comissao")
+
+# Métricas derivadas das somas: (numerador, denominador) em percentual
+METRICAS_TAXA = {
+    "ctr": ("cliques", "impressoes"),
+    "taxa_conversao": ("conversoes", "cliques"),
+}
+
+# Dimensões aceitas por AnalyticsRollupRepository.aggregate, por tabela de rollup
+DIMENSOES_ROLLUP = {
+    "dia": AnalyticsDiario.dia,
+    "canal": AnalyticsDiario.canal,
+    "nicho": AnalyticsDiario.nicho,
+    "campanha": AnalyticsDiario.campanha,
+}
+DIMENSOES_ROLLUP_PRODUTO = {
+    "dia": AnalyticsProdutoDiario.dia,
+    "produto_id": AnalyticsProdutoDiario.produto_id,
+}
+
+# Campos obrigatórios que identificam um conteúdo inserido em lote
+CHAVE_CONTEUDO = ("produto_id", "canal", "formato", "persona", "template", "copy_texto")
+
+# Rollups atualizados a partir de analytics: nome -> (model, dimensões além do dia)
+ROLLUPS = {
+    "analytics_diario": (AnalyticsDiario, ("canal", "nicho", "campanha")),
+    "analytics_produto_diario": (AnalyticsProdutoDiario, ("produto_id",)),
+}
+
+
+def _dialect_insert(db: Session):
+    """insert com suporte a ON CONFLICT do dialeto da sessão"""
+    if db.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
+
+
+def _inserir_em_lote(db: Session, modelo, dados: List[dict], chave: tuple) -> list:
+    """
+    INSERT em lote com RETURNING, devolvendo os objetos na ordem de dados
+    
+    O RETURNING de um INSERT com várias linhas não garante a ordem dos
+    parâmetros (e sort_by_parameter_order vira um INSERT por linha no
+    SQLite), então cada linha retornada é casada pelos campos de chave.
+    Linhas com a mesma chave são intercambiáveis.
+    
+    Args:
+        db: Sessão do banco
+        modelo: Modelo inserido
+        dados: Campos de cada linha (todas com os campos de chave)
+        chave: Campos obrigatórios que identificam a linha
+        
+    Returns:
+        Objetos criados, na ordem de dados
+    """
+    criados = {}
+    for objeto in db.scalars(insert(modelo).returning(modelo), dados):
+        criados.setdefault(tuple(getattr(objeto, campo) for campo in chave), []).append(objeto)
+    
+    return [criados[tuple(linha[campo] for campo in chave)].pop(0) for linha in dados]
+
+
+def _agregar(
+    db: Session,
+    modelo,
+    dimensoes_validas: Dict,
+    dimensions: tuple,
+    metrics: Optional[tuple],
+    filtros: list
+) -> List[Dict]:
+    """
+    GROUP BY/SUM sobre analytics ou um rollup, com taxas derivadas das somas
+    
+    Args:
+        db: Sessão do banco
+        modelo: Analytics ou model de rollup (colunas de METRICAS_SOMA)
+        dimensoes_validas: Nome da dimensão -> expressão SQL
+        dimensions: Dimensões de agrupamento
+        metrics: Métricas retornadas (padrão: todas as somas e taxas)
+        filtros: Condições do WHERE
+        
+    Returns:
+        Uma linha (dict) por combinação de dimensões
+    """
+    metrics = tuple(metrics) if metrics is not None else METRICAS_SOMA + tuple(METRICAS_TAXA)
+    
+    invalidas = [d for d in dimensions if d not in dimensoes_validas]
+    invalidas += [m for m in metrics if m not in METRICAS_SOMA and m not in METRICAS_TAXA]
+    if invalidas:
+        raise ValueError(f"Dimensões/métricas desconhecidas: {', '.join(invalidas)}")
+    
+    # Somas necessárias para as métricas pedidas (inclusive as das taxas)
+    somas = [m for m in METRICAS_SOMA if m in metrics or any(
+        m in METRICAS_TAXA[t] for t in metrics if t in METRICAS_TAXA
+    )]
+    
+    expressoes_dim = [dimensoes_validas[d] for d in dimensions]
+    colunas_soma = [
+        func.coalesce(func.sum(getattr(modelo, m)), 0).label(m) for m in somas
+    ]
+    
+    query = db.query(
+        *[e.label(d) for d, e in zip(dimensions, expressoes_dim)],
+        *colunas_soma
+    ).select_from(modelo).filter(*filtros)
+    
+    if expressoes_dim:
+        query = query.group_by(*expressoes_dim).order_by(*expressoes_dim)
+    
+    linhas = []
+    for row in query.all():
+        valores = row._asdict()
+        
+        linha = {}
+        for d in dimensions:
+            valor = valores[d]
+            if d == "dia" and valor is not None:
+                valor = str(valor)
+            # Rollups guardam dimensões nulas como ""
+            linha[d] = None if valor == "" else valor
+        
+        for m in metrics:
+            if m in METRICAS_TAXA:
+                numerador, denominador = METRICAS_TAXA[m]
+                total = valores[denominador]
+                linha[m] = round(valores[numerador] / total * 100, 2) if total else 0.0
+            else:
+                linha[m] = valores[m]
+        
+        linhas.append(linha)
+    
+    return linhas
+
 
 class ProdutoRepository:
     """Repository para operações com Produtos"""
@@ -34,6 +195,133 @@ class ProdutoRepository:
         logger.info("Produto criado", produto_id=produto.id, shopee_id=produto.shopee_id)
         return produto
     
+    @staticmethod
+    def upsert_many(
+        db: Session,
+        produtos_data: List[dict],
+        batch_size: int = UPSERT_BATCH_SIZE
+    ) -> Dict[str, int]:
+        """
+        Insere produtos novos e atualiza preço, comissão e vendas dos existentes
+        
+        Ver upsert_many_com_inseridos.
+        
+        Returns:
+            Dict com contagens de inseridos, atualizados e inalterados
+        """
+        contagens, _ = ProdutoRepository.upsert_many_com_inseridos(db, produtos_data, batch_size)
+        return contagens
+    
+    @staticmethod
+    def upsert_many_com_inseridos(
+        db: Session,
+        produtos_data: List[dict],
+        batch_size: int = UPSERT_BATCH_SIZE
+    ) -> Tuple[Dict[str, int], List[str]]:
+        """
+        Upsert em lote que também devolve os shopee_ids inseridos
+        
+        Usa INSERT ... ON CONFLICT (shopee_id) DO UPDATE com várias linhas por
+        statement (SQLite e PostgreSQL) e um único commit no final. Linhas existentes
+        só são reescritas quando algum dos campos monitorados mudou.
+        
+        Inserido vs atualizado sai do próprio RETURNING: no PostgreSQL, linha
+        inserida tem xmax = 0; no SQLite, id maior que o maior id antes do
+        upsert (lido uma vez, na mesma transação de escrita).
+        
+        Args:
+            db: Sessão do banco
+            produtos_data: Lista de dados de produtos (formato do OfferParser)
+            batch_size: Máximo de produtos por statement
+            
+        Returns:
+            (contagens de inseridos, atualizados e inalterados, shopee_ids inseridos)
+        """
+        contagens = {"inseridos": 0, "atualizados": 0, "inalterados": 0}
+        
+        # Um mesmo shopee_id duas vezes no statement é erro no PostgreSQL
+        unicos = {p["shopee_id"]: p for p in produtos_data}
+        if not unicos:
+            return contagens, []
+        
+        insert = _dialect_insert(db)
+        tabela = Produto.__table__
+        colunas = [c for c in tabela.columns if c.name != "id"]
+        
+        if db.get_bind().dialect.name == "postgresql":
+            inserido = literal_column("xmax = 0")
+        else:
+            inserido = tabela.c.id > (db.query(func.max(Produto.id)).scalar() or 0)
+        
+        stmt = insert(tabela)
+        excluded = stmt.excluded
+        mudou = or_(*(
+            tabela.c[campo].is_distinct_from(excluded[campo])
+            for campo in CAMPOS_UPSERT
+        ))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tabela.c.shopee_id],
+            set_={
+                **{campo: excluded[campo] for campo in CAMPOS_UPSERT},
+                "atualizado_em": excluded.atualizado_em,
+            },
+            where=mudou
+        ).returning(tabela.c.shopee_id, inserido.label("inserido"))
+        
+        # Executado como executemany: o SQLAlchemy compila o statement uma vez e
+        # o envia como INSERT multi-VALUES de até batch_size linhas por vez
+        # (respeitando o limite de parâmetros do SQLite)
+        stmt = stmt.execution_options(insertmanyvalues_page_size=batch_size)
+        
+        agora = datetime.utcnow()
+        linhas = [ProdutoRepository._linha_upsert(p, colunas, agora) for p in unicos.values()]
+        
+        retornadas = db.execute(stmt, linhas).all()
+        inseridos = [linha.shopee_id for linha in retornadas if linha.inserido]
+        
+        contagens["inseridos"] = len(inseridos)
+        contagens["atualizados"] = len(retornadas) - len(inseridos)
+        contagens["inalterados"] = len(linhas) - len(retornadas)
+        
+        db.commit()
+        logger.info("Upsert de produtos", **contagens)
+        return contagens, inseridos
+    
+    @staticmethod
+    def _linha_upsert(produto_data: dict, colunas: list, agora: datetime) -> dict:
+        """Monta uma linha com todas as colunas, aplicando os defaults do model"""
+        linha = {}
+        for coluna in colunas:
+            if coluna.name in produto_data:
+                linha[coluna.name] = produto_data[coluna.name]
+            elif coluna.default is not None and coluna.default.is_scalar:
+                linha[coluna.name] = coluna.default.arg
+            else:
+                linha[coluna.name] = None
+        
+        linha["coletado_em"] = agora
+        linha["atualizado_em"] = agora
+        return linha
+    
+    @staticmethod
+    def buscar_por_id(db: Session, produto_id: int) -> Optional[Produto]:
+        """Busca produto pelo ID"""
+        return db.get(Produto, produto_id)
+    
+    @staticmethod
+    def buscar_por_ids(db: Session, produto_ids: List[int]) -> List[Produto]:
+        """Busca vários produtos pelos IDs"""
+        if not produto_ids:
+            return []
+        return db.query(Produto).filter(Produto.id.in_(set(produto_ids))).all()
+    
+    @staticmethod
+    def buscar_por_shopee_ids(db: Session, shopee_ids: List[str]) -> List[Produto]:
+        """Busca vários produtos pelos IDs da Shopee"""
+        if not shopee_ids:
+            return []
+        return db.query(Produto).filter(Produto.shopee_id.in_(shopee_ids)).all()
+    
     @staticmethod
     def buscar_por_shopee_id(db: Session, shopee_id: str) -> Optional[Produto]:
         """Busca produto pelo ID da Shopee"""
@@ -55,22 +343,105 @@ class ProdutoRepository:
     
     @staticmethod
     def atualizar_score(db: Session, produto_id: int, score: float, motivo: str):
-        """Atualiza o score de ranking de um produto"""
-        produto = db.query(Produto).filter(Produto.id == produto_id).first()
-        if produto:
-            produto.score_ranking = score
-            produto.motivo_ranking = motivo
-            produto.atualizado_em = datetime.utcnow()
-            db.commit()
+        """
+        Atualiza o score de ranking de um produto
+        
+        Para vários produtos, use atualizar_scores_em_lote ou UnitOfWork.
+        """
+        atualizados = db.execute(
+            update(Produto)
+            .where(Produto.id == produto_id)
+            .values(score_ranking=score, motivo_ranking=motivo, atualizado_em=datetime.utcnow())
+        ).rowcount
+        db.commit()
+        if atualizados:
             logger.info("Score atualizado", produto_id=produto_id, score=score)
     
+    @staticmethod
+    def listar_entradas_score(db: Session, nicho: Optional[str] = None) -> list:
+        """
+        Lista só as colunas usadas no re-ranking dos produtos ativos
+        
+        Args:
+            db: Sessão do banco
+            nicho: Filtra por nicho (opcional)
+            
+        Returns:
+            Linhas com id, campos de score, score_fingerprint e score_versao_pesos
+        """
+        query = db.query(
+            Produto.id,
+            Produto.comissao_percentual,
+            Produto.preco_original,
+            Produto.preco_promocional,
+            Produto.rating,
+            Produto.total_vendas,
+            Produto.desconto_percentual,
+            Produto.score_fingerprint,
+            Produto.score_versao_pesos,
+        ).filter(Produto.ativo == True)
+        
+        if nicho:
+            query = query.filter(Produto.nicho == nicho)
+        
+        return query.all()
+    
+    @staticmethod
+    def atualizar_scores_em_lote(db: Session, atualizacoes: List[dict], commit: bool = True) -> int:
+        """
+        Atualiza scores de vários produtos com um único UPDATE em lote
+        
+        Args:
+            db: Sessão do banco
+            atualizacoes: Dicts com "id" e as colunas a atualizar
+                (score_ranking, motivo_ranking, score_fingerprint, ...)
+            commit: Faz commit ao final (False dentro de um UnitOfWork)
+                
+        Returns:
+            Quantidade de produtos atualizados
+        """
+        if not atualizacoes:
+            return 0
+        
+        agora = datetime.utcnow()
+        db.execute(
+            update(Produto),
+            [{**a, "atualizado_em": agora} for a in atualizacoes]
+        )
+        if commit:
+            db.commit()
+        logger.info("Scores atualizados em lote", total=len(atualizacoes))
+        return len(atualizacoes)
+    
     @staticmethod
     def marcar_como_publicado(db: Session, produto_id: int):
         """Marca produto como já publicado"""
-        produto = db.query(Produto).filter(Produto.id == produto_id).first()
-        if produto:
-            produto.ja_publicado = True
+        ProdutoRepository.marcar_como_publicado_many(db, [produto_id])
+    
+    @staticmethod
+    def marcar_como_publicado_many(db: Session, produto_ids: List[int], commit: bool = True) -> int:
+        """
+        Marca vários produtos como já publicados com um único UPDATE
+        
+        Args:
+            db: Sessão do banco
+            produto_ids: IDs dos produtos
+            commit: Faz commit ao final (False dentro de um UnitOfWork)
+            
+        Returns:
+            Quantidade de produtos atualizados
+        """
+        if not produto_ids:
+            return 0
+        
+        atualizados = db.execute(
+            update(Produto)
+            .where(Produto.id.in_(set(produto_ids)))
+            .values(ja_publicado=True)
+        ).rowcount
+        if commit:
             db.commit()
+        return atualizados
 
 
 class ConteudoRepository:
@@ -86,6 +457,49 @@ class ConteudoRepository:
         logger.info("Conteúdo criado", conteudo_id=conteudo.id, canal=conteudo.canal)
         return conteudo
     
+    @staticmethod
+    def criar_muitos(db: Session, conteudos_data: List[dict], commit: bool = True) -> List[ConteudoGerado]:
+        """
+        Cria vários conteúdos com um único INSERT em lote (RETURNING) e um commit
+        
+        Args:
+            db: Sessão do banco
+            conteudos_data: Campos de cada conteúdo
+            commit: Faz commit ao final
+            
+        Returns:
+            Conteúdos criados, na ordem de conteudos_data
+        """
+        if not conteudos_data:
+            return []
+        
+        conteudos = _inserir_em_lote(db, ConteudoGerado, conteudos_data, chave=CHAVE_CONTEUDO)
+        if commit:
+            db.commit()
+        logger.info("Conteúdos criados em lote", total=len(conteudos))
+        return conteudos
+    
+    @staticmethod
+    def buscar_por_id(db: Session, conteudo_id: int) -> Optional[ConteudoGerado]:
+        """Busca conteúdo pelo ID"""
+        return db.get(ConteudoGerado, conteudo_id)
+    
+    @staticmethod
+    def buscar_por_ids(db: Session, conteudo_ids: List[int]) -> List[ConteudoGerado]:
+        """Busca vários conteúdos pelos IDs"""
+        if not conteudo_ids:
+            return []
+        return db.query(ConteudoGerado).filter(ConteudoGerado.id.in_(set(conteudo_ids))).all()
+    
+    @staticmethod
+    def aprovar(db: Session, conteudo_id: int) -> Optional[ConteudoGerado]:
+        """Aprova conteúdo para publicação (None se não existe)"""
+        conteudo = db.get(ConteudoGerado, conteudo_id)
+        if conteudo:
+            conteudo.aprovado = True
+            db.commit()
+        return conteudo
+    
     @staticmethod
     def listar_por_produto(db: Session, produto_id: int) -> List[ConteudoGerado]:
         """Lista todos os conteúdos de um produto"""
@@ -115,33 +529,240 @@ class ConteudoRepository:
     @staticmethod
     def marcar_como_publicado(db: Session, conteudo_id: int):
         """Marca conteúdo como publicado"""
-        conteudo = db.query(ConteudoGerado).filter(
-            ConteudoGerado.id == conteudo_id
-        ).first()
-        if conteudo:
-            conteudo.publicado = True
-            conteudo.publicado_em = datetime.utcnow()
+        ConteudoRepository.marcar_como_publicado_many(db, [conteudo_id])
+    
+    @staticmethod
+    def marcar_como_publicado_many(db: Session, conteudo_ids: List[int], commit: bool = True) -> int:
+        """
+        Marca vários conteúdos como publicados com um único UPDATE
+        
+        Args:
+            db: Sessão do banco
+            conteudo_ids: IDs dos conteúdos
+            commit: Faz commit ao final (False dentro de um UnitOfWork)
+            
+        Returns:
+            Quantidade de conteúdos atualizados
+        """
+        if not conteudo_ids:
+            return 0
+        
+        atualizados = db.execute(
+            update(ConteudoGerado)
+            .where(ConteudoGerado.id.in_(set(conteudo_ids)))
+            .values(publicado=True, publicado_em=datetime.utcnow())
+        ).rowcount
+        if commit:
             db.commit()
+        return atualizados
 
 
 class LinkRepository:
     """Repository para operações com Links"""
     
     @staticmethod
-    def criar(db: Session, link_data: dict) -> Link:
-        """Cria novo link de afiliado"""
-        link = Link(**link_data)
-        db.add(link)
-        db.commit()
-        db.refresh(link)
-        logger.info("Link criado", link_id=link.id, link_curto=link.link_curto)
+    def criar(
+        db: Session,
+        link_data: dict,
+        gerar_codigo: Optional[Callable[[], str]] = None,
+        tentativas: int = LINK_CODIGO_TENTATIVAS,
+        commit: bool = True
+    ) -> Link:
+        """
+        Cria novo link de afiliado (ver criar_ou_obter)
+        
+        Returns:
+            Link criado (ou o existente com os mesmos SubIds)
+        """
+        link, _ = LinkRepository.criar_ou_obter(db, link_data, gerar_codigo, tentativas, commit)
         return link
     
+    @staticmethod
+    def criar_ou_obter(
+        db: Session,
+        link_data: dict,
+        gerar_codigo: Optional[Callable[[], str]] = None,
+        tentativas: int = LINK_CODIGO_TENTATIVAS,
+        commit: bool = True
+    ) -> Tuple[Link, bool]:
+        """
+        Cria novo link de afiliado, informando se a linha foi mesmo inserida
+        
+        O INSERT roda num savepoint. Se o link_curto já existe (ex: um short
+        code antigo, gerado por hash), só o savepoint é desfeito e o link é
+        inserido de novo com um código de gerar_codigo. A unicidade não é
+        consultada antes: o banco só é lido de novo quando o INSERT falha.
+        Se o que colidiu foi a combinação produto + SubIds (índice único,
+        ex: outro worker gerou o mesmo link), o link existente é retornado.
+        
+        Args:
+            db: Sessão do banco
+            link_data: Campos do link (com link_curto)
+            gerar_codigo: Gera outro short code em caso de colisão
+            tentativas: Máximo de INSERTs
+            commit: Faz commit ao final (False dentro de um lote)
+            
+        Returns:
+            (link, criado): criado é False quando o link com os mesmos
+            SubIds já existia
+        """
+        for tentativa in range(1, tentativas + 1):
+            link = Link(**link_data)
+            try:
+                with db.begin_nested():
+                    db.add(link)
+                break
+            except IntegrityError:
+                chave = LinkRepository.chave_subids(link_data)
+                existente = LinkRepository.buscar_por_subids(db, [chave]).get(chave)
+                if existente is not None:
+                    logger.info("Link já existe para os mesmos SubIds", link_id=existente.id)
+                    return existente, False
+                
+                colisao = db.execute(
+                    select(Link.id).where(Link.link_curto == link_data["link_curto"])
+                ).first()
+                if not colisao or gerar_codigo is None or tentativa == tentativas:
+                    raise
+                logger.warning(
+                    "Short code já existe, gerando outro",
+                    link_curto=link_data["link_curto"],
+                    tentativa=tentativa
+                )
+                link_data = {**link_data, "link_curto": gerar_codigo()}
+        
+        if commit:
+            db.commit()
+            db.refresh(link)
+        logger.info("Link criado", link_id=link.id, link_curto=link.link_curto)
+        return link, True
+    
+    @staticmethod
+    def criar_muitos(
+        db: Session,
+        links_data: List[dict],
+        gerar_codigo: Optional[Callable[[], str]] = None,
+        commit: bool = True
+    ) -> List[Tuple[Link, bool]]:
+        """
+        Cria vários links com um único INSERT em lote (RETURNING)
+        
+        Se algum short code ou produto + SubIds colidir, o lote é desfeito
+        no savepoint e os links são inseridos um a um (ver criar_ou_obter).
+        
+        Args:
+            db: Sessão do banco
+            links_data: Campos de cada link (com link_curto)
+            gerar_codigo: Gera outro short code em caso de colisão
+            commit: Faz commit ao final
+            
+        Returns:
+            Pares (link, criado), na ordem de links_data; criado é False
+            para links que já existiam com os mesmos SubIds
+        """
+        if not links_data:
+            return []
+        
+        try:
+            with db.begin_nested():
+                links = [
+                    (link, True) for link in _inserir_em_lote(db, Link, links_data, chave=("link_curto",))
+                ]
+        except IntegrityError:
+            logger.warning("Colisão no lote de links, inserindo um a um", total=len(links_data))
+            links = [
+                LinkRepository.criar_ou_obter(db, link_data, gerar_codigo=gerar_codigo, commit=False)
+                for link_data in links_data
+            ]
+        
+        if commit:
+            db.commit()
+        logger.info("Links criados em lote", total=len(links), criados=sum(criado for _, criado in links))
+        return links
+    
+    @staticmethod
+    def buscar_por_id(db: Session, link_id: int) -> Optional[Link]:
+        """Busca link pelo ID"""
+        return db.get(Link, link_id)
+    
     @staticmethod
     def buscar_por_link_curto(db: Session, link_curto: str) -> Optional[Link]:
         """Busca link pelo short code"""
         return db.query(Link).filter(Link.link_curto == link_curto).first()
     
+    @staticmethod
+    def chave_subids(link) -> tuple:
+        """
+        Chave de unicidade de um link: (produto_id, sub_id1, ..., sub_id5)
+        
+        Args:
+            link: Link ou dict com os campos do link
+        """
+        campos = ("produto_id", "sub_id1", "sub_id2", "sub_id3", "sub_id4", "sub_id5")
+        if isinstance(link, dict):
+            return tuple(link[campo] for campo in campos)
+        return tuple(getattr(link, campo) for campo in campos)
+    
+    @staticmethod
+    def buscar_por_subids(db: Session, chaves: List[tuple]) -> Dict[tuple, Link]:
+        """
+        Busca links já gerados para combinações de produto e SubIds
+        
+        Args:
+            db: Sessão do banco
+            chaves: Tuplas (produto_id, sub_id1, ..., sub_id5)
+            
+        Returns:
+            Dict chave -> Link (o mais antigo, se houver repetidos)
+        """
+        colunas = (Link.produto_id, Link.sub_id1, Link.sub_id2, Link.sub_id3, Link.sub_id4, Link.sub_id5)
+        chaves = list(dict.fromkeys(chaves))
+        encontrados: Dict[tuple, Link] = {}
+        
+        for inicio in range(0, len(chaves), UPSERT_BATCH_SIZE):
+            bloco = chaves[inicio:inicio + UPSERT_BATCH_SIZE]
+            links = db.scalars(
+                select(Link).where(tuple_(*colunas).in_(bloco)).order_by(Link.id)
+            ).all()
+            for link in links:
+                encontrados.setdefault(LinkRepository.chave_subids(link), link)
+        
+        return encontrados
+    
+    @staticmethod
+    def buscar_destino(db: Session, link_curto: str) -> Optional[tuple]:
+        """
+        Busca só o destino de um short code (sem carregar o objeto ORM)
+        
+        Returns:
+            (link_id, link_completo) ou None
+        """
+        linha = db.execute(
+            select(Link.id, Link.link_completo).where(Link.link_curto == link_curto)
+        ).first()
+        return tuple(linha) if linha else None
+    
+    @staticmethod
+    def listar_destinos(db: Session, limite: int) -> List[tuple]:
+        """
+        Lista os destinos mais prováveis de receber cliques (aquecimento de cache)
+        
+        Links clicados mais recentemente primeiro; depois os mais novos.
+        
+        Args:
+            db: Sessão do banco
+            limite: Máximo de links
+            
+        Returns:
+            Tuplas (link_curto, link_id, link_completo)
+        """
+        linhas = db.execute(
+            select(Link.link_curto, Link.id, Link.link_completo)
+            .order_by(Link.ultimo_clique_em.desc().nulls_last(), Link.id.desc())
+            .limit(limite)
+        ).all()
+        return [tuple(linha) for linha in linhas]
+    
     @staticmethod
     def atualizar_metricas(
         db: Session,
@@ -151,14 +772,308 @@ class LinkRepository:
         receita: float = 0.0
     ):
         """Atualiza métricas de um link"""
-        link = db.query(Link).filter(Link.id == link_id).first()
-        if link:
-            link.total_cliques += cliques
-            link.total_conversoes += conversoes
-            link.receita_gerada += receita
-            if cliques > 0:
-                link.ultimo_clique_em = datetime.utcnow()
+        LinkRepository.atualizar_metricas_many(db, [{
+            "link_id": link_id,
+            "cliques": cliques,
+            "conversoes": conversoes,
+            "receita": receita,
+        }])
+    
+    @staticmethod
+    def atualizar_metricas_many(db: Session, incrementos: List[dict], commit: bool = True) -> int:
+        """
+        Soma métricas a vários links com um UPDATE em lote (executemany)
+        
+        O incremento é feito no banco (total_cliques = total_cliques + :n),
+        sem ler os valores atuais. Incrementos do mesmo link são somados antes.
+        
+        Args:
+            db: Sessão do banco
+            incrementos: Dicts com "link_id" e opcionalmente "cliques",
+                "conversoes" e "receita"
+            commit: Faz commit ao final (False dentro de um UnitOfWork)
+            
+        Returns:
+            Quantidade de links distintos atualizados
+        """
+        por_link: Dict[int, Dict] = {}
+        for inc in incrementos:
+            total = por_link.setdefault(inc["link_id"], {
+                "b_link_id": inc["link_id"], "b_cliques": 0, "b_conversoes": 0, "b_receita": 0.0
+            })
+            total["b_cliques"] += inc.get("cliques", 0)
+            total["b_conversoes"] += inc.get("conversoes", 0)
+            total["b_receita"] += inc.get("receita", 0.0)
+        
+        if not por_link:
+            return 0
+        
+        tabela = Link.__table__
+        stmt = (
+            update(tabela)
+            .where(tabela.c.id == bindparam("b_link_id"))
+            .values(
+                total_cliques=func.coalesce(tabela.c.total_cliques, 0) + bindparam("b_cliques"),
+                total_conversoes=func.coalesce(tabela.c.total_conversoes, 0) + bindparam("b_conversoes"),
+                receita_gerada=func.coalesce(tabela.c.receita_gerada, 0) + bindparam("b_receita"),
+                ultimo_clique_em=case(
+                    (bindparam("b_cliques") > 0, datetime.utcnow()),
+                    else_=tabela.c.ultimo_clique_em
+                )
+            )
+        )
+        db.execute(stmt, list(por_link.values()))
+        if commit:
             db.commit()
+        return len(por_link)
+
+
+class SequenciaRepository:
+    """Repository para as sequências de IDs alocados em blocos"""
+    
+    @staticmethod
+    def reservar(db: Session, nome: str, quantidade: int) -> int:
+        """
+        Reserva um bloco de IDs consecutivos de uma sequência
+        
+        Um único UPDATE ... RETURNING, atômico entre workers: blocos
+        reservados ao mesmo tempo nunca se sobrepõem. A linha da sequência é
+        criada na primeira reserva.
+        
+        Args:
+            db: Sessão do banco
+            nome: Nome da sequência
+            quantidade: Tamanho do bloco
+            
+        Returns:
+            Primeiro ID do bloco (o bloco vai até inicio + quantidade - 1)
+        """
+        tabela = Sequencia.__table__
+        db.execute(
+            _dialect_insert(db)(tabela)
+            .values(nome=nome, proximo=1)
+            .on_conflict_do_nothing(index_elements=["nome"])
+        )
+        fim = db.execute(
+            update(tabela)
+            .where(tabela.c.nome == nome)
+            .values(proximo=tabela.c.proximo + quantidade)
+            .returning(tabela.c.proximo)
+        ).scalar_one()
+        db.commit()
+        return fim - quantidade
+
+
+class LLMJobRepository:
+    """Repository para jobs de geração de copies em lote (ver src/llm/batch.py)"""
+    
+    @staticmethod
+    def criar(db: Session, job_data: dict, itens_data: List[dict]) -> LLMJob:
+        """
+        Cria o job e todos os itens (um INSERT em lote) numa transação
+        
+        Args:
+            db: Sessão do banco
+            job_data: Campos do job (nome, provider)
+            itens_data: Campos de cada item (produto_id, canal, prompt...)
+            
+        Returns:
+            Job criado
+        """
+        job = LLMJob(**job_data, total=len(itens_data), concluidos=0, falhas=0, status="pendente")
+        db.add(job)
+        db.flush()
+        
+        if itens_data:
+            db.execute(insert(LLMJobItem), [
+                {**item_data, "job_id": job.id, "status": "pendente", "tentativas": 0}
+                for item_data in itens_data
+            ])
+        
+        db.commit()
+        db.refresh(job)
+        logger.info("Job de LLM criado", job_id=job.id, itens=job.total)
+        return job
+    
+    @staticmethod
+    def buscar_por_id(db: Session, job_id: int) -> Optional[LLMJob]:
+        """Busca job pelo ID"""
+        return db.get(LLMJob, job_id)
+    
+    @staticmethod
+    def listar_incompletos(db: Session) -> List[LLMJob]:
+        """Jobs ainda não concluídos (para retomar), do mais antigo ao mais novo"""
+        return db.query(LLMJob).filter(LLMJob.status != "concluido").order_by(LLMJob.id).all()
+    
+    @staticmethod
+    def listar_itens(db: Session, job_id: int, status: str, limite: Optional[int] = None) -> List[LLMJobItem]:
+        """Itens de um job num estado (pendente, enviado, concluido, falhou)"""
+        query = db.query(LLMJobItem).filter(
+            LLMJobItem.job_id == job_id,
+            LLMJobItem.status == status
+        ).order_by(LLMJobItem.id)
+        if limite:
+            query = query.limit(limite)
+        return query.all()
+    
+    @staticmethod
+    def iniciar(db: Session, job_id: int):
+        """Marca o job como em andamento"""
+        db.execute(
+            update(LLMJob)
+            .where(LLMJob.id == job_id, LLMJob.status == "pendente")
+            .values(status="em_andamento", atualizado_em=datetime.utcnow())
+        )
+        db.commit()
+    
+    @staticmethod
+    def marcar_enviados(db: Session, item_ids: List[int], lote_externo: str):
+        """Registra que os itens foram enviados num lote do provedor"""
+        db.execute(
+            update(LLMJobItem)
+            .where(LLMJobItem.id.in_(item_ids))
+            .values(status="enviado", lote_externo=lote_externo, atualizado_em=datetime.utcnow())
+        )
+        db.commit()
+    
+    @staticmethod
+    def registrar_resultados(
+        db: Session,
+        job_id: int,
+        respostas: Dict[int, str],
+        erros: Dict[int, str],
+        max_tentativas: int
+    ) -> Dict[str, int]:
+        """
+        Grava as respostas como ConteudoGerado e atualiza itens e job numa transação
+        
+        Um item com erro volta para pendente até esgotar max_tentativas,
+        depois fica como falhou.
+        
+        Args:
+            db: Sessão do banco
+            job_id: ID do job
+            respostas: item_id -> copy gerada
+            erros: item_id -> mensagem de erro
+            max_tentativas: Tentativas por item antes de desistir
+            
+        Returns:
+            Dict com concluidos, repetir e falhas (deste lote)
+        """
+        agora = datetime.utcnow()
+        itens = {
+            item.id: item for item in db.query(LLMJobItem).filter(
+                LLMJobItem.id.in_(set(respostas) | set(erros))
+            )
+        }
+        
+        # Itens já concluídos (ex: resultado repetido após retomar) são ignorados
+        itens = {item_id: item for item_id, item in itens.items() if item.status != "concluido"}
+        
+        concluidos = [itens[item_id] for item_id in respostas if item_id in itens]
+        conteudos = ConteudoRepository.criar_muitos(db, [
+            {
+                "produto_id": item.produto_id,
+                "canal": item.canal,
+                "formato": item.formato,
+                "persona": item.persona,
+                "template": item.template,
+                "copy_texto": respostas[item.id],
+                "variacao_numero": item.variacao_numero,
+                "aprovado": False
+            }
+            for item in concluidos
+        ], commit=False)
+        for item, conteudo in zip(concluidos, conteudos):
+            item.status = "concluido"
+            item.conteudo_id = conteudo.id
+            item.erro = None
+            item.atualizado_em = agora
+        
+        contagens = {"concluidos": len(concluidos), "repetir": 0, "falhas": 0}
+        for item_id, erro in erros.items():
+            item = itens.get(item_id)
+            if item is None:
+                continue
+            item.tentativas += 1
+            item.erro = erro
+            item.lote_externo = None
+            item.atualizado_em = agora
+            if item.tentativas >= max_tentativas:
+                item.status = "falhou"
+                contagens["falhas"] += 1
+            else:
+                item.status = "pendente"
+                contagens["repetir"] += 1
+        
+        db.flush()
+        LLMJobRepository._atualizar_contagens(db, job_id, agora)
+        db.commit()
+        return contagens
+    
+    @staticmethod
+    def _atualizar_contagens(db: Session, job_id: int, agora: datetime):
+        """Recalcula concluidos/falhas do job a partir dos itens"""
+        contagens = dict(
+            db.query(LLMJobItem.status, func.count(LLMJobItem.id))
+            .filter(LLMJobItem.job_id == job_id)
+            .group_by(LLMJobItem.status)
+            .all()
+        )
+        db.execute(
+            update(LLMJob)
+            .where(LLMJob.id == job_id)
+            .values(
+                concluidos=contagens.get("concluido", 0),
+                falhas=contagens.get("falhou", 0),
+                atualizado_em=agora
+            )
+        )
+    
+    @staticmethod
+    def finalizar(db: Session, job_id: int):
+        """Marca o job como concluído (com ou sem falhas)"""
+        agora = datetime.utcnow()
+        LLMJobRepository._atualizar_contagens(db, job_id, agora)
+        db.execute(
+            update(LLMJob)
+            .where(LLMJob.id == job_id)
+            .values(status="concluido", concluido_em=agora)
+        )
+        db.commit()
+    
+    @staticmethod
+    def progresso(db: Session, job_id: int) -> Optional[Dict]:
+        """
+        Estado do job e contagem dos itens por estado
+        
+        Returns:
+            Dict com status, total, itens por estado e percentual, ou None
+            se o job não existe
+        """
+        job = db.get(LLMJob, job_id)
+        if job is None:
+            return None
+        
+        por_status = dict(
+            db.query(LLMJobItem.status, func.count(LLMJobItem.id))
+            .filter(LLMJobItem.job_id == job_id)
+            .group_by(LLMJobItem.status)
+            .all()
+        )
+        finalizados = por_status.get("concluido", 0) + por_status.get("falhou", 0)
+        return {
+            "job_id": job.id,
+            "nome": job.nome,
+            "provider": job.provider,
+            "status": job.status,
+            "total": job.total,
+            "concluidos": por_status.get("concluido", 0),
+            "falhas": por_status.get("falhou", 0),
+            "pendentes": por_status.get("pendente", 0),
+            "enviados": por_status.get("enviado", 0),
+            "percentual": round(100 * finalizados / job.total, 1) if job.total else 100.0,
+        }
 
 
 class AnalyticsRepository:
@@ -166,7 +1081,13 @@ class AnalyticsRepository:
     
     @staticmethod
     def criar(db: Session, analytics_data: dict) -> Analytics:
-        """Registra analytics"""
+        """
+        Registra analytics
+        
+        A linha nasce com agregado = False e entra nos rollups na próxima
+        atualização agendada (AnalyticsRollupRepository.atualizar), sem
+        travar os watermarks no caminho de escrita.
+        """
         analytics = Analytics(**analytics_data)
         db.add(analytics)
         db.commit()
@@ -196,20 +1117,237 @@ class AnalyticsRepository:
         
         return query.all()
     
+    @staticmethod
+    def aggregate(
+        db: Session,
+        dimensions: tuple = (),
+        metrics: Optional[tuple] = None,
+        data_inicio: Optional[datetime] = None,
+        data_fim: Optional[datetime] = None,
+        canal: Optional[str] = None,
+        nicho: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Agrega analytics no banco com GROUP BY/SUM
+        
+        As taxas (ctr, taxa_conversao) são calculadas a partir das somas,
+        ou seja, ponderadas pelo volume, e não como média das taxas por linha.
+        Lê a tabela bruta (períodos com hora); para dias inteiros use
+        AnalyticsRollupRepository.aggregate.
+        
+        Args:
+            db: Sessão do banco
+            dimensions: Dimensões de agrupamento (chaves de DIMENSOES_ANALYTICS)
+            metrics: Métricas retornadas (padrão: todas as somas e taxas)
+            data_inicio: Início do período (inclusivo)
+            data_fim: Fim do período (inclusivo)
+            canal: Filtra por canal
+            nicho: Filtra por nicho
+            
+        Returns:
+            Uma linha (dict) por combinação de dimensões
+        """
+        filtros = []
+        if data_inicio:
+            filtros.append(Analytics.data >= data_inicio)
+        if data_fim:
+            filtros.append(Analytics.data <= data_fim)
+        if canal:
+            filtros.append(Analytics.canal == canal)
+        if nicho:
+            filtros.append(Analytics.nicho == nicho)
+        
+        return _agregar(db, Analytics, DIMENSOES_ANALYTICS, dimensions, metrics, filtros)
+    
     @staticmethod
     def resumo_ultimos_dias(db: Session, dias: int = 7) -> dict:
-        """Retorna resumo dos últimos N dias"""
-        data_inicio = datetime.utcnow() - timedelta(days=dias)
+        """Retorna resumo dos últimos N dias, incluindo hoje (lido dos rollups)"""
+        dia_inicio = datetime.utcnow().date() - timedelta(days=dias - 1)
         
-        analytics = db.query(Analytics).filter(
-            Analytics.data >= data_inicio
-        ).all()
+        totais = AnalyticsRollupRepository.aggregate(db, dia_inicio=dia_inicio)[0]
         
         return {
-            "total_cliques": sum(a.cliques for a in analytics),
-            "total_conversoes": sum(a.conversoes for a in analytics),
-            "total_receita": sum(a.receita for a in analytics),
-            "total_comissao": sum(a.comissao for a in analytics),
-            "ctr_medio": sum(a.ctr for a in analytics) / len(analytics) if analytics else 0,
-            "taxa_conversao_media": sum(a.taxa_conversao for a in analytics) / len(analytics) if analytics else 0,
+            "total_cliques": totais["cliques"],
+            "total_conversoes": totais["conversoes"],
+            "total_receita": totais["receita"],
+            "total_comissao": totais["comissao"],
+            "ctr_medio": totais["ctr"],
+            "taxa_conversao_media": totais["taxa_conversao"],
         }
+
+
+class AnalyticsRollupRepository:
+    """
+    Repository dos rollups diários de analytics
+    
+    Cada linha de analytics é marcada como agregada ao entrar nos rollups, que
+    são atualizados pelo job agendado (/rollups/refresh) só com as linhas
+    ainda não marcadas, com INSERT ... SELECT
+    ... ON CONFLICT somando às linhas existentes. As consultas de dashboard leem no máximo
+    uma linha por dia × dimensões, independente do tamanho do histórico.
+    """
+    
+    @staticmethod
+    def travar_watermarks(db: Session) -> Dict[str, RollupWatermark]:
+        """
+        Carrega (e cria, se preciso) os watermarks com SELECT ... FOR UPDATE
+        
+        Serializa atualizações concorrentes dos rollups no PostgreSQL; no
+        SQLite a escrita já é serializada pelo banco.
+        """
+        marcas = {
+            marca.nome: marca
+            for marca in db.query(RollupWatermark)
+            .filter(RollupWatermark.nome.in_(ROLLUPS))
+            .with_for_update()
+            .all()
+        }
+        
+        for nome in ROLLUPS:
+            if nome not in marcas:
+                marcas[nome] = RollupWatermark(nome=nome, ultimo_id=0)
+                db.add(marcas[nome])
+        
+        db.flush()
+        return marcas
+    
+    @staticmethod
+    def atualizar(db: Session, commit: bool = True, lote: int = ROLLUP_LOTE) -> Dict[str, int]:
+        """
+        Agrega nos rollups as linhas de analytics ainda não agregadas
+        
+        As linhas são reservadas em lotes de até `lote` ids com UPDATE ...
+        SET agregado ... RETURNING antes de somar, então uma linha que fica
+        visível depois (commit tardio com id menor que outras já agregadas)
+        entra na próxima atualização em vez de ficar para trás de um watermark.
+        
+        Args:
+            db: Sessão do banco
+            commit: Faz commit ao final (False quando chamado dentro de outra transação)
+            lote: Linhas reservadas e agregadas por vez
+            
+        Returns:
+            Dict com linhas de analytics agregadas por rollup
+        """
+        marcas = AnalyticsRollupRepository.travar_watermarks(db)
+        insert = _dialect_insert(db)
+        dia = func.date(Analytics.data)
+        
+        processados = {nome: 0 for nome in ROLLUPS}
+        maior_id = 0
+        while True:
+            pendentes = (
+                select(Analytics.id)
+                .where(Analytics.agregado.is_(False))
+                .order_by(Analytics.id)
+                .limit(lote)
+                .scalar_subquery()
+            )
+            reservadas = db.execute(
+                update(Analytics)
+                .where(Analytics.id.in_(pendentes))
+                .values(agregado=True)
+                .returning(Analytics.id, Analytics.produto_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            if not reservadas:
+                break
+            
+            ids = [linha.id for linha in reservadas]
+            maior_id = max(maior_id, *ids)
+            
+            for nome, (modelo, dimensoes) in ROLLUPS.items():
+                filtros = [Analytics.id.in_(ids)]
+                colunas_dim = []
+                for d in dimensoes:
+                    coluna = getattr(Analytics, d)
+                    if d == "produto_id":
+                        filtros.append(coluna.isnot(None))
+                        colunas_dim.append(coluna)
+                    else:
+                        colunas_dim.append(func.coalesce(coluna, literal_column("''")))
+                
+                selecao = select(
+                    dia,
+                    *colunas_dim,
+                    *[func.coalesce(func.sum(getattr(Analytics, m)), 0) for m in METRICAS_SOMA]
+                ).where(*filtros).group_by(dia, *colunas_dim)
+                
+                tabela = modelo.__table__
+                stmt = insert(tabela).from_select(["dia", *dimensoes, *METRICAS_SOMA], selecao)
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[c for c in tabela.primary_key.columns],
+                    set_={m: tabela.c[m] + stmt.excluded[m] for m in METRICAS_SOMA}
+                )
+                db.execute(stmt)
+                
+                if "produto_id" in dimensoes:
+                    processados[nome] += sum(1 for linha in reservadas if linha.produto_id is not None)
+                else:
+                    processados[nome] += len(reservadas)
+            
+            if len(reservadas) < lote:
+                break
+        
+        if maior_id:
+            # Informativo: o que foi agregado é marcado em cada linha
+            for marca in marcas.values():
+                marca.ultimo_id = max(marca.ultimo_id, maior_id)
+                marca.atualizado_em = datetime.utcnow()
+        
+        if commit:
+            db.commit()
+        else:
+            db.flush()
+        
+        if any(processados.values()):
+            logger.debug("Rollups de analytics atualizados", ultimo_id=maior_id, **processados)
+        
+        return processados
+    
+    @staticmethod
+    def aggregate(
+        db: Session,
+        dimensions: tuple = (),
+        metrics: Optional[tuple] = None,
+        dia_inicio: Optional[date] = None,
+        dia_fim: Optional[date] = None,
+        canal: Optional[str] = None,
+        nicho: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Mesma agregação de AnalyticsRepository.aggregate, lida dos rollups
+        
+        Agrupar por produto_id usa o rollup por produto, que não tem as
+        dimensões canal/nicho/campanha.
+        
+        Args:
+            db: Sessão do banco
+            dimensions: Dimensões (dia, canal, nicho, campanha ou dia, produto_id)
+            metrics: Métricas retornadas (padrão: todas as somas e taxas)
+            dia_inicio: Primeiro dia (inclusivo)
+            dia_fim: Último dia (inclusivo)
+            canal: Filtra por canal
+            nicho: Filtra por nicho
+            
+        Returns:
+            Uma linha (dict) por combinação de dimensões
+        """
+        if "produto_id" in dimensions:
+            if canal or nicho:
+                raise ValueError("O rollup por produto não filtra por canal/nicho")
+            modelo, dimensoes_validas = AnalyticsProdutoDiario, DIMENSOES_ROLLUP_PRODUTO
+        else:
+            modelo, dimensoes_validas = AnalyticsDiario, DIMENSOES_ROLLUP
+        
+        filtros = []
+        if dia_inicio:
+            filtros.append(modelo.dia >= dia_inicio)
+        if dia_fim:
+            filtros.append(modelo.dia <= dia_fim)
+        if canal:
+            filtros.append(AnalyticsDiario.canal == canal)
+        if nicho:
+            filtros.append(AnalyticsDiario.nicho == nicho)
+        
+        return _agregar(db, modelo, dimensoes_validas, dimensions, metrics, filtros)
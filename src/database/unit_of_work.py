@@ -0,0 +1,157 @@
+"""
+Unit of Work - acumula atualizações e aplica numa única transação
+
+Em vez de um SELECT + commit por item (atualizar_score, marcar_como_publicado,
+atualizar_metricas), o chamador enfileira as mudanças e o flush executa um
+UPDATE em lote por tipo de atualização.
+
+Exemplo:
+    with UnitOfWork(db) as uow:
+        for conteudo in publicados:
+            uow.marcar_conteudo_publicado(conteudo.id)
+            uow.marcar_produto_publicado(conteudo.produto_id)
+    # commit ao sair do bloco (rollback se houver exceção)
+"""
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from src.database.repository import ProdutoRepository, ConteudoRepository, LinkRepository
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class UnitOfWork:
+    """
+    Fila de atualizações aplicadas em lote na mesma transação
+    """
+    
+    def __init__(self, db: Session):
+        """
+        Args:
+            db: Sessão do banco (o commit é feito pela UnitOfWork)
+        """
+        self.db = db
+        self._scores: Dict[int, Dict] = {}
+        self._produtos_publicados: Set[int] = set()
+        self._conteudos_publicados: Set[int] = set()
+        self._metricas_links: List[Dict] = []
+    
+    def atualizar_score(self, produto_id: int, score: float, motivo: str, **colunas):
+        """
+        Enfileira o score de um produto (a última chamada por produto vale)
+        
+        Args:
+            produto_id: ID do produto
+            score: Novo score_ranking
+            motivo: motivo_ranking
+            **colunas: Outras colunas do score (ex: score_fingerprint)
+        """
+        self._scores[produto_id] = {
+            "id": produto_id,
+            "score_ranking": score,
+            "motivo_ranking": motivo,
+            **colunas,
+        }
+    
+    def marcar_produto_publicado(self, produto_id: int):
+        """Enfileira a marcação de produto como já publicado"""
+        self._produtos_publicados.add(produto_id)
+    
+    def marcar_conteudo_publicado(self, conteudo_id: int):
+        """Enfileira a marcação de conteúdo como publicado"""
+        self._conteudos_publicados.add(conteudo_id)
+    
+    def atualizar_metricas_link(
+        self,
+        link_id: int,
+        cliques: int = 0,
+        conversoes: int = 0,
+        receita: float = 0.0
+    ):
+        """Enfileira incrementos de métricas de um link (somados no flush)"""
+        self._metricas_links.append({
+            "link_id": link_id,
+            "cliques": cliques,
+            "conversoes": conversoes,
+            "receita": receita,
+        })
+    
+    @property
+    def pendentes(self) -> int:
+        """Quantidade de atualizações enfileiradas"""
+        return (
+            len(self._scores)
+            + len(self._produtos_publicados)
+            + len(self._conteudos_publicados)
+            + len(self._metricas_links)
+        )
+    
+    def flush(self) -> Dict[str, int]:
+        """
+        Executa os UPDATEs em lote na transação atual (sem commit)
+        
+        Scores com colunas diferentes (ex: com e sem score_fingerprint) vão
+        em lotes separados, já que cada executemany usa um só statement.
+        
+        Returns:
+            Dict com linhas atualizadas por tipo de atualização
+        """
+        resultado = {
+            "scores": 0,
+            "produtos_publicados": ProdutoRepository.marcar_como_publicado_many(
+                self.db, list(self._produtos_publicados), commit=False
+            ),
+            "conteudos_publicados": ConteudoRepository.marcar_como_publicado_many(
+                self.db, list(self._conteudos_publicados), commit=False
+            ),
+            "links": LinkRepository.atualizar_metricas_many(
+                self.db, self._metricas_links, commit=False
+            ),
+        }
+        
+        por_colunas: Dict[tuple, List[Dict]] = {}
+        for atualizacao in self._scores.values():
+            por_colunas.setdefault(tuple(sorted(atualizacao)), []).append(atualizacao)
+        for lote in por_colunas.values():
+            resultado["scores"] += ProdutoRepository.atualizar_scores_em_lote(self.db, lote, commit=False)
+        
+        self._limpar()
+        return resultado
+    
+    def commit(self) -> Dict[str, int]:
+        """
+        Aplica as atualizações pendentes e faz commit
+        
+        Returns:
+            Dict com linhas atualizadas por tipo de atualização
+        """
+        resultado = self.flush()
+        self.db.commit()
+        
+        if any(resultado.values()):
+            logger.info("Unit of work aplicada", **resultado)
+        
+        return resultado
+    
+    def rollback(self):
+        """Descarta as atualizações pendentes e desfaz a transação"""
+        self._limpar()
+        self.db.rollback()
+    
+    def _limpar(self):
+        self._scores.clear()
+        self._produtos_publicados.clear()
+        self._conteudos_publicados.clear()
+        self._metricas_links.clear()
+    
+    def __enter__(self) -> "UnitOfWork":
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> Optional[bool]:
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return None
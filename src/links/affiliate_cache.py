@@ -0,0 +1,154 @@
+"""
+Cache de links de afiliado por produto + SubIds
+
+Cada chamada a /link/generate da Shopee é assinada e conta no rate limit,
+mas o resultado para o mesmo produto e os mesmos cinco SubIds (o SubId5 é a
+data) é sempre o mesmo link. A tabela links guarda esses links com um
+índice único (produto_id, sub_id1..5); este cache lê através dela:
+
+1. LRU em memória (sem I/O)
+2. Em miss, uma consulta à tabela links para todas as chaves que faltam
+3. Só o que não está em nenhum dos dois vai para a API Shopee
+
+Links não mudam depois de criados, então não há TTL: chaves de dias
+anteriores simplesmente deixam de ser usadas e saem pela LRU.
+"""
+from collections import OrderedDict
+from typing import Dict, List, NamedTuple, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.constants import AFFILIATE_CACHE_MAX_ITENS
+from src.database.async_repository import AsyncLinkRepository
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LinkCacheado(NamedTuple):
+    """Campos do link guardados em memória (mesmos nomes do model Link)"""
+    
+    id: int
+    link_curto: str
+    link_completo: str
+
+
+class AffiliateLinkCache:
+    """
+    Read-through de (produto_id, sub_id1, ..., sub_id5) -> link
+    
+    - get/put são O(1) (OrderedDict)
+    - Ao passar de max_itens, o item usado há mais tempo sai
+    - hit_ratio conta acertos da memória e do banco: cada um é uma
+      chamada à API Shopee evitada
+    """
+    
+    def __init__(self, max_itens: int = AFFILIATE_CACHE_MAX_ITENS):
+        """
+        Args:
+            max_itens: Máximo de links em memória
+        """
+        self.max_itens = max_itens
+        self._itens: "OrderedDict[tuple, LinkCacheado]" = OrderedDict()
+        self._stats = {"hits_memoria": 0, "hits_banco": 0, "misses": 0, "consultas_banco": 0, "removidos": 0}
+    
+    def __len__(self) -> int:
+        return len(self._itens)
+    
+    def get(self, chave: tuple) -> Optional[LinkCacheado]:
+        """Busca uma chave só em memória (não conta nas estatísticas)"""
+        link = self._itens.get(chave)
+        if link is not None:
+            self._itens.move_to_end(chave)
+        return link
+    
+    def put(self, chave: tuple, link) -> LinkCacheado:
+        """
+        Guarda o link de uma chave
+        
+        Args:
+            chave: (produto_id, sub_id1, ..., sub_id5)
+            link: Link (ou qualquer objeto com id, link_curto e link_completo)
+            
+        Returns:
+            Link como guardado em memória
+        """
+        cacheado = LinkCacheado(link.id, link.link_curto, link.link_completo)
+        self._itens[chave] = cacheado
+        self._itens.move_to_end(chave)
+        
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self._stats["removidos"] += 1
+        
+        return cacheado
+    
+    def limpar(self):
+        """Esvazia o cache"""
+        self._itens.clear()
+    
+    async def buscar_muitos(self, db: AsyncSession, chaves: List[tuple]) -> Dict[tuple, LinkCacheado]:
+        """
+        Resolve as chaves pela memória e, para as que faltam, pela tabela links
+        
+        Args:
+            db: Sessão do banco
+            chaves: Tuplas (produto_id, sub_id1, ..., sub_id5)
+            
+        Returns:
+            Dict chave -> link só com as chaves encontradas (as demais
+            precisam ser geradas na Shopee)
+        """
+        encontrados = {}
+        faltando = []
+        for chave in dict.fromkeys(chaves):
+            link = self.get(chave)
+            if link is None:
+                faltando.append(chave)
+            else:
+                encontrados[chave] = link
+        self._stats["hits_memoria"] += len(encontrados)
+        
+        if faltando:
+            self._stats["consultas_banco"] += 1
+            do_banco = await AsyncLinkRepository.buscar_por_subids(db, faltando)
+            for chave, link in do_banco.items():
+                encontrados[chave] = self.put(chave, link)
+            self._stats["hits_banco"] += len(do_banco)
+            self._stats["misses"] += len(faltando) - len(do_banco)
+        
+        return encontrados
+    
+    async def buscar(self, db: AsyncSession, chave: tuple) -> Optional[LinkCacheado]:
+        """
+        Resolve uma chave (ver buscar_muitos)
+        
+        Returns:
+            Link ou None se ainda não foi gerado
+        """
+        return (await self.buscar_muitos(db, [chave])).get(chave)
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna métricas do cache
+        
+        Returns:
+            Dict com itens, acertos (memória/banco), misses e taxa de acerto
+        """
+        hits = self._stats["hits_memoria"] + self._stats["hits_banco"]
+        acessos = hits + self._stats["misses"]
+        return {
+            "itens": len(self._itens),
+            "max_itens": self.max_itens,
+            "hits_memoria": self._stats["hits_memoria"],
+            "hits_banco": self._stats["hits_banco"],
+            "misses": self._stats["misses"],
+            "hit_ratio": round(hits / acessos, 4) if acessos else 0.0,
+            "chamadas_api_evitadas": hits,
+            "consultas_banco": self._stats["consultas_banco"],
+            "removidos": self._stats["removidos"],
+        }
+
+
+# Instância global usada na geração de links (rota e lote)
+affiliate_link_cache = AffiliateLinkCache()
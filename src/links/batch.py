@@ -0,0 +1,207 @@
+"""
+Geração de links de afiliado em lote
+
+Recebe uma matriz produto × canal × formato × campanha (ex: top 10 de cada
+nicho × 4 canais × formatos do dia) e:
+
+- reaproveita links já gerados para a mesma tupla de SubIds (mesma data),
+  pelo cache de links de afiliado (memória e tabela links)
+- chama a API Shopee em paralelo só para o que falta (o rate limiter do
+  cliente continua valendo)
+- grava todos os links novos num único INSERT em lote
+"""
+import asyncio
+import itertools
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.constants import LINKS_CONCORRENCIA
+from src.database.async_repository import AsyncLinkRepository, AsyncProdutoRepository
+from src.links import affiliate_cache, redirect_cache
+from src.links.shortener import LinkShortener, separar_shopee_id
+from src.links.subid_builder import SubIdBuilder
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class LinkBatchGenerator:
+    """
+    Gera os links de uma matriz de pedidos com reaproveitamento e I/O em lote
+    """
+    
+    def __init__(
+        self,
+        shortener: Optional[LinkShortener] = None,
+        concorrencia: int = LINKS_CONCORRENCIA,
+        cache: Optional[affiliate_cache.AffiliateLinkCache] = None
+    ):
+        """
+        Args:
+            shortener: Gerador de links (padrão: LinkShortener com a API compartilhada)
+            concorrencia: Máximo de chamadas à API Shopee em voo
+            cache: Cache de links por produto + SubIds (padrão: affiliate_link_cache)
+        """
+        self._shortener = shortener
+        self.concorrencia = concorrencia
+        self._cache = cache
+    
+    @property
+    def shortener(self) -> LinkShortener:
+        if self._shortener is None:
+            self._shortener = LinkShortener()
+        return self._shortener
+    
+    @property
+    def cache(self) -> affiliate_cache.AffiliateLinkCache:
+        if self._cache is None:
+            return affiliate_cache.affiliate_link_cache
+        return self._cache
+    
+    @staticmethod
+    def expandir(
+        produto_ids: List[int],
+        canais: List[str],
+        formatos: List[str],
+        campanhas: List[str]
+    ) -> List[Dict]:
+        """
+        Expande a matriz em pedidos (produto, canal, formato, campanha)
+        
+        Returns:
+            Um dict por combinação
+        """
+        return [
+            {"produto_id": produto_id, "canal": canal, "formato": formato, "campanha": campanha}
+            for produto_id, canal, formato, campanha in itertools.product(
+                produto_ids, canais, formatos, campanhas
+            )
+        ]
+    
+    async def gerar(
+        self,
+        db: AsyncSession,
+        pedidos: List[Dict],
+        data: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Gera (ou reaproveita) um link por pedido
+        
+        Args:
+            db: Sessão do banco
+            pedidos: Dicts com produto_id, canal, formato e campanha
+            data: Data do SubId5 (padrão: hoje)
+            
+        Returns:
+            Dict com os links por pedido, contagens e falhas
+        """
+        inicio = time.perf_counter()
+        data = data or datetime.now()
+        
+        produtos = {
+            p.id: p for p in await AsyncProdutoRepository.buscar_por_ids(
+                db, [pedido["produto_id"] for pedido in pedidos]
+            )
+        }
+        
+        # Chave de reaproveitamento: produto + os 5 SubIds (inclui a data)
+        chaves = {}
+        falhas = []
+        for pedido in pedidos:
+            produto = produtos.get(pedido["produto_id"])
+            if produto is None:
+                falhas.append({**pedido, "motivo": "Produto não encontrado"})
+                continue
+            sub_ids = SubIdBuilder.build(
+                pedido["canal"], produto.nicho, pedido["formato"], pedido["campanha"], data
+            )
+            chaves.setdefault((produto.id, *sub_ids), pedido)
+        
+        existentes = await self.cache.buscar_muitos(db, list(chaves))
+        faltando = [chave for chave in chaves if chave not in existentes]
+        
+        gerados = await self._gerar_na_shopee(
+            [(chave, produtos[chave[0]], chaves[chave]) for chave in faltando], data, falhas
+        )
+        
+        salvos = await AsyncLinkRepository.criar_muitos(
+            db,
+            [{**link_data, "produto_id": chave[0]} for chave, link_data in gerados],
+            gerar_codigo=self.shortener.codigos.gerar
+        )
+        for (chave, _), (link, _) in zip(gerados, salvos):
+            existentes[chave] = self.cache.put(chave, link)
+            redirect_cache.short_link_cache.put(link.link_curto, link.id, link.link_completo)
+        
+        # Só conta como gerado o que foi inserido agora (outro worker pode ter
+        # gravado o mesmo produto + SubIds entre a consulta ao cache e o INSERT)
+        links = []
+        ids_novos = {link.id for link, criado in salvos if criado}
+        for chave, pedido in chaves.items():
+            link = existentes.get(chave)
+            if link is None:
+                continue
+            links.append({
+                **pedido,
+                "link_id": link.id,
+                "link_curto": link.link_curto,
+                "link_completo": link.link_completo,
+                "reutilizado": link.id not in ids_novos,
+            })
+        
+        resultado = {
+            "total": len(pedidos),
+            "gerados": len(ids_novos),
+            "reutilizados": len(links) - len(ids_novos),
+            "falhas": falhas,
+            "links": links,
+            "duracao_s": round(time.perf_counter() - inicio, 3),
+        }
+        
+        logger.info(
+            "Links gerados em lote",
+            total=resultado["total"],
+            gerados=resultado["gerados"],
+            reutilizados=resultado["reutilizados"],
+            falhas=len(falhas),
+            duracao_s=resultado["duracao_s"]
+        )
+        
+        return resultado
+    
+    async def _gerar_na_shopee(self, itens: List[tuple], data: datetime, falhas: List[Dict]) -> List[tuple]:
+        """
+        Chama /link/generate em paralelo para cada (chave, produto, pedido)
+        
+        Returns:
+            Pares (chave, link_data) dos links gerados com sucesso
+        """
+        semaforo = asyncio.Semaphore(self.concorrencia)
+        
+        async def gerar_um(chave, produto, pedido):
+            try:
+                shop_id, item_id = separar_shopee_id(produto.shopee_id)
+                async with semaforo:
+                    link_data = await self.shortener.generate_short_link(
+                        item_id=item_id,
+                        shop_id=shop_id,
+                        canal=pedido["canal"],
+                        nicho=produto.nicho,
+                        formato=pedido["formato"],
+                        campanha=pedido["campanha"],
+                        data=data
+                    )
+            except Exception as e:
+                falhas.append({**pedido, "motivo": str(e)})
+                return None
+            
+            if not link_data:
+                falhas.append({**pedido, "motivo": "Erro ao gerar link de afiliado"})
+                return None
+            return chave, link_data
+        
+        resultados = await asyncio.gather(*(gerar_um(*item) for item in itens))
+        return [r for r in resultados if r is not None]
@@ -0,0 +1,224 @@
+"""
+Ingestão de cliques e conversões de links
+
+Os eventos são somados em memória por link e gravados em lote a cada
+CLIQUES_FLUSH_INTERVALO_S (ou ao acumular CLIQUES_FLUSH_MAX_EVENTOS), com
+um único UPDATE atômico por link (total_cliques = total_cliques + :n). Um
+webhook de clique não lê nem grava o banco; workers diferentes podem
+gravar os mesmos links sem perder incrementos.
+
+Eventos ainda no buffer se perdem se o processo morrer sem passar pelo
+shutdown (no máximo um intervalo de flush).
+"""
+import asyncio
+import time
+from typing import Dict, Iterable, Optional
+
+from config.constants import CLIQUES_FLUSH_INTERVALO_S, CLIQUES_FLUSH_MAX_EVENTOS
+from src.database.async_repository import AsyncLinkRepository
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class ClickBuffer:
+    """
+    Acumula incrementos de métricas por link e grava em lote
+    
+    - registrar() é O(1) e não faz I/O
+    - Uma task em background grava o buffer a cada intervalo ou quando
+      ele atinge max_eventos
+    - Se a gravação falhar, os incrementos voltam para o buffer
+    """
+    
+    def __init__(
+        self,
+        intervalo_flush: float = CLIQUES_FLUSH_INTERVALO_S,
+        max_eventos: int = CLIQUES_FLUSH_MAX_EVENTOS,
+        session_factory=None
+    ):
+        """
+        Args:
+            intervalo_flush: Segundos entre gravações
+            max_eventos: Eventos acumulados que disparam uma gravação antecipada
+            session_factory: Factory de AsyncSession (padrão: AsyncSessionLocal)
+        """
+        self.intervalo_flush = intervalo_flush
+        self.max_eventos = max_eventos
+        self._session_factory = session_factory
+        
+        self._pendentes: Dict[int, Dict] = {}
+        self._eventos_pendentes = 0
+        self._cheio: Optional[asyncio.Event] = None
+        self._parando = False
+        self._task: Optional[asyncio.Task] = None
+        
+        self._stats = {
+            "eventos_recebidos": 0,
+            "eventos_gravados": 0,
+            "flushes": 0,
+            "erros": 0,
+            "flush_total_s": 0.0,
+            "flush_max_s": 0.0,
+        }
+    
+    def _get_session(self):
+        if self._session_factory is None:
+            from src.database.connection import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+    
+    @property
+    def rodando(self) -> bool:
+        return self._task is not None and not self._task.done()
+    
+    def _somar(self, link_id: int, cliques: int, conversoes: int, receita: float):
+        total = self._pendentes.get(link_id)
+        if total is None:
+            total = self._pendentes[link_id] = {
+                "link_id": link_id, "cliques": 0, "conversoes": 0, "receita": 0.0
+            }
+        total["cliques"] += cliques
+        total["conversoes"] += conversoes
+        total["receita"] += receita
+    
+    def registrar(
+        self,
+        link_id: int,
+        cliques: int = 0,
+        conversoes: int = 0,
+        receita: float = 0.0
+    ):
+        """
+        Soma um evento ao buffer
+        
+        Args:
+            link_id: ID do link
+            cliques: Cliques a somar
+            conversoes: Conversões a somar
+            receita: Receita a somar
+        """
+        self._somar(link_id, cliques, conversoes, receita)
+        
+        self._eventos_pendentes += 1
+        self._stats["eventos_recebidos"] += 1
+        
+        if self._cheio is not None and self._eventos_pendentes >= self.max_eventos:
+            self._cheio.set()
+    
+    def registrar_muitos(self, eventos: Iterable[Dict]) -> int:
+        """
+        Soma vários eventos ao buffer
+        
+        Args:
+            eventos: Dicts com "link_id" e opcionalmente "cliques",
+                "conversoes" e "receita"
+                
+        Returns:
+            Quantidade de eventos aceitos
+        """
+        aceitos = 0
+        for evento in eventos:
+            self.registrar(
+                evento["link_id"],
+                cliques=evento.get("cliques", 0),
+                conversoes=evento.get("conversoes", 0),
+                receita=evento.get("receita", 0.0)
+            )
+            aceitos += 1
+        return aceitos
+    
+    async def flush(self) -> int:
+        """
+        Grava os incrementos acumulados com um UPDATE em lote
+        
+        Returns:
+            Quantidade de links atualizados
+        """
+        if not self._pendentes:
+            return 0
+        
+        # Troca o buffer antes do I/O: eventos que chegam durante a gravação
+        # entram no próximo lote
+        lote, eventos = self._pendentes, self._eventos_pendentes
+        self._pendentes, self._eventos_pendentes = {}, 0
+        
+        inicio = time.perf_counter()
+        try:
+            async with self._get_session() as db:
+                links = await AsyncLinkRepository.atualizar_metricas_many(db, list(lote.values()))
+        except Exception as e:
+            self._stats["erros"] += 1
+            logger.error(f"Erro ao gravar cliques, mantendo no buffer: {e}", links=len(lote))
+            for total in lote.values():
+                self._somar(total["link_id"], total["cliques"], total["conversoes"], total["receita"])
+            self._eventos_pendentes += eventos
+            return 0
+        
+        duracao = time.perf_counter() - inicio
+        self._stats["flushes"] += 1
+        self._stats["eventos_gravados"] += eventos
+        self._stats["flush_total_s"] += duracao
+        self._stats["flush_max_s"] = max(self._stats["flush_max_s"], duracao)
+        
+        logger.debug("Cliques gravados", links=links, eventos=eventos)
+        return links
+    
+    async def _loop(self):
+        # Sem cancelamento: um flush em andamento sempre termina
+        while not self._parando:
+            try:
+                await asyncio.wait_for(self._cheio.wait(), timeout=self.intervalo_flush)
+            except asyncio.TimeoutError:
+                pass
+            self._cheio.clear()
+            await self.flush()
+    
+    async def start(self):
+        """Inicia a gravação periódica no event loop atual"""
+        if self.rodando:
+            return
+        
+        self._parando = False
+        self._cheio = asyncio.Event()
+        self._task = asyncio.create_task(self._loop())
+        logger.info(
+            "Buffer de cliques iniciado",
+            intervalo_flush=self.intervalo_flush,
+            max_eventos=self.max_eventos
+        )
+    
+    async def stop(self):
+        """Para a gravação periódica e grava o que restou no buffer"""
+        if self._task is not None:
+            self._parando = True
+            self._cheio.set()
+            await self._task
+            self._task = None
+        self._cheio = None
+        
+        await self.flush()
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna métricas do buffer
+        
+        Returns:
+            Dict com eventos recebidos/gravados, pendentes e tempos de flush
+        """
+        flushes = self._stats["flushes"]
+        return {
+            "rodando": self.rodando,
+            "eventos_recebidos": self._stats["eventos_recebidos"],
+            "eventos_gravados": self._stats["eventos_gravados"],
+            "eventos_pendentes": self._eventos_pendentes,
+            "links_pendentes": len(self._pendentes),
+            "flushes": flushes,
+            "erros": self._stats["erros"],
+            "flush_medio_ms": round(self._stats["flush_total_s"] / flushes * 1000, 3) if flushes else 0.0,
+            "flush_max_ms": round(self._stats["flush_max_s"] * 1000, 3),
+        }
+
+
+# Instância global usada pela API
+click_buffer = ClickBuffer()
@@ -0,0 +1,177 @@
+"""
+Cache de redirecionamento dos short links (short code -> link_completo)
+
+LRU com TTL em memória, aquecido no startup com os links clicados mais
+recentemente. Um redirecionamento com cache quente não toca o banco; um
+miss faz uma consulta de duas colunas e guarda o resultado (inclusive
+"não existe", por REDIRECT_CACHE_TTL_NEGATIVO_S, para short codes
+inválidos não virarem uma consulta por requisição).
+"""
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+from config.constants import (
+    REDIRECT_CACHE_MAX_ITENS,
+    REDIRECT_CACHE_TTL_S,
+    REDIRECT_CACHE_TTL_NEGATIVO_S,
+)
+from src.database.async_repository import AsyncLinkRepository
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Marca de short code inexistente guardada no cache
+_AUSENTE = (None, None)
+
+
+class ShortLinkCache:
+    """
+    LRU com TTL de short code -> (link_id, link_completo)
+    
+    - get/put são O(1) (OrderedDict)
+    - Ao passar de max_itens, o item usado há mais tempo sai
+    - Itens expirados são relidos do banco no próximo acesso
+    """
+    
+    def __init__(
+        self,
+        max_itens: int = REDIRECT_CACHE_MAX_ITENS,
+        ttl: float = REDIRECT_CACHE_TTL_S,
+        ttl_negativo: float = REDIRECT_CACHE_TTL_NEGATIVO_S,
+        session_factory=None
+    ):
+        """
+        Args:
+            max_itens: Máximo de short codes em memória
+            ttl: Segundos até reler um destino do banco
+            ttl_negativo: Segundos que um short code inexistente fica em cache
+            session_factory: Factory de AsyncSession (padrão: AsyncSessionLocal)
+        """
+        self.max_itens = max_itens
+        self.ttl = ttl
+        self.ttl_negativo = ttl_negativo
+        self._session_factory = session_factory
+        
+        self._itens: "OrderedDict[str, Tuple[Optional[int], Optional[str], float]]" = OrderedDict()
+        self._stats = {"hits": 0, "misses": 0, "expirados": 0, "removidos": 0, "consultas_banco": 0}
+    
+    def _get_session(self):
+        if self._session_factory is None:
+            from src.database.connection import AsyncSessionLocal
+            self._session_factory = AsyncSessionLocal
+        return self._session_factory()
+    
+    def __len__(self) -> int:
+        return len(self._itens)
+    
+    def get(self, link_curto: str) -> Optional[Tuple[Optional[int], Optional[str]]]:
+        """
+        Busca um short code em memória
+        
+        Returns:
+            (link_id, link_completo), (None, None) para short code inexistente
+            em cache negativo, ou None se não está em cache (ou expirou)
+        """
+        item = self._itens.get(link_curto)
+        if item is None:
+            self._stats["misses"] += 1
+            return None
+        
+        link_id, link_completo, expira_em = item
+        if expira_em <= time.monotonic():
+            del self._itens[link_curto]
+            self._stats["expirados"] += 1
+            self._stats["misses"] += 1
+            return None
+        
+        self._itens.move_to_end(link_curto)
+        self._stats["hits"] += 1
+        return link_id, link_completo
+    
+    def put(self, link_curto: str, link_id: Optional[int], link_completo: Optional[str]):
+        """
+        Guarda o destino de um short code (link_id None = inexistente)
+        """
+        ttl = self.ttl if link_id is not None else self.ttl_negativo
+        self._itens[link_curto] = (link_id, link_completo, time.monotonic() + ttl)
+        self._itens.move_to_end(link_curto)
+        
+        while len(self._itens) > self.max_itens:
+            self._itens.popitem(last=False)
+            self._stats["removidos"] += 1
+    
+    def invalidar(self, link_curto: str):
+        """Remove um short code do cache"""
+        self._itens.pop(link_curto, None)
+    
+    def limpar(self):
+        """Esvazia o cache"""
+        self._itens.clear()
+    
+    async def resolver(self, link_curto: str) -> Optional[Tuple[int, str]]:
+        """
+        Resolve um short code pelo cache, consultando o banco só em miss
+        
+        Args:
+            link_curto: Short code
+            
+        Returns:
+            (link_id, link_completo) ou None se o short code não existe
+        """
+        destino = self.get(link_curto)
+        
+        if destino is None:
+            self._stats["consultas_banco"] += 1
+            async with self._get_session() as db:
+                destino = await AsyncLinkRepository.buscar_destino(db, link_curto) or _AUSENTE
+            self.put(link_curto, *destino)
+        
+        return None if destino == _AUSENTE else destino
+    
+    async def aquecer(self, limite: Optional[int] = None) -> int:
+        """
+        Carrega os links clicados mais recentemente
+        
+        Args:
+            limite: Máximo de links (padrão: max_itens)
+            
+        Returns:
+            Quantidade de short codes carregados
+        """
+        try:
+            async with self._get_session() as db:
+                destinos = await AsyncLinkRepository.listar_destinos(db, limite or self.max_itens)
+        except Exception as e:
+            logger.error(f"Erro ao aquecer cache de redirecionamento: {e}")
+            return 0
+        
+        # Os mais clicados entram por último (ficam no fim da LRU)
+        for link_curto, link_id, link_completo in reversed(destinos):
+            self.put(link_curto, link_id, link_completo)
+        
+        logger.info("Cache de redirecionamento aquecido", links=len(destinos))
+        return len(destinos)
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna métricas do cache
+        
+        Returns:
+            Dict com itens, hits, misses, taxa de acerto e consultas ao banco
+        """
+        acessos = self._stats["hits"] + self._stats["misses"]
+        return {
+            "itens": len(self._itens),
+            "max_itens": self.max_itens,
+            "hits": self._stats["hits"],
+            "misses": self._stats["misses"],
+            "hit_ratio": round(self._stats["hits"] / acessos, 4) if acessos else 0.0,
+            "expirados": self._stats["expirados"],
+            "removidos": self._stats["removidos"],
+            "consultas_banco": self._stats["consultas_banco"],
+        }
+
+
+# Instância global usada pela rota de redirecionamento
+short_link_cache = ShortLinkCache()
@@ -0,0 +1,187 @@
+"""
+Alocação de short codes dos links (base62)
+
+Cada short code vem de um ID inteiro único: os IDs são reservados em
+blocos na tabela "sequencias" (um UPDATE por bloco, atômico entre
+workers) e entregues em memória. O ID passa por uma bijeção em 2^47
+(multiplicação por um ímpar + xorshift), então IDs consecutivos não geram
+códigos consecutivos, e é codificado em SHORT_CODE_TAMANHO caracteres
+base62. Como a bijeção não repete valores, um código nunca precisa ser
+conferido no banco antes do INSERT.
+"""
+import asyncio
+import string
+import threading
+from typing import Dict, Optional
+
+from config.constants import SHORT_CODE_BLOCO, SHORT_CODE_TAMANHO
+from src.database.repository import SequenciaRepository
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+ALFABETO_BASE62 = string.digits + string.ascii_letters
+
+# IDs distintos cabem em 8 caracteres base62 (62^8 ≈ 2^47.6)
+BITS_ESPACO = 47
+ESPACO = 1 << BITS_ESPACO
+MULTIPLICADOR = 0x5DEECE66D  # ímpar: multiplicação é bijeção módulo 2^47
+DESLOCAMENTO = 0x1F3A5C7E9B2D
+DESLOCAMENTO_XOR = 24
+
+
+def codificar_base62(numero: int, tamanho: int = SHORT_CODE_TAMANHO) -> str:
+    """
+    Codifica um inteiro não negativo em base62 com zeros à esquerda
+    
+    Args:
+        numero: Inteiro a codificar
+        tamanho: Quantidade mínima de caracteres
+        
+    Returns:
+        Texto base62
+    """
+    if numero < 0:
+        raise ValueError("Número negativo não tem codificação base62")
+    
+    digitos = []
+    while numero:
+        numero, resto = divmod(numero, 62)
+        digitos.append(ALFABETO_BASE62[resto])
+    
+    return "".join(reversed(digitos)).rjust(tamanho, ALFABETO_BASE62[0])
+
+
+def embaralhar(numero: int) -> int:
+    """
+    Bijeção em [0, 2^47): IDs distintos geram valores distintos
+    
+    Args:
+        numero: ID sequencial
+        
+    Returns:
+        Valor embaralhado no mesmo intervalo
+    """
+    if not 0 <= numero < ESPACO:
+        raise ValueError(f"ID fora do espaço de short codes: {numero}")
+    
+    valor = (numero * MULTIPLICADOR + DESLOCAMENTO) % ESPACO
+    return valor ^ (valor >> DESLOCAMENTO_XOR)
+
+
+def codigo_para_id(numero: int) -> str:
+    """Short code de um ID da sequência"""
+    return codificar_base62(embaralhar(numero))
+
+
+class ShortCodeAllocator:
+    """
+    Gera short codes únicos a partir de blocos de IDs reservados no banco
+    
+    - O banco é acessado uma vez por bloco, não por código
+    - Workers diferentes reservam blocos disjuntos
+    - IDs de um bloco não usado até o fim (ex: restart) são descartados
+    """
+    
+    def __init__(
+        self,
+        bloco: int = SHORT_CODE_BLOCO,
+        sequencia: str = "links",
+        session_factory=None
+    ):
+        """
+        Args:
+            bloco: IDs reservados por ida ao banco (1 = sem pré-alocação)
+            sequencia: Nome da sequência na tabela "sequencias"
+            session_factory: Factory de sessões síncronas (padrão: SessionLocal)
+        """
+        self.bloco = bloco
+        self.sequencia = sequencia
+        self._session_factory = session_factory
+        
+        self._lock = threading.Lock()
+        self._proximo = 0
+        self._fim = 0
+        self._stats = {"blocos_reservados": 0, "codigos_gerados": 0}
+    
+    def _get_session(self):
+        if self._session_factory is None:
+            from src.database.connection import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+    
+    def _reservar_bloco(self):
+        with self._get_session() as db:
+            inicio = SequenciaRepository.reservar(db, self.sequencia, self.bloco)
+        
+        self._proximo, self._fim = inicio, inicio + self.bloco
+        self._stats["blocos_reservados"] += 1
+        logger.debug("Bloco de short codes reservado", sequencia=self.sequencia, inicio=inicio)
+    
+    def _tomar_local(self) -> Optional[int]:
+        """Próximo ID do bloco em memória, ou None se o bloco acabou"""
+        with self._lock:
+            if self._proximo >= self._fim:
+                return None
+            numero = self._proximo
+            self._proximo += 1
+            self._stats["codigos_gerados"] += 1
+            return numero
+    
+    def proximo_id(self) -> int:
+        """
+        Próximo ID único (reserva um bloco novo quando o atual acaba)
+        
+        Returns:
+            ID da sequência
+        """
+        with self._lock:
+            if self._proximo >= self._fim:
+                self._reservar_bloco()
+            numero = self._proximo
+            self._proximo += 1
+            self._stats["codigos_gerados"] += 1
+            return numero
+    
+    def gerar(self) -> str:
+        """
+        Gera um short code único
+        
+        Returns:
+            Short code base62
+        """
+        return codigo_para_id(self.proximo_id())
+    
+    async def gerar_async(self) -> str:
+        """
+        Gera um short code sem bloquear o event loop
+        
+        Com o bloco em memória não há I/O; a reserva de um bloco novo roda
+        numa thread.
+        
+        Returns:
+            Short code base62
+        """
+        numero = self._tomar_local()
+        if numero is None:
+            return await asyncio.to_thread(self.gerar)
+        return codigo_para_id(numero)
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna métricas do alocador
+        
+        Returns:
+            Dict com blocos reservados, códigos gerados e disponíveis no bloco
+        """
+        return {
+            "sequencia": self.sequencia,
+            "bloco": self.bloco,
+            "blocos_reservados": self._stats["blocos_reservados"],
+            "codigos_gerados": self._stats["codigos_gerados"],
+            "disponiveis": max(self._fim - self._proximo, 0),
+        }
+
+
+# Instância global usada pelo LinkShortener
+short_code_allocator = ShortCodeAllocator()
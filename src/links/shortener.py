@@ -1,22 +1,47 @@
 """
 Gerador de short links de afiliado
 """
-import hashlib
-from typing import Optional
-from src.collectors.shopee_api import ShopeeAffiliateAPI
+from datetime import datetime
+from typing import Optional, Tuple
+from src.collectors.shopee_api import ShopeeAffiliateAPI, get_shopee_api
+from src.links.short_code import ShortCodeAllocator, short_code_allocator
 from src.links.subid_builder import SubIdBuilder
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
 
+def separar_shopee_id(shopee_id: str) -> Tuple[str, str]:
+    """
+    Separa o shopee_id (formato: shop_id_item_id) em (shop_id, item_id)
+    
+    Raises:
+        ValueError: shopee_id sem shop_id e item_id
+    """
+    parts = shopee_id.split("_")
+    if len(parts) < 2:
+        raise ValueError("shopee_id inválido")
+    
+    return parts[0], "_".join(parts[1:])
+
+
 class LinkShortener:
     """
     Gera e gerencia links curtos de afiliado
     """
     
-    def __init__(self):
-        self.api = ShopeeAffiliateAPI()
+    def __init__(
+        self,
+        api: Optional[ShopeeAffiliateAPI] = None,
+        codigos: Optional[ShortCodeAllocator] = None
+    ):
+        """
+        Args:
+            api: Cliente Shopee (padrão: instância compartilhada)
+            codigos: Alocador de short codes (padrão: instância compartilhada)
+        """
+        self.api = api or get_shopee_api()
+        self.codigos = codigos or short_code_allocator
         self.subid_builder = SubIdBuilder()
     
     async def generate_short_link(
@@ -26,11 +51,16 @@ class LinkShortener:
         canal: str,
         nicho: str,
         formato: str,
-        campanha: str
+        campanha: str,
+        data: Optional[datetime] = None
     ) -> Optional[dict]:
         """
         Gera um link curto de afiliado com tracking
         
+        Sempre chama a API Shopee: para reaproveitar o link já gerado para o
+        mesmo produto e SubIds, passe pelo affiliate_link_cache (a rota
+        /api/links/generate e LinkBatchGenerator já fazem isso).
+        
         Args:
             item_id: ID do item na Shopee
             shop_id: ID da loja
@@ -38,12 +68,13 @@ class LinkShortener:
             nicho: Nicho do produto
             formato: Formato do conteúdo
             campanha: Tipo de campanha
+            data: Data do SubId5 (padrão: hoje)
             
         Returns:
             Dict com link_completo, link_curto e sub_ids
         """
         # Constrói SubIds
-        sub_ids = self.subid_builder.build(canal, nicho, formato, campanha)
+        sub_ids = self.subid_builder.build(canal, nicho, formato, campanha, data)
         
         # Gera link via API Shopee
         link_completo = await self.api.generate_affiliate_link(
@@ -56,12 +87,12 @@ class LinkShortener:
             logger.error("Falha ao gerar link", item_id=item_id)
             return None
         
-        # Gera hash curto para identificação
-        link_hash = self._generate_short_hash(link_completo)
+        # Short code único do bloco reservado (sem consulta ao banco por link)
+        link_curto = await self.codigos.gerar_async()
         
         result = {
             "link_completo": link_completo,
-            "link_curto": link_hash,
+            "link_curto": link_curto,
             "sub_id1": sub_ids[0],
             "sub_id2": sub_ids[1],
             "sub_id3": sub_ids[2],
@@ -72,26 +103,12 @@ class LinkShortener:
         logger.info(
             "Link gerado com sucesso",
             item_id=item_id,
-            link_curto=link_hash,
+            link_curto=link_curto,
             canal=canal
         )
         
         return result
     
-    def _generate_short_hash(self, url: str, length: int = 8) -> str:
-        """
-        Gera hash curto para URL
-        
-        Args:
-            url: URL completa
-            length: Tamanho do hash
-            
-        Returns:
-            Hash curto
-        """
-        hash_object = hashlib.md5(url.encode())
-        return hash_object.hexdigest()[:length]
-    
     def build_tracking_url(self, base_url: str, sub_ids: list) -> str:
         """
         Constrói URL com parâmetros de tracking
@@ -0,0 +1,347 @@
+"""
+Jobs de geração de copies em lote
+
+Para o pipeline diário (dezenas de produtos × canais × variações):
+
+1. criar_job: o ContentGenerator monta os prompts de cada produto/canal/
+   variação e eles viram itens de um job (tabelas llm_jobs e llm_job_itens)
+2. executar: os itens pendentes vão ao provedor em lotes de
+   LLM_BATCH_TAMANHO_LOTE
+   - provedor com batch API (usa_lotes): o lote é enviado, o ID do lote é
+     gravado nos itens e o resultado é buscado depois
+   - sem batch API: pool de workers pelo LLMRouter (semáforo por provedor
+     e cache de respostas)
+3. Cada lote de respostas vira ConteudoGerado numa única transação, junto
+   com o estado dos itens
+
+Como o estado fica no banco, um job interrompido continua de onde parou:
+itens concluídos não são refeitos e lotes já enviados são só consultados.
+"""
+import asyncio
+import itertools
+from typing import Dict, List, Optional
+
+from config.constants import (
+    LLM_BATCH_TAMANHO_LOTE,
+    LLM_BATCH_INTERVALO_POLL_S,
+    LLM_BATCH_MAX_TENTATIVAS,
+)
+from src.content.generator import ContentGenerator
+from src.database.repository import LLMJobRepository
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class BatchProvider:
+    """
+    Provedor de um job em lote
+    
+    Pedidos são dicts item_id -> prompt. Provedores com batch API definem
+    usa_lotes = True e implementam enviar/buscar; os demais implementam gerar.
+    """
+    
+    nome = "base"
+    usa_lotes = False
+    
+    async def gerar(self, pedidos: Dict[int, str]) -> Dict[int, Optional[str]]:
+        """
+        Gera as respostas na hora
+        
+        Returns:
+            item_id -> copy (None se falhou)
+        """
+        raise NotImplementedError
+    
+    async def enviar(self, pedidos: Dict[int, str]) -> str:
+        """
+        Envia um lote à batch API
+        
+        Returns:
+            ID do lote no provedor
+        """
+        raise NotImplementedError
+    
+    async def buscar(self, lote_id: str) -> Optional[Dict[int, Optional[str]]]:
+        """
+        Consulta um lote enviado
+        
+        Returns:
+            None enquanto o lote processa, depois item_id -> copy (None ou
+            ausente se o item falhou)
+        """
+        raise NotImplementedError
+
+
+class PoolProvider(BatchProvider):
+    """Sem batch API: chamadas em paralelo pelo LLMRouter (copywriting com GPT)"""
+    
+    nome = "gpt"
+    
+    def __init__(self, router=None):
+        """
+        Args:
+            router: LLMRouter (padrão: llm_router)
+        """
+        self._router = router
+    
+    @property
+    def router(self):
+        if self._router is None:
+            from src.llm.router import llm_router
+            self._router = llm_router
+        return self._router
+    
+    async def gerar(self, pedidos: Dict[int, str]) -> Dict[int, Optional[str]]:
+        from src.llm.router import LLMTask
+        
+        resultados = await self.router.execute_many(
+            LLMTask.COPYWRITING, [{"prompt": prompt} for prompt in pedidos.values()]
+        )
+        return {
+            item_id: resultado.get("copy") if resultado else None
+            for item_id, resultado in zip(pedidos, resultados)
+        }
+
+
+class FakeBatchProvider(BatchProvider):
+    """
+    Batch API local, para testes e execução offline
+    
+    O lote fica "processando" por `consultas_ate_concluir` chamadas a buscar
+    e os lotes sobrevivem à troca do runner (como num provedor real).
+    """
+    
+    nome = "fake"
+    usa_lotes = True
+    
+    def __init__(self, consultas_ate_concluir: int = 1, falhar_em: Optional[set] = None):
+        """
+        Args:
+            consultas_ate_concluir: Consultas que devolvem "processando" antes do resultado
+            falhar_em: Prompts que o provedor não responde
+        """
+        self.consultas_ate_concluir = consultas_ate_concluir
+        self.falhar_em = set(falhar_em or ())
+        self.lotes: Dict[str, Dict] = {}
+        self.pedidos_enviados = 0
+        self._ids = itertools.count(1)
+    
+    async def enviar(self, pedidos: Dict[int, str]) -> str:
+        lote_id = f"fake-lote-{next(self._ids)}"
+        self.lotes[lote_id] = {"pedidos": dict(pedidos), "consultas": 0}
+        self.pedidos_enviados += len(pedidos)
+        return lote_id
+    
+    async def buscar(self, lote_id: str) -> Optional[Dict[int, Optional[str]]]:
+        lote = self.lotes[lote_id]
+        lote["consultas"] += 1
+        if lote["consultas"] < self.consultas_ate_concluir:
+            return None
+        return {
+            item_id: None if prompt in self.falhar_em else f"Copy gerada: {prompt[:60]}"
+            for item_id, prompt in lote["pedidos"].items()
+        }
+
+
+class LLMBatchRunner:
+    """
+    Cria e executa jobs de geração de copies em lote
+    """
+    
+    def __init__(
+        self,
+        provider: Optional[BatchProvider] = None,
+        session_factory=None,
+        tamanho_lote: int = LLM_BATCH_TAMANHO_LOTE,
+        intervalo_poll_s: float = LLM_BATCH_INTERVALO_POLL_S,
+        max_tentativas: int = LLM_BATCH_MAX_TENTATIVAS
+    ):
+        """
+        Args:
+            provider: Provedor (padrão: PoolProvider pelo LLMRouter)
+            session_factory: Factory de sessões (padrão: SessionLocal)
+            tamanho_lote: Itens por envio e por transação de resultados
+            intervalo_poll_s: Espera entre consultas a um lote da batch API
+            max_tentativas: Tentativas por item antes de marcá-lo como falhou
+        """
+        self.provider = provider or PoolProvider()
+        self._session_factory = session_factory
+        self.tamanho_lote = tamanho_lote
+        self.intervalo_poll_s = intervalo_poll_s
+        self.max_tentativas = max_tentativas
+    
+    def _get_session(self):
+        if self._session_factory is None:
+            from src.database.connection import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+    
+    def _no_banco(self, metodo, *args):
+        """Roda um método do LLMJobRepository numa sessão própria"""
+        with self._get_session() as db:
+            return metodo(db, *args)
+    
+    async def _banco(self, metodo, *args):
+        return await asyncio.to_thread(self._no_banco, metodo, *args)
+    
+    @staticmethod
+    def montar_itens(produtos: List[Dict], canais: List[str], num_variacoes: int = 5) -> List[Dict]:
+        """
+        Monta os itens (prompts) de cada produto × canal × variação
+        
+        Só entram conteúdos com prompt de LLM (TikTok, Reels); os demais
+        canais usam a copy do template e não precisam de job.
+        
+        Args:
+            produtos: Dicts de produto (com id, nome, preços, nicho...)
+            canais: Canais de publicação
+            num_variacoes: Variações por produto e canal
+            
+        Returns:
+            Campos de cada item do job
+        """
+        generator = ContentGenerator()
+        itens = []
+        for produto in produtos:
+            for canal in canais:
+                for conteudo in generator.generate_variacoes(canal, produto, num_variacoes):
+                    if not conteudo.get("prompt_llm"):
+                        continue
+                    itens.append({
+                        "produto_id": produto["id"],
+                        "canal": conteudo["canal"],
+                        "formato": conteudo.get("formato"),
+                        "persona": conteudo.get("persona"),
+                        "template": conteudo.get("template"),
+                        "variacao_numero": conteudo.get("variacao_numero", 1),
+                        "prompt": conteudo["prompt_llm"],
+                    })
+        return itens
+    
+    async def criar_job(
+        self,
+        produtos: List[Dict],
+        canais: List[str],
+        num_variacoes: int = 5,
+        nome: Optional[str] = None
+    ) -> int:
+        """
+        Cria um job com os prompts de produtos × canais × variações
+        
+        Args:
+            produtos: Dicts de produto
+            canais: Canais de publicação
+            num_variacoes: Variações por produto e canal
+            nome: Nome do job (ex: "diario-20260131")
+            
+        Returns:
+            ID do job
+        """
+        itens = self.montar_itens(produtos, canais, num_variacoes)
+        job = await self._banco(
+            LLMJobRepository.criar, {"nome": nome, "provider": self.provider.nome}, itens
+        )
+        return job.id
+    
+    async def executar(self, job_id: int) -> Optional[Dict]:
+        """
+        Executa (ou retoma) um job até não sobrar item pendente
+        
+        Args:
+            job_id: ID do job
+            
+        Returns:
+            Progresso final (ver progresso) ou None se o job não existe
+        """
+        job = await self._banco(LLMJobRepository.buscar_por_id, job_id)
+        if job is None:
+            logger.error(f"Job de LLM não encontrado: {job_id}")
+            return None
+        if job.status == "concluido":
+            return await self.progresso(job_id)
+        
+        await self._banco(LLMJobRepository.iniciar, job_id)
+        logger.info("Executando job de LLM", job_id=job_id, provider=self.provider.nome, total=job.total)
+        
+        # Lotes enviados antes de uma interrupção: só falta buscar o resultado
+        if self.provider.usa_lotes:
+            enviados = await self._banco(LLMJobRepository.listar_itens, job_id, "enviado")
+            lotes: Dict[str, Dict[int, str]] = {}
+            for item in enviados:
+                lotes.setdefault(item.lote_externo, {})[item.id] = item.prompt
+            for lote_id, pedidos in lotes.items():
+                await self._coletar_lote(job_id, lote_id, pedidos)
+        
+        while True:
+            pendentes = await self._banco(
+                LLMJobRepository.listar_itens, job_id, "pendente", self.tamanho_lote
+            )
+            if not pendentes:
+                break
+            
+            pedidos = {item.id: item.prompt for item in pendentes}
+            if self.provider.usa_lotes:
+                lote_id = await self.provider.enviar(pedidos)
+                await self._banco(LLMJobRepository.marcar_enviados, list(pedidos), lote_id)
+                await self._coletar_lote(job_id, lote_id, pedidos)
+            else:
+                try:
+                    respostas = await self.provider.gerar(pedidos)
+                except Exception as e:
+                    logger.error(f"Erro no lote do job {job_id}: {e}")
+                    respostas = {}
+                await self._registrar(job_id, pedidos, respostas)
+        
+        await self._banco(LLMJobRepository.finalizar, job_id)
+        progresso = await self.progresso(job_id)
+        logger.info("Job de LLM concluído", **progresso)
+        return progresso
+    
+    async def _coletar_lote(self, job_id: int, lote_id: str, pedidos: Dict[int, str]):
+        """Consulta o lote até ficar pronto e grava o resultado"""
+        while True:
+            try:
+                respostas = await self.provider.buscar(lote_id)
+            except Exception as e:
+                logger.error(f"Erro ao consultar lote {lote_id}: {e}")
+                respostas = {}
+            if respostas is not None:
+                break
+            await asyncio.sleep(self.intervalo_poll_s)
+        
+        await self._registrar(job_id, pedidos, respostas)
+    
+    async def _registrar(self, job_id: int, pedidos: Dict[int, str], respostas: Dict[int, Optional[str]]):
+        """Grava as respostas de um lote e reporta o progresso"""
+        textos = {item_id: respostas[item_id] for item_id in pedidos if respostas.get(item_id)}
+        erros = {item_id: "Sem resposta do provedor" for item_id in pedidos if item_id not in textos}
+        
+        await self._banco(
+            LLMJobRepository.registrar_resultados, job_id, textos, erros, self.max_tentativas
+        )
+        
+        progresso = await self.progresso(job_id)
+        logger.info("Progresso do job de LLM", **progresso)
+    
+    async def progresso(self, job_id: int) -> Optional[Dict]:
+        """
+        Progresso do job (itens por estado e percentual)
+        
+        Returns:
+            Dict do LLMJobRepository.progresso ou None se o job não existe
+        """
+        return await self._banco(LLMJobRepository.progresso, job_id)
+    
+    async def retomar(self) -> List[Dict]:
+        """
+        Executa todos os jobs não concluídos (ex: depois de uma queda)
+        
+        Returns:
+            Progresso final de cada job
+        """
+        jobs = await self._banco(LLMJobRepository.listar_incompletos)
+        resultados = []
+        for job in jobs:
+            resultados.append(await self.executar(job.id))
+        return resultados
@@ -0,0 +1,319 @@
+"""
+Custo e orçamento dos LLMs
+
+Cada chamada real a um provedor registra tokens de entrada e saída (os
+informados pela API ou, na falta deles, uma estimativa local: tiktoken se
+instalado, senão LLM_CHARS_POR_TOKEN) e o custo pela tabela
+LLM_PRECOS_POR_MIL_TOKENS. Respostas do cache não custam nada.
+
+O gasto do dia (UTC) é somado por tarefa, nicho, canal e modelo. A tarefa,
+o nicho e o canal vêm do contexto aberto pelo LLMRouter (contexto_uso).
+
+Antes de cada tarefa o router pede uma decisão (decidir):
+- abaixo de LLM_ORCAMENTO_LIMIAR_ECONOMIA do orçamento: modelo normal
+- a partir dele: modelo econômico (LLM_MODELO_ECONOMICO), se houver
+- orçamento esgotado: só respostas do cache, sem chamar a API
+
+Valem o orçamento diário (LLM_DAILY_BUDGET_USD) e, para as tarefas em
+LLM_ORCAMENTO_POR_TAREFA_USD, o da tarefa; o mais apertado decide.
+Orçamento 0 significa sem limite.
+"""
+import math
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, NamedTuple, Optional
+
+from config.constants import (
+    LLM_PRECOS_POR_MIL_TOKENS,
+    LLM_MODELO_ECONOMICO,
+    LLM_ORCAMENTO_POR_TAREFA_USD,
+    LLM_ORCAMENTO_LIMIAR_ECONOMIA,
+    LLM_CHARS_POR_TOKEN,
+)
+from config.credentials import credentials
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Tarefa/nicho/canal da execução em andamento e o uso somado nela
+_contexto: ContextVar[Optional[Dict]] = ContextVar("llm_budget_contexto", default=None)
+
+NORMAL = "normal"
+ECONOMICO = "modelo_economico"
+SOMENTE_CACHE = "somente_cache"
+
+
+@contextmanager
+def contexto_uso(tarefa: str, nicho: Optional[str] = None, canal: Optional[str] = None) -> Iterator[Dict]:
+    """
+    Atribui as chamadas feitas dentro do bloco a tarefa/nicho/canal
+    
+    Returns:
+        Dict com chamadas, tokens e custo somados no bloco
+    """
+    uso = {
+        "tarefa": tarefa,
+        "nicho": nicho,
+        "canal": canal,
+        "chamadas": 0,
+        "tokens_prompt": 0,
+        "tokens_resposta": 0,
+        "custo_usd": 0.0,
+    }
+    token = _contexto.set(uso)
+    try:
+        yield uso
+    finally:
+        _contexto.reset(token)
+
+
+@lru_cache(maxsize=None)
+def _codificador(modelo: str):
+    """Tokenizer do tiktoken para o modelo (None se o pacote não está instalado)"""
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    
+    try:
+        return tiktoken.encoding_for_model(modelo)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def estimar_tokens(texto: Optional[str], modelo: str = "") -> int:
+    """
+    Estimativa local de tokens de um texto
+    
+    Args:
+        texto: Prompt ou resposta
+        modelo: Modelo (escolhe o tokenizer quando há tiktoken)
+        
+    Returns:
+        Quantidade de tokens
+    """
+    if not texto:
+        return 0
+    
+    codificador = _codificador(modelo)
+    if codificador is not None:
+        return len(codificador.encode(texto))
+    return max(1, math.ceil(len(texto) / LLM_CHARS_POR_TOKEN))
+
+
+class Decisao(NamedTuple):
+    """Modelo a usar numa tarefa e se a API pode ser chamada"""
+    
+    modelo: Optional[str]
+    somente_cache: bool
+    motivo: str
+
+
+def _novo_acumulado() -> Dict:
+    return {"chamadas": 0, "tokens_prompt": 0, "tokens_resposta": 0, "custo_usd": 0.0}
+
+
+class LLMBudget:
+    """
+    Contabilidade de tokens/custo por dia e orçamento por tarefa
+    """
+    
+    def __init__(
+        self,
+        orcamento_diario_usd: Optional[float] = None,
+        orcamento_por_tarefa_usd: Optional[Dict[str, float]] = None,
+        limiar_economia: float = LLM_ORCAMENTO_LIMIAR_ECONOMIA,
+        precos: Optional[Dict[str, tuple]] = None,
+        modelo_economico: Optional[Dict[str, str]] = None
+    ):
+        """
+        Args:
+            orcamento_diario_usd: Limite do dia (padrão: LLM_DAILY_BUDGET_USD; 0 = sem limite)
+            orcamento_por_tarefa_usd: Limite do dia por tarefa (padrão: LLM_ORCAMENTO_POR_TAREFA_USD)
+            limiar_economia: Fração do orçamento a partir da qual troca de modelo
+            precos: Modelo -> (USD por mil tokens de entrada, de saída)
+            modelo_economico: Modelo -> alternativa mais barata
+        """
+        self.orcamento_diario_usd = (
+            credentials.LLM_DAILY_BUDGET_USD if orcamento_diario_usd is None else orcamento_diario_usd
+        )
+        self.orcamento_por_tarefa_usd = dict(
+            LLM_ORCAMENTO_POR_TAREFA_USD if orcamento_por_tarefa_usd is None else orcamento_por_tarefa_usd
+        )
+        self.limiar_economia = limiar_economia
+        self.precos = dict(LLM_PRECOS_POR_MIL_TOKENS if precos is None else precos)
+        self.modelo_economico = dict(LLM_MODELO_ECONOMICO if modelo_economico is None else modelo_economico)
+        self._dia = None
+        self._virar_dia()
+    
+    def _virar_dia(self):
+        """Zera os acumulados quando muda o dia (UTC)"""
+        hoje = datetime.utcnow().date()
+        if self._dia == hoje:
+            return
+        self._dia = hoje
+        self._total = _novo_acumulado()
+        self._por = {"tarefa": {}, "nicho": {}, "canal": {}, "modelo": {}}
+        self._decisoes = {ECONOMICO: 0, SOMENTE_CACHE: 0}
+        self._estimadas = 0
+    
+    def custo(self, modelo: str, tokens_prompt: int, tokens_resposta: int) -> float:
+        """
+        Custo em USD de uma chamada
+        
+        Modelos fora da tabela de preços custam 0 (e geram um aviso).
+        """
+        preco = self.precos.get(modelo)
+        if preco is None:
+            logger.warning(f"Modelo sem preço cadastrado: {modelo}")
+            return 0.0
+        return (tokens_prompt * preco[0] + tokens_resposta * preco[1]) / 1000
+    
+    def registrar(self, modelo: str, tokens_prompt: int, tokens_resposta: int, estimado: bool = False) -> float:
+        """
+        Registra uma chamada feita ao provedor
+        
+        Args:
+            modelo: Modelo usado
+            tokens_prompt: Tokens de entrada
+            tokens_resposta: Tokens de saída
+            estimado: Tokens estimados localmente (o provedor não informou)
+            
+        Returns:
+            Custo da chamada em USD
+        """
+        self._virar_dia()
+        custo = self.custo(modelo, tokens_prompt, tokens_resposta)
+        contexto = _contexto.get() or {}
+        
+        destinos = [
+            self._total,
+            self._por["tarefa"].setdefault(contexto.get("tarefa") or "sem_tarefa", _novo_acumulado()),
+            self._por["nicho"].setdefault(contexto.get("nicho") or "sem_nicho", _novo_acumulado()),
+            self._por["canal"].setdefault(contexto.get("canal") or "sem_canal", _novo_acumulado()),
+            self._por["modelo"].setdefault(modelo, _novo_acumulado()),
+        ]
+        if contexto:
+            destinos.append(contexto)
+        for acumulado in destinos:
+            acumulado["chamadas"] += 1
+            acumulado["tokens_prompt"] += tokens_prompt
+            acumulado["tokens_resposta"] += tokens_resposta
+            acumulado["custo_usd"] += custo
+        
+        if estimado:
+            self._estimadas += 1
+        return custo
+    
+    def registrar_uso(
+        self,
+        modelo: str,
+        prompt: str,
+        resposta: Optional[str],
+        tokens_prompt: Optional[int] = None,
+        tokens_resposta: Optional[int] = None
+    ) -> float:
+        """
+        Registra uma chamada usando os tokens do provedor ou, na falta deles, a estimativa local
+        
+        Args:
+            modelo: Modelo usado
+            prompt: Texto enviado (para estimar)
+            resposta: Texto recebido (para estimar)
+            tokens_prompt: Tokens de entrada informados pelo provedor
+            tokens_resposta: Tokens de saída informados pelo provedor
+            
+        Returns:
+            Custo da chamada em USD
+        """
+        estimado = tokens_prompt is None or tokens_resposta is None
+        if tokens_prompt is None:
+            tokens_prompt = estimar_tokens(prompt, modelo)
+        if tokens_resposta is None:
+            tokens_resposta = estimar_tokens(resposta, modelo)
+        return self.registrar(modelo, tokens_prompt, tokens_resposta, estimado=estimado)
+    
+    def gasto(self, tarefa: Optional[str] = None) -> float:
+        """Gasto do dia em USD (total ou de uma tarefa)"""
+        self._virar_dia()
+        if tarefa is None:
+            return self._total["custo_usd"]
+        return self._por["tarefa"].get(tarefa, {}).get("custo_usd", 0.0)
+    
+    def uso_do_orcamento(self, tarefa: Optional[str] = None) -> float:
+        """Fração usada do orçamento mais apertado (diário ou da tarefa)"""
+        fracoes = [0.0]
+        if self.orcamento_diario_usd > 0:
+            fracoes.append(self.gasto() / self.orcamento_diario_usd)
+        limite_tarefa = self.orcamento_por_tarefa_usd.get(tarefa, 0) if tarefa else 0
+        if limite_tarefa > 0:
+            fracoes.append(self.gasto(tarefa) / limite_tarefa)
+        return max(fracoes)
+    
+    def decidir(self, tarefa: str, modelo: Optional[str]) -> Decisao:
+        """
+        Modelo para a próxima execução de uma tarefa
+        
+        Args:
+            tarefa: Nome da tarefa (LLMTask.value)
+            modelo: Modelo padrão da tarefa
+            
+        Returns:
+            Decisao com o modelo, se só o cache pode responder e o motivo
+        """
+        uso = self.uso_do_orcamento(tarefa)
+        
+        if uso >= 1:
+            self._decisoes[SOMENTE_CACHE] += 1
+            logger.warning("Orçamento de LLM esgotado, usando só o cache", tarefa=tarefa, gasto_usd=round(self.gasto(), 4))
+            return Decisao(modelo, True, SOMENTE_CACHE)
+        
+        if uso >= self.limiar_economia and modelo in self.modelo_economico:
+            self._decisoes[ECONOMICO] += 1
+            return Decisao(self.modelo_economico[modelo], False, ECONOMICO)
+        
+        return Decisao(modelo, False, NORMAL)
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna gasto e tokens do dia
+        
+        Returns:
+            Dict com total, orçamento restante e gasto por tarefa, nicho,
+            canal e modelo
+        """
+        self._virar_dia()
+        
+        def arredondar(acumulado: Dict) -> Dict:
+            return {**acumulado, "custo_usd": round(acumulado["custo_usd"], 6)}
+        
+        por_tarefa = {}
+        for tarefa, acumulado in self._por["tarefa"].items():
+            por_tarefa[tarefa] = arredondar(acumulado)
+            if self.orcamento_por_tarefa_usd.get(tarefa):
+                por_tarefa[tarefa]["orcamento_usd"] = self.orcamento_por_tarefa_usd[tarefa]
+        
+        return {
+            "dia": self._dia.isoformat(),
+            "orcamento_diario_usd": self.orcamento_diario_usd,
+            "gasto_usd": round(self._total["custo_usd"], 6),
+            "restante_usd": (
+                round(max(0.0, self.orcamento_diario_usd - self._total["custo_usd"]), 6)
+                if self.orcamento_diario_usd > 0 else None
+            ),
+            "chamadas": self._total["chamadas"],
+            "tokens_prompt": self._total["tokens_prompt"],
+            "tokens_resposta": self._total["tokens_resposta"],
+            "chamadas_estimadas": self._estimadas,
+            "decisoes": dict(self._decisoes),
+            "por_tarefa": por_tarefa,
+            "por_nicho": {k: arredondar(v) for k, v in self._por["nicho"].items()},
+            "por_canal": {k: arredondar(v) for k, v in self._por["canal"].items()},
+            "por_modelo": {k: arredondar(v) for k, v in self._por["modelo"].items()},
+        }
+
+
+# Instância global usada pelos clientes de LLM e pelo router
+llm_budget = LLMBudget()
@@ -0,0 +1,539 @@
+"""
+Cache de respostas dos LLMs com chave por conteúdo
+
+A chave é o sha256 de (provider, modelo, prompt, parâmetros), então o mesmo
+pedido para o mesmo modelo cai sempre na mesma entrada, em qualquer
+processo. Dois níveis:
+
+1. LRU em memória (por processo, sem I/O)
+2. SQLite em disco (LLM_CACHE_PATH), compartilhado entre processos, com
+   TTL e limite de tamanho (sai primeiro o que foi acessado há mais tempo)
+
+Política por temperatura: com temperatura baixa uma resposta por prompt
+basta; acima de LLM_CACHE_TEMPERATURA_DETERMINISTICA a entrada guarda até
+LLM_CACHE_VARIACOES respostas. Enquanto não completa, cada pedido ainda vai
+à API (e a resposta entra como nova variação); depois, os pedidos recebem as
+variações em rodízio.
+
+Acertos e erros são contados no total e na tarefa atual (contextvar), que o
+LLMRouter abre em cada execute(). Dentro de somente_cache() (orçamento
+esgotado) um miss devolve None em vez de chamar a API.
+"""
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional
+
+from config.constants import (
+    LLM_CACHE_MAX_ITENS_MEMORIA,
+    LLM_CACHE_TTL_S,
+    LLM_CACHE_MAX_BYTES,
+    LLM_CACHE_VARIACOES,
+    LLM_CACHE_TEMPERATURA_DETERMINISTICA,
+    LLM_CACHE_PURGA_A_CADA,
+)
+from config.credentials import credentials
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Contadores da tarefa em andamento (ver contar_tarefa)
+_contadores_tarefa: ContextVar[Optional[Dict[str, int]]] = ContextVar("llm_cache_tarefa", default=None)
+
+# Ligado por somente_cache(): misses não chamam a API
+_somente_cache: ContextVar[bool] = ContextVar("llm_cache_somente_cache", default=False)
+
+
+@contextmanager
+def contar_tarefa() -> Iterator[Dict[str, int]]:
+    """
+    Conta hits/misses do cache dentro do bloco (inclusive em tasks filhas)
+    
+        with contar_tarefa() as contadores:
+            await gpt_client.generate_copy(prompt)
+        contadores  # {"hits": 0, "misses": 1}
+    """
+    contadores = {"hits": 0, "misses": 0}
+    token = _contadores_tarefa.set(contadores)
+    try:
+        yield contadores
+    finally:
+        _contadores_tarefa.reset(token)
+
+
+@contextmanager
+def somente_cache() -> Iterator[None]:
+    """Dentro do bloco, obter_ou_gerar só responde do cache (qualquer variação)"""
+    token = _somente_cache.set(True)
+    try:
+        yield
+    finally:
+        _somente_cache.reset(token)
+
+
+class LLMCache:
+    """
+    Cache de respostas em memória + SQLite
+    
+    - get/put em memória são O(1) (OrderedDict)
+    - O SQLite usa conexões curtas (uma por operação), seguras entre
+      threads e processos; gravações somam variações dentro de uma
+      transação BEGIN IMMEDIATE
+    - obter_ou_gerar consulta a memória no event loop e leva o SQLite
+      para uma thread (asyncio.to_thread)
+    """
+    
+    def __init__(
+        self,
+        caminho: Optional[str] = None,
+        max_itens_memoria: int = LLM_CACHE_MAX_ITENS_MEMORIA,
+        ttl_s: float = LLM_CACHE_TTL_S,
+        max_bytes: int = LLM_CACHE_MAX_BYTES,
+        variacoes: int = LLM_CACHE_VARIACOES,
+        temperatura_deterministica: float = LLM_CACHE_TEMPERATURA_DETERMINISTICA,
+        habilitado: Optional[bool] = None
+    ):
+        """
+        Args:
+            caminho: Arquivo SQLite (padrão: LLM_CACHE_PATH; vazio = só memória)
+            max_itens_memoria: Máximo de entradas no LRU em memória
+            ttl_s: Segundos até uma entrada expirar
+            max_bytes: Tamanho máximo das respostas guardadas em disco
+            variacoes: Respostas por entrada quando a temperatura é alta
+            temperatura_deterministica: Até essa temperatura, uma resposta basta
+            habilitado: Liga/desliga o cache (padrão: LLM_CACHE_ENABLED)
+        """
+        self.caminho = credentials.LLM_CACHE_PATH if caminho is None else caminho
+        self.max_itens_memoria = max_itens_memoria
+        self.ttl_s = ttl_s
+        self.max_bytes = max_bytes
+        self.variacoes = variacoes
+        self.temperatura_deterministica = temperatura_deterministica
+        self.habilitado = credentials.LLM_CACHE_ENABLED if habilitado is None else habilitado
+        
+        # chave -> (variações, expira_em)
+        self._memoria: "OrderedDict[str, tuple]" = OrderedDict()
+        self._rodizio: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._tabela_criada = False
+        self._gravacoes = 0
+        self._stats = {
+            "hits_memoria": 0,
+            "hits_disco": 0,
+            "misses": 0,
+            "gravacoes": 0,
+            "removidos_disco": 0,
+            "erros_disco": 0,
+        }
+    
+    # ------------------------------------------------------------------
+    # Chave e política
+    
+    @staticmethod
+    def chave(provider: str, modelo: str, prompt: str, params: Optional[Dict] = None) -> str:
+        """
+        Chave por conteúdo do pedido
+        
+        Args:
+            provider: Nome do provedor (gpt, deepseek, gemini)
+            modelo: Modelo usado
+            prompt: Prompt completo (inclusive system prompt, se houver)
+            params: Parâmetros que mudam a resposta (max_tokens, temperature...)
+            
+        Returns:
+            sha256 hexadecimal
+        """
+        conteudo = json.dumps(
+            {"provider": provider, "modelo": modelo, "prompt": prompt, "params": params or {}},
+            sort_keys=True,
+            ensure_ascii=False,
+            default=str
+        )
+        return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+    
+    def variacoes_para(self, temperatura: Optional[float]) -> int:
+        """Quantas respostas uma entrada guarda para essa temperatura"""
+        if temperatura is None or temperatura <= self.temperatura_deterministica:
+            return 1
+        return max(1, self.variacoes)
+    
+    # ------------------------------------------------------------------
+    # SQLite
+    
+    def _conectar(self) -> sqlite3.Connection:
+        conexao = sqlite3.connect(self.caminho, timeout=5.0, isolation_level=None)
+        if not self._tabela_criada:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("""
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    chave TEXT PRIMARY KEY,
+                    provider TEXT NOT NULL,
+                    modelo TEXT NOT NULL,
+                    variacoes TEXT NOT NULL,
+                    tamanho INTEGER NOT NULL,
+                    criado_em REAL NOT NULL,
+                    expira_em REAL NOT NULL,
+                    acessado_em REAL NOT NULL
+                )
+            """)
+            conexao.execute("CREATE INDEX IF NOT EXISTS ix_llm_cache_acessado_em ON llm_cache (acessado_em)")
+            self._tabela_criada = True
+        return conexao
+    
+    def _ler_disco(self, chave: str) -> Optional[tuple]:
+        """(variações, expira_em) do SQLite, ou None se ausente/expirada"""
+        if not self.caminho:
+            return None
+        
+        try:
+            conexao = self._conectar()
+            try:
+                agora = time.time()
+                linha = conexao.execute(
+                    "SELECT variacoes, expira_em FROM llm_cache WHERE chave = ? AND expira_em > ?",
+                    (chave, agora)
+                ).fetchone()
+                if linha is None:
+                    return None
+                conexao.execute("UPDATE llm_cache SET acessado_em = ? WHERE chave = ?", (agora, chave))
+                return json.loads(linha[0]), linha[1]
+            finally:
+                conexao.close()
+        except (sqlite3.Error, ValueError) as e:
+            self._stats["erros_disco"] += 1
+            logger.warning(f"Erro ao ler cache de LLM em disco: {e}")
+            return None
+    
+    def _gravar_disco(self, chave: str, resposta: str, limite: int, provider: str, modelo: str) -> Optional[tuple]:
+        """Soma a resposta às variações em disco; devolve (variações, expira_em)"""
+        if not self.caminho:
+            return None
+        
+        try:
+            conexao = self._conectar()
+            try:
+                agora = time.time()
+                conexao.execute("BEGIN IMMEDIATE")
+                linha = conexao.execute(
+                    "SELECT variacoes, expira_em FROM llm_cache WHERE chave = ? AND expira_em > ?",
+                    (chave, agora)
+                ).fetchone()
+                variacoes, expira_em = (json.loads(linha[0]), linha[1]) if linha else ([], agora + self.ttl_s)
+                if resposta not in variacoes and len(variacoes) < limite:
+                    variacoes.append(resposta)
+                
+                texto = json.dumps(variacoes, ensure_ascii=False)
+                conexao.execute(
+                    """
+                    INSERT INTO llm_cache (chave, provider, modelo, variacoes, tamanho, criado_em, expira_em, acessado_em)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(chave) DO UPDATE SET
+                        variacoes = excluded.variacoes,
+                        tamanho = excluded.tamanho,
+                        expira_em = excluded.expira_em,
+                        acessado_em = excluded.acessado_em
+                    """,
+                    (chave, provider, modelo, texto, len(texto.encode("utf-8")), agora, expira_em, agora)
+                )
+                conexao.execute("COMMIT")
+                return variacoes, expira_em
+            finally:
+                conexao.close()
+        except (sqlite3.Error, ValueError) as e:
+            self._stats["erros_disco"] += 1
+            logger.warning(f"Erro ao gravar cache de LLM em disco: {e}")
+            return None
+    
+    def purgar(self) -> int:
+        """
+        Remove do SQLite as entradas expiradas e, se passar de max_bytes,
+        as acessadas há mais tempo
+        
+        Returns:
+            Quantidade de entradas removidas
+        """
+        if not self.caminho:
+            return 0
+        
+        try:
+            conexao = self._conectar()
+            try:
+                removidos = conexao.execute(
+                    "DELETE FROM llm_cache WHERE expira_em <= ?", (time.time(),)
+                ).rowcount
+                
+                total = conexao.execute("SELECT COALESCE(SUM(tamanho), 0) FROM llm_cache").fetchone()[0]
+                if total > self.max_bytes:
+                    # Apaga das mais antigas (por acesso) até caber no limite
+                    removidos += conexao.execute(
+                        """
+                        DELETE FROM llm_cache WHERE chave IN (
+                            SELECT chave FROM (
+                                SELECT chave, SUM(tamanho) OVER (ORDER BY acessado_em DESC, chave) AS acumulado
+                                FROM llm_cache
+                            ) WHERE acumulado > ?
+                        )
+                        """,
+                        (self.max_bytes,)
+                    ).rowcount
+            finally:
+                conexao.close()
+        except sqlite3.Error as e:
+            self._stats["erros_disco"] += 1
+            logger.warning(f"Erro ao limpar cache de LLM em disco: {e}")
+            return 0
+        
+        self._stats["removidos_disco"] += removidos
+        if removidos:
+            logger.info("Cache de LLM limpo", removidos=removidos)
+        return removidos
+    
+    # ------------------------------------------------------------------
+    # Memória
+    
+    def _guardar_memoria(self, chave: str, variacoes: List[str], expira_em: float):
+        with self._lock:
+            self._memoria[chave] = (variacoes, expira_em)
+            self._memoria.move_to_end(chave)
+            while len(self._memoria) > self.max_itens_memoria:
+                antiga, _ = self._memoria.popitem(last=False)
+                self._rodizio.pop(antiga, None)
+    
+    def _ler_memoria(self, chave: str) -> Optional[List[str]]:
+        with self._lock:
+            item = self._memoria.get(chave)
+            if item is None:
+                return None
+            variacoes, expira_em = item
+            if expira_em <= time.time():
+                del self._memoria[chave]
+                return None
+            self._memoria.move_to_end(chave)
+            return variacoes
+    
+    def _escolher(self, chave: str, variacoes: List[str]) -> str:
+        """Variação da vez (rodízio por entrada)"""
+        with self._lock:
+            indice = self._rodizio.get(chave, 0)
+            self._rodizio[chave] = indice + 1
+        return variacoes[indice % len(variacoes)]
+    
+    # ------------------------------------------------------------------
+    # API
+    
+    def _contar(self, campo: str):
+        self._stats[campo] += 1
+        contadores = _contadores_tarefa.get()
+        if contadores is not None:
+            contadores["misses" if campo == "misses" else "hits"] += 1
+    
+    def get(self, chave: str, temperatura: Optional[float] = None) -> Optional[str]:
+        """
+        Busca uma resposta (memória, depois SQLite)
+        
+        Args:
+            chave: Chave de chave()
+            temperatura: Temperatura do pedido (define quantas variações precisa)
+            
+        Returns:
+            Resposta ou None se a entrada não existe ou ainda não tem
+            variações suficientes
+        """
+        if not self.habilitado:
+            return None
+        
+        necessarias = self.variacoes_para(temperatura)
+        
+        resposta = self._buscar_memoria(chave, necessarias)
+        if resposta is None:
+            resposta = self._usar_disco(chave, necessarias, self._ler_disco(chave))
+        if resposta is None:
+            self._contar("misses")
+        return resposta
+    
+    async def _get_async(self, chave: str, temperatura: Optional[float] = None) -> Optional[str]:
+        """get com a leitura do SQLite fora do event loop"""
+        if not self.habilitado:
+            return None
+        
+        necessarias = self.variacoes_para(temperatura)
+        
+        resposta = self._buscar_memoria(chave, necessarias)
+        if resposta is None and self.caminho:
+            do_disco = await asyncio.to_thread(self._ler_disco, chave)
+            resposta = self._usar_disco(chave, necessarias, do_disco)
+        if resposta is None:
+            self._contar("misses")
+        return resposta
+    
+    def _buscar_memoria(self, chave: str, necessarias: int) -> Optional[str]:
+        """Variação da vez do LRU, se a entrada já tem variações suficientes"""
+        variacoes = self._ler_memoria(chave)
+        if variacoes is None or len(variacoes) < necessarias:
+            return None
+        self._contar("hits_memoria")
+        return self._escolher(chave, variacoes)
+    
+    def _usar_disco(self, chave: str, necessarias: int, do_disco: Optional[tuple]) -> Optional[str]:
+        """Sobe para a memória o que veio do SQLite e escolhe a variação da vez"""
+        if do_disco is None:
+            return None
+        self._guardar_memoria(chave, *do_disco)
+        if len(do_disco[0]) < necessarias:
+            return None
+        self._contar("hits_disco")
+        return self._escolher(chave, do_disco[0])
+    
+    def put(
+        self,
+        chave: str,
+        resposta: str,
+        temperatura: Optional[float] = None,
+        provider: str = "",
+        modelo: str = ""
+    ):
+        """
+        Guarda uma resposta (nova variação, se a entrada ainda não está completa)
+        
+        Args:
+            chave: Chave de chave()
+            resposta: Texto gerado
+            temperatura: Temperatura do pedido
+            provider: Provedor (só informativo, vai para o SQLite)
+            modelo: Modelo (só informativo, vai para o SQLite)
+        """
+        if not self.habilitado or not resposta:
+            return
+        
+        limite = self.variacoes_para(temperatura)
+        gravado = self._gravar_disco(chave, resposta, limite, provider, modelo)
+        
+        if self._registrar_gravacao(chave, resposta, limite, gravado):
+            self.purgar()
+    
+    async def _put_async(
+        self,
+        chave: str,
+        resposta: str,
+        temperatura: Optional[float] = None,
+        provider: str = "",
+        modelo: str = ""
+    ):
+        """put com a gravação e a limpeza do SQLite fora do event loop"""
+        if not self.habilitado or not resposta:
+            return
+        
+        limite = self.variacoes_para(temperatura)
+        gravado = None
+        if self.caminho:
+            gravado = await asyncio.to_thread(self._gravar_disco, chave, resposta, limite, provider, modelo)
+        
+        if self._registrar_gravacao(chave, resposta, limite, gravado) and self.caminho:
+            await asyncio.to_thread(self.purgar)
+    
+    def _registrar_gravacao(self, chave: str, resposta: str, limite: int, gravado: Optional[tuple]) -> bool:
+        """
+        Atualiza a memória com o resultado da gravação em disco
+        
+        Returns:
+            True quando é a vez de purgar o SQLite
+        """
+        if gravado is None:
+            atual = self._ler_memoria(chave) or []
+            variacoes = list(atual)
+            if resposta not in variacoes and len(variacoes) < limite:
+                variacoes.append(resposta)
+            gravado = (variacoes, time.time() + self.ttl_s)
+        
+        self._guardar_memoria(chave, *gravado)
+        self._stats["gravacoes"] += 1
+        
+        self._gravacoes += 1
+        return self._gravacoes % LLM_CACHE_PURGA_A_CADA == 0
+    
+    async def obter_ou_gerar(
+        self,
+        provider: str,
+        modelo: str,
+        prompt: str,
+        params: Optional[Dict],
+        gerar: Callable[[], Awaitable[Optional[str]]]
+    ) -> Optional[str]:
+        """
+        Resposta do cache ou, em miss, de gerar() (que é então guardada)
+        
+        Args:
+            provider: Provedor
+            modelo: Modelo
+            prompt: Prompt completo
+            params: Parâmetros do pedido (temperature define as variações)
+            gerar: Chama a API e devolve o texto (None não é guardado)
+            
+        Returns:
+            Texto da resposta ou None
+        """
+        params = params or {}
+        temperatura = params.get("temperature")
+        chave = self.chave(provider, modelo, prompt, params)
+        
+        if _somente_cache.get():
+            # Sem orçamento: qualquer variação guardada serve, e miss não chama a API
+            return await self._get_async(chave)
+        
+        resposta = await self._get_async(chave, temperatura)
+        if resposta is not None:
+            logger.debug("Resposta de LLM do cache", provider=provider, modelo=modelo)
+            return resposta
+        
+        resposta = await gerar()
+        if resposta:
+            await self._put_async(chave, resposta, temperatura, provider, modelo)
+        return resposta
+    
+    def limpar(self):
+        """Esvazia a memória e o SQLite"""
+        with self._lock:
+            self._memoria.clear()
+            self._rodizio.clear()
+        
+        if self.caminho:
+            try:
+                conexao = self._conectar()
+                try:
+                    conexao.execute("DELETE FROM llm_cache")
+                finally:
+                    conexao.close()
+            except sqlite3.Error as e:
+                logger.warning(f"Erro ao limpar cache de LLM em disco: {e}")
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna métricas do cache
+        
+        Returns:
+            Dict com acertos (memória/disco), misses, taxa de acerto e gravações
+        """
+        hits = self._stats["hits_memoria"] + self._stats["hits_disco"]
+        acessos = hits + self._stats["misses"]
+        return {
+            "habilitado": self.habilitado,
+            "disco": bool(self.caminho),
+            "itens_memoria": len(self._memoria),
+            "hits_memoria": self._stats["hits_memoria"],
+            "hits_disco": self._stats["hits_disco"],
+            "misses": self._stats["misses"],
+            "hit_ratio": round(hits / acessos, 4) if acessos else 0.0,
+            "gravacoes": self._stats["gravacoes"],
+            "removidos_disco": self._stats["removidos_disco"],
+            "erros_disco": self._stats["erros_disco"],
+        }
+
+
+# Instância global usada pelos clientes de LLM
+llm_cache = LLMCache()
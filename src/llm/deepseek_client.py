@@ -5,7 +5,10 @@ from typing import Dict, List, Optional
 import httpx
 
 from config.credentials import credentials
+from src.llm.budget import llm_budget
+from src.llm.cache import llm_cache
 from src.utils.logger import get_logger
+from src.utils.resilience import resilience
 
 logger = get_logger(__name__)
 
@@ -13,12 +16,16 @@ logger = get_logger(__name__)
 class DeepSeekClient:
     """
     Cliente para API DeepSeek
-    Usado para: análise de produtos, ranking, otimização
+    Usado para: análise de produtos, ranking, otimização (e copy, como reserva do GPT)
     """
     
     def __init__(self):
         self.api_key = credentials.DEEPSEEK_API_KEY
         self.base_url = "https://api.deepseek.com/v1"
+        self.host = httpx.URL(self.base_url).host
+        self.resilience = resilience
+        self.cache = llm_cache
+        self.budget = llm_budget
         
         if not self.api_key:
             logger.warning("DeepSeek API key não configurada")
@@ -39,10 +46,10 @@ class DeepSeekClient:
         prompt = self._build_analysis_prompt(produto)
         
         try:
-            response = await self._call_api(prompt)
+            analise = await self._call_api_cacheado(prompt)
             
             return {
-                "analise": response.get("choices", [{}])[0].get("message", {}).get("content", ""),
+                "analise": analise,
                 "produto_id": produto.get("id"),
                 "sucesso": True
             }
@@ -50,6 +57,28 @@ class DeepSeekClient:
             logger.error(f"Erro ao analisar produto: {e}")
             return {"error": str(e), "sucesso": False}
     
+    async def generate_copy(self, prompt: str, max_tokens: int = 500) -> Optional[str]:
+        """
+        Gera copy com DeepSeek (reserva do GPT no LLMRouter)
+        
+        Args:
+            prompt: Prompt com instruções
+            max_tokens: Máximo de tokens
+            
+        Returns:
+            Texto gerado ou None
+        """
+        if not self.api_key:
+            logger.warning("DeepSeek não disponível para copy")
+            return None
+        
+        try:
+            copy = await self._call_api_cacheado(prompt, max_tokens)
+            return copy or None
+        except Exception as e:
+            logger.error(f"Erro ao gerar copy com DeepSeek: {e}")
+            return None
+    
     async def rank_products(self, produtos: List[Dict]) -> List[Dict]:
         """
         Ranqueia produtos usando análise de IA
@@ -117,7 +146,7 @@ Forneça insights sobre:
     
     async def _call_api(self, prompt: str, max_tokens: int = 1000) -> Dict:
         """
-        Chama a API DeepSeek
+        Chama a API DeepSeek (com retry e circuit breaker; registra tokens e custo)
         
         Args:
             prompt: Prompt para o modelo
@@ -140,14 +169,45 @@ Forneça insights sobre:
             "temperature": 0.7
         }
         
-        async with httpx.AsyncClient(timeout=60.0) as client:
-            response = await client.post(
-                f"{self.base_url}/chat/completions",
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-            return response.json()
+        async def enviar():
+            async with httpx.AsyncClient(timeout=60.0) as client:
+                response = await client.post(
+                    f"{self.base_url}/chat/completions",
+                    headers=headers,
+                    json=payload
+                )
+                response.raise_for_status()
+                return response.json()
+        
+        resultado = await self.resilience.executar(self.host, enviar)
+        
+        usage = resultado.get("usage") or {}
+        self.budget.registrar_uso(
+            payload["model"],
+            prompt,
+            resultado.get("choices", [{}])[0].get("message", {}).get("content", ""),
+            usage.get("prompt_tokens"),
+            usage.get("completion_tokens")
+        )
+        return resultado
+    
+    async def _call_api_cacheado(self, prompt: str, max_tokens: int = 1000) -> str:
+        """
+        Texto da resposta, do cache de LLM ou de _call_api em miss
+        
+        Args:
+            prompt: Prompt para o modelo
+            max_tokens: Máximo de tokens na resposta
+            
+        Returns:
+            Conteúdo da resposta (vazio se a API não devolveu texto)
+        """
+        async def gerar():
+            response = await self._call_api(prompt, max_tokens)
+            return response.get("choices", [{}])[0].get("message", {}).get("content", "")
+        
+        params = {"max_tokens": max_tokens, "temperature": 0.7}
+        return await self.cache.obter_ou_gerar("deepseek", "deepseek-chat", prompt, params, gerar) or ""
     
     def _build_analysis_prompt(self, produto: Dict) -> str:
         """Constrói prompt de análise de produto"""
@@ -1,11 +1,15 @@
 """
 Cliente Google Gemini para roteiros de vídeo e análise de imagens
 """
+import asyncio
 from typing import Dict, Optional, List
 import google.generativeai as genai
 
 from config.credentials import credentials
+from src.llm.budget import llm_budget
+from src.llm.cache import llm_cache
 from src.utils.logger import get_logger
+from src.utils.resilience import resilience
 
 logger = get_logger(__name__)
 
@@ -18,6 +22,10 @@ class GeminiClient:
     
     def __init__(self):
         self.api_key = credentials.GOOGLE_API_KEY
+        self.host = "generativelanguage.googleapis.com"
+        self.resilience = resilience
+        self.cache = llm_cache
+        self.budget = llm_budget
         
         if self.api_key:
             genai.configure(api_key=self.api_key)
@@ -65,12 +73,12 @@ Inclua também:
 """
         
         try:
-            response = self.model.generate_content(full_prompt)
+            texto = await self._gerar_cacheado(full_prompt)
             
             roteiro = {
-                "roteiro_completo": response.text,
+                "roteiro_completo": texto,
                 "duracao_segundos": duracao_segundos,
-                "cenas": self._parse_scenes(response.text),
+                "cenas": self._parse_scenes(texto),
                 "sucesso": True
             }
             
@@ -112,7 +120,7 @@ Forneça:
         try:
             # Em produção, faria download da imagem e enviaria
             # Por ora, apenas simulação
-            response = self.model.generate_content(prompt)
+            response = await self._gerar(prompt)
             
             return {
                 "analise": response.text,
@@ -161,7 +169,7 @@ REQUISITOS:
 """
         
         try:
-            response = self.model.generate_content(prompt)
+            response = await self._gerar(prompt)
             
             logger.info("Script de narração gerado")
             return response.text
@@ -170,6 +178,38 @@ REQUISITOS:
             logger.error(f"Erro ao gerar narração: {e}")
             return None
     
+    async def _gerar(self, prompt: str):
+        """
+        generate_content com retry e circuit breaker (registra tokens e custo)
+        
+        A chamada do SDK é síncrona; roda numa thread para não travar o
+        event loop durante a espera.
+        """
+        response = await self.resilience.executar(
+            self.host, lambda: asyncio.to_thread(self.model.generate_content, prompt)
+        )
+        
+        usage = getattr(response, "usage_metadata", None)
+        try:
+            texto = response.text
+        except ValueError:
+            texto = ""  # resposta bloqueada, sem texto
+        self.budget.registrar_uso(
+            "gemini-pro",
+            prompt,
+            texto,
+            getattr(usage, "prompt_token_count", None),
+            getattr(usage, "candidates_token_count", None)
+        )
+        return response
+    
+    async def _gerar_cacheado(self, prompt: str) -> str:
+        """Texto gerado, do cache de LLM ou de _gerar em miss"""
+        async def gerar():
+            return (await self._gerar(prompt)).text
+        
+        return await self.cache.obter_ou_gerar("gemini", "gemini-pro", prompt, {}, gerar)
+    
     def _parse_scenes(self, roteiro: str) -> List[Dict]:
         """
         Parse de cenas do roteiro
@@ -1,11 +1,15 @@
 """
 Cliente OpenAI GPT para copywriting
 """
+import json
 from typing import Dict, List, Optional
 from openai import AsyncOpenAI
 
 from config.credentials import credentials
+from src.llm.budget import llm_budget
+from src.llm.cache import llm_cache
 from src.utils.logger import get_logger
+from src.utils.resilience import resilience
 
 logger = get_logger(__name__)
 
@@ -16,12 +20,22 @@ class GPTClient:
     Usado para: copywriting, hooks, variações de texto
     """
     
+    # Modelos padrão (o LLMRouter pode trocar por um mais barato via `model`)
+    MODELO_COPY = "gpt-4-turbo-preview"
+    MODELO_HASHTAGS = "gpt-3.5-turbo"  # Usa modelo mais barato para hashtags
+    
     def __init__(self):
         self.api_key = credentials.OPENAI_API_KEY
         self.client = None
+        self.host = "api.openai.com"
+        self.resilience = resilience
+        self.cache = llm_cache
+        self.budget = llm_budget
         
         if self.api_key:
-            self.client = AsyncOpenAI(api_key=self.api_key)
+            # Retries ficam com a camada de resiliência (não com o SDK)
+            self.client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+            self.host = self.client.base_url.host
         else:
             logger.warning("OpenAI API key não configurada")
     
@@ -29,7 +43,8 @@ class GPTClient:
         self,
         prompt: str,
         max_tokens: int = 500,
-        temperature: float = 0.8
+        temperature: float = 0.8,
+        model: Optional[str] = None
     ) -> Optional[str]:
         """
         Gera copy usando GPT
@@ -38,6 +53,7 @@ class GPTClient:
             prompt: Prompt com instruções
             max_tokens: Máximo de tokens
             temperature: Criatividade (0-1)
+            model: Modelo (padrão: MODELO_COPY)
             
         Returns:
             Texto gerado ou None
@@ -47,8 +63,8 @@ class GPTClient:
             return None
         
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
+            copy = await self._completar_cacheado(
+                model=model or self.MODELO_COPY,
                 messages=[
                     {"role": "system", "content": "Você é um copywriter especialista em marketing de afiliados."},
                     {"role": "user", "content": prompt}
@@ -57,7 +73,9 @@ class GPTClient:
                 temperature=temperature
             )
             
-            copy = response.choices[0].message.content
+            if copy is None:
+                logger.warning("GPT sem copy (resposta vazia ou orçamento esgotado sem cache)")
+                return None
             
             logger.debug("Copy gerada com GPT", chars=len(copy))
             return copy
@@ -97,8 +115,8 @@ REQUISITOS:
 """
         
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
+            response = await self._completar(
+                model=self.MODELO_COPY,
                 messages=[
                     {"role": "system", "content": "Você é um copywriter criativo."},
                     {"role": "user", "content": prompt}
@@ -149,8 +167,8 @@ Retorne APENAS o hook melhorado, sem explicações.
 """
         
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-4-turbo-preview",
+            response = await self._completar(
+                model=self.MODELO_COPY,
                 messages=[
                     {"role": "user", "content": prompt}
                 ],
@@ -171,7 +189,8 @@ Retorne APENAS o hook melhorado, sem explicações.
         self,
         produto: Dict,
         nicho: str,
-        num_hashtags: int = 10
+        num_hashtags: int = 10,
+        model: Optional[str] = None
     ) -> List[str]:
         """
         Gera hashtags relevantes para o produto
@@ -180,6 +199,7 @@ Retorne APENAS o hook melhorado, sem explicações.
             produto: Dados do produto
             nicho: Nicho do produto
             num_hashtags: Número de hashtags
+            model: Modelo (padrão: MODELO_HASHTAGS)
             
         Returns:
             Lista de hashtags
@@ -203,16 +223,16 @@ Liste apenas as hashtags, uma por linha.
 """
         
         try:
-            response = await self.client.chat.completions.create(
-                model="gpt-3.5-turbo",  # Usa modelo mais barato para hashtags
+            hashtags_text = await self._completar_cacheado(
+                model=model or self.MODELO_HASHTAGS,
                 messages=[
                     {"role": "user", "content": prompt}
                 ],
                 max_tokens=200,
                 temperature=0.7
             )
-            
-            hashtags_text = response.choices[0].message.content
+            if hashtags_text is None:
+                return []
             hashtags = [f"#{tag.strip()}" for tag in hashtags_text.split("\n") if tag.strip()]
             
             logger.debug(f"Geradas {len(hashtags)} hashtags")
@@ -222,6 +242,31 @@ Liste apenas as hashtags, uma por linha.
             logger.error(f"Erro ao gerar hashtags: {e}")
             return []
     
+    async def _completar(self, **kwargs):
+        """chat.completions.create com retry e circuit breaker (registra tokens e custo)"""
+        response = await self.resilience.executar(
+            self.host, lambda: self.client.chat.completions.create(**kwargs)
+        )
+        
+        usage = getattr(response, "usage", None)
+        self.budget.registrar_uso(
+            kwargs.get("model", ""),
+            "\n".join(m.get("content") or "" for m in kwargs.get("messages", [])),
+            response.choices[0].message.content if response.choices else "",
+            getattr(usage, "prompt_tokens", None),
+            getattr(usage, "completion_tokens", None)
+        )
+        return response
+    
+    async def _completar_cacheado(self, model: str, messages: List[Dict], **params) -> Optional[str]:
+        """Texto da resposta, do cache de LLM ou de _completar em miss"""
+        async def gerar():
+            response = await self._completar(model=model, messages=messages, **params)
+            return response.choices[0].message.content
+        
+        prompt = json.dumps(messages, ensure_ascii=False, sort_keys=True)
+        return await self.cache.obter_ou_gerar("gpt", model, prompt, params, gerar)
+    
     def _parse_variations(self, text: str) -> List[str]:
         """
         Parse de variações do texto retornado
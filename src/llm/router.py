@@ -1,12 +1,37 @@
 """
 Router de LLMs - Decide qual LLM usar para cada tarefa
+
+Cada tarefa tem uma política (LLM_POLITICAS_ROTEAMENTO): provedores em
+ordem de fallback, com timeout por tentativa. Sem resposta útil (erro,
+timeout ou resultado vazio), o próximo provedor é tentado; "template" é o
+último recurso local, sem LLM.
+
+Em tarefas com hedge, se o primeiro provedor não responde dentro do p95 da
+sua latência recente, o segundo recebe o mesmo pedido; vale a primeira
+resposta útil e a outra chamada é cancelada. Um provedor cuja mediana
+recente passa do timeout da tarefa vai para o fim da fila.
 """
-from typing import Dict, Optional
+import asyncio
+import time
+from collections import deque
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple
 from enum import Enum
 
+from config.constants import (
+    LLM_CONCORRENCIA_POR_PROVEDOR,
+    LLM_POLITICAS_ROTEAMENTO,
+    LLM_LATENCIA_JANELA,
+    LLM_HEDGE_PERCENTIL,
+    LLM_HEDGE_MIN_AMOSTRAS,
+)
+from src.content.generator import ContentGenerator
+from src.llm.budget import contexto_uso, llm_budget
+from src.llm.cache import contar_tarefa, somente_cache
 from src.llm.deepseek_client import deepseek_client
-from src.llm.gpt_client import gpt_client
+from src.llm.gpt_client import GPTClient, gpt_client
 from src.llm.gemini_client import gemini_client
+from src.utils.hashtags import generate_hashtags
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
@@ -24,6 +49,114 @@ class LLMTask(Enum):
     NARRATION = "narration"
 
 
+# Provedor local (templates), último recurso das cadeias de fallback
+TEMPLATE = "template"
+
+# Provedor principal de cada tarefa (o primeiro da cadeia padrão)
+PROVEDOR_POR_TAREFA = {
+    LLMTask.RANKING: "deepseek",
+    LLMTask.ANALYSIS: "deepseek",
+    LLMTask.COPYWRITING: "gpt",
+    LLMTask.VARIATIONS: "gpt",
+    LLMTask.HASHTAGS: "gpt",
+    LLMTask.VIDEO_SCRIPT: "gemini",
+    LLMTask.IMAGE_ANALYSIS: "gemini",
+    LLMTask.NARRATION: "gemini",
+}
+
+# Modelo padrão de cada tarefa (base da decisão de orçamento)
+MODELO_POR_TAREFA = {
+    LLMTask.RANKING: "deepseek-chat",
+    LLMTask.ANALYSIS: "deepseek-chat",
+    LLMTask.COPYWRITING: GPTClient.MODELO_COPY,
+    LLMTask.VARIATIONS: GPTClient.MODELO_COPY,
+    LLMTask.HASHTAGS: GPTClient.MODELO_HASHTAGS,
+    LLMTask.VIDEO_SCRIPT: "gemini-pro",
+    LLMTask.IMAGE_ANALYSIS: "gemini-pro",
+    LLMTask.NARRATION: "gemini-pro",
+}
+
+# Modelo de cada provedor quando ele atende como reserva
+MODELO_POR_PROVEDOR = {"gpt": GPTClient.MODELO_COPY, "deepseek": "deepseek-chat", "gemini": "gemini-pro"}
+
+# Tarefas que aceitam outro modelo (rebaixamento quando o orçamento aperta)
+TAREFAS_COM_MODELO = {LLMTask.COPYWRITING, LLMTask.HASHTAGS}
+
+# Tarefas respondidas pelo cache de LLM (as únicas possíveis com orçamento esgotado)
+TAREFAS_COM_CACHE = {LLMTask.COPYWRITING, LLMTask.HASHTAGS, LLMTask.ANALYSIS, LLMTask.VIDEO_SCRIPT}
+
+# Campo do resultado que precisa vir preenchido (vazio = tenta o próximo provedor)
+CAMPO_RESPOSTA = {
+    LLMTask.COPYWRITING: "copy",
+    LLMTask.VARIATIONS: "variacoes",
+    LLMTask.HASHTAGS: "hashtags",
+    LLMTask.NARRATION: "narration_script",
+}
+
+
+def sem_resposta(task: LLMTask, resultado: Optional[Dict]) -> bool:
+    """True se o resultado de um provedor não serve (None, erro ou campo principal vazio)"""
+    if not resultado:
+        return True
+    if "error" in resultado or resultado.get("sucesso") is False:
+        return True
+    campo = CAMPO_RESPOSTA.get(task)
+    return campo is not None and not resultado.get(campo)
+
+
+class LatenciaProvedores:
+    """
+    Latências recentes por provedor (janela das últimas N chamadas)
+    
+    Só entram chamadas que foram à API (hits de cache não contam) e
+    timeouts, com o próprio timeout como latência.
+    """
+    
+    def __init__(self, janela: int = LLM_LATENCIA_JANELA):
+        """
+        Args:
+            janela: Chamadas guardadas por provedor
+        """
+        self.janela = janela
+        self._amostras: Dict[str, deque] = {}
+    
+    def observar(self, provedor: str, segundos: float):
+        """Registra a latência de uma chamada"""
+        self._amostras.setdefault(provedor, deque(maxlen=self.janela)).append(segundos)
+    
+    def amostras(self, provedor: str) -> int:
+        return len(self._amostras.get(provedor, ()))
+    
+    def quantil(self, provedor: str, q: float) -> Optional[float]:
+        """
+        Quantil q das latências recentes do provedor
+        
+        Returns:
+            Segundos (None se não há amostras)
+        """
+        amostras = sorted(self._amostras.get(provedor, ()))
+        if not amostras:
+            return None
+        return amostras[min(len(amostras) - 1, int(q * len(amostras)))]
+    
+    def get_stats(self) -> Dict[str, Dict]:
+        """
+        Returns:
+            Dict provedor -> amostras, p50 e p95 (em ms)
+        """
+        def ms(valor: Optional[float]) -> Optional[float]:
+            return round(valor * 1000, 1) if valor is not None else None
+        
+        return {
+            provedor: {
+                "amostras": self.amostras(provedor),
+                "p50_ms": ms(self.quantil(provedor, 0.50)),
+                "p95_ms": ms(self.quantil(provedor, 0.95)),
+            }
+            for provedor in self._amostras
+        }
+
+
 class LLMRouter:
     """
     Roteia requisições para o LLM apropriado baseado na tarefa
@@ -32,12 +165,64 @@ class LLMRouter:
     - DeepSeek: Ranking, Análise de dados, Otimização
     - GPT: Copywriting, Hooks, Variações de texto
     - Gemini: Roteiros de vídeo, Análise de imagens
+    
+    Cada provedor tem um semáforo (LLM_CONCORRENCIA_POR_PROVEDOR) que limita
+    as chamadas em voo, inclusive as disparadas por execute_many.
+    
+    Antes de cada tarefa o orçamento (src/llm/budget.py) decide o modelo:
+    perto do limite troca pelo econômico; esgotado, só o cache responde.
+    
+    A ordem dos provedores, os timeouts e o hedge vêm das políticas por
+    tarefa (ver o docstring do módulo).
     """
     
-    def __init__(self):
+    def __init__(
+        self,
+        concorrencia: Optional[Dict[str, int]] = None,
+        politicas: Optional[Dict[str, Dict]] = None
+    ):
+        """
+        Args:
+            concorrencia: Chamadas em voo por provedor (padrão: LLM_CONCORRENCIA_POR_PROVEDOR)
+            politicas: Política de roteamento por tarefa (padrão: LLM_POLITICAS_ROTEAMENTO)
+        """
         self.deepseek = deepseek_client
         self.gpt = gpt_client
         self.gemini = gemini_client
+        self.budget = llm_budget
+        self.concorrencia = dict(LLM_CONCORRENCIA_POR_PROVEDOR if concorrencia is None else concorrencia)
+        self.politicas = dict(LLM_POLITICAS_ROTEAMENTO if politicas is None else politicas)
+        self.latencias = LatenciaProvedores()
+        self._cache_por_tarefa: Dict[str, Dict[str, int]] = {}
+        self._roteamento = {"fallbacks": {}, "timeouts": {}, "hedges": 0, "hedges_vencidos": 0}
+        self._semaforos: Dict[str, asyncio.Semaphore] = {}
+        self._loop = None
+        
+        # Handler de cada tarefa por provedor
+        self._handlers = {
+            LLMTask.RANKING: {"deepseek": self._handle_ranking},
+            LLMTask.ANALYSIS: {"deepseek": self._handle_analysis},
+            LLMTask.COPYWRITING: {
+                "gpt": self._handle_copywriting,
+                "deepseek": self._handle_copywriting_deepseek,
+                TEMPLATE: self._handle_copywriting_template,
+            },
+            LLMTask.VARIATIONS: {"gpt": self._handle_variations},
+            LLMTask.HASHTAGS: {"gpt": self._handle_hashtags, TEMPLATE: self._handle_hashtags_template},
+            LLMTask.VIDEO_SCRIPT: {"gemini": self._handle_video_script},
+            LLMTask.IMAGE_ANALYSIS: {"gemini": self._handle_image_analysis},
+            LLMTask.NARRATION: {"gemini": self._handle_narration},
+        }
+    
+    def _semaforo(self, provedor: str) -> asyncio.Semaphore:
+        """Semáforo do provedor (recriado quando o event loop muda, ex: vários asyncio.run)"""
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._semaforos = {}
+            self._loop = loop
+        if provedor not in self._semaforos:
+            self._semaforos[provedor] = asyncio.Semaphore(max(1, self.concorrencia.get(provedor, 1)))
+        return self._semaforos[provedor]
     
     async def execute(self, task: LLMTask, **kwargs) -> Optional[Dict]:
         """
@@ -45,30 +230,226 @@ class LLMRouter:
         
         Args:
             task: Tipo de tarefa
-            **kwargs: Parâmetros específicos da tarefa
+            **kwargs: Parâmetros específicos da tarefa (nicho e canal, quando
+                informados, atribuem o custo)
             
         Returns:
-            Resultado da tarefa
-        """
-        if task == LLMTask.RANKING:
-            return await self._handle_ranking(**kwargs)
-        elif task == LLMTask.ANALYSIS:
-            return await self._handle_analysis(**kwargs)
-        elif task == LLMTask.COPYWRITING:
-            return await self._handle_copywriting(**kwargs)
-        elif task == LLMTask.VARIATIONS:
-            return await self._handle_variations(**kwargs)
-        elif task == LLMTask.HASHTAGS:
-            return await self._handle_hashtags(**kwargs)
-        elif task == LLMTask.VIDEO_SCRIPT:
-            return await self._handle_video_script(**kwargs)
-        elif task == LLMTask.IMAGE_ANALYSIS:
-            return await self._handle_image_analysis(**kwargs)
-        elif task == LLMTask.NARRATION:
-            return await self._handle_narration(**kwargs)
-        else:
+            Resultado da tarefa, com "provedor" (quem respondeu), "cache"
+            ({"hits", "misses"} do cache de LLM nesta execução) e "uso"
+            (chamadas, tokens, custo, modelo e decisão de orçamento); None
+            se nenhum provedor da cadeia respondeu
+        """
+        if not isinstance(task, LLMTask):
             logger.error(f"Tarefa desconhecida: {task}")
             return None
+        
+        decisao = self.budget.decidir(task.value, kwargs.get("model") or MODELO_POR_TAREFA[task])
+        if decisao.somente_cache and task not in TAREFAS_COM_CACHE:
+            logger.warning("Orçamento de LLM esgotado, tarefa não executada", tarefa=task.value)
+            return None
+        if task in TAREFAS_COM_MODELO:
+            kwargs["model"] = decisao.modelo
+        
+        produto = kwargs.get("produto")
+        nicho = kwargs.get("nicho") or (produto.get("nicho") if isinstance(produto, dict) else None)
+        
+        with contar_tarefa() as contadores, contexto_uso(task.value, nicho, kwargs.get("canal")) as uso:
+            with somente_cache() if decisao.somente_cache else nullcontext():
+                provedor, resultado = await self._rotear(task, kwargs, contadores, medir=not decisao.somente_cache)
+        
+        totais = self._cache_por_tarefa.setdefault(task.value, {"hits": 0, "misses": 0})
+        totais["hits"] += contadores["hits"]
+        totais["misses"] += contadores["misses"]
+        
+        if resultado is None:
+            logger.error("Nenhum provedor respondeu", tarefa=task.value)
+            return None
+        
+        resultado["provedor"] = provedor
+        resultado["cache"] = dict(contadores)
+        resultado["uso"] = {
+            "chamadas": uso["chamadas"],
+            "tokens_prompt": uso["tokens_prompt"],
+            "tokens_resposta": uso["tokens_resposta"],
+            "custo_usd": round(uso["custo_usd"], 6),
+            "modelo": decisao.modelo if provedor == PROVEDOR_POR_TAREFA[task] else MODELO_POR_PROVEDOR.get(provedor),
+            "orcamento": decisao.motivo,
+        }
+        return resultado
+    
+    def provedores(self, task: LLMTask) -> List[str]:
+        """
+        Cadeia de provedores da tarefa, na ordem em que serão tentados
+        
+        A ordem é a da política, exceto que provedores cuja mediana de
+        latência recente passa do timeout vão para o fim (antes do template).
+        """
+        politica = self.politicas.get(task.value, {})
+        cadeia = [p for p in politica.get("provedores", [PROVEDOR_POR_TAREFA[task]]) if p in self._handlers[task]]
+        timeout = politica.get("timeout_s")
+        
+        def lento(provedor: str) -> bool:
+            if timeout is None or self.latencias.amostras(provedor) < LLM_HEDGE_MIN_AMOSTRAS:
+                return False
+            return self.latencias.quantil(provedor, 0.50) >= timeout
+        
+        return sorted(cadeia, key=lambda provedor: (provedor == TEMPLATE, lento(provedor)))
+    
+    async def _rotear(
+        self,
+        task: LLMTask,
+        kwargs: Dict,
+        contadores: Dict[str, int],
+        medir: bool = True
+    ) -> Tuple[Optional[str], Optional[Dict]]:
+        """
+        Percorre a cadeia de provedores até uma resposta útil
+        
+        Returns:
+            (provedor que respondeu, resultado) ou (None, None)
+        """
+        politica = self.politicas.get(task.value, {})
+        timeout = politica.get("timeout_s")
+        cadeia = self.provedores(task)
+        
+        def tentar(provedor: str):
+            return self._tentar(task, provedor, kwargs, timeout, contadores, medir)
+        
+        inicio = 0
+        if politica.get("hedge") and len(cadeia) > 1 and TEMPLATE not in cadeia[:2]:
+            provedor, resultado, inicio = await self._com_hedge(task, cadeia[0], cadeia[1], tentar)
+            if not sem_resposta(task, resultado):
+                return self._respondido(task, provedor, resultado)
+        
+        for provedor in cadeia[inicio:]:
+            resultado = await tentar(provedor)
+            if not sem_resposta(task, resultado):
+                return self._respondido(task, provedor, resultado)
+            logger.warning("Provedor sem resposta, tentando o próximo", tarefa=task.value, provedor=provedor)
+        
+        return None, None
+    
+    def _respondido(self, task: LLMTask, provedor: str, resultado: Dict) -> Tuple[str, Dict]:
+        """Conta quando a resposta veio de um provedor reserva"""
+        if provedor != PROVEDOR_POR_TAREFA[task]:
+            fallbacks = self._roteamento["fallbacks"].setdefault(task.value, {})
+            fallbacks[provedor] = fallbacks.get(provedor, 0) + 1
+        return provedor, resultado
+    
+    async def _com_hedge(self, task: LLMTask, principal: str, reserva: str, tentar) -> Tuple[str, Optional[Dict], int]:
+        """
+        Pedido ao provedor principal, com o reserva disparado após o p95 do principal
+        
+        Returns:
+            (provedor, resultado, quantos provedores da cadeia já foram usados)
+        """
+        atraso = None
+        if self.latencias.amostras(principal) >= LLM_HEDGE_MIN_AMOSTRAS:
+            atraso = self.latencias.quantil(principal, LLM_HEDGE_PERCENTIL)
+        
+        if atraso is None:
+            return principal, await tentar(principal), 1
+        
+        primeira = asyncio.create_task(tentar(principal))
+        try:
+            resultado = await asyncio.wait_for(asyncio.shield(primeira), atraso)
+            # Respondeu (ou falhou) antes do p95: o reserva segue pela cadeia normal
+            return principal, resultado, 1
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            primeira.cancel()
+            raise
+        
+        self._roteamento["hedges"] += 1
+        logger.info("Hedge disparado", tarefa=task.value, principal=principal, reserva=reserva, atraso_s=round(atraso, 3))
+        segunda = asyncio.create_task(tentar(reserva))
+        provedores = {primeira: principal, segunda: reserva}
+        pendentes = set(provedores)
+        resultado = None
+        try:
+            while pendentes:
+                prontas, pendentes = await asyncio.wait(pendentes, return_when=asyncio.FIRST_COMPLETED)
+                for tarefa in prontas:
+                    resultado = tarefa.result()
+                    if not sem_resposta(task, resultado):
+                        if tarefa is segunda:
+                            self._roteamento["hedges_vencidos"] += 1
+                        return provedores[tarefa], resultado, 2
+            return reserva, resultado, 2
+        finally:
+            for tarefa in pendentes:
+                tarefa.cancel()
+            if pendentes:
+                await asyncio.gather(*pendentes, return_exceptions=True)
+    
+    async def _tentar(
+        self,
+        task: LLMTask,
+        provedor: str,
+        kwargs: Dict,
+        timeout: Optional[float],
+        contadores: Dict[str, int],
+        medir: bool
+    ) -> Optional[Dict]:
+        """
+        Uma tentativa num provedor (semáforo do provedor + timeout)
+        
+        Erros e timeouts viram None. A latência entra nos percentis do
+        provedor quando a chamada foi à API.
+        """
+        handler = self._handlers[task][provedor]
+        if provedor == TEMPLATE:
+            return await handler(**kwargs)
+        
+        async with self._semaforo(provedor):
+            inicio = time.monotonic()
+            with contar_tarefa() as desta:
+                try:
+                    resultado = await asyncio.wait_for(handler(**kwargs), timeout)
+                except asyncio.TimeoutError:
+                    self._roteamento["timeouts"][provedor] = self._roteamento["timeouts"].get(provedor, 0) + 1
+                    logger.warning("Timeout no provedor de LLM", tarefa=task.value, provedor=provedor, timeout_s=timeout)
+                    if medir:
+                        self.latencias.observar(provedor, timeout)
+                    return None
+                except Exception as e:
+                    logger.error(f"Erro no provedor {provedor} ({task.value}): {e}")
+                    return None
+                finally:
+                    contadores["hits"] += desta["hits"]
+                    contadores["misses"] += desta["misses"]
+            
+            if medir and not (desta["hits"] and not desta["misses"]):
+                self.latencias.observar(provedor, time.monotonic() - inicio)
+            return resultado
+    
+    async def execute_many(self, task: LLMTask, pedidos: List[Dict]) -> List[Optional[Dict]]:
+        """
+        Executa vários pedidos da mesma tarefa em paralelo
+        
+        O semáforo do provedor limita quantos ficam em voo; com pedidos
+        dentro do limite, o tempo total é o da chamada mais lenta.
+        
+        Args:
+            task: Tipo de tarefa
+            pedidos: kwargs de cada execução
+            
+        Returns:
+            Resultados na ordem dos pedidos (None onde a execução falhou)
+        """
+        resultados = await asyncio.gather(
+            *(self.execute(task, **pedido) for pedido in pedidos),
+            return_exceptions=True
+        )
+        
+        saida = []
+        for resultado in resultados:
+            if isinstance(resultado, Exception):
+                logger.error(f"Erro em execução paralela de {task}: {resultado}")
+                resultado = None
+            saida.append(resultado)
+        return saida
     
     async def _handle_ranking(self, produtos: list, **kwargs) -> Optional[Dict]:
         """Ranking de produtos com DeepSeek"""
@@ -81,9 +462,22 @@ class LLMRouter:
     
     async def _handle_copywriting(self, prompt: str, **kwargs) -> Optional[Dict]:
         """Copywriting com GPT"""
-        copy = await self.gpt.generate_copy(prompt, **kwargs)
+        opcoes = {chave: kwargs[chave] for chave in ("max_tokens", "temperature", "model") if chave in kwargs}
+        copy = await self.gpt.generate_copy(prompt, **opcoes)
         return {"copy": copy}
     
+    async def _handle_copywriting_deepseek(self, prompt: str, max_tokens: int = 500, **kwargs) -> Optional[Dict]:
+        """Copywriting com DeepSeek (reserva do GPT)"""
+        copy = await self.deepseek.generate_copy(prompt, max_tokens)
+        return {"copy": copy}
+    
+    async def _handle_copywriting_template(self, produto: Optional[Dict] = None, **kwargs) -> Optional[Dict]:
+        """Copy local do template de grupo (sem LLM; precisa do produto)"""
+        if not produto:
+            return None
+        conteudo = ContentGenerator().generate_for_canal("grupo", produto)
+        return {"copy": conteudo.get("copy_texto")}
+    
     async def _handle_variations(self, base_copy: str, num: int = 5, **kwargs) -> Optional[Dict]:
         """Variações de copy com GPT"""
         variations = await self.gpt.generate_variations(base_copy, num)
@@ -91,9 +485,15 @@ class LLMRouter:
     
     async def _handle_hashtags(self, produto: Dict, nicho: str, **kwargs) -> Optional[Dict]:
         """Geração de hashtags com GPT"""
-        hashtags = await self.gpt.generate_hashtags(produto, nicho, **kwargs)
+        opcoes = {chave: kwargs[chave] for chave in ("num_hashtags", "model") if chave in kwargs}
+        hashtags = await self.gpt.generate_hashtags(produto, nicho, **opcoes)
         return {"hashtags": hashtags}
     
+    async def _handle_hashtags_template(self, produto: Dict, nicho: str, num_hashtags: int = 10, **kwargs) -> Optional[Dict]:
+        """Hashtags locais pelo nome do produto e nicho (sem LLM)"""
+        tags = generate_hashtags(produto.get("nome", ""), nicho, max_hashtags=num_hashtags)
+        return {"hashtags": [f"#{tag}" for tag in tags]}
+    
     async def _handle_video_script(self, prompt: str, duracao: int = 30, **kwargs) -> Optional[Dict]:
         """Roteiro de vídeo com Gemini"""
         return await self.gemini.generate_video_script(prompt, duracao)
@@ -119,6 +519,31 @@ class LLMRouter:
             "gpt": self.gpt.client is not None,
             "gemini": self.gemini.model is not None
         }
+    
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        Hits/misses do cache de LLM acumulados por tarefa
+        
+        Returns:
+            Dict tarefa -> {"hits", "misses"}
+        """
+        return {tarefa: dict(totais) for tarefa, totais in self._cache_por_tarefa.items()}
+    
+    def get_roteamento_stats(self) -> Dict:
+        """
+        Latência por provedor, fallbacks, timeouts e hedges
+        
+        Returns:
+            Dict com latencia (p50/p95 por provedor), fallbacks por tarefa,
+            timeouts por provedor e hedges disparados/vencidos pelo reserva
+        """
+        return {
+            "latencia": self.latencias.get_stats(),
+            "fallbacks": {tarefa: dict(contagem) for tarefa, contagem in self._roteamento["fallbacks"].items()},
+            "timeouts": dict(self._roteamento["timeouts"]),
+            "hedges": self._roteamento["hedges"],
+            "hedges_vencidos": self._roteamento["hedges_vencidos"],
+        }
 
 
 # Instância global
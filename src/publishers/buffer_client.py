@@ -6,6 +6,7 @@ import httpx
 
 from config.credentials import credentials
 from src.utils.logger import get_logger
+from src.utils.resilience import resilience
 
 logger = get_logger(__name__)
 
@@ -20,10 +21,33 @@ class BufferClient:
     
     def __init__(self):
         self.access_token = credentials.BUFFER_ACCESS_TOKEN
+        self.host = httpx.URL(self.BASE_URL).host
+        self.resilience = resilience
         
         if not self.access_token:
             logger.warning("Buffer access token não configurado")
     
+    async def _request(self, method: str, url: str, idempotente: bool = True, **kwargs) -> httpx.Response:
+        """
+        Requisição HTTP com retry e circuit breaker
+        
+        Args:
+            method: Método HTTP
+            url: URL completa
+            idempotente: False para pedidos que não podem ser duplicados
+            **kwargs: Repassados ao httpx (params, data)
+            
+        Returns:
+            Resposta com status de sucesso
+        """
+        async def enviar():
+            async with httpx.AsyncClient() as client:
+                response = await client.request(method, url, **kwargs)
+                response.raise_for_status()
+                return response
+        
+        return await self.resilience.executar(self.host, enviar, idempotente=idempotente)
+    
     async def get_profiles(self) -> list:
         """
         Lista perfis conectados ao Buffer
@@ -38,14 +62,12 @@ class BufferClient:
         params = {"access_token": self.access_token}
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                
-                profiles = response.json()
-                logger.info(f"Buffer: {len(profiles)} perfis encontrados")
-                return profiles
-                
+            response = await self._request("GET", url, params=params)
+            
+            profiles = response.json()
+            logger.info(f"Buffer: {len(profiles)} perfis encontrados")
+            return profiles
+        
         except Exception as e:
             logger.error(f"Erro ao buscar perfis Buffer: {e}")
             return []
@@ -91,19 +113,18 @@ class BufferClient:
             data["now"] = False  # Adiciona à fila
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(url, data=data)
-                response.raise_for_status()
-                
-                result = response.json()
-                logger.info(
-                    "Post agendado no Buffer",
-                    profile_id=profile_id,
-                    update_id=result.get("updates", [{}])[0].get("id")
-                )
-                
-                return result
-                
+            # Agendar de novo após um timeout poderia duplicar o post
+            response = await self._request("POST", url, idempotente=False, data=data)
+            
+            result = response.json()
+            logger.info(
+                "Post agendado no Buffer",
+                profile_id=profile_id,
+                update_id=result.get("updates", [{}])[0].get("id")
+            )
+            
+            return result
+        
         except Exception as e:
             logger.error(f"Erro ao agendar no Buffer: {e}")
             return None
@@ -177,16 +198,14 @@ class BufferClient:
         params = {"access_token": self.access_token}
         
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.get(url, params=params)
-                response.raise_for_status()
-                
-                data = response.json()
-                posts = data.get("updates", [])
-                logger.info(f"Buffer: {len(posts)} posts pendentes")
-                
-                return posts
-                
+            response = await self._request("GET", url, params=params)
+            
+            data = response.json()
+            posts = data.get("updates", [])
+            logger.info(f"Buffer: {len(posts)} posts pendentes")
+            
+            return posts
+        
         except Exception as e:
             logger.error(f"Erro ao buscar posts pendentes: {e}")
             return []
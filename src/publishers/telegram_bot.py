@@ -7,6 +7,7 @@ from telegram.error import TelegramError
 
 from config.credentials import credentials
 from src.utils.logger import get_logger
+from src.utils.resilience import CircuitoAbertoError, resilience
 
 logger = get_logger(__name__)
 
@@ -19,6 +20,8 @@ class TelegramPublisher:
     def __init__(self):
         self.bot_token = credentials.TELEGRAM_BOT_TOKEN
         self.bot: Optional[Bot] = None
+        self.host = "api.telegram.org"
+        self.resilience = resilience
         
         if self.bot_token:
             self.bot = Bot(token=self.bot_token)
@@ -48,26 +51,30 @@ class TelegramPublisher:
             logger.error("Telegram bot não disponível")
             return False
         
-        try:
+        def enviar():
             if image_url:
-                await self.bot.send_photo(
+                return self.bot.send_photo(
                     chat_id=group_id,
                     photo=image_url,
                     caption=message,
                     parse_mode=parse_mode
                 )
-            else:
-                await self.bot.send_message(
-                    chat_id=group_id,
-                    text=message,
-                    parse_mode=parse_mode,
-                    disable_web_page_preview=False
-                )
+            return self.bot.send_message(
+                chat_id=group_id,
+                text=message,
+                parse_mode=parse_mode,
+                disable_web_page_preview=False
+            )
+        
+        try:
+            # Só repete quando o Telegram recusou (RetryAfter) ou a conexão
+            # nem abriu: um timeout pode já ter publicado a mensagem
+            await self.resilience.executar(self.host, enviar, idempotente=False)
             
             logger.info("Mensagem publicada no Telegram", group_id=group_id)
             return True
             
-        except TelegramError as e:
+        except (TelegramError, CircuitoAbertoError) as e:
             logger.error(f"Erro ao publicar no Telegram: {e}")
             return False
     
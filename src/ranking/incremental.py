@@ -0,0 +1,85 @@
+"""
+Re-ranking incremental de produtos
+
+Guarda em cada produto o fingerprint das entradas do score e a versão dos
+pesos. Só produtos cujo preço, comissão, rating, vendas, desconto ou pesos
+mudaram são pontuados de novo, e os scores voltam ao banco em um único
+UPDATE em lote.
+"""
+import time
+from typing import Dict, Optional
+
+from sqlalchemy.orm import Session
+
+from src.database import repository
+from src.ranking.scorer import CAMPOS_SCORE, ProductScorer
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def reranquear_nicho(
+    db: Session,
+    nicho: Optional[str] = None,
+    scorer: Optional[ProductScorer] = None,
+    forcar: bool = False
+) -> Dict:
+    """
+    Re-ranqueia os produtos ativos de um nicho (ou de todos)
+    
+    Args:
+        db: Sessão do banco
+        nicho: Nicho a re-ranquear (None = catálogo inteiro)
+        scorer: Scorer a usar (padrão: ProductScorer())
+        forcar: Pontua todos os produtos, mesmo sem mudanças
+        
+    Returns:
+        Dict com total analisado, reranqueados, inalterados e duração
+    """
+    inicio = time.perf_counter()
+    scorer = scorer or ProductScorer()
+    
+    linhas = repository.ProdutoRepository.listar_entradas_score(db, nicho)
+    
+    # Filtra os produtos cujas entradas (ou pesos) mudaram desde o último score
+    pendentes = []
+    fingerprints = []
+    for linha in linhas:
+        produto = {campo: getattr(linha, campo) for campo in CAMPOS_SCORE}
+        fingerprint = scorer.fingerprint(produto)
+        
+        if (
+            forcar
+            or fingerprint != linha.score_fingerprint
+            or linha.score_versao_pesos != scorer.versao_pesos
+        ):
+            pendentes.append((linha.id, produto))
+            fingerprints.append(fingerprint)
+    
+    atualizacoes = []
+    if pendentes:
+        resultado = scorer.score_batch([produto for _, produto in pendentes])
+        
+        for i, (produto_id, _) in enumerate(pendentes):
+            score, motivo = resultado.resultado(i)
+            atualizacoes.append({
+                "id": produto_id,
+                "score_ranking": score,
+                "motivo_ranking": motivo,
+                "score_fingerprint": fingerprints[i],
+                "score_versao_pesos": scorer.versao_pesos,
+            })
+    
+    repository.ProdutoRepository.atualizar_scores_em_lote(db, atualizacoes)
+    
+    relatorio = {
+        "nicho": nicho,
+        "total": len(linhas),
+        "reranqueados": len(atualizacoes),
+        "inalterados": len(linhas) - len(atualizacoes),
+        "duracao_s": round(time.perf_counter() - inicio, 3),
+    }
+    
+    logger.info("Re-ranking incremental", **relatorio)
+    
+    return relatorio
@@ -1,7 +1,11 @@
 """
 Algoritmo de pontuação de produtos
 """
-from typing import Dict
+import hashlib
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+
 from config.constants import (
     PESO_COMISSAO,
     PESO_PRECO,
@@ -13,6 +17,83 @@ from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Campos usados no cálculo do score
+CAMPOS_SCORE = (
+    "comissao_percentual",
+    "preco_original",
+    "preco_promocional",
+    "rating",
+    "total_vendas",
+    "desconto_percentual",
+)
+
+
+class BatchScoreResult:
+    """
+    Resultado de ProductScorer.score_batch
+    
+    Guarda os scores totais e parciais como arrays. Arredondamento e
+    explicação são feitos sob demanda, só para as linhas consultadas.
+    """
+    
+    def __init__(self, scorer: "ProductScorer", totais: np.ndarray, parciais: Dict[str, np.ndarray]):
+        """
+        Args:
+            scorer: Scorer que gerou o resultado (usado nas explicações)
+            totais: Score ponderado de cada produto, sem arredondamento
+            parciais: Scores parciais por fator (comissao, preco, rating, vendas, desconto)
+        """
+        self._scorer = scorer
+        self.totais = totais
+        self.parciais = parciais
+    
+    def __len__(self) -> int:
+        return len(self.totais)
+    
+    def score(self, i: int) -> float:
+        """Score arredondado do produto i (igual a calcular_score)"""
+        return round(float(self.totais[i]), 2)
+    
+    def explicacao(self, i: int) -> str:
+        """Explicação do score do produto i"""
+        parciais = {fator: float(valores[i]) for fator, valores in self.parciais.items()}
+        return self._scorer._gerar_explicacao(parciais, float(self.totais[i]))
+    
+    def resultado(self, i: int) -> tuple[float, str]:
+        """
+        Score e explicação do produto i
+        
+        Returns:
+            Tuple (score, explicação), idêntica a calcular_score
+        """
+        return self.score(i), self.explicacao(i)
+    
+    def ordem(self, n: Optional[int] = None) -> np.ndarray:
+        """
+        Índices dos produtos do maior para o menor score
+        
+        Empates mantêm a ordem de entrada. Com n, só os n primeiros são
+        ordenados (seleção parcial, O(N)).
+        
+        Args:
+            n: Quantidade de índices (None = todos)
+            
+        Returns:
+            Array de índices
+        """
+        totais = self.totais
+        
+        if n is None or n >= len(totais):
+            return np.argsort(-totais, kind="stable")
+        if n <= 0:
+            return np.empty(0, dtype=np.intp)
+        
+        # Candidatos: tudo que empata ou supera o n-ésimo maior score
+        limite = np.partition(totais, len(totais) - n)[len(totais) - n]
+        candidatos = np.flatnonzero(totais >= limite)
+        
+        return candidatos[np.argsort(-totais[candidatos], kind="stable")][:n]
+
 
 class ProductScorer:
     """
@@ -25,6 +106,42 @@ class ProductScorer:
         self.peso_rating = PESO_RATING
         self.peso_vendas = PESO_VENDAS
         self.peso_desconto = PESO_DESCONTO
+        self.versao_pesos = self._calcular_versao_pesos()
+    
+    def _calcular_versao_pesos(self) -> str:
+        """
+        Identificador dos pesos atuais
+        
+        Muda sempre que algum peso muda, invalidando os scores salvos.
+        
+        Returns:
+            Hash curto dos pesos
+        """
+        pesos = (
+            self.peso_comissao,
+            self.peso_preco,
+            self.peso_rating,
+            self.peso_vendas,
+            self.peso_desconto,
+        )
+        return hashlib.blake2b(repr(pesos).encode(), digest_size=6).hexdigest()
+    
+    @staticmethod
+    def fingerprint(produto: Dict) -> str:
+        """
+        Fingerprint dos campos que entram no score
+        
+        Dois produtos com o mesmo fingerprint (e mesma versão de pesos) têm
+        o mesmo score, então o re-ranking pode pulá-los.
+        
+        Args:
+            produto: Dados do produto
+            
+        Returns:
+            Hash curto dos campos de score
+        """
+        valores = "|".join(repr(float(produto.get(campo) or 0)) for campo in CAMPOS_SCORE)
+        return hashlib.blake2b(valores.encode(), digest_size=8).hexdigest()
     
     def calcular_score(self, produto: Dict) -> tuple[float, str]:
         """
@@ -39,12 +156,12 @@ class ProductScorer:
         scores_parciais = {}
         
         # 1. Score de Comissão (0-100)
-        comissao_pct = produto.get("comissao_percentual", 0)
+        comissao_pct = produto.get("comissao_percentual") or 0
         score_comissao = min(comissao_pct * 5, 100)  # 20% = score 100
         scores_parciais["comissao"] = score_comissao
         
         # 2. Score de Preço (produtos entre R$50-200 são ideais)
-        preco = produto.get("preco_promocional") or produto.get("preco_original", 0)
+        preco = produto.get("preco_promocional") or produto.get("preco_original") or 0
         if 50 <= preco <= 200:
             score_preco = 100
         elif preco < 50:
@@ -54,18 +171,18 @@ class ProductScorer:
         scores_parciais["preco"] = score_preco
         
         # 3. Score de Rating (0-5 -> 0-100)
-        rating = produto.get("rating", 0)
+        rating = produto.get("rating") or 0
         score_rating = (rating / 5) * 100
         scores_parciais["rating"] = score_rating
         
         # 4. Score de Vendas (normalizado)
-        vendas = produto.get("total_vendas", 0)
+        vendas = produto.get("total_vendas") or 0
         # Vendas > 1000 = score 100
         score_vendas = min((vendas / 1000) * 100, 100)
         scores_parciais["vendas"] = score_vendas
         
         # 5. Score de Desconto (0-100)
-        desconto = produto.get("desconto_percentual", 0)
+        desconto = produto.get("desconto_percentual") or 0
         score_desconto = min(desconto * 2, 100)  # 50% desconto = score 100
         scores_parciais["desconto"] = score_desconto
         
@@ -89,6 +206,92 @@ class ProductScorer:
         
         return round(score_final, 2), explicacao
     
+    def score_batch(self, produtos: Union[List[Dict], Dict[str, np.ndarray]]) -> BatchScoreResult:
+        """
+        Calcula o score de muitos produtos de uma vez com operações NumPy
+        
+        Produz exatamente os mesmos números de calcular_score (campos
+        ausentes ou None valem 0), mas sem laço Python por produto. As
+        explicações só são geradas para as linhas consultadas no resultado.
+        
+        Args:
+            produtos: Lista de dicts de produto ou dict colunar
+                ({"comissao_percentual": array, "preco_original": array, ...})
+                
+        Returns:
+            BatchScoreResult com totais e parciais por produto
+        """
+        colunas = self._extrair_colunas(produtos)
+        
+        # 1. Comissão (20% = score 100)
+        score_comissao = np.minimum(colunas["comissao_percentual"] * 5, 100)
+        
+        # 2. Preço (R$50-200 ideal); promocional zerado usa o original
+        promocional = colunas["preco_promocional"]
+        preco = np.where(promocional != 0, promocional, colunas["preco_original"])
+        score_preco = np.where(
+            preco < 50,
+            (preco / 50) * 100,
+            np.where(preco <= 200, 100.0, np.maximum(100 - ((preco - 200) / 10), 0))
+        )
+        
+        # 3. Rating (0-5 -> 0-100)
+        score_rating = (colunas["rating"] / 5) * 100
+        
+        # 4. Vendas (> 1000 = score 100)
+        score_vendas = np.minimum((colunas["total_vendas"] / 1000) * 100, 100)
+        
+        # 5. Desconto (50% = score 100)
+        score_desconto = np.minimum(colunas["desconto_percentual"] * 2, 100)
+        
+        # Mesma ordem de soma do cálculo escalar (mantém os floats idênticos)
+        totais = (
+            score_comissao * self.peso_comissao +
+            score_preco * self.peso_preco +
+            score_rating * self.peso_rating +
+            score_vendas * self.peso_vendas +
+            score_desconto * self.peso_desconto
+        )
+        
+        return BatchScoreResult(self, totais, {
+            "comissao": score_comissao,
+            "preco": score_preco,
+            "rating": score_rating,
+            "vendas": score_vendas,
+            "desconto": score_desconto,
+        })
+    
+    @staticmethod
+    def _extrair_colunas(produtos) -> Dict[str, np.ndarray]:
+        """
+        Converte produtos (lista de dicts ou colunar) em arrays float64
+        
+        Args:
+            produtos: Lista de dicts ou dict de colunas
+            
+        Returns:
+            Dict campo -> array, com None/NaN/ausente convertidos para 0
+        """
+        if isinstance(produtos, dict):
+            tamanho = max((len(v) for v in produtos.values()), default=0)
+            colunas = {}
+            for campo in CAMPOS_SCORE:
+                if campo in produtos:
+                    valores = np.asarray(produtos[campo], dtype=np.float64)
+                    colunas[campo] = np.nan_to_num(valores, nan=0.0)
+                else:
+                    colunas[campo] = np.zeros(tamanho)
+            return colunas
+        
+        return {
+            campo: np.fromiter(
+                (p.get(campo) or 0 for p in produtos),
+                dtype=np.float64,
+                count=len(produtos)
+            )
+            for campo in CAMPOS_SCORE
+        }
+    
     def _gerar_explicacao(self, scores: Dict[str, float], score_final: float) -> str:
         """
         Gera explicação textual do score
@@ -1,24 +1,166 @@
 """
 Seletor de produtos top ranqueados
 """
-from typing import List, Dict
+import heapq
+from typing import AsyncIterable, Dict, Iterable, List, Optional, Tuple
+
 from src.ranking.scorer import ProductScorer
 from src.utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Produtos pontuados por vez com score_batch durante a seleção em streaming
+TAMANHO_BLOCO_SCORE = 4096
+
+# Faixas de preço usadas na seleção diversificada (ordem importa)
+FAIXAS_PRECO = ("ate_50", "50_100", "100_200", "acima_200")
+
+
+def _preco(produto: Dict) -> float:
+    """Preço efetivo do produto (promocional, se houver)"""
+    return produto.get("preco_promocional") or produto.get("preco_original") or 0
+
+
+def _faixa_preco(produto: Dict) -> str:
+    """Faixa de preço do produto"""
+    preco = _preco(produto)
+    
+    if preco <= 50:
+        return "ate_50"
+    elif preco <= 100:
+        return "50_100"
+    elif preco <= 200:
+        return "100_200"
+    return "acima_200"
+
+
+class _TopN:
+    """
+    Heap limitado com os N maiores scores
+    
+    A chave (score, -seq) faz empates manterem a ordem de chegada, igual a
+    um sorted(..., reverse=True) estável sobre a lista inteira.
+    """
+    
+    def __init__(self, n: int):
+        self.n = n
+        self._heap: List[Tuple[float, int, Dict]] = []
+        self._seq = 0
+    
+    def adicionar(self, score: float, produto: Dict):
+        seq = self._seq
+        self._seq += 1
+        
+        if self.n <= 0:
+            return
+        
+        entrada = (score, -seq, produto)
+        if len(self._heap) < self.n:
+            heapq.heappush(self._heap, entrada)
+        elif entrada[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, entrada)
+    
+    def ordenados(self) -> List[Tuple[float, Dict]]:
+        """Itens do maior para o menor score (empates na ordem de chegada)"""
+        return [
+            (score, produto)
+            for score, _, produto in sorted(self._heap, key=lambda e: (-e[0], -e[1]))
+        ]
+
+
+class _SelecaoStreaming:
+    """
+    Acumula produtos em streaming, pontuando em blocos com score_batch
+    
+    Mantém um heap limitado (global ou um por faixa de preço), então a
+    memória fica em O(N + bloco) e o tempo em O(M log N).
+    """
+    
+    def __init__(
+        self,
+        scorer: ProductScorer,
+        n: int,
+        filtros: Optional[Dict] = None,
+        cotas_por_faixa: Optional[Dict[str, int]] = None,
+        tamanho_bloco: int = TAMANHO_BLOCO_SCORE
+    ):
+        self.scorer = scorer
+        self.filtros = filtros
+        self.tamanho_bloco = max(1, tamanho_bloco)
+        self.cotas_por_faixa = cotas_por_faixa
+        
+        if cotas_por_faixa is None:
+            self.heap = _TopN(n)
+        else:
+            self.heaps = {faixa: _TopN(cota) for faixa, cota in cotas_por_faixa.items()}
+        
+        self.analisados = 0
+        self._bloco: List[Dict] = []
+    
+    def adicionar(self, produto: Dict):
+        self.analisados += 1
+        
+        if self.filtros and not ProductSelector._passa_filtros(produto, self.filtros):
+            return
+        
+        self._bloco.append(produto)
+        if len(self._bloco) >= self.tamanho_bloco:
+            self._processar_bloco()
+    
+    def _processar_bloco(self):
+        if not self._bloco:
+            return
+        
+        totais = self.scorer.score_batch(self._bloco).totais.tolist()
+        
+        for produto, total in zip(self._bloco, totais):
+            # Mesmo arredondamento de calcular_score (a ordenação usa o score exibido)
+            score = round(total, 2)
+            if self.cotas_por_faixa is None:
+                self.heap.adicionar(score, produto)
+            else:
+                self.heaps[_faixa_preco(produto)].adicionar(score, produto)
+        
+        self._bloco = []
+    
+    def finalizar(self) -> List[Tuple[float, Dict]]:
+        """
+        Retorna a seleção ordenada por score
+        
+        Na seleção por faixa, as faixas são concatenadas na ordem de
+        FAIXAS_PRECO e reordenadas de forma estável pelo score.
+        """
+        self._processar_bloco()
+        
+        if self.cotas_por_faixa is None:
+            return self.heap.ordenados()
+        
+        selecionados = []
+        for faixa in FAIXAS_PRECO:
+            selecionados.extend(self.heaps[faixa].ordenados())
+        
+        return sorted(selecionados, key=lambda item: item[0], reverse=True)
+
 
 class ProductSelector:
     """
     Seleciona os melhores produtos baseado em score
+    
+    Aceita listas, geradores ou iteradores assíncronos de produtos: a
+    seleção é feita em streaming, sem ordenar (nem copiar) a lista inteira.
     """
     
-    def __init__(self):
+    def __init__(self, tamanho_bloco: int = TAMANHO_BLOCO_SCORE):
+        """
+        Args:
+            tamanho_bloco: Produtos pontuados por vez com score_batch
+        """
         self.scorer = ProductScorer()
+        self.tamanho_bloco = tamanho_bloco
     
     def selecionar_top_n(
         self,
-        produtos: List[Dict],
+        produtos: Iterable[Dict],
         n: int = 10,
         filtros: Dict = None
     ) -> List[Dict]:
@@ -26,44 +168,57 @@ class ProductSelector:
         Seleciona os top N produtos
         
         Args:
-            produtos: Lista de produtos
+            produtos: Produtos (lista ou qualquer iterável)
             n: Número de produtos a selecionar
             filtros: Filtros opcionais (ex: {"preco_max": 200})
             
         Returns:
             Lista dos top N produtos ordenados por score
         """
-        if not produtos:
-            logger.warning("Lista de produtos vazia")
-            return []
+        selecao = _SelecaoStreaming(self.scorer, n, filtros, tamanho_bloco=self.tamanho_bloco)
         
-        # Aplica filtros se existirem
-        produtos_filtrados = produtos
-        if filtros:
-            produtos_filtrados = self._aplicar_filtros(produtos, filtros)
+        for produto in produtos:
+            selecao.adicionar(produto)
         
-        # Calcula scores para todos os produtos
-        produtos_com_score = []
-        for produto in produtos_filtrados:
-            score, explicacao = self.scorer.calcular_score(produto)
-            produto_scored = produto.copy()
-            produto_scored["score_calculado"] = score
-            produto_scored["explicacao_score"] = explicacao
-            produtos_com_score.append(produto_scored)
+        return self._montar_top_n(selecao)
+    
+    async def selecionar_top_n_async(
+        self,
+        produtos: AsyncIterable[Dict],
+        n: int = 10,
+        filtros: Dict = None
+    ) -> List[Dict]:
+        """
+        Seleciona os top N produtos de um iterador assíncrono
         
-        # Ordena por score (maior primeiro)
-        produtos_ordenados = sorted(
-            produtos_com_score,
-            key=lambda p: p["score_calculado"],
-            reverse=True
-        )
+        Ex: direto de ShopeeAffiliateAPI.iter_product_offers (após o parse).
         
-        # Retorna top N
-        top_n = produtos_ordenados[:n]
+        Args:
+            produtos: Iterador assíncrono de produtos
+            n: Número de produtos a selecionar
+            filtros: Filtros opcionais (ex: {"preco_max": 200})
+            
+        Returns:
+            Lista dos top N produtos ordenados por score
+        """
+        selecao = _SelecaoStreaming(self.scorer, n, filtros, tamanho_bloco=self.tamanho_bloco)
+        
+        async for produto in produtos:
+            selecao.adicionar(produto)
+        
+        return self._montar_top_n(selecao)
+    
+    def _montar_top_n(self, selecao: _SelecaoStreaming) -> List[Dict]:
+        """Copia e explica apenas os produtos selecionados"""
+        if not selecao.analisados:
+            logger.warning("Lista de produtos vazia")
+            return []
+        
+        top_n = self._com_score(selecao.finalizar())
         
         logger.info(
             "Produtos selecionados",
-            total_analisados=len(produtos),
+            total_analisados=selecao.analisados,
             total_selecionados=len(top_n),
             score_max=top_n[0]["score_calculado"] if top_n else 0,
             score_min=top_n[-1]["score_calculado"] if top_n else 0
@@ -71,56 +226,40 @@ class ProductSelector:
         
         return top_n
     
-    def _aplicar_filtros(self, produtos: List[Dict], filtros: Dict) -> List[Dict]:
+    def _com_score(self, selecionados: List[Tuple[float, Dict]]) -> List[Dict]:
+        """Adiciona score_calculado e explicacao_score a cópias dos produtos"""
+        resultado = []
+        for score, produto in selecionados:
+            _, explicacao = self.scorer.calcular_score(produto)
+            produto_scored = produto.copy()
+            produto_scored["score_calculado"] = score
+            produto_scored["explicacao_score"] = explicacao
+            resultado.append(produto_scored)
+        return resultado
+    
+    @staticmethod
+    def _passa_filtros(produto: Dict, filtros: Dict) -> bool:
         """
-        Aplica filtros aos produtos
+        Verifica se um produto atende aos filtros
         
         Args:
-            produtos: Lista de produtos
+            produto: Dados do produto
             filtros: Dicionário de filtros
             
         Returns:
-            Produtos filtrados
-        """
-        produtos_filtrados = produtos.copy()
-        
-        # Filtro de preço máximo
-        if "preco_max" in filtros:
-            produtos_filtrados = [
-                p for p in produtos_filtrados
-                if (p.get("preco_promocional") or p.get("preco_original", 0)) <= filtros["preco_max"]
-            ]
-        
-        # Filtro de preço mínimo
-        if "preco_min" in filtros:
-            produtos_filtrados = [
-                p for p in produtos_filtrados
-                if (p.get("preco_promocional") or p.get("preco_original", 0)) >= filtros["preco_min"]
-            ]
-        
-        # Filtro de rating mínimo
-        if "rating_min" in filtros:
-            produtos_filtrados = [
-                p for p in produtos_filtrados
-                if p.get("rating", 0) >= filtros["rating_min"]
-            ]
-        
-        # Filtro de comissão mínima
-        if "comissao_min" in filtros:
-            produtos_filtrados = [
-                p for p in produtos_filtrados
-                if p.get("comissao_percentual", 0) >= filtros["comissao_min"]
-            ]
-        
-        logger.debug(
-            "Filtros aplicados",
-            total_antes=len(produtos),
-            total_depois=len(produtos_filtrados)
-        )
-        
-        return produtos_filtrados
+            True se o produto passa em todos os filtros
+        """
+        if "preco_max" in filtros and _preco(produto) > filtros["preco_max"]:
+            return False
+        if "preco_min" in filtros and _preco(produto) < filtros["preco_min"]:
+            return False
+        if "rating_min" in filtros and (produto.get("rating") or 0) < filtros["rating_min"]:
+            return False
+        if "comissao_min" in filtros and (produto.get("comissao_percentual") or 0) < filtros["comissao_min"]:
+            return False
+        return True
     
-    def agrupar_por_faixa_preco(self, produtos: List[Dict]) -> Dict[str, List[Dict]]:
+    def agrupar_por_faixa_preco(self, produtos: Iterable[Dict]) -> Dict[str, List[Dict]]:
         """
         Agrupa produtos por faixa de preço
         
@@ -130,66 +269,82 @@ class ProductSelector:
         Returns:
             Dict com produtos agrupados por faixa
         """
-        faixas = {
-            "ate_50": [],
-            "50_100": [],
-            "100_200": [],
-            "acima_200": []
-        }
+        faixas = {faixa: [] for faixa in FAIXAS_PRECO}
         
         for produto in produtos:
-            preco = produto.get("preco_promocional") or produto.get("preco_original", 0)
-            
-            if preco <= 50:
-                faixas["ate_50"].append(produto)
-            elif preco <= 100:
-                faixas["50_100"].append(produto)
-            elif preco <= 200:
-                faixas["100_200"].append(produto)
-            else:
-                faixas["acima_200"].append(produto)
+            faixas[_faixa_preco(produto)].append(produto)
         
         return faixas
     
+    def _cotas_por_faixa(self, n: int) -> Dict[str, int]:
+        """Divide n igualmente entre as faixas (as primeiras recebem o resto)"""
+        produtos_por_faixa = n // len(FAIXAS_PRECO)
+        resto = n % len(FAIXAS_PRECO)
+        
+        return {
+            faixa: produtos_por_faixa + (1 if i < resto else 0)
+            for i, faixa in enumerate(FAIXAS_PRECO)
+        }
+    
     def diversificar_selecao(
         self,
-        produtos: List[Dict],
+        produtos: Iterable[Dict],
         n: int = 10
     ) -> List[Dict]:
         """
         Seleciona produtos diversificados (diferentes faixas de preço)
         
+        Uma única passada, com um heap limitado por faixa de preço.
+        
         Args:
-            produtos: Lista de produtos
+            produtos: Produtos (lista ou qualquer iterável)
             n: Número total de produtos a selecionar
             
         Returns:
             Lista diversificada de produtos
         """
-        # Agrupa por faixa de preço
-        por_faixa = self.agrupar_por_faixa_preco(produtos)
+        selecao = _SelecaoStreaming(
+            self.scorer,
+            n,
+            cotas_por_faixa=self._cotas_por_faixa(n),
+            tamanho_bloco=self.tamanho_bloco
+        )
         
-        # Distribui seleção entre faixas
-        produtos_por_faixa = n // 4  # Divide igualmente
-        resto = n % 4
+        for produto in produtos:
+            selecao.adicionar(produto)
         
-        selecionados = []
+        return self._montar_diversificada(selecao, n)
+    
+    async def diversificar_selecao_async(
+        self,
+        produtos: AsyncIterable[Dict],
+        n: int = 10
+    ) -> List[Dict]:
+        """
+        Seleção diversificada a partir de um iterador assíncrono
         
-        for i, (faixa, produtos_faixa) in enumerate(por_faixa.items()):
-            # Adiciona 1 extra para as primeiras faixas se houver resto
-            quantidade = produtos_por_faixa + (1 if i < resto else 0)
+        Args:
+            produtos: Iterador assíncrono de produtos
+            n: Número total de produtos a selecionar
             
-            # Seleciona top da faixa
-            top_faixa = self.selecionar_top_n(produtos_faixa, quantidade)
-            selecionados.extend(top_faixa)
-        
-        # Ordena resultado final por score
-        selecionados_ordenados = sorted(
-            selecionados,
-            key=lambda p: p.get("score_calculado", 0),
-            reverse=True
+        Returns:
+            Lista diversificada de produtos
+        """
+        selecao = _SelecaoStreaming(
+            self.scorer,
+            n,
+            cotas_por_faixa=self._cotas_por_faixa(n),
+            tamanho_bloco=self.tamanho_bloco
         )
         
-        logger.info("Seleção diversificada realizada", total=len(selecionados_ordenados))
+        async for produto in produtos:
+            selecao.adicionar(produto)
+        
+        return self._montar_diversificada(selecao, n)
+    
+    def _montar_diversificada(self, selecao: _SelecaoStreaming, n: int) -> List[Dict]:
+        selecionados = self._com_score(selecao.finalizar()[:n])
+        
+        logger.info("Seleção diversificada realizada", total=len(selecionados))
         
-        return selecionados_ordenados[:n]
+        return selecionados
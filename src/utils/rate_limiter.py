@@ -0,0 +1,349 @@
+"""
+Rate limiting assíncrono com token bucket
+
+Usado para respeitar SHOPEE_API_RATE_LIMIT em todas as chamadas assinadas
+à API Shopee. Quem chama entra em fila (FIFO) e espera por um token em vez
+de falhar; o tempo de espera é registrado como métrica.
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+
+from config.constants import (
+    SHOPEE_API_RATE_LIMIT,
+    SHOPEE_API_BURST,
+    SHOPEE_API_ENDPOINT_RATE_LIMITS,
+)
+from config.credentials import credentials
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+class _LoopLock:
+    """asyncio.Lock recriado quando o event loop muda (ex: vários asyncio.run)"""
+    
+    def __init__(self):
+        self._lock: Optional[asyncio.Lock] = None
+        self._loop = None
+    
+    def get(self) -> asyncio.Lock:
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        return self._lock
+
+
+class TokenBucket:
+    """
+    Token bucket em memória (por processo)
+    
+    Acumula até `capacidade` tokens, repostos a `taxa_por_segundo`.
+    """
+    
+    def __init__(self, capacidade: float, taxa_por_segundo: float):
+        """
+        Args:
+            capacidade: Máximo de tokens acumulados (tamanho do burst)
+            taxa_por_segundo: Tokens repostos por segundo
+        """
+        self.capacidade = float(capacidade)
+        self.taxa_por_segundo = float(taxa_por_segundo)
+        self.tokens = float(capacidade)
+        self.atualizado_em = time.monotonic()
+        self._lock = _LoopLock()
+    
+    def _reabastecer(self):
+        """Repõe os tokens proporcionais ao tempo decorrido"""
+        agora = time.monotonic()
+        decorrido = agora - self.atualizado_em
+        self.tokens = min(self.capacidade, self.tokens + decorrido * self.taxa_por_segundo)
+        self.atualizado_em = agora
+    
+    def try_acquire(self, tokens: float = 1) -> float:
+        """
+        Tenta consumir tokens sem esperar
+        
+        Args:
+            tokens: Quantidade de tokens
+            
+        Returns:
+            0 se consumiu, senão segundos até haver tokens suficientes
+        """
+        self._reabastecer()
+        
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        
+        return (tokens - self.tokens) / self.taxa_por_segundo
+    
+    async def acquire(self, tokens: float = 1) -> float:
+        """
+        Consome tokens, esperando na fila se necessário
+        
+        Args:
+            tokens: Quantidade de tokens
+            
+        Returns:
+            Tempo total de espera em segundos
+        """
+        inicio = time.monotonic()
+        
+        async with self._lock.get():
+            while True:
+                espera = self.try_acquire(tokens)
+                if espera == 0:
+                    break
+                await asyncio.sleep(espera)
+        
+        return time.monotonic() - inicio
+
+
+class DatabaseTokenBucket:
+    """
+    Token bucket persistido na tabela rate_limit_buckets
+    
+    Permite que vários workers (processos) dividam o mesmo orçamento. O
+    consumo é um único UPDATE condicional, atômico tanto no SQLite quanto
+    no PostgreSQL.
+    """
+    
+    def __init__(
+        self,
+        nome: str,
+        capacidade: float,
+        taxa_por_segundo: float,
+        session_factory=None
+    ):
+        """
+        Args:
+            nome: Nome do bucket (chave na tabela)
+            capacidade: Máximo de tokens acumulados
+            taxa_por_segundo: Tokens repostos por segundo
+            session_factory: Factory de sessões (padrão: SessionLocal)
+        """
+        self.nome = nome
+        self.capacidade = float(capacidade)
+        self.taxa_por_segundo = float(taxa_por_segundo)
+        self._session_factory = session_factory
+        self._lock = _LoopLock()
+        self._inicializado = False
+    
+    def _get_session(self):
+        if self._session_factory is None:
+            from src.database.connection import SessionLocal
+            self._session_factory = SessionLocal
+        return self._session_factory()
+    
+    def _inicializar(self, db):
+        """Cria a linha do bucket se ainda não existir"""
+        from src.database.models import RateLimitBucket
+        
+        if db.get(RateLimitBucket, self.nome) is None:
+            db.add(RateLimitBucket(
+                nome=self.nome,
+                tokens=self.capacidade,
+                atualizado_em=time.time()
+            ))
+            try:
+                db.commit()
+            except Exception:
+                # Outro worker criou a linha ao mesmo tempo
+                db.rollback()
+        
+        self._inicializado = True
+    
+    def try_acquire(self, tokens: float = 1) -> float:
+        """
+        Tenta consumir tokens do bucket compartilhado
+        
+        Args:
+            tokens: Quantidade de tokens
+            
+        Returns:
+            0 se consumiu, senão segundos até haver tokens suficientes
+        """
+        from sqlalchemy import func, literal, select, update
+        from src.database.models import RateLimitBucket
+        
+        db = self._get_session()
+        try:
+            if not self._inicializado:
+                self._inicializar(db)
+            
+            postgres = db.get_bind().dialect.name == "postgresql"
+            menor = func.least if postgres else func.min
+            maior = func.greatest if postgres else func.max
+            
+            agora = time.time()
+            decorrido = maior(literal(0.0), literal(agora) - RateLimitBucket.atualizado_em)
+            disponiveis = menor(
+                literal(self.capacidade),
+                RateLimitBucket.tokens + decorrido * self.taxa_por_segundo
+            )
+            
+            result = db.execute(
+                update(RateLimitBucket)
+                .where(RateLimitBucket.nome == self.nome, disponiveis >= tokens)
+                .values(tokens=disponiveis - tokens, atualizado_em=agora)
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            
+            if result.rowcount == 1:
+                return 0.0
+            
+            atuais = db.execute(
+                select(disponiveis).where(RateLimitBucket.nome == self.nome)
+            ).scalar() or 0.0
+            return max((tokens - atuais) / self.taxa_por_segundo, 0.01)
+        finally:
+            db.close()
+    
+    async def acquire(self, tokens: float = 1) -> float:
+        """
+        Consome tokens, esperando na fila se necessário
+        
+        Args:
+            tokens: Quantidade de tokens
+            
+        Returns:
+            Tempo total de espera em segundos
+        """
+        inicio = time.monotonic()
+        
+        async with self._lock.get():
+            while True:
+                espera = await asyncio.to_thread(self.try_acquire, tokens)
+                if espera == 0:
+                    break
+                await asyncio.sleep(espera)
+        
+        return time.monotonic() - inicio
+
+
+class RateLimiter:
+    """
+    Limitador com um bucket global e buckets opcionais por endpoint
+    
+    Cada chamada passa primeiro pelo bucket do endpoint (se configurado) e
+    depois pelo bucket global.
+    """
+    
+    def __init__(
+        self,
+        nome: str,
+        limite_por_minuto: int,
+        burst: Optional[int] = None,
+        limites_por_endpoint: Optional[Dict[str, int]] = None,
+        backend: str = "memory",
+        session_factory=None
+    ):
+        """
+        Args:
+            nome: Nome do limitador (prefixo dos buckets persistidos)
+            limite_por_minuto: Chamadas por minuto no bucket global
+            burst: Capacidade dos buckets (padrão: limite_por_minuto)
+            limites_por_endpoint: Limites por minuto específicos por endpoint
+            backend: "memory" (por processo) ou "database" (compartilhado)
+            session_factory: Factory de sessões para o backend database
+        """
+        self.nome = nome
+        self.backend = backend
+        self.burst = burst
+        self.session_factory = session_factory
+        self.limites_por_endpoint = limites_por_endpoint or {}
+        
+        self.bucket_global = self._criar_bucket(nome, limite_por_minuto)
+        self.buckets_endpoint = {
+            endpoint: self._criar_bucket(f"{nome}:{endpoint}", limite)
+            for endpoint, limite in self.limites_por_endpoint.items()
+        }
+        
+        self._stats: Dict[str, Dict] = {}
+    
+    def _criar_bucket(self, nome: str, limite_por_minuto: int):
+        capacidade = min(self.burst or limite_por_minuto, limite_por_minuto)
+        taxa = limite_por_minuto / 60.0
+        
+        if self.backend == "database":
+            return DatabaseTokenBucket(nome, capacidade, taxa, self.session_factory)
+        return TokenBucket(capacidade, taxa)
+    
+    def _stats_endpoint(self, endpoint: str) -> Dict:
+        if endpoint not in self._stats:
+            self._stats[endpoint] = {
+                "requisicoes": 0,
+                "aguardando": 0,
+                "espera_total_s": 0.0,
+                "espera_max_s": 0.0,
+                "requisicoes_com_espera": 0,
+            }
+        return self._stats[endpoint]
+    
+    async def acquire(self, endpoint: str = "default") -> float:
+        """
+        Aguarda permissão para uma chamada ao endpoint
+        
+        Args:
+            endpoint: Caminho da API (ex: /link/generate)
+            
+        Returns:
+            Tempo de espera na fila em segundos
+        """
+        stats = self._stats_endpoint(endpoint)
+        stats["aguardando"] += 1
+        
+        try:
+            espera = 0.0
+            bucket_endpoint = self.buckets_endpoint.get(endpoint)
+            if bucket_endpoint is not None:
+                espera += await bucket_endpoint.acquire()
+            espera += await self.bucket_global.acquire()
+        finally:
+            stats["aguardando"] -= 1
+        
+        stats["requisicoes"] += 1
+        stats["espera_total_s"] += espera
+        stats["espera_max_s"] = max(stats["espera_max_s"], espera)
+        if espera > 0.001:
+            stats["requisicoes_com_espera"] += 1
+            logger.debug("Requisição aguardou rate limit", endpoint=endpoint, espera_s=round(espera, 3))
+        
+        return espera
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna métricas de fila por endpoint
+        
+        Returns:
+            Dict com requisições, esperas (média/máxima) e fila atual
+        """
+        endpoints = {}
+        for endpoint, stats in self._stats.items():
+            requisicoes = stats["requisicoes"]
+            endpoints[endpoint] = {
+                "requisicoes": requisicoes,
+                "aguardando": stats["aguardando"],
+                "requisicoes_com_espera": stats["requisicoes_com_espera"],
+                "espera_media_ms": round(stats["espera_total_s"] / requisicoes * 1000, 3) if requisicoes else 0.0,
+                "espera_max_ms": round(stats["espera_max_s"] * 1000, 3),
+            }
+        
+        return {
+            "nome": self.nome,
+            "backend": self.backend,
+            "endpoints": endpoints,
+        }
+
+
+# Instância global compartilhada por todas as chamadas à API Shopee
+shopee_rate_limiter = RateLimiter(
+    nome="shopee",
+    limite_por_minuto=SHOPEE_API_RATE_LIMIT,
+    burst=SHOPEE_API_BURST,
+    limites_por_endpoint=SHOPEE_API_ENDPOINT_RATE_LIMITS,
+    backend=credentials.SHOPEE_RATE_LIMIT_BACKEND
+)
@@ -0,0 +1,541 @@
+"""
+Resiliência das chamadas externas: retry com backoff, circuit breaker e histogramas
+
+Todas as integrações (Shopee, DeepSeek, GPT, Gemini, Buffer, Telegram)
+passam por Resilience.executar com o host de destino:
+
+- Erros transitórios (rede, timeout, 408/425/429/5xx) são repetidos com
+  backoff exponencial e jitter. Um Retry-After (cabeçalho HTTP ou
+  RetryAfter do Telegram) substitui o backoff.
+- Erros definitivos (4xx, resposta inválida) sobem na primeira tentativa.
+- Cada host tem um circuit breaker: depois de CIRCUITO_LIMITE_FALHAS
+  falhas transitórias seguidas as chamadas falham na hora
+  (CircuitoAbertoError) por CIRCUITO_RESET_S; depois uma única chamada de
+  teste (meio-aberto) decide se o circuito fecha ou abre de novo.
+- Tentativas por chamada e latência por tentativa vão para histogramas
+  por host (expostos em /metrics).
+
+Chamadas que não podem ser repetidas às cegas (publicar um post, agendar no
+Buffer) usam idempotente=False: só são repetidas quando o servidor
+comprovadamente não processou o pedido (429/503 ou falha ao conectar).
+"""
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from functools import lru_cache
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple, TypeVar
+
+import httpx
+
+from config.constants import (
+    RESILIENCIA_TENTATIVAS,
+    RESILIENCIA_BACKOFF_BASE_S,
+    RESILIENCIA_BACKOFF_MAX_S,
+    RESILIENCIA_RETRY_AFTER_MAX_S,
+    CIRCUITO_LIMITE_FALHAS,
+    CIRCUITO_RESET_S,
+)
+from src.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+# Status HTTP que indicam falha temporária do servidor
+STATUS_TRANSITORIOS = frozenset({408, 425, 429, 500, 502, 503, 504})
+
+# Status em que o servidor recusou o pedido sem processá-lo
+STATUS_NAO_PROCESSADOS = frozenset({429, 503})
+
+LIMITES_LATENCIA_MS = (50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+LIMITES_TENTATIVAS = (1, 2, 3, 4, 5)
+
+FECHADO = "fechado"
+ABERTO = "aberto"
+MEIO_ABERTO = "meio_aberto"
+
+
+class CircuitoAbertoError(Exception):
+    """Chamada recusada sem ir à rede: o circuito do host está aberto"""
+    
+    def __init__(self, host: str, reabre_em_s: float):
+        super().__init__(f"Circuito aberto para {host} (nova tentativa em {reabre_em_s:.1f}s)")
+        self.host = host
+        self.reabre_em_s = reabre_em_s
+
+
+@lru_cache(maxsize=None)
+def _erros_de_rede() -> Tuple[type, ...]:
+    """Exceções de rede/timeout das bibliotecas instaladas"""
+    erros = [httpx.TransportError, ConnectionError, asyncio.TimeoutError]
+    
+    try:
+        import openai
+        erros.append(openai.APIConnectionError)  # inclui APITimeoutError
+    except ImportError:
+        pass
+    
+    try:
+        from telegram.error import NetworkError
+        erros.append(NetworkError)  # inclui TimedOut
+    except ImportError:
+        pass
+    
+    return tuple(erros)
+
+
+@lru_cache(maxsize=None)
+def _erros_de_conexao() -> Tuple[type, ...]:
+    """Falhas antes de o pedido chegar ao servidor (seguras para repetir sempre)"""
+    return (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout, ConnectionRefusedError)
+
+
+@lru_cache(maxsize=None)
+def _erros_definitivos() -> Tuple[type, ...]:
+    """Subclasses de erros de rede que na verdade são rejeições do servidor"""
+    try:
+        from telegram.error import BadRequest
+        return (BadRequest,)
+    except ImportError:
+        return ()
+
+
+def status_http(erro: BaseException) -> Optional[int]:
+    """
+    Status HTTP de uma exceção (httpx, openai, google.api_core)
+    
+    Returns:
+        Status ou None se a exceção não veio de uma resposta HTTP
+    """
+    for origem in (erro, getattr(erro, "response", None)):
+        status = getattr(origem, "status_code", None)
+        if isinstance(status, int):
+            return status
+    
+    # google.api_core usa .code com o status HTTP
+    code = getattr(erro, "code", None)
+    if isinstance(code, int) and 100 <= code < 600:
+        return code
+    return None
+
+
+def retry_after(erro: BaseException) -> Optional[float]:
+    """
+    Espera pedida pelo servidor (Retry-After ou RetryAfter do Telegram)
+    
+    Returns:
+        Segundos a esperar ou None se o servidor não indicou
+    """
+    valor = getattr(erro, "retry_after", None)
+    if isinstance(valor, timedelta):
+        return valor.total_seconds()
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    
+    headers = getattr(getattr(erro, "response", None), "headers", None)
+    if not headers:
+        return None
+    
+    try:
+        cabecalho = headers.get("retry-after")
+    except Exception:
+        return None
+    if not cabecalho:
+        return None
+    
+    try:
+        return max(float(cabecalho), 0.0)
+    except ValueError:
+        pass
+    
+    try:
+        data = parsedate_to_datetime(cabecalho)
+    except (TypeError, ValueError):
+        return None
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return max((data - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def erro_transitorio(erro: BaseException, idempotente: bool = True) -> bool:
+    """
+    Decide se vale repetir a chamada que falhou com `erro`
+    
+    Args:
+        erro: Exceção da tentativa
+        idempotente: False para chamadas que não podem ser duplicadas
+        
+    Returns:
+        True se a falha é temporária (e segura de repetir)
+    """
+    if isinstance(erro, CircuitoAbertoError) or isinstance(erro, _erros_definitivos()):
+        return False
+    
+    status = status_http(erro)
+    if status is not None:
+        return status in (STATUS_TRANSITORIOS if idempotente else STATUS_NAO_PROCESSADOS)
+    
+    if retry_after(erro) is not None:
+        return True
+    
+    if not idempotente:
+        return isinstance(erro, _erros_de_conexao())
+    return isinstance(erro, _erros_de_rede())
+
+
+class Histogram:
+    """
+    Histograma de buckets fixos (contagens acumuladas só por bucket)
+    
+    Os quantis são aproximados pelo limite superior do bucket.
+    """
+    
+    def __init__(self, limites: Sequence[float]):
+        """
+        Args:
+            limites: Limites superiores dos buckets, em ordem crescente
+        """
+        self.limites = tuple(limites)
+        self.contagens = [0] * (len(self.limites) + 1)
+        self.total = 0
+        self.soma = 0.0
+    
+    def observar(self, valor: float):
+        """Registra um valor"""
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                self.contagens[i] += 1
+                break
+        else:
+            self.contagens[-1] += 1
+        self.total += 1
+        self.soma += valor
+    
+    def quantil(self, q: float) -> Optional[float]:
+        """
+        Limite superior do bucket que contém o quantil q
+        
+        Returns:
+            Limite (None se caiu acima do último limite ou não há valores)
+        """
+        if not self.total:
+            return None
+        
+        alvo = q * self.total
+        acumulado = 0
+        for limite, contagem in zip(self.limites, self.contagens):
+            acumulado += contagem
+            if acumulado >= alvo:
+                return limite
+        return None
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna os buckets e resumos
+        
+        Returns:
+            Dict com contagens por bucket ("<=limite" e "+inf"), total, média e p50/p95/p99
+        """
+        buckets = {f"<={limite:g}": contagem for limite, contagem in zip(self.limites, self.contagens)}
+        buckets["+inf"] = self.contagens[-1]
+        return {
+            "buckets": buckets,
+            "total": self.total,
+            "media": round(self.soma / self.total, 3) if self.total else 0.0,
+            "p50": self.quantil(0.50),
+            "p95": self.quantil(0.95),
+            "p99": self.quantil(0.99),
+        }
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de um host (fechado -> aberto -> meio-aberto -> fechado)
+    
+    - Fechado: tudo passa; falhas transitórias seguidas são contadas
+    - Aberto: nada passa até reset_s depois da abertura
+    - Meio-aberto: uma única chamada de teste passa; sucesso fecha o
+      circuito, falha abre de novo
+    """
+    
+    def __init__(
+        self,
+        host: str,
+        limite_falhas: int = CIRCUITO_LIMITE_FALHAS,
+        reset_s: float = CIRCUITO_RESET_S
+    ):
+        """
+        Args:
+            host: Host protegido (só para logs/métricas)
+            limite_falhas: Falhas seguidas que abrem o circuito
+            reset_s: Segundos com o circuito aberto antes da chamada de teste
+        """
+        self.host = host
+        self.limite_falhas = limite_falhas
+        self.reset_s = reset_s
+        
+        self._estado = FECHADO
+        self._falhas = 0
+        self._aberto_em = 0.0
+        self._testando = False
+        self._aberturas = 0
+    
+    @property
+    def estado(self) -> str:
+        """Estado atual (um circuito aberto vira meio-aberto após reset_s)"""
+        if self._estado == ABERTO and time.monotonic() - self._aberto_em >= self.reset_s:
+            return MEIO_ABERTO
+        return self._estado
+    
+    def reabre_em(self) -> float:
+        """Segundos até a próxima chamada de teste (0 se não está aberto)"""
+        if self._estado != ABERTO:
+            return 0.0
+        return max(self.reset_s - (time.monotonic() - self._aberto_em), 0.0)
+    
+    def permitir(self) -> bool:
+        """
+        Reserva a passagem de uma chamada
+        
+        Returns:
+            True se a chamada pode ir à rede
+        """
+        estado = self.estado
+        if estado == FECHADO:
+            return True
+        if estado == MEIO_ABERTO and not self._testando:
+            self._testando = True
+            return True
+        return False
+    
+    def registrar_sucesso(self):
+        """O host respondeu (mesmo que com um erro definitivo)"""
+        if self._estado != FECHADO:
+            logger.info("Circuito fechado", host=self.host)
+        self._estado = FECHADO
+        self._falhas = 0
+        self._testando = False
+    
+    def registrar_falha(self):
+        """Falha transitória de uma chamada que passou por permitir()"""
+        self._falhas += 1
+        if self._testando or (self._estado == FECHADO and self._falhas >= self.limite_falhas):
+            self._abrir()
+    
+    def liberar(self):
+        """Desfaz a reserva de uma chamada cancelada antes de terminar"""
+        self._testando = False
+    
+    def _abrir(self):
+        self._estado = ABERTO
+        self._aberto_em = time.monotonic()
+        self._testando = False
+        self._aberturas += 1
+        logger.warning(
+            "Circuito aberto",
+            host=self.host,
+            falhas_seguidas=self._falhas,
+            reset_s=self.reset_s
+        )
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna o estado do circuito
+        
+        Returns:
+            Dict com estado, falhas seguidas, aberturas e segundos até reabrir
+        """
+        return {
+            "estado": self.estado,
+            "falhas_seguidas": self._falhas,
+            "aberturas": self._aberturas,
+            "reabre_em_s": round(self.reabre_em(), 3),
+        }
+
+
+class Resilience:
+    """
+    Executa chamadas externas com retry, backoff e circuit breaker por host
+    
+        dados = await resilience.executar("api.deepseek.com", lambda: client.post(...))
+        
+    A operação é uma função sem argumentos que devolve um awaitable novo a
+    cada tentativa (assinaturas, timestamps e tokens de rate limit são
+    refeitos por tentativa).
+    """
+    
+    def __init__(
+        self,
+        tentativas: int = RESILIENCIA_TENTATIVAS,
+        backoff_base_s: float = RESILIENCIA_BACKOFF_BASE_S,
+        backoff_max_s: float = RESILIENCIA_BACKOFF_MAX_S,
+        retry_after_max_s: float = RESILIENCIA_RETRY_AFTER_MAX_S,
+        limite_falhas: int = CIRCUITO_LIMITE_FALHAS,
+        reset_s: float = CIRCUITO_RESET_S
+    ):
+        """
+        Args:
+            tentativas: Tentativas por chamada (1 = sem retry)
+            backoff_base_s: Espera base antes da 2ª tentativa (dobra a cada uma)
+            backoff_max_s: Teto do backoff
+            retry_after_max_s: Retry-After acima disso desiste em vez de esperar
+            limite_falhas: Falhas seguidas que abrem o circuito de um host
+            reset_s: Segundos com o circuito aberto antes da chamada de teste
+        """
+        self.tentativas = tentativas
+        self.backoff_base_s = backoff_base_s
+        self.backoff_max_s = backoff_max_s
+        self.retry_after_max_s = retry_after_max_s
+        self.limite_falhas = limite_falhas
+        self.reset_s = reset_s
+        
+        self._circuitos: Dict[str, CircuitBreaker] = {}
+        self._stats: Dict[str, Dict] = {}
+    
+    def circuito(self, host: str) -> CircuitBreaker:
+        """Circuit breaker do host (criado no primeiro uso)"""
+        if host not in self._circuitos:
+            self._circuitos[host] = CircuitBreaker(host, self.limite_falhas, self.reset_s)
+        return self._circuitos[host]
+    
+    def _stats_host(self, host: str) -> Dict:
+        if host not in self._stats:
+            self._stats[host] = {
+                "chamadas": 0,
+                "sucessos": 0,
+                "falhas": 0,
+                "retries": 0,
+                "recusadas_circuito": 0,
+                "tentativas": Histogram(LIMITES_TENTATIVAS),
+                "latencia_ms": Histogram(LIMITES_LATENCIA_MS),
+            }
+        return self._stats[host]
+    
+    def backoff(self, tentativa: int) -> float:
+        """
+        Espera antes da próxima tentativa (exponencial com "equal jitter")
+        
+        Args:
+            tentativa: Número da tentativa que falhou (1 = primeira)
+            
+        Returns:
+            Segundos entre metade e o total do backoff exponencial
+        """
+        teto = min(self.backoff_max_s, self.backoff_base_s * 2 ** (tentativa - 1))
+        return teto / 2 + random.uniform(0, teto / 2)
+    
+    def _espera(self, erro: BaseException, tentativa: int) -> Optional[float]:
+        """Espera antes de repetir, ou None se o Retry-After pedido é longo demais"""
+        pedido = retry_after(erro)
+        if pedido is None:
+            return self.backoff(tentativa)
+        if pedido > self.retry_after_max_s:
+            return None
+        return pedido
+    
+    async def executar(
+        self,
+        host: str,
+        operacao: Callable[[], Awaitable[T]],
+        tentativas: Optional[int] = None,
+        idempotente: bool = True
+    ) -> T:
+        """
+        Executa a operação com retry e circuit breaker
+        
+        Args:
+            host: Host de destino (chave do circuit breaker e das métricas)
+            operacao: Função que inicia uma tentativa
+            tentativas: Tentativas desta chamada (padrão: self.tentativas)
+            idempotente: False para chamadas que não podem ser duplicadas
+            
+        Returns:
+            Resultado da operação
+            
+        Raises:
+            CircuitoAbertoError: Se o circuito do host está aberto
+            Exception: O erro da última tentativa
+        """
+        circuito = self.circuito(host)
+        stats = self._stats_host(host)
+        tentativas = max(1, tentativas or self.tentativas)
+        stats["chamadas"] += 1
+        
+        for tentativa in range(1, tentativas + 1):
+            if not circuito.permitir():
+                stats["recusadas_circuito"] += 1
+                if tentativa > 1:
+                    stats["falhas"] += 1
+                    stats["tentativas"].observar(tentativa - 1)
+                raise CircuitoAbertoError(host, circuito.reabre_em())
+            
+            inicio = time.monotonic()
+            try:
+                resultado = await operacao()
+            except asyncio.CancelledError:
+                circuito.liberar()
+                raise
+            except Exception as erro:
+                stats["latencia_ms"].observar((time.monotonic() - inicio) * 1000)
+                
+                if not erro_transitorio(erro, idempotente):
+                    circuito.registrar_sucesso()
+                    stats["falhas"] += 1
+                    stats["tentativas"].observar(tentativa)
+                    raise
+                
+                circuito.registrar_falha()
+                espera = self._espera(erro, tentativa)
+                if tentativa == tentativas or espera is None:
+                    stats["falhas"] += 1
+                    stats["tentativas"].observar(tentativa)
+                    logger.warning(
+                        "Falha transitória sem novas tentativas",
+                        host=host,
+                        tentativas=tentativa,
+                        erro=str(erro) or type(erro).__name__
+                    )
+                    raise
+                
+                stats["retries"] += 1
+                logger.info(
+                    "Falha transitória, tentando de novo",
+                    host=host,
+                    tentativa=tentativa,
+                    espera_s=round(espera, 3),
+                    erro=str(erro) or type(erro).__name__
+                )
+                await asyncio.sleep(espera)
+            else:
+                stats["latencia_ms"].observar((time.monotonic() - inicio) * 1000)
+                circuito.registrar_sucesso()
+                stats["sucessos"] += 1
+                stats["tentativas"].observar(tentativa)
+                return resultado
+    
+    def get_stats(self) -> Dict:
+        """
+        Retorna métricas por host
+        
+        Returns:
+            Dict host -> contagens, circuito e histogramas de tentativas e latência
+        """
+        return {
+            host: {
+                "chamadas": stats["chamadas"],
+                "sucessos": stats["sucessos"],
+                "falhas": stats["falhas"],
+                "retries": stats["retries"],
+                "recusadas_circuito": stats["recusadas_circuito"],
+                "circuito": self.circuito(host).get_stats(),
+                "tentativas": stats["tentativas"].get_stats(),
+                "latencia_ms": stats["latencia_ms"].get_stats(),
+            }
+            for host, stats in self._stats.items()
+        }
+
+
+# Instância global compartilhada por todos os clientes externos
+resilience = Resilience()
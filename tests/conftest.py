@@ -3,9 +3,33 @@ Configurações compartilhadas para testes
 """
 import pytest
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
-from src.database.connection import Base
+from src.database import models  # noqa: F401
+from src.database.connection import Base, async_database_url
+
+
+def make_produto(n: int, **overrides) -> dict:
+    """Produto no formato do OfferParser"""
+    produto = {
+        "shopee_id": f"1_{n}",
+        "nome": f"Produto {n}",
+        "preco_original": 100.0,
+        "preco_promocional": 80.0,
+        "desconto_percentual": 20.0,
+        "comissao_percentual": 10.0,
+        "comissao_valor": 8.0,
+        "rating": 4.5,
+        "total_vendas": 100,
+        "total_avaliacoes": 50,
+        "nicho": "tech",
+        "url_produto": f"https://shopee.com.br/{n}",
+        "imagem_url": "https://example.com/image.jpg",
+    }
+    produto.update(overrides)
+    return produto
 
 
 @pytest.fixture(scope="function")
@@ -25,6 +49,23 @@ def db_session():
     session.close()
 
 
+@pytest.fixture
+def bancos(tmp_path):
+    """
+    Banco SQLite em arquivo com o schema vazio, acessível pelos dois lados
+    
+    Devolve (sessionmaker, async_sessionmaker); cada módulo de teste
+    sobrescreve a fixture para inserir as próprias linhas.
+    """
+    url = f"sqlite:///{tmp_path / 'bancos.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    async_engine = create_async_engine(async_database_url(url), poolclass=NullPool)
+    
+    yield sessionmaker(bind=engine), async_sessionmaker(async_engine, expire_on_commit=False)
+    engine.dispose()
+
+
 @pytest.fixture
 def sample_produto():
     """Produto de exemplo para testes"""
@@ -0,0 +1,93 @@
+"""
+Testes do cache de links de afiliado (produto + SubIds)
+"""
+import asyncio
+
+import pytest
+
+from src.database.models import Link
+from src.database.repository import LinkRepository, ProdutoRepository
+from src.links.affiliate_cache import AffiliateLinkCache, LinkCacheado
+from tests.conftest import make_produto
+
+SUB_IDS = ("grupo", "tech", "texto", "oferta_dia", "20260131")
+
+
+def novo_link(link_curto: str, produto_id: int = 1) -> dict:
+    return {
+        "produto_id": produto_id,
+        "link_curto": link_curto,
+        "link_completo": f"https://s.shopee.com.br/{link_curto}",
+        **dict(zip(("sub_id1", "sub_id2", "sub_id3", "sub_id4", "sub_id5"), SUB_IDS)),
+    }
+
+
+@pytest.fixture
+def bancos(bancos):
+    """Banco compartilhado (conftest) com 2 produtos"""
+    session_factory, _ = bancos
+    with session_factory() as db:
+        ProdutoRepository.upsert_many(db, [make_produto(1), make_produto(2)])
+    return bancos
+
+
+class TestAffiliateLinkCache:
+    """Memória -> tabela links -> Shopee"""
+    
+    def test_reads_through_links_table(self, bancos):
+        session_factory, async_factory = bancos
+        with session_factory() as db:
+            link = LinkRepository.criar(db, novo_link("abc12345"))
+            link_id = link.id
+        cache = AffiliateLinkCache()
+        existe, falta = (1, *SUB_IDS), (2, *SUB_IDS)
+        
+        async def cenario():
+            async with async_factory() as db:
+                primeira = await cache.buscar_muitos(db, [existe, falta])
+                segunda = await cache.buscar_muitos(db, [existe])
+            return primeira, segunda
+        
+        primeira, segunda = asyncio.run(cenario())
+        
+        assert primeira == {existe: LinkCacheado(link_id, "abc12345", "https://s.shopee.com.br/abc12345")}
+        assert segunda == {existe: primeira[existe]}
+        stats = cache.get_stats()
+        assert (stats["hits_memoria"], stats["hits_banco"], stats["misses"]) == (1, 1, 1)
+        assert stats["consultas_banco"] == 1
+        assert stats["hit_ratio"] == round(2 / 3, 4)
+    
+    def test_lru_eviction(self):
+        cache = AffiliateLinkCache(max_itens=2)
+        for i in range(3):
+            cache.put((i, *SUB_IDS), LinkCacheado(i, f"c{i}", "u"))
+        
+        assert len(cache) == 2
+        assert cache.get((0, *SUB_IDS)) is None
+        assert cache.get((2, *SUB_IDS)).link_curto == "c2"
+        assert cache.get_stats()["removidos"] == 1
+
+
+class TestLinkUnicoPorSubIds:
+    """Índice único (produto_id, sub_id1..5)"""
+    
+    def test_criar_returns_existing_link(self, bancos):
+        session_factory, _ = bancos
+        with session_factory() as db:
+            existente = LinkRepository.criar(db, novo_link("abc12345"))
+            
+            link, criado = LinkRepository.criar_ou_obter(db, novo_link("outro001"))
+            
+            assert (link.id, criado) == (existente.id, False)
+            assert db.query(Link).count() == 1
+    
+    def test_criar_muitos_keeps_existing_on_duplicate(self, bancos):
+        session_factory, _ = bancos
+        with session_factory() as db:
+            existente = LinkRepository.criar(db, novo_link("abc12345"))
+            
+            links = LinkRepository.criar_muitos(db, [novo_link("novo0001", produto_id=2), novo_link("novo0002")])
+            
+            assert [(l.link_curto, criado) for l, criado in links] == [("novo0001", True), ("abc12345", False)]
+            assert links[1][0].id == existente.id
+            assert db.query(Link).count() == 2
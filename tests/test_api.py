@@ -0,0 +1,361 @@
+"""
+Testes das rotas da API com sessões assíncronas (AsyncSession)
+"""
+import asyncio
+import time
+from datetime import datetime
+
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from src.api.main import app
+from src.database import models  # noqa: F401
+from src.database.connection import Base, async_database_url, get_async_db
+from src.database.models import Link
+from src.database.repository import AnalyticsRepository, ConteudoRepository, LinkRepository, ProdutoRepository
+from src.links import affiliate_cache, click_tracker, redirect_cache
+from src.llm.router import llm_router
+from tests.conftest import make_produto
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Banco SQLite em arquivo compartilhado pelo engine síncrono e o assíncrono"""
+    url = f"sqlite:///{tmp_path / 'api.db'}"
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    
+    # NullPool: cada teste roda num event loop próprio (asyncio.run)
+    async_engine = create_async_engine(async_database_url(url), poolclass=NullPool)
+    async_factory = async_sessionmaker(async_engine, expire_on_commit=False)
+    
+    async def get_test_db():
+        async with async_factory() as db:
+            yield db
+    
+    app.dependency_overrides[get_async_db] = get_test_db
+    yield sessionmaker(bind=engine)
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+def chamar(metodo: str, caminho: str, **kwargs) -> httpx.Response:
+    async def requisicao():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.request(metodo, caminho, **kwargs)
+    
+    return asyncio.run(requisicao())
+
+
+class TestProductRoutes:
+    """Rotas de produtos"""
+    
+    def test_top_products(self, session_factory):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(i) for i in range(3)])
+            for i, score in enumerate([10.0, 30.0, 20.0]):
+                ProdutoRepository.atualizar_score(db, i + 1, score, "teste")
+        
+        resposta = chamar("GET", "/api/products/top/tech", params={"limit": 2})
+        
+        assert resposta.status_code == 200
+        assert [p["score"] for p in resposta.json()["produtos"]] == [30.0, 20.0]
+    
+    def test_collect_saves_offers_in_batches_as_they_arrive(self, session_factory, monkeypatch):
+        from src.api.routes import products
+        from src.database import async_repository
+        
+        class FakeAPI:
+            async def iter_product_offers(self, **kwargs):
+                for n in range(5):
+                    yield make_produto(n)
+        
+        class FakeParser:
+            def parse_offer(self, oferta, nicho):
+                return oferta
+            
+            def validar_produto(self, produto):
+                return True, None
+        
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(0)])
+        
+        lotes = []
+        upsert = async_repository.AsyncProdutoRepository.upsert_many_com_inseridos
+        
+        async def espiao(db, produtos_data):
+            lotes.append(len(produtos_data))
+            return await upsert(db, produtos_data)
+        
+        monkeypatch.setattr(products, "get_shopee_api", FakeAPI)
+        monkeypatch.setattr(products, "OfferParser", FakeParser)
+        monkeypatch.setattr(products, "UPSERT_BATCH_SIZE", 2)
+        monkeypatch.setattr(async_repository.AsyncProdutoRepository, "upsert_many_com_inseridos", espiao)
+        
+        resposta = chamar("POST", "/api/products/collect", params={"nicho": "tech", "limit": 5})
+        
+        assert resposta.status_code == 200
+        assert lotes == [2, 2, 1]
+        # "produtos" lista só os novos, como total_coletados
+        assert (resposta.json()["total_coletados"], resposta.json()["inalterados"]) == (4, 1)
+        assert resposta.json()["produtos"] == ["1_1", "1_2", "1_3", "1_4"]
+    
+    def test_get_product_and_not_found(self, session_factory):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1)])
+        
+        assert chamar("GET", "/api/products/1").json()["shopee_id"] == "1_1"
+        assert chamar("GET", "/api/products/99").status_code == 404
+    
+    def test_rank_runs_on_async_session(self, session_factory):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(i) for i in range(4)])
+        
+        resposta = chamar("POST", "/api/products/rank", params={"nicho": "tech"})
+        
+        assert resposta.json()["reranqueados"] == 4
+        with session_factory() as db:
+            assert ProdutoRepository.buscar_por_id(db, 1).score_ranking > 0
+
+
+class TestContentRoutes:
+    """Rotas de conteúdo"""
+    
+    def test_approve_content(self, session_factory):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1)])
+            conteudo = ConteudoRepository.criar(db, {
+                "produto_id": 1,
+                "canal": "grupo",
+                "formato": "texto",
+                "persona": "economica",
+                "template": "oferta",
+                "copy_texto": "Oferta",
+            })
+            conteudo_id = conteudo.id
+        
+        assert chamar("POST", f"/api/content/{conteudo_id}/approve").status_code == 200
+        assert chamar("GET", f"/api/content/{conteudo_id}").json()["aprovado"] is True
+        assert chamar("POST", "/api/content/99/approve").status_code == 404
+
+
+    def test_mark_published_batch(self, session_factory):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(i) for i in range(2)])
+            for produto_id in (1, 1, 2):
+                ConteudoRepository.criar(db, {
+                    "produto_id": produto_id,
+                    "canal": "grupo",
+                    "formato": "texto",
+                    "persona": "economica",
+                    "template": "oferta",
+                    "copy_texto": "Oferta",
+                })
+        
+        resposta = chamar("POST", "/api/content/mark-published", json={"conteudo_ids": [1, 2, 99]})
+        
+        assert resposta.json() == {"conteudos": 2, "produtos": 1, "nao_encontrados": [99]}
+        with session_factory() as db:
+            assert ProdutoRepository.buscar_por_id(db, 1).ja_publicado is True
+            assert ProdutoRepository.buscar_por_id(db, 2).ja_publicado is False
+            assert ConteudoRepository.buscar_por_id(db, 3).publicado is False
+    
+    def test_generate_runs_variations_concurrently_and_saves_in_one_insert(self, session_factory, monkeypatch):
+        class FakeGPT:
+            em_voo = max_em_voo = chamadas = 0
+            
+            async def generate_copy(self, prompt, **kwargs):
+                FakeGPT.chamadas += 1
+                numero = FakeGPT.chamadas
+                FakeGPT.em_voo += 1
+                FakeGPT.max_em_voo = max(FakeGPT.max_em_voo, FakeGPT.em_voo)
+                await asyncio.sleep(0.1)
+                FakeGPT.em_voo -= 1
+                return f"copy {numero}"
+        
+        monkeypatch.setattr(llm_router, "gpt", FakeGPT())
+        monkeypatch.setattr(llm_router, "concorrencia", {"gpt": 5})
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1)])
+        
+        inicio = time.monotonic()
+        resposta = chamar("POST", "/api/content/generate/1", params={"canal": "tiktok", "num_variacoes": 5})
+        decorrido = time.monotonic() - inicio
+        
+        assert resposta.status_code == 200
+        assert [c["variacao"] for c in resposta.json()["conteudos"]] == [1, 2, 3, 4, 5]
+        assert FakeGPT.max_em_voo == 5
+        assert decorrido < 0.4
+        with session_factory() as db:
+            copies = {c.copy_texto for c in ConteudoRepository.listar_por_produto(db, 1)}
+        assert copies == {f"copy {i}" for i in range(1, 6)}
+
+
+class TestLinkRoutes:
+    """Rotas de links"""
+    
+    def test_events_are_buffered_then_flushed(self, session_factory, tmp_path, monkeypatch):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1)])
+            db.add(Link(
+                produto_id=1, link_curto="s1", link_completo="https://s.shopee.com.br/1",
+                sub_id1="grupo", sub_id2="tech", sub_id3="texto",
+                sub_id4="oferta_dia", sub_id5="20260101"
+            ))
+            db.commit()
+        
+        async_engine = create_async_engine(
+            async_database_url(f"sqlite:///{tmp_path / 'api.db'}"), poolclass=NullPool
+        )
+        buffer = click_tracker.ClickBuffer(session_factory=async_sessionmaker(async_engine))
+        monkeypatch.setattr(click_tracker, "click_buffer", buffer)
+        
+        resposta = chamar("POST", "/api/links/events", json={"eventos": [
+            {"link_id": 1, "cliques": 1},
+            {"link_id": 1, "cliques": 1, "conversoes": 1, "receita": 25.0},
+        ]})
+        
+        assert resposta.status_code == 202
+        assert resposta.json() == {"aceitos": 2}
+        assert chamar("GET", "/api/links/1").json()["metricas"]["cliques"] == 0
+        
+        asyncio.run(buffer.flush())
+        
+        assert chamar("GET", "/api/links/1").json()["metricas"] == {
+            "cliques": 2, "conversoes": 1, "receita": 25.0
+        }
+        with session_factory() as db:
+            assert LinkRepository.buscar_por_id(db, 1).ultimo_clique_em is not None
+    
+    def test_redirect_uses_cache_and_buffers_click(self, session_factory, tmp_path, monkeypatch):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1)])
+            db.add(Link(
+                produto_id=1, link_curto="abc123", link_completo="https://s.shopee.com.br/abc",
+                sub_id1="grupo", sub_id2="tech", sub_id3="texto",
+                sub_id4="oferta_dia", sub_id5="20260101"
+            ))
+            db.commit()
+        
+        async_engine = create_async_engine(
+            async_database_url(f"sqlite:///{tmp_path / 'api.db'}"), poolclass=NullPool
+        )
+        async_factory = async_sessionmaker(async_engine)
+        buffer = click_tracker.ClickBuffer(session_factory=async_factory)
+        cache = redirect_cache.ShortLinkCache(session_factory=async_factory)
+        monkeypatch.setattr(click_tracker, "click_buffer", buffer)
+        monkeypatch.setattr(redirect_cache, "short_link_cache", cache)
+        
+        respostas = [chamar("GET", "/r/abc123") for _ in range(3)]
+        
+        assert [r.status_code for r in respostas] == [302] * 3
+        assert respostas[0].headers["location"] == "https://s.shopee.com.br/abc"
+        assert chamar("GET", "/r/nada").status_code == 404
+        assert cache.get_stats()["consultas_banco"] == 2
+        
+        # Cliques só chegam ao banco no flush do buffer
+        assert chamar("GET", "/api/links/1").json()["metricas"]["cliques"] == 0
+        asyncio.run(buffer.flush())
+        assert chamar("GET", "/api/links/1").json()["metricas"]["cliques"] == 3
+    
+    def test_generate_batch_reuses_existing_links(self, session_factory, monkeypatch):
+        from src.links import shortener
+        from src.links.short_code import ShortCodeAllocator
+        from tests.test_link_batch import FakeShopeeAPI
+        
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1), make_produto(2)])
+        api = FakeShopeeAPI()
+        monkeypatch.setattr(shortener, "get_shopee_api", lambda: api)
+        monkeypatch.setattr(shortener, "short_code_allocator", ShortCodeAllocator(session_factory=session_factory))
+        monkeypatch.setattr(redirect_cache, "short_link_cache", redirect_cache.ShortLinkCache())
+        monkeypatch.setattr(affiliate_cache, "affiliate_link_cache", affiliate_cache.AffiliateLinkCache())
+        lote = {"produto_ids": [1, 2], "canais": ["grupo", "tiktok"], "formatos": ["texto"]}
+        
+        primeira = chamar("POST", "/api/links/generate-batch", json=lote)
+        segunda = chamar("POST", "/api/links/generate-batch", json=lote)
+        
+        assert primeira.status_code == 200
+        assert (primeira.json()["gerados"], segunda.json()["reutilizados"]) == (4, 4)
+        assert {l["campanha"] for l in primeira.json()["links"]} == {"oferta_dia"}
+        assert api.chamadas == 4
+        assert redirect_cache.short_link_cache.get(primeira.json()["links"][0]["link_curto"]) is not None
+    
+    def test_generate_reuses_link_for_same_subids(self, session_factory, monkeypatch):
+        from src.links import shortener
+        from src.links.short_code import ShortCodeAllocator
+        from tests.test_link_batch import FakeShopeeAPI
+        
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1)])
+        api = FakeShopeeAPI()
+        cache = affiliate_cache.AffiliateLinkCache()
+        monkeypatch.setattr(shortener, "get_shopee_api", lambda: api)
+        monkeypatch.setattr(shortener, "short_code_allocator", ShortCodeAllocator(session_factory=session_factory))
+        monkeypatch.setattr(redirect_cache, "short_link_cache", redirect_cache.ShortLinkCache())
+        monkeypatch.setattr(affiliate_cache, "affiliate_link_cache", cache)
+        
+        caminho = "/api/links/generate/1?canal=grupo&formato=texto"
+        respostas = [chamar("POST", caminho).json() for _ in range(3)]
+        cache.limpar()  # outro worker: acha o link na tabela links
+        respostas.append(chamar("POST", caminho).json())
+        
+        assert api.chamadas == 1
+        assert [r["reutilizado"] for r in respostas] == [False, True, True, True]
+        assert len({r["link_id"] for r in respostas}) == 1
+        assert respostas[0]["tracking"]["sub_id1"] == "grupo"
+        stats = cache.get_stats()
+        assert (stats["hits_memoria"], stats["hits_banco"], stats["misses"]) == (2, 1, 1)
+        assert stats["hit_ratio"] == 0.75
+        assert chamar("GET", "/metrics").json()["affiliate_link_cache"]["chamadas_api_evitadas"] == 3
+    
+    def test_generate_batch_rejects_oversized_matrix(self, session_factory, monkeypatch):
+        from src.api.routes import links
+        
+        monkeypatch.setattr(links, "LINKS_LOTE_MAX_PEDIDOS", 3)
+        
+        resposta = chamar("POST", "/api/links/generate-batch", json={
+            "produto_ids": [1, 2], "canais": ["grupo", "tiktok"], "formatos": ["texto"]
+        })
+        
+        assert resposta.status_code == 400
+        assert chamar("POST", "/api/links/generate-batch", json={
+            "produto_ids": [], "canais": ["grupo"], "formatos": ["texto"]
+        }).status_code == 422
+    
+    def test_events_reject_negative_increments(self, session_factory):
+        resposta = chamar("POST", "/api/links/events", json={"eventos": [{"link_id": 1, "cliques": -5}]})
+        
+        assert resposta.status_code == 422
+
+
+class TestAnalyticsRoutes:
+    """Rotas de analytics"""
+    
+    def test_summary_and_by_canal(self, session_factory):
+        with session_factory() as db:
+            for canal, cliques in [("grupo", 10), ("grupo", 5), ("tiktok", 3)]:
+                AnalyticsRepository.criar(db, {
+                    "data": datetime.utcnow(),
+                    "canal": canal,
+                    "impressoes": 100,
+                    "cliques": cliques,
+                })
+        
+        assert chamar("POST", "/api/analytics/rollups/refresh").json()["processados"]["analytics_diario"] == 3
+        resumo = chamar("GET", "/api/analytics/summary", params={"days": 1}).json()
+        por_canal = chamar("GET", "/api/analytics/by-canal").json()["por_canal"]
+        
+        assert resumo["metricas"]["total_cliques"] == 18
+        assert resumo["metricas"]["ctr_medio"] == 6.0
+        assert por_canal["grupo"]["cliques"] == 15
+        assert por_canal["tiktok"]["ctr"] == 3.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,171 @@
+"""
+Testes do buffer de cliques/conversões (ClickBuffer)
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import event
+
+from src.database.models import Link
+from src.database.repository import LinkRepository, ProdutoRepository
+from src.links.click_tracker import ClickBuffer
+from tests.conftest import make_produto
+
+
+@pytest.fixture
+def bancos(bancos):
+    """Banco compartilhado (conftest) com 3 links"""
+    session_factory, _ = bancos
+    with session_factory() as db:
+        ProdutoRepository.upsert_many(db, [make_produto(1)])
+        for i in range(1, 4):
+            db.add(Link(
+                produto_id=1, link_curto=f"s{i}", link_completo=f"https://s.shopee.com.br/{i}",
+                sub_id1="grupo", sub_id2="tech", sub_id3="texto",
+                sub_id4="oferta_dia", sub_id5=f"202601{i:02d}"
+            ))
+        db.commit()
+    return bancos
+
+
+def metricas(session_factory, link_id):
+    with session_factory() as db:
+        link = LinkRepository.buscar_por_id(db, link_id)
+        return link.total_cliques, link.total_conversoes, link.receita_gerada
+
+
+class TestClickBuffer:
+    """Incrementos acumulados em memória e gravados em lote"""
+    
+    def test_flush_writes_summed_increments_in_one_update(self, bancos):
+        session_factory, async_factory = bancos
+        buffer = ClickBuffer(session_factory=async_factory)
+        
+        for _ in range(100):
+            buffer.registrar(1, cliques=1)
+        buffer.registrar(2, cliques=1, conversoes=1, receita=50.0)
+        
+        # Nada é gravado antes do flush
+        assert metricas(session_factory, 1) == (0, 0, 0.0)
+        assert buffer.get_stats()["eventos_pendentes"] == 101
+        
+        updates = []
+        
+        async def gravar():
+            engine = async_factory.kw["bind"].sync_engine
+            
+            def antes(conn, cursor, statement, parameters, context, executemany):
+                if statement.lstrip().upper().startswith("UPDATE"):
+                    updates.append(statement)
+            
+            event.listen(engine, "before_cursor_execute", antes)
+            try:
+                return await buffer.flush()
+            finally:
+                event.remove(engine, "before_cursor_execute", antes)
+        
+        assert asyncio.run(gravar()) == 2
+        
+        assert len(updates) == 1
+        assert metricas(session_factory, 1) == (100, 0, 0.0)
+        assert metricas(session_factory, 2) == (1, 1, 50.0)
+        stats = buffer.get_stats()
+        assert stats["eventos_gravados"] == 101
+        assert stats["eventos_pendentes"] == 0
+        assert stats["flushes"] == 1
+    
+    def test_batched_events(self, bancos):
+        session_factory, async_factory = bancos
+        buffer = ClickBuffer(session_factory=async_factory)
+        
+        aceitos = buffer.registrar_muitos([
+            {"link_id": 1, "cliques": 3},
+            {"link_id": 3, "conversoes": 1, "receita": 19.9},
+            {"link_id": 1, "cliques": 2},
+        ])
+        asyncio.run(buffer.flush())
+        
+        assert aceitos == 3
+        assert metricas(session_factory, 1) == (5, 0, 0.0)
+        assert metricas(session_factory, 3) == (0, 1, 19.9)
+    
+    def test_concurrent_workers_do_not_lose_updates(self, bancos):
+        """Dois processos (buffers) gravando os mesmos links ao mesmo tempo"""
+        session_factory, async_factory = bancos
+        workers = [ClickBuffer(session_factory=async_factory) for _ in range(2)]
+        
+        async def webhook(buffer, n):
+            for i in range(n):
+                buffer.registrar(1 + i % 3, cliques=1)
+                if i % 50 == 0:
+                    await buffer.flush()
+                await asyncio.sleep(0)
+            await buffer.flush()
+        
+        async def carga():
+            await asyncio.gather(*(webhook(w, 600) for w in workers for _ in range(3)))
+        
+        asyncio.run(carga())
+        
+        total = sum(metricas(session_factory, i)[0] for i in range(1, 4))
+        assert total == 2 * 3 * 600
+        assert metricas(session_factory, 1)[0] == 2 * 3 * 200
+    
+    def test_max_events_triggers_early_flush(self, bancos):
+        session_factory, async_factory = bancos
+        buffer = ClickBuffer(intervalo_flush=60, max_eventos=10, session_factory=async_factory)
+        
+        async def cenario():
+            await buffer.start()
+            for _ in range(10):
+                buffer.registrar(1, cliques=1)
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if buffer.get_stats()["flushes"]:
+                    break
+            flushes = buffer.get_stats()["flushes"]
+            await buffer.stop()
+            return flushes
+        
+        assert asyncio.run(cenario()) == 1
+        assert metricas(session_factory, 1)[0] == 10
+    
+    def test_periodic_flush_and_stop_drains_buffer(self, bancos):
+        session_factory, async_factory = bancos
+        buffer = ClickBuffer(intervalo_flush=0.05, session_factory=async_factory)
+        
+        async def cenario():
+            await buffer.start()
+            buffer.registrar(1, cliques=1)
+            await asyncio.sleep(0.3)
+            gravado = metricas(session_factory, 1)[0]
+            
+            buffer.registrar(2, cliques=4)
+            await buffer.stop()
+            return gravado
+        
+        assert asyncio.run(cenario()) == 1
+        assert metricas(session_factory, 2)[0] == 4
+        assert buffer.get_stats()["rodando"] is False
+        assert buffer.get_stats()["eventos_pendentes"] == 0
+    
+    def test_failed_flush_keeps_increments(self, bancos):
+        session_factory, async_factory = bancos
+        
+        def quebrado():
+            raise RuntimeError("banco fora do ar")
+        
+        buffer = ClickBuffer(session_factory=quebrado)
+        buffer.registrar(1, cliques=2)
+        buffer.registrar(1, cliques=3, receita=10.0)
+        
+        assert asyncio.run(buffer.flush()) == 0
+        stats = buffer.get_stats()
+        assert stats["erros"] == 1
+        assert stats["eventos_pendentes"] == 2
+        
+        buffer._session_factory = async_factory
+        asyncio.run(buffer.flush())
+        
+        assert metricas(session_factory, 1) == (5, 0, 10.0)
+        assert buffer.get_stats()["eventos_gravados"] == 2
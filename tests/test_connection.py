@@ -0,0 +1,105 @@
+"""
+Testes da configuração dos engines e das métricas de pool
+"""
+import threading
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from config.credentials import credentials
+from src.database.connection import configurar_sqlite, engine_options, pool_stats
+
+
+class TestEngineOptions:
+    """Opções de pool e connect_args por banco"""
+    
+    def test_sqlite_file_gets_sized_monitored_pool(self):
+        opcoes = engine_options("sqlite:///./teste.db")
+        
+        assert opcoes["poolclass"].__name__ == "MonitoredQueuePool"
+        assert opcoes["pool_size"] == credentials.DB_POOL_SIZE
+        assert opcoes["connect_args"] == {"check_same_thread": False}
+        assert opcoes["echo"] is credentials.DB_ECHO
+    
+    def test_sqlite_memory_keeps_default_pool(self):
+        opcoes = engine_options("sqlite://")
+        
+        assert "poolclass" not in opcoes
+        assert "pool_size" not in opcoes
+    
+    def test_postgres_statement_timeout(self, monkeypatch):
+        monkeypatch.setattr(credentials, "DB_STATEMENT_TIMEOUT_MS", 1500)
+        url = "postgresql://u:p@localhost/db"
+        
+        assert engine_options(url)["connect_args"] == {"options": "-c statement_timeout=1500"}
+        assert engine_options(url, assincrono=True)["connect_args"] == {
+            "server_settings": {"statement_timeout": "1500"}
+        }
+        assert engine_options(url, assincrono=True)["poolclass"].__name__ == "MonitoredAsyncAdaptedQueuePool"
+
+
+class TestSqlitePragmas:
+    """WAL, synchronous=NORMAL e busy_timeout em cada conexão"""
+    
+    def test_pragmas_applied(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'pragmas.db'}"
+        engine = create_engine(url, **engine_options(url))
+        configurar_sqlite(engine)
+        
+        with engine.connect() as conn:
+            assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+            assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+            assert conn.execute(text("PRAGMA busy_timeout")).scalar() == credentials.DB_SQLITE_BUSY_TIMEOUT_MS
+        
+        engine.dispose()
+
+
+class TestPoolStats:
+    """Métricas de uso e espera do pool"""
+    
+    def test_checkouts_and_timeouts(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(credentials, "DB_POOL_SIZE", 1)
+        monkeypatch.setattr(credentials, "DB_MAX_OVERFLOW", 0)
+        monkeypatch.setattr(credentials, "DB_POOL_TIMEOUT", 0.05)
+        url = f"sqlite:///{tmp_path / 'pool.db'}"
+        engine = create_engine(url, **engine_options(url))
+        
+        conexao = engine.connect()
+        em_uso = pool_stats(engine)
+        
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+        
+        # Outra thread espera a conexão ser devolvida
+        liberar = threading.Timer(0.02, conexao.close)
+        liberar.start()
+        monkeypatch.setattr(engine.pool, "_timeout", 1.0)
+        with engine.connect():
+            pass
+        liberar.join()
+        
+        stats = pool_stats(engine)
+        engine.dispose()
+        
+        assert em_uso["em_uso"] == 1
+        assert em_uso["tamanho"] == 1
+        assert stats["em_uso"] == 0
+        assert stats["checkouts"] == 2
+        assert stats["timeouts"] == 1
+        assert stats["checkouts_com_espera"] >= 1
+        assert stats["espera_max_ms"] >= 10
+    
+    def test_stats_survive_dispose(self, tmp_path):
+        url = f"sqlite:///{tmp_path / 'dispose.db'}"
+        engine = create_engine(url, **engine_options(url))
+        
+        with engine.connect():
+            pass
+        engine.dispose()
+        
+        assert pool_stats(engine)["checkouts"] == 1
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
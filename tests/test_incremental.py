@@ -0,0 +1,91 @@
+"""
+Testes para o re-ranking incremental
+"""
+import pytest
+
+from src.database import models  # noqa: F401
+from src.database.models import Produto
+from src.database.repository import ProdutoRepository
+from src.ranking.incremental import reranquear_nicho
+from src.ranking.scorer import ProductScorer
+from tests.conftest import make_produto
+
+
+@pytest.fixture
+def catalogo(db_session):
+    ProdutoRepository.upsert_many(db_session, [make_produto(i, total_vendas=i * 10) for i in range(20)])
+    ProdutoRepository.upsert_many(db_session, [make_produto(100, nicho="pet")])
+    return db_session
+
+
+class TestReranquearNicho:
+    """Testes do re-ranking por fingerprint"""
+    
+    def test_first_run_scores_everything(self, catalogo):
+        """Sem fingerprint salvo, todos os produtos do nicho são pontuados"""
+        relatorio = reranquear_nicho(catalogo, "tech")
+        
+        assert relatorio["total"] == 20
+        assert relatorio["reranqueados"] == 20
+        
+        scorer = ProductScorer()
+        produto = ProdutoRepository.buscar_por_shopee_id(catalogo, "1_5")
+        score, motivo = scorer.calcular_score(make_produto(5, total_vendas=50))
+        assert produto.score_ranking == score
+        assert produto.motivo_ranking == motivo
+        assert produto.score_versao_pesos == scorer.versao_pesos
+        
+        # Outro nicho não é tocado
+        assert ProdutoRepository.buscar_por_shopee_id(catalogo, "1_100").score_fingerprint is None
+    
+    def test_second_run_is_a_noop(self, catalogo):
+        """Sem mudanças, nada é re-pontuado"""
+        reranquear_nicho(catalogo, "tech")
+        
+        relatorio = reranquear_nicho(catalogo, "tech")
+        
+        assert relatorio["reranqueados"] == 0
+        assert relatorio["inalterados"] == 20
+    
+    def test_only_changed_products_are_rescored(self, catalogo):
+        """Mudança de preço/vendas re-pontua apenas os produtos afetados"""
+        reranquear_nicho(catalogo, "tech")
+        ProdutoRepository.upsert_many(catalogo, [
+            make_produto(3, total_vendas=5000),
+            make_produto(7, total_vendas=70, preco_promocional=30.0),
+        ])
+        
+        relatorio = reranquear_nicho(catalogo, "tech")
+        
+        assert relatorio["reranqueados"] == 2
+        catalogo.expire_all()
+        score, _ = ProductScorer().calcular_score(make_produto(3, total_vendas=5000))
+        assert ProdutoRepository.buscar_por_shopee_id(catalogo, "1_3").score_ranking == score
+    
+    def test_weight_change_rescores_all(self, catalogo):
+        """Nova versão de pesos invalida todos os scores"""
+        reranquear_nicho(catalogo, "tech")
+        scorer = ProductScorer()
+        scorer.peso_vendas = 0.5
+        scorer.versao_pesos = scorer._calcular_versao_pesos()
+        
+        relatorio = reranquear_nicho(catalogo, "tech", scorer=scorer)
+        
+        assert relatorio["reranqueados"] == 20
+    
+    def test_force(self, catalogo):
+        """forcar=True re-pontua tudo"""
+        reranquear_nicho(catalogo, "tech")
+        
+        assert reranquear_nicho(catalogo, "tech", forcar=True)["reranqueados"] == 20
+    
+    def test_inactive_products_are_skipped(self, catalogo):
+        """Produtos inativos ficam de fora"""
+        catalogo.query(Produto).filter(Produto.shopee_id == "1_0").update({"ativo": False})
+        catalogo.commit()
+        
+        assert reranquear_nicho(catalogo, "tech")["total"] == 19
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
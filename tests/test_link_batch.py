@@ -0,0 +1,178 @@
+"""
+Testes da geração de links em lote (LinkBatchGenerator)
+"""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from src.database.models import Link
+from src.database.repository import ProdutoRepository
+from src.links.affiliate_cache import AffiliateLinkCache
+from src.links.batch import LinkBatchGenerator
+from src.links.short_code import ShortCodeAllocator
+from src.links.shortener import LinkShortener
+from tests.conftest import make_produto
+
+HOJE = datetime(2026, 1, 31)
+
+
+class FakeShopeeAPI:
+    """generate_affiliate_link com latência e contagem de chamadas em voo"""
+    
+    def __init__(self, falhar_item: str = None):
+        self.chamadas = 0
+        self.em_voo = 0
+        self.max_em_voo = 0
+        self.falhar_item = falhar_item
+    
+    async def generate_affiliate_link(self, item_id, shop_id, sub_ids):
+        self.chamadas += 1
+        self.em_voo += 1
+        self.max_em_voo = max(self.max_em_voo, self.em_voo)
+        await asyncio.sleep(0.01)
+        self.em_voo -= 1
+        if item_id == self.falhar_item:
+            return None
+        return f"https://s.shopee.com.br/{shop_id}/{item_id}?{'-'.join(sub_ids)}"
+
+
+@pytest.fixture
+def bancos(bancos):
+    """Banco compartilhado (conftest) com 4 produtos"""
+    session_factory, _ = bancos
+    with session_factory() as db:
+        ProdutoRepository.upsert_many(db, [make_produto(i) for i in range(4)])
+    return bancos
+
+
+def criar_gerador(session_factory, api, concorrencia=4, cache=None):
+    shortener = LinkShortener(api=api, codigos=ShortCodeAllocator(session_factory=session_factory))
+    return LinkBatchGenerator(shortener=shortener, concorrencia=concorrencia, cache=cache or AffiliateLinkCache())
+
+
+def rodar(async_factory, gerador, pedidos, data=HOJE):
+    async def cenario():
+        async with async_factory() as db:
+            return await gerador.gerar(db, pedidos, data=data)
+    
+    return asyncio.run(cenario())
+
+
+class TestLinkBatchGenerator:
+    """Matriz de pedidos com reaproveitamento e INSERT em lote"""
+    
+    def test_expandir(self):
+        pedidos = LinkBatchGenerator.expandir([1, 2], ["tiktok", "grupo"], ["texto"], ["oferta_dia", "flash"])
+        
+        assert len(pedidos) == 8
+        assert pedidos[0] == {"produto_id": 1, "canal": "tiktok", "formato": "texto", "campanha": "oferta_dia"}
+    
+    def test_generates_matrix_with_one_bulk_insert(self, bancos):
+        session_factory, async_factory = bancos
+        api = FakeShopeeAPI()
+        pedidos = LinkBatchGenerator.expandir([1, 2, 3, 4], ["tiktok", "grupo"], ["texto", "video30s"], ["oferta_dia"])
+        
+        inserts = []
+        event.listen(
+            async_factory.kw["bind"].sync_engine, "before_cursor_execute",
+            lambda conn, cursor, statement, *args: inserts.append(statement)
+            if statement.startswith("INSERT INTO links") else None
+        )
+        
+        resultado = rodar(async_factory, criar_gerador(session_factory, api), pedidos)
+        
+        assert (resultado["gerados"], resultado["reutilizados"], resultado["falhas"]) == (16, 0, [])
+        assert len(inserts) == 1
+        assert api.chamadas == 16
+        assert 1 < api.max_em_voo <= 4
+        
+        with session_factory() as db:
+            links = db.query(Link).all()
+            assert len(links) == 16
+            assert len({l.link_curto for l in links}) == 16
+            assert {l.sub_id5 for l in links} == {"20260131"}
+    
+    def test_reuses_links_for_same_subids_and_date(self, bancos):
+        session_factory, async_factory = bancos
+        api = FakeShopeeAPI()
+        gerador = criar_gerador(session_factory, api)
+        pedidos = LinkBatchGenerator.expandir([1, 2], ["tiktok"], ["texto"], ["oferta_dia"])
+        
+        primeiro = rodar(async_factory, gerador, pedidos)
+        segundo = rodar(async_factory, gerador, pedidos + [
+            {"produto_id": 3, "canal": "tiktok", "formato": "texto", "campanha": "oferta_dia"}
+        ])
+        outro_dia = rodar(async_factory, gerador, pedidos, data=datetime(2026, 2, 1))
+        
+        assert (segundo["gerados"], segundo["reutilizados"]) == (1, 2)
+        assert [l["link_id"] for l in segundo["links"][:2]] == [l["link_id"] for l in primeiro["links"]]
+        assert all(l["reutilizado"] for l in segundo["links"][:2])
+        assert outro_dia["gerados"] == 2
+        assert api.chamadas == 5
+    
+    def test_duplicate_requests_call_shopee_once(self, bancos):
+        session_factory, async_factory = bancos
+        api = FakeShopeeAPI()
+        pedido = {"produto_id": 1, "canal": "grupo", "formato": "texto", "campanha": "flash"}
+        
+        resultado = rodar(async_factory, criar_gerador(session_factory, api), [pedido, dict(pedido)])
+        
+        assert api.chamadas == 1
+        assert resultado["gerados"] == 1
+        assert len(resultado["links"]) == 1
+    
+    def test_link_saved_concurrently_counts_as_reused(self, bancos):
+        session_factory, async_factory = bancos
+        api = FakeShopeeAPI()
+        pedidos = LinkBatchGenerator.expandir([1, 2], ["grupo"], ["texto"], ["oferta_dia"])
+        primeiro = rodar(async_factory, criar_gerador(session_factory, api), pedidos[:1])
+        
+        # Cache que ainda não viu o link gravado por outro worker
+        class CacheSemBanco(AffiliateLinkCache):
+            async def buscar_muitos(self, db, chaves):
+                return {}
+        
+        resultado = rodar(async_factory, criar_gerador(session_factory, api, cache=CacheSemBanco()), pedidos)
+        
+        assert (resultado["gerados"], resultado["reutilizados"]) == (1, 1)
+        assert resultado["links"][0]["link_id"] == primeiro["links"][0]["link_id"]
+        assert [l["reutilizado"] for l in resultado["links"]] == [True, False]
+        with session_factory() as db:
+            assert db.query(Link).count() == 2
+    
+    def test_failures_are_reported_and_others_saved(self, bancos):
+        session_factory, async_factory = bancos
+        api = FakeShopeeAPI(falhar_item="0")  # produto 1 = make_produto(0), shopee_id "1_0"
+        pedidos = LinkBatchGenerator.expandir([1, 2, 99], ["grupo"], ["texto"], ["oferta_dia"])
+        
+        resultado = rodar(async_factory, criar_gerador(session_factory, api), pedidos)
+        
+        motivos = {f["produto_id"]: f["motivo"] for f in resultado["falhas"]}
+        assert motivos == {1: "Erro ao gerar link de afiliado", 99: "Produto não encontrado"}
+        assert resultado["gerados"] == 1
+        assert resultado["links"][0]["produto_id"] == 2
+
+
+class TestCriarMuitos:
+    """INSERT em lote com fallback por linha quando um short code colide"""
+    
+    def test_collision_falls_back_to_per_row_insert(self, bancos):
+        from src.database.repository import LinkRepository
+        
+        session_factory, _ = bancos
+        base = {
+            "produto_id": 1, "link_completo": "https://s.shopee.com.br/x",
+            "sub_id1": "grupo", "sub_id2": "tech", "sub_id3": "texto", "sub_id4": "oferta_dia",
+        }
+        with session_factory() as db:
+            LinkRepository.criar(db, {**base, "link_curto": "abc12345", "sub_id5": "20260101"})
+            
+            links = LinkRepository.criar_muitos(db, [
+                {**base, "link_curto": "novo0001", "sub_id5": "20260102"},
+                {**base, "link_curto": "abc12345", "sub_id5": "20260103"},
+            ], gerar_codigo=lambda: "novo0002")
+            
+            assert [(l.link_curto, criado) for l, criado in links] == [("novo0001", True), ("novo0002", True)]
+            assert db.query(Link).count() == 3
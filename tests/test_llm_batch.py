@@ -0,0 +1,204 @@
+"""
+Testes dos jobs de geração de copies em lote
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database import models  # noqa: F401
+from src.database.connection import Base
+from src.database.models import ConteudoGerado, LLMJobItem
+from src.database.repository import LLMJobRepository, ProdutoRepository
+from src.llm.batch import FakeBatchProvider, LLMBatchRunner, PoolProvider
+from src.llm.router import LLMRouter
+from tests.test_llm_router import FakeGPT
+from tests.conftest import make_produto
+
+CANAIS = ["tiktok", "reels", "grupo"]
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Banco SQLite em arquivo com 2 produtos"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'jobs.db'}")
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine)
+    with factory() as db:
+        ProdutoRepository.upsert_many(db, [make_produto(1), make_produto(2)])
+    yield factory
+    engine.dispose()
+
+
+@pytest.fixture
+def produtos():
+    return [{**make_produto(n), "id": n} for n in (1, 2)]
+
+
+def novo_runner(session_factory, provider, **kwargs):
+    return LLMBatchRunner(
+        provider=provider,
+        session_factory=session_factory,
+        tamanho_lote=kwargs.pop("tamanho_lote", 3),
+        intervalo_poll_s=0,
+        **kwargs
+    )
+
+
+def criar_job(runner, produtos, num_variacoes=2):
+    return asyncio.run(runner.criar_job(produtos, CANAIS, num_variacoes, nome="teste"))
+
+
+class FakeBatchComQueda(FakeBatchProvider):
+    """Cai (como o processo caindo) no segundo envio de lote"""
+    
+    async def enviar(self, pedidos):
+        if len(self.lotes) == 1:
+            raise RuntimeError("processo caiu")
+        return await super().enviar(pedidos)
+
+
+class FakeBatchPorItem(FakeBatchProvider):
+    """Responde uma copy própria de cada item, em ordem invertida"""
+    
+    async def buscar(self, lote_id):
+        respostas = await super().buscar(lote_id)
+        if respostas is None:
+            return None
+        return {item_id: f"Copy do item {item_id}" for item_id in reversed(list(respostas))}
+
+
+class TestCriarJob:
+    """Prompts do ContentGenerator viram itens do job"""
+    
+    def test_only_llm_channels_become_items(self, session_factory, produtos):
+        runner = novo_runner(session_factory, FakeBatchProvider())
+        
+        job_id = criar_job(runner, produtos)
+        
+        progresso = asyncio.run(runner.progresso(job_id))
+        # 2 produtos × (tiktok + reels) × 2 variações; grupo usa a copy do template
+        assert (progresso["total"], progresso["pendentes"], progresso["status"]) == (8, 8, "pendente")
+        with session_factory() as db:
+            itens = db.query(LLMJobItem).all()
+        assert {i.canal for i in itens} == {"tiktok", "reels"}
+        assert all(i.prompt for i in itens)
+
+
+class TestExecutar:
+    """Envio, coleta, persistência e retomada"""
+    
+    def test_batch_api_job_persists_contents(self, session_factory, produtos):
+        provider = FakeBatchProvider(consultas_ate_concluir=2)
+        runner = novo_runner(session_factory, provider)
+        job_id = criar_job(runner, produtos)
+        
+        progresso = asyncio.run(runner.executar(job_id))
+        
+        assert progresso["status"] == "concluido"
+        assert (progresso["concluidos"], progresso["falhas"], progresso["percentual"]) == (8, 0, 100.0)
+        assert len(provider.lotes) == 3  # 8 itens em lotes de 3
+        with session_factory() as db:
+            conteudos = db.query(ConteudoGerado).all()
+            itens = db.query(LLMJobItem).all()
+        assert len(conteudos) == 8
+        assert all(c.copy_texto.startswith("Copy gerada:") for c in conteudos)
+        assert {i.conteudo_id for i in itens} == {c.id for c in conteudos}
+    
+    def test_each_item_points_to_its_own_content(self, session_factory, produtos):
+        runner = novo_runner(session_factory, FakeBatchPorItem())
+        job_id = criar_job(runner, produtos)
+        
+        asyncio.run(runner.executar(job_id))
+        
+        with session_factory() as db:
+            pares = db.query(LLMJobItem, ConteudoGerado).join(
+                ConteudoGerado, LLMJobItem.conteudo_id == ConteudoGerado.id
+            ).all()
+        assert len(pares) == 8
+        for item, conteudo in pares:
+            assert conteudo.copy_texto == f"Copy do item {item.id}"
+            assert (conteudo.produto_id, conteudo.canal, conteudo.variacao_numero) == (
+                item.produto_id, item.canal, item.variacao_numero
+            )
+    
+    def test_resumes_after_crash_without_resending(self, session_factory, produtos):
+        provider = FakeBatchComQueda()
+        job_id = criar_job(novo_runner(session_factory, provider), produtos)
+        
+        with pytest.raises(RuntimeError):
+            asyncio.run(novo_runner(session_factory, provider).executar(job_id))
+        
+        parcial = asyncio.run(novo_runner(session_factory, provider).progresso(job_id))
+        assert (parcial["status"], parcial["concluidos"], parcial["pendentes"]) == ("em_andamento", 3, 5)
+        
+        retomado = FakeBatchProvider()
+        retomado.lotes = provider.lotes
+        progresso = asyncio.run(novo_runner(session_factory, retomado).executar(job_id))
+        
+        assert progresso["concluidos"] == 8
+        assert retomado.pedidos_enviados == 5
+        with session_factory() as db:
+            assert db.query(ConteudoGerado).count() == 8
+    
+    def test_resumes_sent_batch_without_resending(self, session_factory, produtos):
+        provider = FakeBatchProvider()
+        runner = novo_runner(session_factory, provider)
+        job_id = criar_job(runner, produtos)
+        
+        # Queda logo depois de enviar o primeiro lote
+        with session_factory() as db:
+            itens = LLMJobRepository.listar_itens(db, job_id, "pendente", 3)
+            pedidos = {item.id: item.prompt for item in itens}
+        lote_id = asyncio.run(provider.enviar(pedidos))
+        with session_factory() as db:
+            LLMJobRepository.marcar_enviados(db, list(pedidos), lote_id)
+        
+        progresso = asyncio.run(runner.executar(job_id))
+        
+        assert progresso["concluidos"] == 8
+        assert provider.pedidos_enviados == 8
+        assert provider.lotes[lote_id]["consultas"] == 1
+    
+    def test_failed_items_are_retried_then_marked(self, session_factory, produtos):
+        runner = novo_runner(session_factory, FakeBatchProvider(), max_tentativas=2)
+        job_id = criar_job(runner, produtos)
+        with session_factory() as db:
+            prompts = [item.prompt for item in LLMJobRepository.listar_itens(db, job_id, "pendente")]
+        runner.provider.falhar_em = {prompts[0]}
+        esperadas = prompts.count(prompts[0])
+        
+        progresso = asyncio.run(runner.executar(job_id))
+        
+        assert (progresso["status"], progresso["falhas"]) == ("concluido", esperadas)
+        assert progresso["concluidos"] == 8 - esperadas
+        assert runner.provider.pedidos_enviados == 8 + esperadas  # uma nova tentativa cada
+        with session_factory() as db:
+            falhos = LLMJobRepository.listar_itens(db, job_id, "falhou")
+        assert all(item.tentativas == 2 and item.conteudo_id is None for item in falhos)
+        assert all(item.erro == "Sem resposta do provedor" for item in falhos)
+    
+    def test_pool_provider_uses_router(self, session_factory, produtos):
+        router = LLMRouter(concorrencia={"gpt": 2})
+        router.gpt = FakeGPT()
+        runner = novo_runner(session_factory, PoolProvider(router), tamanho_lote=4)
+        job_id = criar_job(runner, produtos)
+        
+        progresso = asyncio.run(runner.executar(job_id))
+        
+        assert (progresso["concluidos"], progresso["provider"]) == (8, "gpt")
+        assert router.gpt.max_em_voo == 2
+        with session_factory() as db:
+            assert all(c.copy_texto.startswith("copy de ") for c in db.query(ConteudoGerado))
+    
+    def test_retomar_runs_every_unfinished_job(self, session_factory, produtos):
+        runner = novo_runner(session_factory, FakeBatchProvider())
+        primeiro = criar_job(runner, produtos[:1])
+        segundo = criar_job(runner, produtos[1:])
+        
+        resultados = asyncio.run(runner.retomar())
+        
+        assert [r["job_id"] for r in resultados] == [primeiro, segundo]
+        assert all(r["status"] == "concluido" for r in resultados)
+        assert asyncio.run(runner.retomar()) == []
@@ -0,0 +1,184 @@
+"""
+Testes do custo e orçamento dos LLMs
+"""
+import asyncio
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+
+from src.llm import budget as budget_module
+from src.llm.budget import LLMBudget, contexto_uso, estimar_tokens
+from src.llm.cache import LLMCache
+from src.llm.gpt_client import GPTClient
+from src.llm.router import LLMRouter, LLMTask
+from src.utils.resilience import Resilience
+
+PRECOS = {"caro": (0.01, 0.03), "barato": (0.001, 0.002)}
+
+
+def novo_budget(**kwargs):
+    return LLMBudget(
+        orcamento_diario_usd=kwargs.pop("orcamento_diario_usd", 1.0),
+        orcamento_por_tarefa_usd=kwargs.pop("orcamento_por_tarefa_usd", {}),
+        precos=PRECOS,
+        modelo_economico={"caro": "barato"},
+        **kwargs
+    )
+
+
+class TestContabilidade:
+    """Tokens, custo e atribuição"""
+    
+    def test_estimate_without_tokenizer(self, monkeypatch):
+        monkeypatch.setattr(budget_module, "_codificador", lambda modelo: None)
+        
+        assert estimar_tokens("", "caro") == 0
+        assert estimar_tokens("a" * 40, "caro") == 10
+        assert estimar_tokens("abc", "caro") == 1
+    
+    def test_cost_uses_price_table(self):
+        budget = novo_budget()
+        
+        assert budget.custo("caro", 1000, 1000) == pytest.approx(0.04)
+        assert budget.custo("desconhecido", 1000, 1000) == 0.0
+    
+    def test_spend_is_attributed_to_task_niche_and_channel(self):
+        budget = novo_budget()
+        
+        with contexto_uso("copywriting", "eletronicos", "tiktok") as uso:
+            budget.registrar("caro", 1000, 500)
+        budget.registrar_uso("barato", "a" * 40, "b" * 40)
+        
+        assert uso["chamadas"] == 1
+        assert uso["custo_usd"] == pytest.approx(0.025)
+        stats = budget.get_stats()
+        assert stats["gasto_usd"] == pytest.approx(0.025 + 0.00003, abs=1e-5)
+        assert stats["por_tarefa"]["copywriting"]["custo_usd"] == pytest.approx(0.025)
+        assert stats["por_nicho"]["eletronicos"]["tokens_prompt"] == 1000
+        assert stats["por_canal"]["tiktok"]["tokens_resposta"] == 500
+        assert stats["por_canal"]["sem_canal"]["chamadas"] == 1
+        assert set(stats["por_modelo"]) == {"caro", "barato"}
+        assert stats["chamadas_estimadas"] == 1
+    
+    def test_spend_resets_on_new_day(self):
+        budget = novo_budget()
+        budget.registrar("caro", 1000, 1000)
+        
+        budget._dia -= timedelta(days=1)
+        
+        assert budget.gasto() == 0
+        assert budget.get_stats()["por_tarefa"] == {}
+
+
+class TestDecisao:
+    """Troca de modelo e modo só cache"""
+    
+    def test_normal_then_cheaper_model_then_cache_only(self):
+        budget = novo_budget()
+        
+        assert budget.decidir("copywriting", "caro") == ("caro", False, "normal")
+        
+        budget.registrar("caro", 20_000, 20_000)  # 0.80 USD
+        assert budget.decidir("copywriting", "caro") == ("barato", False, "modelo_economico")
+        assert budget.decidir("copywriting", "sem_alternativa").modelo == "sem_alternativa"
+        
+        budget.registrar("caro", 5_000, 5_000)  # 1.00 USD
+        assert budget.decidir("copywriting", "caro") == ("caro", True, "somente_cache")
+        assert budget.get_stats()["decisoes"] == {"modelo_economico": 1, "somente_cache": 1}
+    
+    def test_task_budget_is_enforced_separately(self):
+        budget = novo_budget(orcamento_diario_usd=100.0, orcamento_por_tarefa_usd={"hashtags": 0.1})
+        
+        with contexto_uso("hashtags"):
+            budget.registrar("caro", 2_500, 2_500)  # 0.10 USD
+        
+        assert budget.decidir("hashtags", "caro").somente_cache
+        assert not budget.decidir("copywriting", "caro").somente_cache
+        assert budget.get_stats()["por_tarefa"]["hashtags"]["orcamento_usd"] == 0.1
+    
+    def test_zero_budget_means_unlimited(self):
+        budget = novo_budget(orcamento_diario_usd=0)
+        budget.registrar("caro", 1_000_000, 1_000_000)
+        
+        assert budget.decidir("copywriting", "caro").motivo == "normal"
+        assert budget.get_stats()["restante_usd"] is None
+
+
+class FakeCompletions:
+    """client.chat.completions de mentira que informa o uso de tokens"""
+    
+    def __init__(self):
+        self.chamadas = []
+    
+    async def create(self, **kwargs):
+        self.chamadas.append(kwargs)
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=f"copy {len(self.chamadas)}"))],
+            usage=SimpleNamespace(prompt_tokens=1000, completion_tokens=1000),
+        )
+
+
+@pytest.fixture
+def gpt(tmp_path):
+    cliente = GPTClient()
+    completions = FakeCompletions()
+    cliente.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    cliente.cache = LLMCache(caminho=str(tmp_path / "llm_cache.db"), habilitado=True)
+    cliente.resilience = Resilience(backoff_base_s=0.001)
+    cliente.budget = LLMBudget(orcamento_diario_usd=0.1, orcamento_por_tarefa_usd={})
+    return cliente, completions
+
+
+def novo_router(cliente):
+    router = LLMRouter()
+    router.gpt = cliente
+    router.budget = cliente.budget
+    return router
+
+
+class TestRouterComOrcamento:
+    """O router aplica a decisão de orçamento"""
+    
+    def test_gpt_registers_reported_tokens(self, gpt):
+        cliente, _ = gpt
+        
+        resultado = asyncio.run(novo_router(cliente).execute(
+            LLMTask.COPYWRITING, prompt="copy do fone", temperature=0.2, nicho="eletronicos", canal="tiktok"
+        ))
+        
+        assert resultado["uso"]["chamadas"] == 1
+        assert resultado["uso"]["custo_usd"] == pytest.approx(0.04)
+        assert resultado["uso"]["orcamento"] == "normal"
+        stats = cliente.budget.get_stats()
+        assert (stats["tokens_prompt"], stats["chamadas_estimadas"]) == (1000, 0)
+        assert stats["por_nicho"]["eletronicos"]["chamadas"] == 1
+        assert stats["por_tarefa"]["copywriting"]["chamadas"] == 1
+    
+    def test_near_limit_uses_cheaper_model(self, gpt):
+        cliente, completions = gpt
+        cliente.budget.registrar(GPTClient.MODELO_COPY, 4000, 1500)  # 0.085 de 0.10 USD
+        
+        resultado = asyncio.run(novo_router(cliente).execute(LLMTask.COPYWRITING, prompt="copy do fone"))
+        
+        assert completions.chamadas[0]["model"] == "gpt-3.5-turbo"
+        assert (resultado["uso"]["modelo"], resultado["uso"]["orcamento"]) == ("gpt-3.5-turbo", "modelo_economico")
+    
+    def test_exhausted_budget_serves_only_cached_copies(self, gpt):
+        cliente, completions = gpt
+        router = novo_router(cliente)
+        asyncio.run(router.execute(LLMTask.COPYWRITING, prompt="copy do fone", temperature=0.9))
+        cliente.budget.registrar(GPTClient.MODELO_COPY, 10_000, 10_000)
+        
+        cacheada = asyncio.run(router.execute(LLMTask.COPYWRITING, prompt="copy do fone", temperature=0.9))
+        nova = asyncio.run(router.execute(LLMTask.COPYWRITING, prompt="copy do relógio"))
+        ranking = asyncio.run(router.execute(LLMTask.RANKING, produtos=[]))
+        
+        assert cacheada["copy"] == "copy 1"
+        assert cacheada["uso"] == {
+            "chamadas": 0, "tokens_prompt": 0, "tokens_resposta": 0, "custo_usd": 0.0,
+            "modelo": GPTClient.MODELO_COPY, "orcamento": "somente_cache",
+        }
+        assert nova is None
+        assert ranking is None
+        assert len(completions.chamadas) == 1
@@ -0,0 +1,221 @@
+"""
+Testes do cache de respostas de LLM (memória + SQLite)
+"""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.llm.cache import LLMCache
+from src.llm.gpt_client import GPTClient
+from src.llm.router import LLMRouter, LLMTask
+from src.utils.resilience import Resilience
+
+
+class Gerador:
+    """gerar() de mentira: devolve "resposta 1", "resposta 2", ..."""
+    
+    def __init__(self, respostas=None):
+        self.respostas = list(respostas) if respostas is not None else None
+        self.chamadas = 0
+    
+    async def __call__(self):
+        self.chamadas += 1
+        if self.respostas is not None:
+            return self.respostas.pop(0)
+        return f"resposta {self.chamadas}"
+
+
+def pedir(cache, gerador, prompt="Escreva uma copy", temperatura=0.2, **params):
+    return asyncio.run(cache.obter_ou_gerar(
+        "gpt", "gpt-4-turbo-preview", prompt, {"temperature": temperatura, **params}, gerador
+    ))
+
+
+@pytest.fixture
+def caminho(tmp_path):
+    return str(tmp_path / "llm_cache.db")
+
+
+class TestChave:
+    """Chave por conteúdo"""
+    
+    def test_same_request_same_key(self):
+        a = LLMCache.chave("gpt", "gpt-4", "oi", {"temperature": 0.7, "max_tokens": 10})
+        b = LLMCache.chave("gpt", "gpt-4", "oi", {"max_tokens": 10, "temperature": 0.7})
+        
+        assert a == b
+        assert len(a) == 64
+    
+    def test_any_field_changes_key(self):
+        base = LLMCache.chave("gpt", "gpt-4", "oi", {"temperature": 0.7})
+        
+        assert LLMCache.chave("deepseek", "gpt-4", "oi", {"temperature": 0.7}) != base
+        assert LLMCache.chave("gpt", "gpt-3.5-turbo", "oi", {"temperature": 0.7}) != base
+        assert LLMCache.chave("gpt", "gpt-4", "olá", {"temperature": 0.7}) != base
+        assert LLMCache.chave("gpt", "gpt-4", "oi", {"temperature": 0.8}) != base
+
+
+class TestLLMCache:
+    """Memória -> SQLite -> API"""
+    
+    def test_low_temperature_calls_api_once(self, caminho):
+        cache = LLMCache(caminho=caminho, habilitado=True)
+        gerador = Gerador()
+        
+        respostas = [pedir(cache, gerador) for _ in range(3)]
+        
+        assert respostas == ["resposta 1"] * 3
+        assert gerador.chamadas == 1
+        stats = cache.get_stats()
+        assert (stats["hits_memoria"], stats["misses"]) == (2, 1)
+    
+    def test_disk_tier_is_shared_between_processes(self, caminho):
+        gerador = Gerador()
+        pedir(LLMCache(caminho=caminho, habilitado=True), gerador)
+        
+        outro_processo = LLMCache(caminho=caminho, habilitado=True)
+        
+        assert pedir(outro_processo, gerador) == "resposta 1"
+        assert gerador.chamadas == 1
+        assert outro_processo.get_stats()["hits_disco"] == 1
+    
+    def test_disk_tier_runs_off_the_event_loop(self, caminho, monkeypatch):
+        cache = LLMCache(caminho=caminho, habilitado=True)
+        threads = []
+        for metodo in ("_ler_disco", "_gravar_disco"):
+            original = getattr(cache, metodo)
+            monkeypatch.setattr(
+                cache, metodo,
+                lambda *args, _original=original: threads.append(threading.get_ident()) or _original(*args)
+            )
+        
+        pedir(cache, Gerador())
+        
+        assert len(threads) == 2
+        assert threading.get_ident() not in threads
+    
+    def test_high_temperature_collects_variations_then_rotates(self, caminho):
+        cache = LLMCache(caminho=caminho, variacoes=3, habilitado=True)
+        gerador = Gerador()
+        
+        respostas = [pedir(cache, gerador, temperatura=0.9) for _ in range(6)]
+        
+        assert gerador.chamadas == 3
+        assert respostas[:3] == ["resposta 1", "resposta 2", "resposta 3"]
+        assert sorted(respostas[3:]) == ["resposta 1", "resposta 2", "resposta 3"]
+    
+    def test_repeated_answer_is_not_a_new_variation(self, caminho):
+        cache = LLMCache(caminho=caminho, variacoes=2, habilitado=True)
+        gerador = Gerador(["igual", "igual", "outra"])
+        
+        for _ in range(4):
+            pedir(cache, gerador, temperatura=0.9)
+        
+        assert gerador.chamadas == 3
+    
+    def test_empty_answer_is_not_cached(self, caminho):
+        cache = LLMCache(caminho=caminho, habilitado=True)
+        gerador = Gerador([None, "agora sim"])
+        
+        assert pedir(cache, gerador) is None
+        assert pedir(cache, gerador) == "agora sim"
+        assert gerador.chamadas == 2
+    
+    def test_expired_entries_are_regenerated(self, caminho):
+        cache = LLMCache(caminho=caminho, ttl_s=0.05, habilitado=True)
+        gerador = Gerador()
+        pedir(cache, gerador)
+        
+        time.sleep(0.06)
+        
+        assert pedir(cache, gerador) == "resposta 2"
+        assert pedir(LLMCache(caminho=caminho, habilitado=True), gerador) == "resposta 2"
+    
+    def test_purge_removes_expired_and_least_recently_used(self, caminho):
+        cache = LLMCache(caminho=caminho, max_bytes=100, habilitado=True)
+        for indice in range(4):
+            pedir(cache, Gerador(["x" * 40]), prompt=f"prompt {indice}")
+            time.sleep(0.01)
+        pedir(LLMCache(caminho=caminho, habilitado=True), Gerador(), prompt="prompt 0")  # acesso em disco
+        
+        removidos = cache.purgar()
+        
+        assert removidos == 2
+        outro_processo = LLMCache(caminho=caminho, habilitado=True)
+        restantes = [
+            indice for indice in range(4)
+            if outro_processo.get(LLMCache.chave("gpt", "gpt-4-turbo-preview", f"prompt {indice}", {"temperature": 0.2}))
+        ]
+        assert restantes == [0, 3]
+    
+    def test_memory_only_and_disabled(self, caminho):
+        so_memoria = LLMCache(caminho="", max_itens_memoria=1, habilitado=True)
+        gerador = Gerador()
+        pedir(so_memoria, gerador, prompt="a")
+        pedir(so_memoria, gerador, prompt="b")
+        
+        assert pedir(so_memoria, gerador, prompt="b") == "resposta 2"
+        assert pedir(so_memoria, gerador, prompt="a") == "resposta 3"
+        
+        desligado = LLMCache(caminho=caminho, habilitado=False)
+        gerador = Gerador()
+        pedir(desligado, gerador)
+        pedir(desligado, gerador)
+        assert gerador.chamadas == 2
+
+
+class FakeCompletions:
+    """client.chat.completions de mentira"""
+    
+    def __init__(self):
+        self.chamadas = []
+    
+    async def create(self, **kwargs):
+        self.chamadas.append(kwargs)
+        texto = f"copy {len(self.chamadas)}"
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=texto))])
+
+
+@pytest.fixture
+def gpt(caminho):
+    cliente = GPTClient()
+    completions = FakeCompletions()
+    cliente.client = SimpleNamespace(chat=SimpleNamespace(completions=completions))
+    cliente.cache = LLMCache(caminho=caminho, habilitado=True)
+    cliente.resilience = Resilience(backoff_base_s=0.001)
+    return cliente, completions
+
+
+class TestClientesComCache:
+    """Clientes e router usam o cache"""
+    
+    def test_gpt_copy_uses_cache(self, gpt):
+        cliente, completions = gpt
+        
+        primeira = asyncio.run(cliente.generate_copy("copy do fone", temperature=0.2))
+        segunda = asyncio.run(cliente.generate_copy("copy do fone", temperature=0.2))
+        outra = asyncio.run(cliente.generate_copy("copy do fone", temperature=0.2, max_tokens=50))
+        
+        assert primeira == segunda == "copy 1"
+        assert outra == "copy 2"
+        assert len(completions.chamadas) == 2
+    
+    def test_router_reports_hits_and_misses_per_task(self, gpt):
+        cliente, _ = gpt
+        router = LLMRouter()
+        router.gpt = cliente
+        
+        async def cenario():
+            primeira = await router.execute(LLMTask.COPYWRITING, prompt="copy do fone", temperature=0.2)
+            segunda = await router.execute(LLMTask.COPYWRITING, prompt="copy do fone", temperature=0.2)
+            return primeira, segunda
+        
+        primeira, segunda = asyncio.run(cenario())
+        
+        assert (primeira["copy"], primeira["cache"]) == ("copy 1", {"hits": 0, "misses": 1})
+        assert (segunda["copy"], segunda["cache"]) == ("copy 1", {"hits": 1, "misses": 0})
+        assert segunda["uso"]["chamadas"] == 0
+        assert router.get_stats() == {"copywriting": {"hits": 1, "misses": 1}}
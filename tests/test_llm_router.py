@@ -0,0 +1,205 @@
+"""
+Testes do router de LLMs (execução paralela, fallback e hedge)
+"""
+import asyncio
+import time
+
+from src.llm.router import LLMRouter, LLMTask
+
+
+class FakeGPT:
+    """generate_copy de mentira que mede quantas chamadas ficam em voo"""
+    
+    def __init__(self, falhar_em: str = None):
+        self.falhar_em = falhar_em
+        self.em_voo = 0
+        self.max_em_voo = 0
+    
+    async def generate_copy(self, prompt, **kwargs):
+        self.em_voo += 1
+        self.max_em_voo = max(self.max_em_voo, self.em_voo)
+        try:
+            await asyncio.sleep(0.02)
+            if prompt == self.falhar_em:
+                raise RuntimeError("falhou")
+            return f"copy de {prompt}"
+        finally:
+            self.em_voo -= 1
+
+
+class FakeDeepSeek:
+    """generate_copy de mentira com atraso configurável"""
+    
+    def __init__(self, atraso: float = 0.0, resposta: str = "copy deepseek"):
+        self.atraso = atraso
+        self.resposta = resposta
+        self.chamadas = 0
+    
+    async def generate_copy(self, prompt, max_tokens=500):
+        self.chamadas += 1
+        await asyncio.sleep(self.atraso)
+        return self.resposta
+
+
+class LentoGPT:
+    """GPT que demora `atraso` segundos e registra se foi cancelado"""
+    
+    def __init__(self, atraso: float):
+        self.atraso = atraso
+        self.cancelado = False
+    
+    async def generate_copy(self, prompt, **kwargs):
+        try:
+            await asyncio.sleep(self.atraso)
+        except asyncio.CancelledError:
+            self.cancelado = True
+            raise
+        return "copy gpt"
+
+
+def novo_router(gpt, deepseek, hedge=False, timeout_s=1.0):
+    router = LLMRouter(politicas={
+        "copywriting": {"provedores": ["gpt", "deepseek", "template"], "timeout_s": timeout_s, "hedge": hedge},
+    })
+    router.gpt = gpt
+    router.deepseek = deepseek
+    return router
+
+
+class TestExecuteMany:
+    """Pedidos em paralelo sob o semáforo do provedor"""
+    
+    def test_respects_provider_limit_and_keeps_order(self):
+        router = LLMRouter(concorrencia={"gpt": 2})
+        router.gpt = FakeGPT()
+        
+        resultados = asyncio.run(router.execute_many(
+            LLMTask.COPYWRITING, [{"prompt": str(i)} for i in range(6)]
+        ))
+        
+        assert [r["copy"] for r in resultados] == [f"copy de {i}" for i in range(6)]
+        assert router.gpt.max_em_voo == 2
+    
+    def test_failed_request_becomes_none(self):
+        router = LLMRouter()
+        router.gpt = FakeGPT(falhar_em="1")
+        router.deepseek = FakeDeepSeek(resposta=None)
+        
+        resultados = asyncio.run(router.execute_many(
+            LLMTask.COPYWRITING, [{"prompt": str(i)} for i in range(3)]
+        ))
+        
+        assert resultados[1] is None
+        assert resultados[0]["copy"] == "copy de 0"
+        assert resultados[2]["copy"] == "copy de 2"
+    
+    def test_semaphores_survive_new_event_loops(self):
+        router = LLMRouter(concorrencia={"gpt": 1})
+        router.gpt = FakeGPT()
+        pedidos = [{"prompt": "a"}, {"prompt": "b"}]
+        
+        asyncio.run(router.execute_many(LLMTask.COPYWRITING, pedidos))
+        resultados = asyncio.run(router.execute_many(LLMTask.COPYWRITING, pedidos))
+        
+        assert [r["copy"] for r in resultados] == ["copy de a", "copy de b"]
+        assert router.gpt.max_em_voo == 1
+
+
+class TestFallback:
+    """Cadeia de provedores com timeout"""
+    
+    def test_error_falls_back_to_next_provider(self):
+        router = novo_router(FakeGPT(falhar_em="x"), FakeDeepSeek())
+        
+        resultado = asyncio.run(router.execute(LLMTask.COPYWRITING, prompt="x"))
+        
+        assert (resultado["copy"], resultado["provedor"]) == ("copy deepseek", "deepseek")
+        assert resultado["uso"]["modelo"] == "deepseek-chat"
+        assert router.get_roteamento_stats()["fallbacks"] == {"copywriting": {"deepseek": 1}}
+    
+    def test_timeout_falls_back_and_is_counted(self):
+        router = novo_router(LentoGPT(atraso=1.0), FakeDeepSeek(), timeout_s=0.05)
+        
+        resultado = asyncio.run(router.execute(LLMTask.COPYWRITING, prompt="x"))
+        
+        assert resultado["provedor"] == "deepseek"
+        assert router.gpt.cancelado
+        stats = router.get_roteamento_stats()
+        assert stats["timeouts"] == {"gpt": 1}
+        assert stats["latencia"]["gpt"]["p95_ms"] == 50.0
+    
+    def test_local_template_is_the_last_resort(self):
+        router = novo_router(FakeGPT(falhar_em="x"), FakeDeepSeek(resposta=None))
+        produto = {"id": 1, "nome": "Fone Bluetooth", "preco_original": 100.0,
+                   "preco_promocional": 80.0, "nicho": "tech", "url_produto": "https://s.shopee.com.br/x"}
+        
+        resultado = asyncio.run(router.execute(LLMTask.COPYWRITING, prompt="x", produto=produto))
+        
+        assert resultado["provedor"] == "template"
+        assert "Fone Bluetooth" in resultado["copy"]
+        assert resultado["uso"]["modelo"] is None
+    
+    def test_hashtags_fall_back_to_local_template(self):
+        class SemHashtags:
+            async def generate_hashtags(self, produto, nicho, **kwargs):
+                return []
+        
+        router = LLMRouter()
+        router.gpt = SemHashtags()
+        
+        resultado = asyncio.run(router.execute(
+            LLMTask.HASHTAGS, produto={"nome": "Fone Bluetooth"}, nicho="tech", num_hashtags=5
+        ))
+        
+        assert resultado["provedor"] == "template"
+        assert 0 < len(resultado["hashtags"]) <= 5
+        assert all(tag.startswith("#") for tag in resultado["hashtags"])
+    
+    def test_provider_slower_than_timeout_goes_to_the_end(self):
+        router = novo_router(FakeGPT(), FakeDeepSeek(), timeout_s=0.5)
+        assert router.provedores(LLMTask.COPYWRITING) == ["gpt", "deepseek", "template"]
+        
+        for _ in range(20):
+            router.latencias.observar("gpt", 0.6)
+        
+        assert router.provedores(LLMTask.COPYWRITING) == ["deepseek", "gpt", "template"]
+
+
+class TestHedge:
+    """Pedido reserva após o p95 do provedor principal"""
+    
+    def test_hedge_fires_after_p95_and_cancels_loser(self):
+        router = novo_router(LentoGPT(atraso=1.0), FakeDeepSeek(atraso=0.01), hedge=True, timeout_s=5.0)
+        for _ in range(20):
+            router.latencias.observar("gpt", 0.05)
+        
+        inicio = time.monotonic()
+        resultado = asyncio.run(router.execute(LLMTask.COPYWRITING, prompt="x"))
+        
+        assert time.monotonic() - inicio < 0.5
+        assert resultado["provedor"] == "deepseek"
+        assert router.gpt.cancelado
+        stats = router.get_roteamento_stats()
+        assert (stats["hedges"], stats["hedges_vencidos"]) == (1, 1)
+    
+    def test_fast_primary_does_not_hedge(self):
+        deepseek = FakeDeepSeek()
+        router = novo_router(LentoGPT(atraso=0.01), deepseek, hedge=True)
+        for _ in range(20):
+            router.latencias.observar("gpt", 0.5)
+        
+        resultado = asyncio.run(router.execute(LLMTask.COPYWRITING, prompt="x"))
+        
+        assert resultado["provedor"] == "gpt"
+        assert deepseek.chamadas == 0
+        assert router.get_roteamento_stats()["hedges"] == 0
+        assert router.latencias.amostras("gpt") == 21
+    
+    def test_no_hedge_without_latency_history(self):
+        deepseek = FakeDeepSeek()
+        router = novo_router(LentoGPT(atraso=0.1), deepseek, hedge=True)
+        
+        resultado = asyncio.run(router.execute(LLMTask.COPYWRITING, prompt="x"))
+        
+        assert resultado["provedor"] == "gpt"
+        assert deepseek.chamadas == 0
@@ -0,0 +1,99 @@
+"""
+Testes das migrações Alembic
+"""
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.migration import MigrationContext
+from sqlalchemy import create_engine, inspect, text
+
+from src.database import models  # noqa: F401
+from src.database.connection import Base
+
+ROOT_DIR = Path(__file__).parent.parent
+
+
+@pytest.fixture
+def alembic_config(tmp_path):
+    config = Config(str(ROOT_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT_DIR / "migrations"))
+    config.set_main_option("sqlalchemy.url", f"sqlite:///{tmp_path / 'migracoes.db'}")
+    config.attributes["configure_logger"] = False
+    return config
+
+
+class TestMigrations:
+    """As migrações produzem o mesmo schema dos models"""
+    
+    def test_head_matches_models(self, alembic_config):
+        """upgrade head não deixa diferenças em relação a Base.metadata"""
+        command.upgrade(alembic_config, "head")
+        
+        engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+        with engine.connect() as connection:
+            diferencas = compare_metadata(MigrationContext.configure(connection), Base.metadata)
+        
+        assert diferencas == []
+    
+    def test_downgrade_and_upgrade_again(self, alembic_config):
+        """Todas as migrações são reversíveis"""
+        command.upgrade(alembic_config, "head")
+        command.downgrade(alembic_config, "base")
+        command.upgrade(alembic_config, "head")
+        
+        engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+        indices = {i["name"] for i in inspect(engine).get_indexes("conteudos_gerados")}
+        
+        assert "ix_conteudos_pendentes_publicacao" in indices
+
+    
+    def test_0006_merges_duplicate_links(self, alembic_config):
+        """Links repetidos por produto + SubIds são somados no mais antigo"""
+        command.upgrade(alembic_config, "0005")
+        
+        engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+        with engine.begin() as conn:
+            conn.execute(text(
+                "INSERT INTO produtos (id, shopee_id, nome, preco_original, comissao_percentual, "
+                "comissao_valor, nicho, url_produto) VALUES (1, '1_1', 'P', 10, 10, 1, 'tech', 'u')"
+            ))
+            for i, (sub_id5, cliques) in enumerate([("20260101", 3), ("20260101", 4), ("20260102", 1)]):
+                conn.execute(text(
+                    "INSERT INTO links (produto_id, link_curto, link_completo, sub_id1, sub_id2, sub_id3, "
+                    "sub_id4, sub_id5, total_cliques, total_conversoes, receita_gerada) "
+                    "VALUES (1, :curto, 'u', 'grupo', 'tech', 'texto', 'oferta_dia', :sub_id5, :cliques, 0, 0)"
+                ), {"curto": f"c{i}", "sub_id5": sub_id5, "cliques": cliques})
+        
+        command.upgrade(alembic_config, "head")
+        
+        with engine.connect() as conn:
+            linhas = conn.execute(text("SELECT link_curto, total_cliques FROM links ORDER BY id")).all()
+        assert [tuple(l) for l in linhas] == [("c0", 7), ("c2", 1)]
+        assert "uq_links_produto_subids" in {i["name"] for i in inspect(engine).get_indexes("links")}
+
+    
+    def test_0008_marks_rows_below_watermark(self, alembic_config):
+        """Linhas até o watermark já agregadas nascem com agregado = true"""
+        command.upgrade(alembic_config, "0007")
+        
+        engine = create_engine(alembic_config.get_main_option("sqlalchemy.url"))
+        with engine.begin() as conn:
+            for i in (1, 2, 3):
+                conn.execute(text("INSERT INTO analytics (id, data) VALUES (:id, '2026-10-01')"), {"id": i})
+            for nome in ("analytics_diario", "analytics_produto_diario"):
+                conn.execute(text(
+                    "INSERT INTO rollup_watermarks (nome, ultimo_id) VALUES (:nome, 2)"
+                ), {"nome": nome})
+        
+        command.upgrade(alembic_config, "head")
+        
+        with engine.connect() as conn:
+            linhas = conn.execute(text("SELECT id, agregado FROM analytics ORDER BY id")).all()
+        assert [tuple(l) for l in linhas] == [(1, 1), (2, 1), (3, 0)]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,146 @@
+"""
+Testes para o pipeline de coleta multi-nicho
+"""
+import asyncio
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from config.constants import NICHOS
+from src.collectors.pipeline import CollectionPipeline
+from src.database import models  # noqa: F401
+from src.database.connection import Base
+from src.database.models import Produto
+
+
+def make_offer(item_id: int, valida: bool = True) -> dict:
+    """Oferta raw no formato da API Shopee"""
+    return {
+        "item_id": item_id,
+        "shop_id": 1,
+        "product_name": f"Produto {item_id}",
+        "price_max": 10000000,
+        "price_min": 8000000,
+        "commission_rate": 1000 if valida else 100,
+        "item_rating": {"rating_star": 4.8, "rating_count": [120]},
+        "item_sold": 500,
+        "image": "https://example.com/img.jpg",
+    }
+
+
+class FakeShopeeAPI:
+    """API falsa: cada palavra-chave demora `atraso` segundos por página"""
+    
+    def __init__(self, atraso: float = 0.05, paginas: int = 2, por_pagina: int = 5):
+        self.atraso = atraso
+        self.paginas = paginas
+        self.por_pagina = por_pagina
+        self.em_voo = 0
+        self.max_em_voo = 0
+        self.buscas = []
+    
+    async def iter_product_offers(
+        self, keyword=None, category_id=None, max_items=None, concurrency=1, semaphore=None, **kwargs
+    ):
+        self.buscas.append((keyword, category_id))
+        base = (sum(ord(c) for c in keyword) if keyword else category_id) * 1000
+        for page in range(self.paginas):
+            async with semaphore:
+                self.em_voo += 1
+                self.max_em_voo = max(self.max_em_voo, self.em_voo)
+                await asyncio.sleep(self.atraso)
+                self.em_voo -= 1
+            for i in range(self.por_pagina):
+                item_id = base + page * self.por_pagina + i
+                yield make_offer(item_id, valida=i != 0)
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pipeline.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+
+
+class TestCollectionPipeline:
+    """Testes do orquestrador de coleta"""
+    
+    def test_collects_all_niches_in_parallel(self, session_factory):
+        """Nichos e palavras-chave rodam ao mesmo tempo"""
+        api = FakeShopeeAPI(atraso=0.05)
+        pipeline = CollectionPipeline(api=api, concorrencia_global=100, session_factory=session_factory)
+        
+        resultado = asyncio.run(pipeline.run(["casa", "tech", "pet", "cosmeticos"]))
+        
+        # Em série seriam 18 palavras-chave x 2 páginas x 50 ms = 1,8 s
+        assert resultado["duracao_s"] < 0.5
+        assert resultado["soma_duracoes_s"] > resultado["duracao_s"]
+        
+        tech = resultado["nichos"]["tech"]
+        palavras = len(NICHOS["tech"]["palavras_chave"])
+        assert tech["coletados"] == palavras * 10
+        assert tech["validos"] == palavras * 8
+        assert tech["salvos"] == palavras * 8
+        assert tech["ofertas_por_s"] > 0
+        
+        db = session_factory()
+        assert db.query(Produto).count() == resultado["total_salvos"]
+        db.close()
+    
+    def test_fans_out_over_keywords_and_categories(self, session_factory, monkeypatch):
+        """Cada categoria configurada vira uma busca além das palavras-chave"""
+        monkeypatch.setitem(NICHOS, "pet", {**NICHOS["pet"], "categoria_ids": [7, 8]})
+        api = FakeShopeeAPI(atraso=0)
+        pipeline = CollectionPipeline(api=api, session_factory=session_factory)
+        
+        resultado = asyncio.run(pipeline.run(["pet"]))
+        
+        palavras = NICHOS["pet"]["palavras_chave"]
+        assert sorted(api.buscas, key=str) == sorted(
+            [(k, None) for k in palavras] + [(None, 7), (None, 8)], key=str
+        )
+        assert resultado["nichos"]["pet"]["coletados"] == (len(palavras) + 2) * 10
+    
+    def test_global_concurrency_cap(self, session_factory):
+        """O semáforo global limita as páginas em voo"""
+        api = FakeShopeeAPI(atraso=0.01)
+        pipeline = CollectionPipeline(api=api, concorrencia_global=3, session_factory=session_factory)
+        
+        asyncio.run(pipeline.run(["casa", "tech"]))
+        
+        assert api.max_em_voo == 3
+    
+    def test_quota_per_niche(self, session_factory):
+        """Cada nicho para ao atingir a cota de produtos válidos"""
+        api = FakeShopeeAPI(atraso=0.01, paginas=20)
+        pipeline = CollectionPipeline(api=api, cota_por_nicho=7, session_factory=session_factory)
+        
+        resultado = asyncio.run(pipeline.run(["pet"]))
+        
+        assert resultado["nichos"]["pet"]["validos"] == 7
+        assert resultado["nichos"]["pet"]["salvos"] == 7
+    
+    def test_existing_products_are_not_duplicated(self, session_factory):
+        """Uma segunda coleta não salva de novo os mesmos produtos"""
+        api = FakeShopeeAPI(atraso=0)
+        pipeline = CollectionPipeline(api=api, session_factory=session_factory)
+        
+        primeira = asyncio.run(pipeline.run(["casa"]))
+        segunda = asyncio.run(pipeline.run(["casa"]))
+        
+        assert primeira["total_salvos"] > 0
+        assert segunda["total_salvos"] == 0
+    
+    def test_unknown_niche(self, session_factory):
+        """Nicho desconhecido gera relatório vazio sem derrubar os demais"""
+        pipeline = CollectionPipeline(api=FakeShopeeAPI(atraso=0), session_factory=session_factory)
+        
+        resultado = asyncio.run(pipeline.run(["inexistente", "tech"]))
+        
+        assert resultado["nichos"]["inexistente"]["salvos"] == 0
+        assert resultado["nichos"]["tech"]["salvos"] > 0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,128 @@
+"""
+Testes para o rate limiter (token bucket)
+"""
+import asyncio
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from src.database.connection import Base
+from src.database import models  # noqa: F401 - registra as tabelas
+from src.utils.rate_limiter import TokenBucket, DatabaseTokenBucket, RateLimiter
+
+
+class TestTokenBucket:
+    """Testes do bucket em memória"""
+    
+    def test_allows_burst_up_to_capacity(self):
+        """Permite consumir a capacidade inteira sem espera"""
+        bucket = TokenBucket(capacidade=3, taxa_por_segundo=1)
+        
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() == 0
+        assert bucket.try_acquire() > 0
+    
+    def test_acquire_waits_instead_of_failing(self):
+        """Quem excede o limite espera na fila"""
+        bucket = TokenBucket(capacidade=1, taxa_por_segundo=20)
+        
+        async def run():
+            await bucket.acquire()
+            return await bucket.acquire()
+        
+        espera = asyncio.run(run())
+        
+        assert espera >= 0.04
+    
+    def test_queue_is_fifo(self):
+        """Chamadas enfileiradas são atendidas na ordem de chegada"""
+        bucket = TokenBucket(capacidade=1, taxa_por_segundo=50)
+        ordem = []
+        
+        async def worker(i):
+            await bucket.acquire()
+            ordem.append(i)
+        
+        async def run():
+            await asyncio.gather(*(worker(i) for i in range(5)))
+        
+        asyncio.run(run())
+        
+        assert ordem == [0, 1, 2, 3, 4]
+
+
+class TestRateLimiter:
+    """Testes do limitador global + por endpoint"""
+    
+    def test_records_wait_metrics(self):
+        """Tempo de espera é exposto por endpoint"""
+        limiter = RateLimiter("teste", limite_por_minuto=1200, burst=1)
+        
+        async def run():
+            for _ in range(3):
+                await limiter.acquire("/product/get_offer_list")
+        
+        asyncio.run(run())
+        stats = limiter.get_stats()["endpoints"]["/product/get_offer_list"]
+        
+        assert stats["requisicoes"] == 3
+        assert stats["aguardando"] == 0
+        assert stats["requisicoes_com_espera"] == 2
+        assert stats["espera_max_ms"] >= 40
+    
+    def test_endpoint_bucket_is_enforced(self):
+        """Endpoints com limite próprio esperam no próprio bucket"""
+        limiter = RateLimiter(
+            "teste",
+            limite_por_minuto=6000,
+            burst=1,
+            limites_por_endpoint={"/link/generate": 600}
+        )
+        
+        async def run():
+            await limiter.acquire("/link/generate")
+            return await limiter.acquire("/link/generate")
+        
+        espera = asyncio.run(run())
+        
+        assert espera >= 0.09
+
+
+class TestDatabaseTokenBucket:
+    """Testes do bucket compartilhado via banco"""
+    
+    @pytest.fixture
+    def session_factory(self, tmp_path):
+        engine = create_engine(f"sqlite:///{tmp_path / 'rate_limit.db'}")
+        Base.metadata.create_all(engine)
+        yield sessionmaker(bind=engine)
+        engine.dispose()
+    
+    def test_workers_share_budget(self, session_factory):
+        """Dois workers consomem do mesmo bucket"""
+        worker_a = DatabaseTokenBucket("shopee", 2, 10, session_factory)
+        worker_b = DatabaseTokenBucket("shopee", 2, 10, session_factory)
+        
+        assert worker_a.try_acquire() == 0
+        assert worker_b.try_acquire() == 0
+        assert worker_a.try_acquire() > 0
+        assert worker_b.try_acquire() > 0
+    
+    def test_acquire_waits_for_refill(self, session_factory):
+        """acquire aguarda a reposição de tokens"""
+        bucket = DatabaseTokenBucket("shopee", 1, 20, session_factory)
+        
+        async def run():
+            await bucket.acquire()
+            inicio = time.monotonic()
+            await bucket.acquire()
+            return time.monotonic() - inicio
+        
+        assert asyncio.run(run()) >= 0.04
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,142 @@
+"""
+Testes do cache de redirecionamento dos short links
+"""
+import asyncio
+from datetime import datetime
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import event
+
+from src.database.models import Link
+from src.database.repository import LinkRepository, ProdutoRepository
+from src.links import redirect_cache
+from src.links.redirect_cache import ShortLinkCache
+from tests.conftest import make_produto
+
+
+@pytest.fixture
+def relogio(monkeypatch):
+    """Relógio controlado pelo teste para os TTLs"""
+    agora = [1000.0]
+    monkeypatch.setattr(redirect_cache, "time", SimpleNamespace(monotonic=lambda: agora[0]))
+    return agora
+
+
+@pytest.fixture
+def bancos(bancos):
+    """Banco compartilhado (conftest) com 5 links"""
+    session_factory, _ = bancos
+    with session_factory() as db:
+        ProdutoRepository.upsert_many(db, [make_produto(1)])
+        for i in range(1, 6):
+            db.add(Link(
+                produto_id=1, link_curto=f"s{i}", link_completo=f"https://s.shopee.com.br/{i}",
+                sub_id1="grupo", sub_id2="tech", sub_id3="texto",
+                sub_id4="oferta_dia", sub_id5=f"202601{i:02d}",
+                # s2 e s4 foram clicados; s4 mais recentemente
+                ultimo_clique_em={2: datetime(2026, 1, 1), 4: datetime(2026, 1, 2)}.get(i)
+            ))
+        db.commit()
+    return bancos
+
+
+def contar_selects(async_factory):
+    registro = {"selects": 0}
+    
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            registro["selects"] += 1
+    
+    event.listen(async_factory.kw["bind"].sync_engine, "before_cursor_execute", antes)
+    return registro
+
+
+class TestShortLinkCache:
+    """LRU com TTL em memória"""
+    
+    def test_get_put_and_lru_eviction(self, relogio):
+        cache = ShortLinkCache(max_itens=2)
+        cache.put("a", 1, "https://a")
+        cache.put("b", 2, "https://b")
+        
+        assert cache.get("a") == (1, "https://a")  # "a" passa a ser o mais recente
+        cache.put("c", 3, "https://c")
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == (1, "https://a")
+        assert cache.get("c") == (3, "https://c")
+        assert cache.get_stats()["removidos"] == 1
+    
+    def test_ttl_expiration(self, relogio):
+        cache = ShortLinkCache(ttl=60, ttl_negativo=5)
+        cache.put("a", 1, "https://a")
+        cache.put("x", None, None)
+        
+        relogio[0] += 10
+        assert cache.get("a") == (1, "https://a")
+        assert cache.get("x") is None
+        
+        relogio[0] += 60
+        assert cache.get("a") is None
+        assert len(cache) == 0
+        assert cache.get_stats()["expirados"] == 2
+    
+    def test_stats_hit_ratio(self, relogio):
+        cache = ShortLinkCache()
+        cache.put("a", 1, "https://a")
+        
+        for _ in range(3):
+            cache.get("a")
+        cache.get("b")
+        
+        stats = cache.get_stats()
+        assert (stats["hits"], stats["misses"], stats["hit_ratio"]) == (3, 1, 0.75)
+
+
+class TestResolver:
+    """Resolução com o banco em miss"""
+    
+    def test_miss_queries_once_then_hits(self, bancos):
+        _, async_factory = bancos
+        cache = ShortLinkCache(session_factory=async_factory)
+        registro = contar_selects(async_factory)
+        
+        async def cenario():
+            return [await cache.resolver("s3") for _ in range(5)]
+        
+        assert asyncio.run(cenario()) == [(3, "https://s.shopee.com.br/3")] * 5
+        assert registro["selects"] == 1
+        assert cache.get_stats()["consultas_banco"] == 1
+    
+    def test_unknown_code_is_negatively_cached(self, bancos):
+        _, async_factory = bancos
+        cache = ShortLinkCache(session_factory=async_factory)
+        registro = contar_selects(async_factory)
+        
+        async def cenario():
+            return [await cache.resolver("nao-existe") for _ in range(3)]
+        
+        assert asyncio.run(cenario()) == [None] * 3
+        assert registro["selects"] == 1
+    
+    def test_warm_loads_most_recently_clicked_last_in_lru(self, bancos):
+        _, async_factory = bancos
+        cache = ShortLinkCache(max_itens=3, session_factory=async_factory)
+        
+        assert asyncio.run(cache.aquecer()) == 3
+        
+        # Clicados primeiro (s4, s2), depois o mais novo (s5)
+        assert cache.get("s4") == (4, "https://s.shopee.com.br/4")
+        assert cache.get("s2") == (2, "https://s.shopee.com.br/2")
+        assert cache.get("s5") == (5, "https://s.shopee.com.br/5")
+        assert cache.get("s1") is None
+    
+    def test_listar_destinos_order(self, bancos):
+        session_factory, _ = bancos
+        
+        with session_factory() as db:
+            destinos = LinkRepository.listar_destinos(db, 10)
+            assert [d[0] for d in destinos] == ["s4", "s2", "s5", "s3", "s1"]
+            assert LinkRepository.buscar_destino(db, "s1") == (1, "https://s.shopee.com.br/1")
+            assert LinkRepository.buscar_destino(db, "zz") is None
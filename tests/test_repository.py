@@ -0,0 +1,332 @@
+"""
+Testes para o repository (produtos e analytics)
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, func, insert
+
+from src.analytics.metrics import metrics_calculator
+from src.database import models  # noqa: F401
+from src.database.models import Analytics, Produto, RollupWatermark
+from src.database.repository import AnalyticsRepository, AnalyticsRollupRepository, ProdutoRepository
+from tests.conftest import make_produto
+
+
+class TestUpsertMany:
+    """Testes do upsert em lote de produtos"""
+    
+    def test_inserts_new_products(self, db_session):
+        """Produtos novos são inseridos com os defaults do model"""
+        contagens = ProdutoRepository.upsert_many(db_session, [make_produto(i) for i in range(5)])
+        
+        assert contagens == {"inseridos": 5, "atualizados": 0, "inalterados": 0}
+        produto = ProdutoRepository.buscar_por_shopee_id(db_session, "1_0")
+        assert produto.ativo is True
+        assert produto.score_ranking == 0.0
+        assert produto.coletado_em is not None
+    
+    def test_updates_changed_and_skips_unchanged(self, db_session):
+        """Só produtos com preço/comissão/vendas diferentes são atualizados"""
+        ProdutoRepository.upsert_many(db_session, [make_produto(i) for i in range(4)])
+        original = ProdutoRepository.buscar_por_shopee_id(db_session, "1_1")
+        coletado_em = original.coletado_em
+        
+        contagens = ProdutoRepository.upsert_many(db_session, [
+            make_produto(0),
+            make_produto(1, preco_promocional=70.0),
+            make_produto(2, total_vendas=150),
+            make_produto(3, preco_promocional=None),
+            make_produto(4),
+        ])
+        
+        assert contagens == {"inseridos": 1, "atualizados": 3, "inalterados": 1}
+        
+        db_session.expire_all()
+        atualizado = ProdutoRepository.buscar_por_shopee_id(db_session, "1_1")
+        assert atualizado.preco_promocional == 70.0
+        assert atualizado.coletado_em == coletado_em
+        assert ProdutoRepository.buscar_por_shopee_id(db_session, "1_3").preco_promocional is None
+    
+    def test_counts_do_not_depend_on_timestamps(self, db_session, monkeypatch):
+        """Relógio parado (mesmo coletado_em): a atualização não conta como inserção"""
+        from src.database import repository
+        
+        class RelogioParado(datetime):
+            @classmethod
+            def utcnow(cls):
+                return datetime(2026, 1, 31, 12, 0, 0)
+        
+        monkeypatch.setattr(repository, "datetime", RelogioParado)
+        ProdutoRepository.upsert_many(db_session, [make_produto(1)])
+        
+        contagens = ProdutoRepository.upsert_many(db_session, [
+            make_produto(1, total_vendas=500), make_produto(2)
+        ])
+        
+        assert contagens == {"inseridos": 1, "atualizados": 1, "inalterados": 0}
+    
+    def test_inserted_ids_come_from_returning(self, db_session):
+        """Sem SELECT por lote: inserido vs atualizado sai do RETURNING"""
+        ProdutoRepository.upsert_many(db_session, [make_produto(1), make_produto(2)])
+        selects = []
+        event.listen(
+            db_session.get_bind(), "before_cursor_execute",
+            lambda conn, cursor, statement, *args: selects.append(statement)
+            if statement.lstrip().upper().startswith("SELECT") else None
+        )
+        
+        contagens, inseridos = ProdutoRepository.upsert_many_com_inseridos(db_session, [
+            make_produto(1), make_produto(2, total_vendas=5), make_produto(3), make_produto(4)
+        ], batch_size=2)
+        
+        assert contagens == {"inseridos": 2, "atualizados": 1, "inalterados": 1}
+        assert sorted(inseridos) == ["1_3", "1_4"]
+        assert len(selects) == 1  # só o maior id (SQLite), uma vez
+    
+    def test_does_not_overwrite_other_fields(self, db_session):
+        """Campos fora do upsert (ex: score) são preservados"""
+        ProdutoRepository.upsert_many(db_session, [make_produto(1)])
+        produto = ProdutoRepository.buscar_por_shopee_id(db_session, "1_1")
+        ProdutoRepository.atualizar_score(db_session, produto.id, 88.0, "teste")
+        
+        ProdutoRepository.upsert_many(db_session, [make_produto(1, nome="Outro nome", total_vendas=999)])
+        
+        db_session.expire_all()
+        produto = ProdutoRepository.buscar_por_shopee_id(db_session, "1_1")
+        assert produto.score_ranking == 88.0
+        assert produto.nome == "Produto 1"
+        assert produto.total_vendas == 999
+    
+    def test_duplicates_in_batch_and_small_batches(self, db_session):
+        """shopee_id repetido no lote vale a última ocorrência; lotes pequenos somam certo"""
+        produtos = [make_produto(i) for i in range(10)] + [make_produto(3, total_vendas=7)]
+        
+        contagens = ProdutoRepository.upsert_many(db_session, produtos, batch_size=3)
+        
+        assert contagens["inseridos"] == 10
+        assert db_session.query(Produto).count() == 10
+        assert ProdutoRepository.buscar_por_shopee_id(db_session, "1_3").total_vendas == 7
+    
+    def test_empty_list(self, db_session):
+        """Lista vazia não executa nada"""
+        assert ProdutoRepository.upsert_many(db_session, []) == {
+            "inseridos": 0, "atualizados": 0, "inalterados": 0
+        }
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
+
+
+class TestAnalyticsAggregate:
+    """Testes da agregação de analytics no banco"""
+    
+    @pytest.fixture
+    def analytics(self, db_session):
+        agora = datetime.utcnow()
+        linhas = [
+            # canal, nicho, dias atrás, impressões, cliques, conversões, receita
+            ("grupo", "tech", 0, 1000, 10, 1, 50.0),
+            ("grupo", "casa", 1, 100, 10, 5, 100.0),
+            ("status", "tech", 2, 10, 5, 0, 0.0),
+            (None, "tech", 3, 0, 0, 0, 0.0),
+            ("grupo", "tech", 30, 500, 50, 10, 500.0),
+        ]
+        for canal, nicho, dias, impressoes, cliques, conversoes, receita in linhas:
+            AnalyticsRepository.criar(db_session, {
+                "data": agora - timedelta(days=dias),
+                "canal": canal,
+                "nicho": nicho,
+                "impressoes": impressoes,
+                "cliques": cliques,
+                "conversoes": conversoes,
+                "receita": receita,
+                "comissao": receita / 10,
+                # Taxas por linha: a média delas não é a taxa do período
+                "ctr": cliques / impressoes * 100 if impressoes else 0.0,
+                "taxa_conversao": conversoes / cliques * 100 if cliques else 0.0,
+            })
+        return agora
+    
+    def test_totals_use_weighted_rates(self, db_session, analytics):
+        """CTR e conversão vêm das somas, não da média por linha"""
+        inicio = analytics - timedelta(days=7)
+        
+        [totais] = AnalyticsRepository.aggregate(db_session, data_inicio=inicio)
+        
+        assert totais["impressoes"] == 1110
+        assert totais["cliques"] == 25
+        assert totais["conversoes"] == 6
+        assert totais["receita"] == pytest.approx(150.0)
+        assert totais["ctr"] == round(25 / 1110 * 100, 2)
+        assert totais["taxa_conversao"] == round(6 / 25 * 100, 2)
+    
+    def test_groups_by_dimension(self, db_session, analytics):
+        """Uma linha por canal, ordenadas pela dimensão"""
+        linhas = AnalyticsRepository.aggregate(
+            db_session,
+            dimensions=("canal",),
+            metrics=("cliques", "ctr"),
+            data_inicio=analytics - timedelta(days=7)
+        )
+        
+        por_canal = {linha["canal"]: linha for linha in linhas}
+        assert set(por_canal) == {None, "grupo", "status"}
+        assert por_canal["grupo"] == {"canal": "grupo", "cliques": 20, "ctr": round(20 / 1100 * 100, 2)}
+        assert por_canal[None]["ctr"] == 0.0
+        assert set(linhas[0]) == {"canal", "cliques", "ctr"}
+    
+    def test_filters_and_day_dimension(self, db_session, analytics):
+        """Filtros de período/nicho e agrupamento por dia"""
+        linhas = AnalyticsRepository.aggregate(
+            db_session,
+            dimensions=("dia", "nicho"),
+            metrics=("cliques",),
+            data_inicio=analytics - timedelta(days=2, hours=1),
+            data_fim=analytics,
+            nicho="tech"
+        )
+        
+        assert [linha["cliques"] for linha in linhas] == [5, 10]
+        assert linhas[-1]["dia"] == analytics.date().isoformat()
+    
+    def test_empty_period(self, db_session):
+        """Período sem dados retorna zeros"""
+        resumo = AnalyticsRepository.resumo_ultimos_dias(db_session, 7)
+        
+        assert resumo == {
+            "total_cliques": 0,
+            "total_conversoes": 0,
+            "total_receita": 0,
+            "total_comissao": 0,
+            "ctr_medio": 0.0,
+            "taxa_conversao_media": 0.0,
+        }
+    
+    def test_rejects_unknown_dimension(self, db_session):
+        with pytest.raises(ValueError):
+            AnalyticsRepository.aggregate(db_session, dimensions=("cor",))
+
+
+class TestAnalyticsRollup:
+    """Testes dos rollups diários de analytics"""
+    
+    def _registrar(self, db_session, rng, quantidade, via_criar=True, produto_id=None):
+        agora = datetime.utcnow()
+        linhas = [
+            {
+                "data": agora - timedelta(days=rng.randint(0, 20), hours=rng.randint(0, 23)),
+                "canal": rng.choice(["grupo", "tiktok", None]),
+                "nicho": rng.choice(["tech", "casa"]),
+                "campanha": rng.choice(["a", None]),
+                "produto_id": produto_id,
+                "impressoes": rng.randint(0, 1000),
+                "cliques": rng.randint(0, 50),
+                "conversoes": rng.randint(0, 5),
+                "receita": float(rng.randint(0, 500)),
+                "comissao": float(rng.randint(0, 50)),
+            }
+            for _ in range(quantidade)
+        ]
+        if via_criar:
+            for linha in linhas:
+                AnalyticsRepository.criar(db_session, linha)
+        else:
+            # Carga em massa direto na tabela
+            db_session.execute(insert(Analytics), linhas)
+            db_session.commit()
+    
+    def _comparar_com_bruto(self, db_session, dimensions):
+        bruto = AnalyticsRepository.aggregate(db_session, dimensions=dimensions)
+        rollup = AnalyticsRollupRepository.aggregate(db_session, dimensions=dimensions)
+        
+        assert len(rollup) == len(bruto)
+        chave = lambda linha: tuple(str(linha[d]) for d in dimensions)
+        for esperado, obtido in zip(sorted(bruto, key=chave), sorted(rollup, key=chave)):
+            assert obtido == pytest.approx(esperado)
+    
+    def test_criar_leaves_rollups_to_the_scheduled_refresh(self, db_session):
+        """criar não trava watermarks nem agrega; o refresh agendado soma tudo"""
+        self._registrar(db_session, random.Random(1), 60)
+        
+        assert db_session.query(RollupWatermark).count() == 0
+        assert AnalyticsRollupRepository.aggregate(db_session, dimensions=("canal",)) == []
+        
+        assert AnalyticsRollupRepository.atualizar(db_session, lote=7)["analytics_diario"] == 60
+        self._comparar_com_bruto(db_session, ("dia", "canal", "nicho", "campanha"))
+        self._comparar_com_bruto(db_session, ("canal",))
+        self._comparar_com_bruto(db_session, ())
+    
+    def test_incremental_refresh_from_watermark(self, db_session):
+        """atualizar só agrega linhas acima do watermark (sem contar duas vezes)"""
+        rng = random.Random(2)
+        self._registrar(db_session, rng, 30, via_criar=False)
+        
+        assert AnalyticsRollupRepository.atualizar(db_session)["analytics_diario"] == 30
+        self._registrar(db_session, rng, 10, via_criar=False)
+        
+        processados = AnalyticsRollupRepository.atualizar(db_session)
+        
+        # Sem produto_id: nada entra no rollup por produto
+        assert processados == {"analytics_diario": 10, "analytics_produto_diario": 0}
+        assert AnalyticsRollupRepository.atualizar(db_session)["analytics_diario"] == 0
+        self._comparar_com_bruto(db_session, ("dia", "nicho"))
+        assert db_session.get(RollupWatermark, "analytics_diario").ultimo_id == 40
+    
+    def test_late_commit_with_lower_id_is_aggregated(self, db_session):
+        """Linha que fica visível depois de ids maiores ainda entra nos rollups"""
+        rng = random.Random(4)
+        self._registrar(db_session, rng, 5, via_criar=False)
+        db_session.execute(insert(Analytics), [{"id": 100, "data": datetime.utcnow(), "cliques": 7}])
+        db_session.commit()
+        AnalyticsRollupRepository.atualizar(db_session)
+        
+        # Commit tardio de uma transação que reservou um id menor
+        db_session.execute(insert(Analytics), [{"id": 50, "data": datetime.utcnow(), "cliques": 3}])
+        db_session.commit()
+        
+        assert AnalyticsRollupRepository.atualizar(db_session)["analytics_diario"] == 1
+        self._comparar_com_bruto(db_session, ("dia", "canal"))
+    
+    def test_product_rollup(self, db_session):
+        """Rollup por produto ignora linhas sem produto"""
+        ProdutoRepository.upsert_many(db_session, [make_produto(1)])
+        produto_id = ProdutoRepository.buscar_por_shopee_id(db_session, "1_1").id
+        rng = random.Random(3)
+        self._registrar(db_session, rng, 5, produto_id=produto_id)
+        self._registrar(db_session, rng, 5)
+        
+        assert AnalyticsRollupRepository.atualizar(db_session, lote=3) == {
+            "analytics_diario": 10, "analytics_produto_diario": 5
+        }
+        [linha] = AnalyticsRollupRepository.aggregate(
+            db_session, dimensions=("produto_id",), metrics=("cliques",)
+        )
+        
+        esperado = db_session.query(func.sum(Analytics.cliques)).filter(
+            Analytics.produto_id == produto_id
+        ).scalar()
+        assert linha == {"produto_id": produto_id, "cliques": esperado}
+    
+    def test_compare_periods_reads_rollups(self, db_session):
+        """compare_periods_rollup compara janelas de dias consecutivas"""
+        hoje = datetime.utcnow()
+        for dias, cliques in [(0, 30), (6, 10), (7, 20), (13, 5), (14, 100)]:
+            AnalyticsRepository.criar(db_session, {
+                "data": hoje - timedelta(days=dias),
+                "canal": "grupo",
+                "impressoes": 100,
+                "cliques": cliques,
+            })
+        AnalyticsRollupRepository.atualizar(db_session)
+        
+        resultado = metrics_calculator.compare_periods_rollup(db_session, dias=7)
+        
+        assert resultado["comparacao"]["cliques"] == {
+            "current": 40,
+            "previous": 25,
+            "variation_percent": 60.0,
+        }
+        assert resultado["periodo_anterior"]["fim"] == (hoje.date() - timedelta(days=7)).isoformat()
@@ -0,0 +1,249 @@
+"""
+Testes da camada de resiliência (retry, backoff, circuit breaker, histogramas)
+"""
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import httpx
+import pytest
+from telegram.error import BadRequest, RetryAfter, TimedOut
+
+from config.credentials import credentials
+from src.collectors.shopee_api import ShopeeAffiliateAPI
+from src.utils.rate_limiter import RateLimiter
+from src.utils.resilience import (
+    ABERTO,
+    FECHADO,
+    MEIO_ABERTO,
+    CircuitBreaker,
+    CircuitoAbertoError,
+    Histogram,
+    Resilience,
+    erro_transitorio,
+    retry_after,
+)
+
+
+def erro_http(status: int, headers: dict = None) -> httpx.HTTPStatusError:
+    request = httpx.Request("GET", "https://api.exemplo.com/x")
+    response = httpx.Response(status, headers=headers or {}, request=request)
+    return httpx.HTTPStatusError(f"status {status}", request=request, response=response)
+
+
+class Falhando:
+    """Operação que falha com os erros dados e depois devolve "ok" """
+    
+    def __init__(self, *erros):
+        self.erros = list(erros)
+        self.chamadas = 0
+    
+    async def __call__(self):
+        self.chamadas += 1
+        if self.erros:
+            raise self.erros.pop(0)
+        return "ok"
+
+
+def executar(resiliencia, operacao, **kwargs):
+    return asyncio.run(resiliencia.executar("api.exemplo.com", operacao, **kwargs))
+
+
+class TestClassificacao:
+    """Quais erros são repetidos e quanto esperar"""
+    
+    def test_transient_errors(self):
+        assert erro_transitorio(erro_http(503))
+        assert erro_transitorio(erro_http(429))
+        assert erro_transitorio(httpx.ReadTimeout("timeout"))
+        assert erro_transitorio(TimedOut())
+        assert erro_transitorio(RetryAfter(2))
+        assert not erro_transitorio(erro_http(400))
+        assert not erro_transitorio(BadRequest("chat not found"))
+        assert not erro_transitorio(ValueError("json inválido"))
+    
+    def test_non_idempotent_only_retries_unprocessed_requests(self):
+        assert erro_transitorio(erro_http(429), idempotente=False)
+        assert erro_transitorio(httpx.ConnectError("recusado"), idempotente=False)
+        assert erro_transitorio(RetryAfter(1), idempotente=False)
+        assert not erro_transitorio(erro_http(500), idempotente=False)
+        assert not erro_transitorio(httpx.ReadTimeout("timeout"), idempotente=False)
+        assert not erro_transitorio(TimedOut(), idempotente=False)
+    
+    def test_retry_after(self):
+        daqui_a_pouco = datetime.now(timezone.utc) + timedelta(seconds=30)
+        
+        assert retry_after(erro_http(429, {"Retry-After": "7"})) == 7.0
+        assert 25 < retry_after(erro_http(503, {"Retry-After": format_datetime(daqui_a_pouco)})) <= 30
+        assert retry_after(RetryAfter(3)) == 3.0
+        assert retry_after(erro_http(503)) is None
+
+
+class TestRetry:
+    """Retry com backoff exponencial e jitter"""
+    
+    def test_retries_transient_then_succeeds(self):
+        resiliencia = Resilience(tentativas=3, backoff_base_s=0.001)
+        operacao = Falhando(erro_http(503), httpx.ConnectError("caiu"))
+        
+        assert executar(resiliencia, operacao) == "ok"
+        assert operacao.chamadas == 3
+        stats = resiliencia.get_stats()["api.exemplo.com"]
+        assert (stats["sucessos"], stats["falhas"], stats["retries"]) == (1, 0, 2)
+        assert stats["tentativas"]["buckets"]["<=3"] == 1
+        assert stats["latencia_ms"]["total"] == 3
+    
+    def test_definitive_error_is_not_retried(self):
+        resiliencia = Resilience(backoff_base_s=0.001)
+        operacao = Falhando(erro_http(404))
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            executar(resiliencia, operacao)
+        
+        assert operacao.chamadas == 1
+        assert resiliencia.circuito("api.exemplo.com").get_stats()["falhas_seguidas"] == 0
+    
+    def test_gives_up_after_max_attempts(self):
+        resiliencia = Resilience(tentativas=2, backoff_base_s=0.001)
+        operacao = Falhando(*[erro_http(502)] * 5)
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            executar(resiliencia, operacao)
+        
+        assert operacao.chamadas == 2
+        assert resiliencia.get_stats()["api.exemplo.com"]["falhas"] == 1
+    
+    def test_honors_retry_after_instead_of_backoff(self):
+        resiliencia = Resilience(backoff_base_s=5.0)
+        operacao = Falhando(erro_http(429, {"Retry-After": "0.05"}))
+        
+        inicio = time.monotonic()
+        assert executar(resiliencia, operacao) == "ok"
+        
+        assert 0.05 <= time.monotonic() - inicio < 1.0
+    
+    def test_long_retry_after_gives_up(self):
+        resiliencia = Resilience(retry_after_max_s=10)
+        operacao = Falhando(erro_http(429, {"Retry-After": "3600"}))
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            executar(resiliencia, operacao)
+        
+        assert operacao.chamadas == 1
+    
+    def test_non_idempotent_timeout_is_not_retried(self):
+        resiliencia = Resilience(backoff_base_s=0.001)
+        operacao = Falhando(httpx.ReadTimeout("timeout"))
+        
+        with pytest.raises(httpx.ReadTimeout):
+            executar(resiliencia, operacao, idempotente=False)
+        
+        assert operacao.chamadas == 1
+    
+    def test_backoff_grows_with_jitter(self):
+        resiliencia = Resilience(backoff_base_s=1.0, backoff_max_s=4.0)
+        
+        esperas = [resiliencia.backoff(t) for t in (1, 2, 3, 4)]
+        
+        assert 0.5 <= esperas[0] <= 1.0
+        assert 1.0 <= esperas[1] <= 2.0
+        assert 2.0 <= esperas[2] <= 4.0
+        assert 2.0 <= esperas[3] <= 4.0
+        assert len({round(resiliencia.backoff(3), 6) for _ in range(20)}) > 1
+
+
+class TestCircuitBreaker:
+    """Fechado -> aberto -> meio-aberto -> fechado"""
+    
+    def test_opens_after_consecutive_failures_and_rejects_fast(self):
+        resiliencia = Resilience(tentativas=1, limite_falhas=3, reset_s=60)
+        operacao = Falhando(*[erro_http(503)] * 10)
+        
+        for _ in range(3):
+            with pytest.raises(httpx.HTTPStatusError):
+                executar(resiliencia, operacao)
+        with pytest.raises(CircuitoAbertoError):
+            executar(resiliencia, operacao)
+        
+        assert operacao.chamadas == 3
+        stats = resiliencia.get_stats()["api.exemplo.com"]
+        assert stats["circuito"]["estado"] == ABERTO
+        assert stats["recusadas_circuito"] == 1
+    
+    def test_half_open_probe_closes_or_reopens(self):
+        circuito = CircuitBreaker("api.exemplo.com", limite_falhas=1, reset_s=0.05)
+        circuito.registrar_falha()
+        assert not circuito.permitir()
+        
+        time.sleep(0.06)
+        assert circuito.estado == MEIO_ABERTO
+        assert circuito.permitir()
+        assert not circuito.permitir()  # só uma chamada de teste por vez
+        
+        circuito.registrar_falha()
+        assert circuito.estado == ABERTO
+        
+        time.sleep(0.06)
+        assert circuito.permitir()
+        circuito.registrar_sucesso()
+        assert circuito.estado == FECHADO
+        assert circuito.get_stats()["aberturas"] == 2
+    
+    def test_circuits_are_per_host(self):
+        resiliencia = Resilience(tentativas=1, limite_falhas=1, reset_s=60)
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(resiliencia.executar("a.com", Falhando(erro_http(500))))
+        
+        assert asyncio.run(resiliencia.executar("b.com", Falhando())) == "ok"
+        with pytest.raises(CircuitoAbertoError):
+            asyncio.run(resiliencia.executar("a.com", Falhando()))
+
+
+class TestHistogram:
+    """Buckets e quantis aproximados"""
+    
+    def test_buckets_and_quantiles(self):
+        histograma = Histogram((10, 100, 1000))
+        for valor in [5] * 90 + [50] * 8 + [5000] * 2:
+            histograma.observar(valor)
+        
+        stats = histograma.get_stats()
+        
+        assert stats["buckets"] == {"<=10": 90, "<=100": 8, "<=1000": 0, "+inf": 2}
+        assert (stats["p50"], stats["p95"], stats["p99"]) == (10, 100, None)
+        assert stats["total"] == 100
+
+
+class TestShopeeComResiliencia:
+    """A API Shopee passa pela camada de resiliência"""
+    
+    def test_collection_survives_transient_errors(self, monkeypatch):
+        monkeypatch.setattr(credentials, "SHOPEE_PARTNER_ID", "123")
+        monkeypatch.setattr(credentials, "SHOPEE_AFFILIATE_API_KEY", "key")
+        monkeypatch.setattr(credentials, "SHOPEE_AFFILIATE_SECRET", "secret")
+        respostas = [httpx.Response(503), httpx.Response(429, headers={"Retry-After": "0"})]
+        assinaturas = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            assinaturas.append(request.headers["Authorization"])
+            if respostas:
+                return respostas.pop(0)
+            return httpx.Response(200, json={"data": {"offers": [{"item_id": 1, "shop_id": 2}]}})
+        
+        async def run():
+            resiliencia = Resilience(backoff_base_s=0.001)
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                api = ShopeeAffiliateAPI(
+                    client=client,
+                    rate_limiter=RateLimiter("teste", limite_por_minuto=60000),
+                    resilience=resiliencia
+                )
+                return await api.get_product_offers(keyword="fone"), resiliencia.get_stats()
+        
+        offers, stats = asyncio.run(run())
+        
+        assert offers == [{"item_id": 1, "shop_id": 2}]
+        assert len(assinaturas) == 3
+        assert stats["partner.shopeemobile.com"]["retries"] == 2
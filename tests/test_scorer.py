@@ -0,0 +1,112 @@
+"""
+Testes para o scorer de produtos
+"""
+import random
+
+import numpy as np
+import pytest
+
+from src.ranking.scorer import ProductScorer
+from src.ranking.selector import ProductSelector
+
+
+def produtos_aleatorios(total: int, seed: int = 42) -> list:
+    """Produtos cobrindo todas as faixas, incluindo campos None/ausentes"""
+    rng = random.Random(seed)
+    produtos = []
+    for i in range(total):
+        produto = {
+            "shopee_id": f"1_{i}",
+            "comissao_percentual": rng.choice([None, 0, rng.uniform(0, 30), rng.randint(1, 25)]),
+            "preco_original": rng.choice([rng.uniform(1, 600), 50, 200, None]),
+            "preco_promocional": rng.choice([None, 0, rng.uniform(1, 400)]),
+            "desconto_percentual": rng.choice([None, rng.uniform(0, 80)]),
+            "rating": rng.choice([None, rng.uniform(0, 5), 5]),
+            "total_vendas": rng.choice([None, rng.randint(0, 5000)]),
+        }
+        if i % 17 == 0:
+            del produto["rating"]
+        produtos.append(produto)
+    return produtos
+
+
+class TestScoreBatch:
+    """Testes do score vetorizado"""
+    
+    def test_parity_with_scalar(self):
+        """score_batch gera os mesmos números e explicações de calcular_score"""
+        scorer = ProductScorer()
+        produtos = produtos_aleatorios(3000)
+        
+        resultado = scorer.score_batch(produtos)
+        
+        for i, produto in enumerate(produtos):
+            assert resultado.resultado(i) == scorer.calcular_score(produto)
+    
+    def test_columnar_input(self):
+        """Entrada colunar dá o mesmo resultado que a lista de dicts"""
+        scorer = ProductScorer()
+        produtos = produtos_aleatorios(500)
+        colunar = {
+            campo: [p.get(campo) for p in produtos]
+            for campo in ("comissao_percentual", "preco_original", "preco_promocional",
+                          "desconto_percentual", "rating", "total_vendas")
+        }
+        
+        por_lista = scorer.score_batch(produtos)
+        por_coluna = scorer.score_batch(colunar)
+        
+        assert np.array_equal(por_lista.totais, por_coluna.totais)
+    
+    def test_missing_columns_count_as_zero(self):
+        """Colunas ausentes na entrada colunar valem 0"""
+        scorer = ProductScorer()
+        
+        resultado = scorer.score_batch({"comissao_percentual": np.array([20.0, 10.0])})
+        
+        assert resultado.score(0) == scorer.calcular_score({"comissao_percentual": 20.0})[0]
+        assert len(resultado) == 2
+    
+    def test_ordem_top_n_keeps_ties_in_input_order(self):
+        """ordem(n) devolve os maiores scores, empates na ordem de entrada"""
+        scorer = ProductScorer()
+        produtos = [{"comissao_percentual": c} for c in [5, 10, 10, 2, 10, 8]]
+        
+        resultado = scorer.score_batch(produtos)
+        
+        assert list(resultado.ordem(2)) == [1, 2]
+        assert list(resultado.ordem(4)) == [1, 2, 4, 5]
+        assert list(resultado.ordem()) == [1, 2, 4, 5, 0, 3]
+    
+    def test_scalar_handles_none_fields(self):
+        """calcular_score aceita campos None (ex: desconto_percentual do parser)"""
+        score, _ = ProductScorer().calcular_score({
+            "comissao_percentual": 10,
+            "preco_original": 100,
+            "preco_promocional": None,
+            "desconto_percentual": None,
+            "rating": 4.5,
+            "total_vendas": None,
+        })
+        
+        assert score == 60.5
+
+
+class TestSelectorTopN:
+    """Testes do seletor usando o score em lote"""
+    
+    def test_selects_same_top_as_scalar_sort(self):
+        """Top N igual ao ordenar todos pelo score escalar"""
+        scorer = ProductScorer()
+        produtos = produtos_aleatorios(1000, seed=7)
+        
+        top = ProductSelector().selecionar_top_n(produtos, n=20)
+        
+        esperado = sorted(produtos, key=lambda p: scorer.calcular_score(p)[0], reverse=True)[:20]
+        assert [p["shopee_id"] for p in top] == [p["shopee_id"] for p in esperado]
+        assert all("explicacao_score" in p for p in top)
+        assert "score_calculado" not in produtos[0]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,138 @@
+"""
+Testes de propriedade do seletor de produtos
+
+Compara a seleção por heap com a implementação de referência (pontuar
+tudo, ordenar e cortar) em muitas entradas aleatórias com semente fixa.
+"""
+import asyncio
+import random
+
+import pytest
+
+from src.ranking.scorer import ProductScorer
+from src.ranking.selector import ProductSelector
+
+CASOS = 200
+
+scorer = ProductScorer()
+
+
+def produto_aleatorio(rng: random.Random, i: int) -> dict:
+    """Valores discretos para forçar muitos empates de score"""
+    return {
+        "shopee_id": f"1_{i}",
+        "comissao_percentual": rng.choice([None, 2, 5, 10, 15, 20]),
+        "preco_original": rng.choice([20, 50, 75, 100, 150, 200, 250, 400]),
+        "preco_promocional": rng.choice([None, None, 40, 90, 180]),
+        "desconto_percentual": rng.choice([None, 10, 30]),
+        "rating": rng.choice([None, 4.0, 4.5, 5.0]),
+        "total_vendas": rng.choice([0, 500, 1000]),
+    }
+
+
+def gerar_caso(seed: int):
+    rng = random.Random(seed)
+    produtos = [produto_aleatorio(rng, i) for i in range(rng.randint(0, 300))]
+    n = rng.randint(0, 25)
+    return rng, produtos, n
+
+
+def referencia_top_n(produtos: list, n: int) -> list:
+    """Algoritmo original: pontua todos, ordena (estável) e corta"""
+    pontuados = [(scorer.calcular_score(p)[0], p) for p in produtos]
+    ordenados = sorted(pontuados, key=lambda item: item[0], reverse=True)
+    return [(score, p["shopee_id"]) for score, p in ordenados[:n]]
+
+
+def referencia_diversificada(produtos: list, n: int) -> list:
+    """Algoritmo original: top por faixa de preço e reordenação final"""
+    selector = ProductSelector()
+    por_faixa = selector.agrupar_por_faixa_preco(produtos)
+    
+    selecionados = []
+    for i, produtos_faixa in enumerate(por_faixa.values()):
+        quantidade = n // 4 + (1 if i < n % 4 else 0)
+        pontuados = [(scorer.calcular_score(p)[0], p) for p in produtos_faixa]
+        selecionados.extend(sorted(pontuados, key=lambda item: item[0], reverse=True)[:quantidade])
+    
+    ordenados = sorted(selecionados, key=lambda item: item[0], reverse=True)
+    return [(score, p["shopee_id"]) for score, p in ordenados[:n]]
+
+
+def resumo(selecionados: list) -> list:
+    return [(p["score_calculado"], p["shopee_id"]) for p in selecionados]
+
+
+async def como_async(produtos: list):
+    for produto in produtos:
+        yield produto
+
+
+class TestTopNProperties:
+    """Propriedades de selecionar_top_n"""
+    
+    @pytest.mark.parametrize("seed", range(CASOS))
+    def test_matches_full_sort(self, seed):
+        """Mesmo resultado (inclusive ordem de empates) que ordenar tudo"""
+        rng, produtos, n = gerar_caso(seed)
+        selector = ProductSelector(tamanho_bloco=rng.randint(1, 64))
+        
+        assert resumo(selector.selecionar_top_n(produtos, n)) == referencia_top_n(produtos, n)
+    
+    @pytest.mark.parametrize("seed", range(0, CASOS, 10))
+    def test_generator_and_async_inputs(self, seed):
+        """Gerador e iterador assíncrono dão o mesmo resultado que a lista"""
+        rng, produtos, n = gerar_caso(seed)
+        selector = ProductSelector(tamanho_bloco=rng.randint(1, 64))
+        esperado = resumo(selector.selecionar_top_n(produtos, n))
+        
+        por_gerador = selector.selecionar_top_n((p for p in produtos), n)
+        por_async = asyncio.run(selector.selecionar_top_n_async(como_async(produtos), n))
+        
+        assert resumo(por_gerador) == esperado
+        assert resumo(por_async) == esperado
+    
+    @pytest.mark.parametrize("seed", range(0, CASOS, 10))
+    def test_filters_match_list_filtering(self, seed):
+        """Filtros em streaming equivalem a filtrar a lista antes"""
+        rng, produtos, n = gerar_caso(seed)
+        filtros = {"preco_max": rng.choice([60, 150, 300]), "rating_min": 4.5}
+        selector = ProductSelector()
+        
+        filtrados = [p for p in produtos if ProductSelector._passa_filtros(p, filtros)]
+        
+        assert resumo(selector.selecionar_top_n(produtos, n, filtros)) == referencia_top_n(filtrados, n)
+    
+    def test_does_not_mutate_input(self):
+        """Os produtos de entrada não recebem score_calculado"""
+        _, produtos, _ = gerar_caso(1)
+        
+        ProductSelector().selecionar_top_n(produtos, 5)
+        
+        assert all("score_calculado" not in p for p in produtos)
+
+
+class TestDiversificarProperties:
+    """Propriedades de diversificar_selecao"""
+    
+    @pytest.mark.parametrize("seed", range(CASOS))
+    def test_matches_per_band_sort(self, seed):
+        """Mesmo resultado que o top por faixa com ordenação completa"""
+        rng, produtos, n = gerar_caso(seed)
+        selector = ProductSelector(tamanho_bloco=rng.randint(1, 64))
+        
+        assert resumo(selector.diversificar_selecao(produtos, n)) == referencia_diversificada(produtos, n)
+    
+    @pytest.mark.parametrize("seed", range(0, CASOS, 10))
+    def test_async_input(self, seed):
+        """Versão assíncrona igual à síncrona"""
+        _, produtos, n = gerar_caso(seed)
+        selector = ProductSelector()
+        
+        por_async = asyncio.run(selector.diversificar_selecao_async(como_async(produtos), n))
+        
+        assert resumo(por_async) == resumo(selector.diversificar_selecao(produtos, n))
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
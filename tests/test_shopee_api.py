@@ -0,0 +1,254 @@
+"""
+Testes para o cliente da API Shopee
+"""
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from config.credentials import credentials
+from src.collectors import shopee_api
+from src.collectors.shopee_api import ShopeeAffiliateAPI
+from src.utils.rate_limiter import RateLimiter
+from src.utils.resilience import Resilience
+
+
+@pytest.fixture(autouse=True)
+def shopee_credentials(monkeypatch):
+    """Configura credenciais fictícias da Shopee"""
+    monkeypatch.setattr(credentials, "SHOPEE_PARTNER_ID", "123")
+    monkeypatch.setattr(credentials, "SHOPEE_AFFILIATE_API_KEY", "key")
+    monkeypatch.setattr(credentials, "SHOPEE_AFFILIATE_SECRET", "secret")
+
+
+def fake_shopee(request: httpx.Request) -> httpx.Response:
+    """Handler que imita as respostas da API Shopee"""
+    if request.url.path.endswith("/link/generate"):
+        body = json.loads(request.content)
+        return httpx.Response(200, json={
+            "data": {"affiliate_link": f"https://s.shopee.com.br/{body['item_id']}"}
+        })
+    
+    if request.url.path.endswith("/product/get_detail"):
+        return httpx.Response(200, json={"data": {"item_id": request.url.params["item_id"]}})
+    
+    return httpx.Response(200, json={"data": {"offers": [{"item_id": 1, "shop_id": 2}]}})
+
+
+class TestShopeeClientPool:
+    """Testes do pool de conexões compartilhado"""
+    
+    def test_reuses_single_client_across_calls(self, monkeypatch):
+        """Todas as chamadas usam o mesmo AsyncClient"""
+        criados = []
+        original = httpx.AsyncClient
+        
+        def factory(**kwargs):
+            client = original(transport=httpx.MockTransport(fake_shopee), **kwargs)
+            criados.append(client)
+            return client
+        
+        monkeypatch.setattr(shopee_api.httpx, "AsyncClient", factory)
+        
+        async def run():
+            async with ShopeeAffiliateAPI() as api:
+                offers = await api.get_product_offers(keyword="fone")
+                detail = await api.get_product_detail("10", "20")
+                link = await api.generate_affiliate_link("10", "20", ["a", "b", "c", "d", "e"])
+                return offers, detail, link
+        
+        offers, detail, link = asyncio.run(run())
+        
+        assert offers == [{"item_id": 1, "shop_id": 2}]
+        assert detail == {"item_id": "10"}
+        assert link == "https://s.shopee.com.br/10"
+        assert len(criados) == 1
+        assert criados[0].is_closed
+    
+    def test_pool_limits_are_configurable(self):
+        """Limites do pool são repassados ao httpx"""
+        api = ShopeeAffiliateAPI(max_connections=5, max_keepalive_connections=2)
+        
+        assert api.limits.max_connections == 5
+        assert api.limits.max_keepalive_connections == 2
+    
+    def test_external_client_is_not_closed(self):
+        """aclose() não fecha um cliente recebido de fora"""
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(fake_shopee))
+            api = ShopeeAffiliateAPI(client=client)
+            await api.get_product_offers()
+            await api.aclose()
+            return client
+        
+        client = asyncio.run(run())
+        
+        assert not client.is_closed
+    
+    def test_signed_body_matches_sent_body(self):
+        """A assinatura é calculada sobre o corpo exatamente enviado"""
+        recebidos = []
+        
+        def handler(request: httpx.Request) -> httpx.Response:
+            recebidos.append(request)
+            return fake_shopee(request)
+        
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            api = ShopeeAffiliateAPI(client=client)
+            await api.generate_affiliate_link("10", "20", ["a", "b", "c", "d", "e"])
+            await client.aclose()
+            return api
+        
+        api = asyncio.run(run())
+        request = recebidos[0]
+        body = json.loads(request.content)
+        signature = api._generate_signature("/link/generate", body["timestamp"], request.content.decode())
+        
+        assert request.headers["Authorization"] == f"key:{signature}"
+    
+    def test_shared_instance(self):
+        """get_shopee_api retorna sempre a mesma instância"""
+        async def run():
+            api = shopee_api.get_shopee_api()
+            same = shopee_api.get_shopee_api()
+            await shopee_api.close_shopee_api()
+            return api, same
+        
+        api, same = asyncio.run(run())
+        
+        assert api is same
+        assert shopee_api._shared_api is None
+
+
+class PaginatedShopee:
+    """Transport assíncrono que imita a paginação de get_offer_list"""
+    
+    def __init__(self, total_paginas: int, duplicar: bool = False):
+        self.total_paginas = total_paginas
+        self.duplicar = duplicar
+        self.paginas_pedidas = []
+        self.em_voo = 0
+        self.max_em_voo = 0
+    
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.em_voo += 1
+        self.max_em_voo = max(self.max_em_voo, self.em_voo)
+        try:
+            page = int(request.url.params["page"])
+            limit = int(request.url.params["limit"])
+            self.paginas_pedidas.append(page)
+            await asyncio.sleep(0.01)
+            
+            if page > self.total_paginas:
+                return httpx.Response(200, json={"data": {"offers": [], "has_more": False}})
+            
+            # Com duplicar, a primeira oferta repete a última da página anterior
+            passo = limit - 1 if self.duplicar else limit
+            inicio = (page - 1) * passo
+            offers = [{"item_id": i, "shop_id": 1} for i in range(inicio, inicio + limit)]
+            
+            return httpx.Response(200, json={
+                "data": {"offers": offers, "has_more": page < self.total_paginas}
+            })
+        finally:
+            self.em_voo -= 1
+
+
+def collect(handler, **kwargs):
+    """Consome iter_product_offers com um transport falso"""
+    async def run():
+        client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        api = ShopeeAffiliateAPI(
+            client=client,
+            rate_limiter=RateLimiter("teste", limite_por_minuto=60000),
+            resilience=Resilience(backoff_base_s=0.001)
+        )
+        offers = [offer async for offer in api.iter_product_offers(**kwargs)]
+        await client.aclose()
+        return offers
+    
+    return asyncio.run(run())
+
+
+class TestIterProductOffers:
+    """Testes da coleta paginada"""
+    
+    def test_fetches_all_pages(self):
+        """Percorre as páginas até has_more=False"""
+        handler = PaginatedShopee(total_paginas=5)
+        
+        offers = collect(handler, page_size=10, concurrency=2)
+        
+        assert sorted(o["item_id"] for o in offers) == list(range(50))
+    
+    def test_bounded_concurrency(self):
+        """Nunca há mais páginas em voo do que concurrency"""
+        handler = PaginatedShopee(total_paginas=12)
+        
+        collect(handler, page_size=10, concurrency=3)
+        
+        assert handler.max_em_voo == 3
+    
+    def test_deduplicates_offers(self):
+        """Ofertas repetidas entre páginas são entregues uma vez só"""
+        handler = PaginatedShopee(total_paginas=4, duplicar=True)
+        
+        offers = collect(handler, page_size=10, concurrency=2)
+        ids = [o["item_id"] for o in offers]
+        
+        assert len(ids) == len(set(ids))
+        assert len(ids) == 37
+    
+    def test_max_items_stops_early(self):
+        """max_items encerra a coleta sem buscar páginas desnecessárias"""
+        handler = PaginatedShopee(total_paginas=100)
+        
+        offers = collect(handler, page_size=10, concurrency=4, max_items=25)
+        
+        assert len(offers) == 25
+        assert max(handler.paginas_pedidas) <= 4
+    
+    def test_page_error_is_raised_after_previous_pages(self):
+        """Erro numa página sobe para quem consome, depois das ofertas já entregues"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.params["page"] == "1":
+                return httpx.Response(200, json={
+                    "data": {"offers": [{"item_id": 1, "shop_id": 1}], "has_more": True}
+                })
+            return httpx.Response(500)
+        
+        entregues = []
+        
+        async def run():
+            client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            api = ShopeeAffiliateAPI(
+                client=client,
+                rate_limiter=RateLimiter("teste", limite_por_minuto=60000),
+                resilience=Resilience(backoff_base_s=0.001)
+            )
+            try:
+                async for offer in api.iter_product_offers(page_size=1, concurrency=1):
+                    entregues.append(offer)
+            finally:
+                await client.aclose()
+        
+        with pytest.raises(httpx.HTTPStatusError):
+            asyncio.run(run())
+        
+        assert entregues == [{"item_id": 1, "shop_id": 1}]
+    
+    def test_offers_without_ids_are_not_collapsed(self):
+        """Só ofertas com shop_id e item_id entram na deduplicação"""
+        def handler(request: httpx.Request) -> httpx.Response:
+            return httpx.Response(200, json={"data": {"has_more": False, "offers": [
+                {"nome": "a"}, {"nome": "b"}, {"item_id": 1, "shop_id": 1}, {"item_id": 1, "shop_id": 1}
+            ]}})
+        
+        offers = collect(handler, page_size=10, concurrency=1)
+        
+        assert [o.get("nome", o.get("item_id")) for o in offers] == ["a", "b", 1]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
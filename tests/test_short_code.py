@@ -0,0 +1,171 @@
+"""
+Testes da alocação de short codes (base62 + blocos de IDs)
+"""
+import asyncio
+import threading
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from src.database import models  # noqa: F401
+from src.database.connection import Base
+from src.database.models import Link
+from src.database.repository import LinkRepository, ProdutoRepository, SequenciaRepository
+from src.links.short_code import (
+    ALFABETO_BASE62,
+    ESPACO,
+    ShortCodeAllocator,
+    codificar_base62,
+    codigo_para_id,
+    embaralhar,
+)
+from tests.conftest import make_produto
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Banco SQLite em arquivo (o alocador abre as próprias sessões)"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'codigos.db'}")
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine)
+    engine.dispose()
+
+
+def novo_link(link_curto: str, sub_id5: str = "20260101") -> dict:
+    return {
+        "produto_id": 1,
+        "link_curto": link_curto,
+        "link_completo": "https://s.shopee.com.br/x",
+        "sub_id1": "grupo",
+        "sub_id2": "tech",
+        "sub_id3": "texto",
+        "sub_id4": "oferta_dia",
+        "sub_id5": sub_id5,
+    }
+
+
+class TestCodificacao:
+    """base62 e bijeção dos IDs"""
+    
+    def test_base62(self):
+        assert codificar_base62(0) == "00000000"
+        assert codificar_base62(61) == "0000000Z"
+        assert codificar_base62(62) == "00000010"
+        assert codificar_base62(62 ** 8 - 1) == "Z" * 8
+        with pytest.raises(ValueError):
+            codificar_base62(-1)
+    
+    def test_scramble_is_injective_and_fixed_width(self):
+        ids = list(range(1, 50001)) + list(range(ESPACO - 1000, ESPACO))
+        codigos = [codigo_para_id(i) for i in ids]
+        
+        assert len(set(codigos)) == len(ids)
+        assert all(len(c) == 8 and set(c) <= set(ALFABETO_BASE62) for c in codigos)
+        assert all(0 <= embaralhar(i) < ESPACO for i in ids[:1000])
+    
+    def test_consecutive_ids_do_not_look_sequential(self):
+        a, b = codigo_para_id(1000), codigo_para_id(1001)
+        
+        assert sum(x != y for x, y in zip(a, b)) > 2
+    
+    def test_id_outside_space(self):
+        with pytest.raises(ValueError):
+            embaralhar(ESPACO)
+
+
+class TestSequencia:
+    """Reserva de blocos de IDs"""
+    
+    def test_blocks_do_not_overlap(self, session_factory):
+        with session_factory() as db:
+            inicios = [SequenciaRepository.reservar(db, "links", 100) for _ in range(3)]
+            outro = SequenciaRepository.reservar(db, "outra", 10)
+        
+        assert inicios == [1, 101, 201]
+        assert outro == 1
+
+
+class TestShortCodeAllocator:
+    """Short codes únicos com uma ida ao banco por bloco"""
+    
+    def test_one_query_per_block(self, session_factory):
+        alocador = ShortCodeAllocator(bloco=10, session_factory=session_factory)
+        updates = []
+        event.listen(
+            session_factory.kw["bind"], "before_cursor_execute",
+            lambda conn, cursor, statement, *args: updates.append(statement)
+            if statement.startswith("UPDATE") else None
+        )
+        
+        codigos = [alocador.gerar() for _ in range(25)]
+        
+        assert len(set(codigos)) == 25
+        assert len(updates) == 3
+        stats = alocador.get_stats()
+        assert (stats["blocos_reservados"], stats["codigos_gerados"], stats["disponiveis"]) == (3, 25, 5)
+    
+    def test_parallel_workers_never_collide(self, session_factory):
+        """Dois alocadores (workers) com threads concorrentes no mesmo banco"""
+        workers = [ShortCodeAllocator(bloco=7, session_factory=session_factory) for _ in range(2)]
+        gerados = []
+        trava = threading.Lock()
+        
+        def gerar(alocador):
+            codigos = [alocador.gerar() for _ in range(200)]
+            with trava:
+                gerados.extend(codigos)
+        
+        threads = [threading.Thread(target=gerar, args=(w,)) for w in workers for _ in range(3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert len(gerados) == 1200
+        assert len(set(gerados)) == 1200
+    
+    def test_gerar_async(self, session_factory):
+        alocador = ShortCodeAllocator(bloco=2, session_factory=session_factory)
+        
+        async def cenario():
+            return [await alocador.gerar_async() for _ in range(5)]
+        
+        codigos = asyncio.run(cenario())
+        
+        assert len(set(codigos)) == 5
+        assert alocador.get_stats()["blocos_reservados"] == 3
+
+
+class TestCriarLinkComColisao:
+    """Colisão de short code desfeita no savepoint e repetida com outro código"""
+    
+    def test_retry_with_new_code(self, session_factory):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1)])
+            existente = LinkRepository.criar(db, novo_link("abc12345"))
+            
+            link = LinkRepository.criar(db, novo_link("abc12345", "20260102"), gerar_codigo=lambda: "novo0001")
+            
+            assert link.link_curto == "novo0001"
+            assert existente.id != link.id
+            assert db.query(Link).count() == 2
+    
+    def test_collision_without_generator_raises(self, session_factory):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1)])
+            LinkRepository.criar(db, novo_link("abc12345"))
+            
+            with pytest.raises(IntegrityError):
+                LinkRepository.criar(db, novo_link("abc12345", "20260102"))
+    
+    def test_gives_up_after_max_attempts(self, session_factory):
+        with session_factory() as db:
+            ProdutoRepository.upsert_many(db, [make_produto(1)])
+            LinkRepository.criar(db, novo_link("abc12345"))
+            
+            with pytest.raises(IntegrityError):
+                LinkRepository.criar(
+                    db, novo_link("abc12345", "20260102"), gerar_codigo=lambda: "abc12345", tentativas=3
+                )
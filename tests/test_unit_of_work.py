@@ -0,0 +1,130 @@
+"""
+Testes da UnitOfWork e das atualizações em lote do repository
+"""
+import pytest
+from sqlalchemy import event
+
+from src.database import models  # noqa: F401
+from src.database.models import ConteudoGerado, Link, Produto
+from src.database.repository import ConteudoRepository, LinkRepository, ProdutoRepository
+from src.database.unit_of_work import UnitOfWork
+from tests.conftest import make_produto
+
+
+@pytest.fixture
+def dados(db_session):
+    """10 produtos, um conteúdo e um link por produto"""
+    ProdutoRepository.upsert_many(db_session, [make_produto(i) for i in range(10)])
+    produtos = db_session.query(Produto).order_by(Produto.id).all()
+    
+    for produto in produtos:
+        db_session.add(ConteudoGerado(
+            produto_id=produto.id, canal="grupo", formato="texto",
+            persona="economica", template="oferta", copy_texto="Oferta"
+        ))
+        db_session.add(Link(
+            produto_id=produto.id, link_curto=f"s{produto.id}",
+            link_completo=f"https://s.shopee.com.br/{produto.id}",
+            sub_id1="grupo", sub_id2=produto.nicho, sub_id3="texto",
+            sub_id4="oferta_dia", sub_id5="20260101"
+        ))
+    db_session.commit()
+    return produtos
+
+
+def contar_sql(db_session):
+    """Contadores de statements UPDATE executados e de commits da sessão"""
+    registro = {"updates": 0, "commits": 0}
+    
+    def antes(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("UPDATE"):
+            registro["updates"] += 1
+    
+    def commit(session):
+        registro["commits"] += 1
+    
+    event.listen(db_session.get_bind(), "before_cursor_execute", antes)
+    event.listen(db_session, "after_commit", commit)
+    return registro
+
+
+class TestUnitOfWork:
+    """Atualizações enfileiradas e aplicadas numa transação"""
+    
+    def test_one_transaction_with_bulk_updates(self, db_session, dados):
+        registro = contar_sql(db_session)
+        
+        with UnitOfWork(db_session) as uow:
+            for produto in dados:
+                uow.atualizar_score(produto.id, produto.id * 1.5, "lote")
+                uow.marcar_produto_publicado(produto.id)
+                uow.marcar_conteudo_publicado(produto.id)
+                uow.atualizar_metricas_link(produto.id, cliques=2, receita=1.0)
+                uow.atualizar_metricas_link(produto.id, cliques=1, conversoes=1)
+        
+        assert registro == {"updates": 4, "commits": 1}
+        
+        db_session.expire_all()
+        produto = db_session.get(Produto, 4)
+        assert produto.score_ranking == 6.0
+        assert produto.ja_publicado is True
+        assert db_session.get(ConteudoGerado, 4).publicado is True
+        link = db_session.get(Link, 4)
+        assert (link.total_cliques, link.total_conversoes, link.receita_gerada) == (3, 1, 1.0)
+        assert link.ultimo_clique_em is not None
+    
+    def test_last_score_wins(self, db_session, dados):
+        with UnitOfWork(db_session) as uow:
+            uow.atualizar_score(1, 10.0, "primeiro")
+            uow.atualizar_score(1, 20.0, "segundo", score_fingerprint="abc")
+            uow.atualizar_score(2, 30.0, "sem fingerprint")
+        
+        db_session.expire_all()
+        produto = db_session.get(Produto, 1)
+        assert (produto.score_ranking, produto.motivo_ranking) == (20.0, "segundo")
+        assert produto.score_fingerprint == "abc"
+        assert db_session.get(Produto, 2).score_ranking == 30.0
+    
+    def test_rollback_on_exception(self, db_session, dados):
+        with pytest.raises(RuntimeError):
+            with UnitOfWork(db_session) as uow:
+                uow.marcar_produto_publicado(1)
+                uow.flush()
+                raise RuntimeError("falha no meio do lote")
+        
+        db_session.expire_all()
+        assert db_session.get(Produto, 1).ja_publicado is False
+        assert uow.pendentes == 0
+
+
+class TestSetBasedUpdates:
+    """Variantes *_many do repository"""
+    
+    def test_marcar_como_publicado_many(self, db_session, dados):
+        assert ProdutoRepository.marcar_como_publicado_many(db_session, [1, 2, 2, 99]) == 2
+        assert ConteudoRepository.marcar_como_publicado_many(db_session, [3]) == 1
+        assert ProdutoRepository.marcar_como_publicado_many(db_session, []) == 0
+        
+        publicados = db_session.query(Produto.id).filter(Produto.ja_publicado == True).all()
+        assert sorted(p.id for p in publicados) == [1, 2]
+    
+    def test_metricas_increment_in_database(self, db_session, dados):
+        # Valor nulo no banco (linha antiga) também é incrementado
+        db_session.get(Link, 2).total_cliques = None
+        db_session.commit()
+        
+        LinkRepository.atualizar_metricas_many(db_session, [
+            {"link_id": 1, "conversoes": 1, "receita": 5.0},
+            {"link_id": 2, "cliques": 4},
+            {"link_id": 2, "cliques": 1},
+        ])
+        LinkRepository.atualizar_metricas(db_session, 2, cliques=1)
+        
+        db_session.expire_all()
+        assert db_session.get(Link, 1).ultimo_clique_em is None
+        assert db_session.get(Link, 1).receita_gerada == 5.0
+        assert db_session.get(Link, 2).total_cliques == 6
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])